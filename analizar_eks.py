@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
+import argparse
+import shlex
 import subprocess
 import sys
 import os
-from logger_utils import setup_logger
+from logger_utils import setup_logger, finalizar_instrumentacion
+from recolector_eks_aws import recolectar_cluster, RecoleccionError
+from calculadora_eks import PerfilCluster, evaluar_cluster, imprimir_reporte
 
 # Configurar logging
 logger = setup_logger('analizar_eks', 'eks_analysis.log')
@@ -26,8 +30,88 @@ def get_cluster_info():
     
     return cluster_name, region
 
+def collect_k8s_requests(context=None):
+    """
+    Requests de pods vs asignable desde el API de Kubernetes (recolector_k8s)
+
+    Returns:
+        CacheK8s, o None si no hay acceso al cluster
+    """
+    print("\n⏳ Consultando requests de pods en el API de Kubernetes...")
+    try:
+        from recolector_k8s import recolectar_requests
+        cache = recolectar_requests(context)
+    except Exception as e:
+        logger.warning(f"No se pudieron obtener los requests de Kubernetes: {e}")
+        print(f"⚠️  No se pudieron obtener los requests de Kubernetes: {e}")
+        return None
+    requests = cache.requests()
+    print(f"✅ {requests.pods} pods en {len(requests.nodos)} nodos: CPU {requests.fraccion_cpu*100:.1f}% "
+          f"y memoria {requests.fraccion_mem*100:.1f}% de lo asignable pedidos")
+    return cache
+
+def run_pipeline(cluster_name, region, workloads_file=None, bin_packing=False, rightsizing=False,
+                 k8s_requests=False, k8s_context=None):
+    """
+    Pipeline en proceso: llama al recolector y a la calculadora como funciones
+    y pasa un DatosCluster entre ambos (sin subprocesos ni parseo de exports)
+
+    Args:
+        workloads_file: Requests de pods para estimar Auto Mode por bin packing
+        bin_packing: Bin packing con pods sintetizados desde la utilización
+        rightsizing: Elegir la flota más barata del catálogo de instancias
+        k8s_requests: Usar los requests de pods del API de Kubernetes para el
+                      waste_factor (y como workloads del bin packing)
+        k8s_context: Contexto del kubeconfig (default: el actual)
+    """
+    print("\n⏳ Recolectando datos con AWS APIs...")
+    logger.info(f"Ejecutando recolector en proceso: cluster={cluster_name}, region={region}")
+
+    try:
+        datos = recolectar_cluster(cluster_name, region)
+    except RecoleccionError as e:
+        logger.error(f"Error recolectando datos: {e}")
+        print("❌ No se pudieron recolectar datos del cluster")
+        sys.exit(1)
+
+    logger.info(f"Datos recolectados: {datos.to_env()}")
+
+    print("\n" + "="*60)
+    print("💰 CALCULANDO COSTOS")
+    print("="*60 + "\n")
+
+    perfil = PerfilCluster.desde_recoleccion(datos)
+    if perfil.node_count == 0:
+        print("⚠️ Advertencia: Node count es 0. ¿Corriste el recolector?")
+    workloads = None
+    if workloads_file:
+        from empaquetado_nodos import cargar_workloads
+        workloads = cargar_workloads(workloads_file)
+    cache_k8s = collect_k8s_requests(k8s_context) if k8s_requests else None
+    if cache_k8s is not None:
+        requests = cache_k8s.requests()
+        perfil.requests_cpu, perfil.requests_mem = requests.fraccion_cpu, requests.fraccion_mem
+        if workloads is None and (bin_packing or rightsizing):
+            workloads = cache_k8s.workloads()
+    resultado = evaluar_cluster(perfil, interactive=True, verbose=True,
+                                workloads=workloads, bin_packing=bin_packing, rightsizing=rightsizing)
+    imprimir_reporte(resultado)
+    logger.info("Calculadora completada exitosamente")
+    return resultado
+
+def parse_env_exports(output):
+    """Parsea las líneas `export KEY='valor'` del recolector (respeta el quoting de shell)"""
+    env_vars = {}
+    for line in output.strip().split('\n'):
+        if line.startswith('export '):
+            tokens = shlex.split(line)
+            if len(tokens) == 2 and '=' in tokens[1]:
+                key, value = tokens[1].split('=', 1)
+                env_vars[key] = value
+    return env_vars
+
 def run_aws_collector(cluster_name, region):
-    """Ejecuta el recolector basado en AWS APIs"""
+    """Ejecuta el recolector basado en AWS APIs en un subproceso (modo compatibilidad)"""
     print("\n⏳ Recolectando datos con AWS APIs...")
     command = ["python3", "recolector_eks_aws.py"]
     input_data = f"{cluster_name}\n{region}\n"
@@ -57,7 +141,7 @@ def run_aws_collector(cluster_name, region):
         return None
 
 def run_calculator(env_vars):
-    """Ejecuta la calculadora de costos con las variables de entorno"""
+    """Ejecuta la calculadora de costos con las variables de entorno en un subproceso (modo compatibilidad)"""
     print("\n" + "="*60)
     print("💰 CALCULANDO COSTOS")
     print("="*60 + "\n")
@@ -87,12 +171,8 @@ def run_calculator(env_vars):
         print(f"❌ Error ejecutando calculadora: {e}")
         sys.exit(1)
 
-def main():
-    logger.info("=== INICIANDO ANÁLISIS EKS AUTO MODE ===")
-    print_header()
-    
-    cluster_name, region = get_cluster_info()
-    
+def run_subprocess_pipeline(cluster_name, region, extra_env=None):
+    """Flujo original: recolector y calculadora como subprocesos unidos por variables de entorno"""
     # Recolectar datos usando AWS APIs
     env_output = run_aws_collector(cluster_name, region)
     
@@ -102,17 +182,58 @@ def main():
         sys.exit(1)
     
     # Parsear variables de entorno
-    env_vars = {}
-    for line in env_output.strip().split('\n'):
-        if line.startswith('export '):
-            var_def = line.replace('export ', '')
-            key, value = var_def.split('=', 1)
-            env_vars[key] = value.strip("'\"")
+    env_vars = parse_env_exports(env_output)
     
+    env_vars.update(extra_env or {})
     logger.info(f"Variables parseadas: {env_vars}")
     
     # Ejecutar calculadora con las variables
     run_calculator(env_vars)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis de migración a EKS Auto Mode")
+    parser.add_argument('--cluster', help='Nombre del cluster EKS (si se omite se pregunta)')
+    parser.add_argument('--region', help='Región AWS (default: us-east-1)')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='Modo compatibilidad: recolector y calculadora como subprocesos')
+    parser.add_argument('--workloads', help='Requests de pods (CSV/JSON o kubectl get pods -o json) para bin packing')
+    parser.add_argument('--bin-packing', action='store_true',
+                        help='Estimar Auto Mode por bin packing con pods sintetizados desde la utilización')
+    parser.add_argument('--rightsizing', action='store_true',
+                        help='Estimar Auto Mode con la flota más barata del catálogo de instancias')
+    parser.add_argument('--k8s-requests', action='store_true',
+                        help='Usar los requests de pods del API de Kubernetes (kubeconfig) para estimar el desperdicio')
+    parser.add_argument('--k8s-context', help='Contexto del kubeconfig para --k8s-requests (default: el actual)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Mostrar al final el resumen de tiempos por etapa y llamada a AWS (también EKS_PROFILE=1)')
+    args = parser.parse_args(argv)
+
+    logger.info("=== INICIANDO ANÁLISIS EKS AUTO MODE ===")
+    print_header()
+    
+    if args.cluster:
+        cluster_name, region = args.cluster, args.region or "us-east-1"
+        logger.info(f"Cluster: {cluster_name}, Región: {region}")
+    else:
+        cluster_name, region = get_cluster_info()
+
+    if args.subprocess:
+        extra_env = {}
+        if args.workloads:
+            extra_env['EKS_WORKLOADS_FILE'] = os.path.abspath(args.workloads)
+        if args.bin_packing:
+            extra_env['EKS_BIN_PACKING'] = '1'
+        if args.rightsizing:
+            extra_env['EKS_RIGHTSIZING'] = '1'
+        if args.k8s_requests:
+            cache_k8s = collect_k8s_requests(args.k8s_context)
+            if cache_k8s is not None:
+                extra_env.update(cache_k8s.requests().to_env())
+        run_subprocess_pipeline(cluster_name, region, extra_env)
+    else:
+        run_pipeline(cluster_name, region, workloads_file=args.workloads, bin_packing=args.bin_packing,
+                     rightsizing=args.rightsizing, k8s_requests=args.k8s_requests, k8s_context=args.k8s_context)
+    finalizar_instrumentacion(args.profile or None)
     logger.info("=== ANÁLISIS COMPLETADO ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas para las llamadas a AWS.
+
+- Registro de clientes boto3 por (servicio, región): una sola sesión por
+  proceso y cada cliente se crea una vez y se reutiliza desde cualquier thread.
+- Limitador de tasa por servicio (token bucket) que se aplica en cada llamada
+  de los clientes, de modo que todas las llamadas de un proceso (incluido un
+  escaneo concurrente de la flota) respetan las cuotas de cada API.
+- Reintentos con backoff exponencial con jitter para errores de throttling y
+  transitorios (5xx, timeouts, conexiones cortadas); cada throttle baja la
+  tasa del servicio a la mitad y las llamadas exitosas la recuperan de a poco
+  hasta la cuota configurada (adaptativo).
+- Métricas por servicio/operación: llamadas, throttles, reintentos, errores y
+  segundos esperados en el limitador y en el backoff. Cada llamada además se
+  registra en la instrumentación de logger_utils (latencia, bytes, resultados).
+"""
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from logger_utils import medir
+
+# Llamadas por segundo por servicio (cuotas por defecto de cada API)
+DEFAULT_RATES = {
+    'ce': 5,            # Cost Explorer: 5 TPS
+    'cloudwatch': 50,   # GetMetricData: 50 TPS
+    'eks': 10,
+    'ec2': 20,
+    'autoscaling': 20,
+    'pricing': 10,
+    'sts': 20,
+}
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens por segundo, ráfagas de hasta `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Bloquea hasta disponer de `tokens`; retorna los segundos esperados"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        """Throttle de la API: la tasa baja a la mitad (sin pasar del 5% de la cuota) y se vacía el bucket"""
+        with self._lock:
+            self.rate = max(self.max_rate * 0.05, self.rate * 0.5)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+    def succeeded(self):
+        """Llamada exitosa: la tasa sube un 5% de la cuota hasta recuperarla"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+class RateLimiter:
+    """Un TokenBucket por servicio; los servicios sin tasa configurada no se limitan"""
+
+    def __init__(self, rates=None):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        for service, rate in (rates or {}).items():
+            self.set_rate(service, rate)
+
+    def set_rate(self, service, rate):
+        with self._lock:
+            if rate and rate > 0:
+                self._buckets[service] = TokenBucket(rate)
+            else:
+                self._buckets.pop(service, None)
+
+    def get_rate(self, service):
+        bucket = self._buckets.get(service)
+        return bucket.rate if bucket else None
+
+    def escalar(self, factor):
+        """Multiplica la tasa de todos los servicios limitados (p.ej. la parte de un proceso)"""
+        with self._lock:
+            rates = {service: bucket.rate * factor for service, bucket in self._buckets.items()}
+        for service, rate in rates.items():
+            self.set_rate(service, rate)
+
+    def acquire(self, service):
+        bucket = self._buckets.get(service)
+        return bucket.acquire() if bucket else 0.0
+
+    def throttled(self, service):
+        bucket = self._buckets.get(service)
+        if bucket:
+            bucket.throttled()
+
+    def succeeded(self, service):
+        bucket = self._buckets.get(service)
+        if bucket:
+            bucket.succeeded()
+
+def parse_rates(spec):
+    """'ce=5,cloudwatch=40' -> {'ce': 5.0, 'cloudwatch': 40.0}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            service, rate = item.split('=', 1)
+            rates[service.strip()] = float(rate)
+    return rates
+
+def _initial_rates():
+    rates = dict(DEFAULT_RATES)
+    rates.update(parse_rates(os.environ.get('EKS_AWS_RATE_LIMITS')))
+    return rates
+
+# Limitador compartido por todo el proceso (configurable con EKS_AWS_RATE_LIMITS)
+rate_limiter = RateLimiter(_initial_rates())
+
+# Códigos de error de throttling (varían por servicio; Cost Explorer usa LimitExceededException)
+THROTTLING_ERRORS = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'RequestLimitExceeded', 'LimitExceededException',
+    'ProvisionedThroughputExceededException', 'RequestThrottled', 'SlowDown',
+    'EC2ThrottledException', 'PriorRequestNotComplete', 'BandwidthLimitExceeded',
+}
+
+# Errores transitorios del servicio (además de cualquier HTTP 5xx): se reintentan sin bajar la tasa
+TRANSIENT_ERRORS = {
+    'InternalError', 'InternalFailure', 'InternalServerError', 'InternalServiceError',
+    'ServiceUnavailable', 'ServiceUnavailableException', 'Unavailable',
+    'RequestTimeout', 'RequestTimeoutException', 'IDPCommunicationError',
+}
+
+# Intentos totales por llamada y backoff exponencial (segundos) con full jitter
+MAX_ATTEMPTS = int(os.environ.get('EKS_AWS_MAX_ATTEMPTS', '8'))
+# Los errores transitorios se reintentan menos veces (como el modo standard de botocore)
+TRANSIENT_MAX_ATTEMPTS = int(os.environ.get('EKS_AWS_TRANSIENT_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE = float(os.environ.get('EKS_AWS_BACKOFF_BASE', '0.25'))
+BACKOFF_CAP = float(os.environ.get('EKS_AWS_BACKOFF_CAP', '20'))
+
+def is_throttling_error(error):
+    """True si la excepción de botocore es un throttle de la API (código conocido o HTTP 429)"""
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    code = response.get('Error', {}).get('Code')
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return code in THROTTLING_ERRORS or status == 429
+
+def is_transient_error(error):
+    """True si el error es transitorio: 5xx, timeout o conexión fallida/cortada"""
+    from botocore.exceptions import ConnectionError as BotocoreConnectionError, HTTPClientError
+
+    if isinstance(error, (BotocoreConnectionError, HTTPClientError)):
+        return True
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    code = response.get('Error', {}).get('Code')
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+    return code in TRANSIENT_ERRORS or status >= 500
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Espera antes del reintento `attempt` (1, 2, ...): uniforme en [0, min(cap, base * 2^attempt)]"""
+    base = BACKOFF_BASE if base is None else base
+    cap = BACKOFF_CAP if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class CallMetrics:
+    """Contadores thread-safe de llamadas a AWS por (servicio, operación)"""
+
+    FIELDS = ('calls', 'throttles', 'retries', 'errors', 'rate_wait_s', 'backoff_s')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def add(self, service, operation, **values):
+        with self._lock:
+            counters = self._counters[(service, operation)]
+            for name, value in values.items():
+                counters[name] += value
+
+    def snapshot(self):
+        """{'servicio.Operacion': {contadores}} con los tiempos redondeados"""
+        with self._lock:
+            return {f"{service}.{operation}": {name: round(value, 3) if name.endswith('_s') else value
+                                               for name, value in counters.items()}
+                    for (service, operation), counters in sorted(self._counters.items())}
+
+    def totals(self):
+        """Contadores sumados de todos los servicios"""
+        totals = dict.fromkeys(self.FIELDS, 0)
+        for counters in self.snapshot().values():
+            for name, value in counters.items():
+                totals[name] += value
+        return {name: round(value, 3) if name.endswith('_s') else value for name, value in totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+# Métricas compartidas por todo el proceso
+call_metrics = CallMetrics()
+
+def attach_retry(client, service, limiter=None, metrics=None, max_attempts=None, sleep=time.sleep,
+                 transient_max_attempts=None):
+    """
+    Envuelve las llamadas del cliente (incluidos los paginadores) con el
+    limitador de tasa y reintentos con backoff exponencial con jitter: hasta
+    max_attempts intentos por throttling y hasta transient_max_attempts por
+    errores transitorios (estos no bajan la tasa). Cualquier otro error se
+    propaga en el primer intento.
+    """
+    limiter = limiter or rate_limiter
+    metrics = metrics or call_metrics
+    max_attempts = max_attempts or MAX_ATTEMPTS
+    transient_max_attempts = min(max_attempts, transient_max_attempts or TRANSIENT_MAX_ATTEMPTS)
+    make_api_call = client._make_api_call
+
+    def _make_api_call(operation_name, api_params):
+        with medir('aws', f"{service}.{operation_name}") as evento:
+            result = _call(operation_name, api_params, evento)
+            metadata = result.get('ResponseMetadata', {})
+            evento['payload_bytes'] = int(metadata.get('HTTPHeaders', {}).get('content-length', 0))
+            evento['resultados'] = sum(len(value) for value in result.values() if isinstance(value, list))
+            return result
+
+    def _call(operation_name, api_params, evento):
+        attempt = 0
+        evento['reintentos'] = 0
+        while True:
+            attempt += 1
+            waited = limiter.acquire(service)
+            try:
+                result = make_api_call(operation_name, api_params)
+            except Exception as e:
+                throttle = is_throttling_error(e)
+                if not throttle and not is_transient_error(e):
+                    metrics.add(service, operation_name, calls=1, errors=1, rate_wait_s=waited)
+                    raise
+                if throttle:
+                    limiter.throttled(service)
+                if attempt >= (max_attempts if throttle else transient_max_attempts):
+                    metrics.add(service, operation_name, calls=1, throttles=int(throttle), errors=1,
+                                rate_wait_s=waited)
+                    raise
+                delay = backoff_delay(attempt)
+                metrics.add(service, operation_name, calls=1, throttles=int(throttle), retries=1,
+                            rate_wait_s=waited, backoff_s=delay)
+                evento['reintentos'] += 1
+                sleep(delay)
+                continue
+            limiter.succeeded(service)
+            metrics.add(service, operation_name, calls=1, rate_wait_s=waited)
+            return result
+
+    client._make_api_call = _make_api_call
+    return client
+
+# Conexiones HTTP por cliente; debe cubrir los threads que comparten un cliente
+MAX_POOL_CONNECTIONS = int(os.environ.get('EKS_AWS_MAX_POOL_CONNECTIONS', '25'))
+
+class ClientRegistry:
+    """
+    Clientes boto3 compartidos por (servicio, región).
+
+    Cada cliente pasa por attach_retry(): los reintentos propios de botocore se
+    desactivan para que el throttling y los errores transitorios se manejen en
+    un solo lugar. Los clientes de botocore son thread-safe una vez creados,
+    pero su creación desde la sesión no lo es, así que se serializa con un
+    lock. boto3 se importa de forma diferida. Tras un fork (ProcessPoolExecutor)
+    se descartan los clientes heredados y cada proceso crea los suyos.
+    """
+
+    def __init__(self, max_pool_connections=None, limiter=None, metrics=None, interceptor=None):
+        self.max_pool_connections = max_pool_connections or MAX_POOL_CONNECTIONS
+        self.limiter = limiter
+        self.metrics = metrics
+        # interceptor(client, service, region): envuelve cada cliente nuevo por debajo de
+        # los reintentos (grabación/reproducción, ver replay_aws.py); por defecto según el entorno
+        self.interceptor = interceptor if interceptor is not None else _interceptor_desde_entorno()
+        self._clients = {}
+        self._session = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._clients = {}
+            self._session = None
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+
+    def get(self, service, region):
+        """Retorna el cliente de (service, region), creándolo la primera vez"""
+        self._check_fork()
+        key = (service, region)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                if self._session is None:
+                    self._session = boto3.session.Session()
+                client = self._session.client(
+                    service, region_name=region,
+                    config=Config(max_pool_connections=self.max_pool_connections,
+                                  retries={'mode': 'standard', 'total_max_attempts': 1})
+                )
+                if self.interceptor is not None:
+                    client = self.interceptor(client, service, region)
+                attach_retry(client, service, self.limiter, self.metrics)
+                self._clients[key] = client
+                self.created += 1
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients = {}
+            self._session = None
+
+    def __len__(self):
+        return len(self._clients)
+
+def _interceptor_desde_entorno():
+    """Grabación/reproducción de respuestas con EKS_AWS_RECORD / EKS_AWS_REPLAY"""
+    if os.environ.get('EKS_AWS_REPLAY') or os.environ.get('EKS_AWS_RECORD'):
+        from replay_aws import interceptor_desde_entorno
+        return interceptor_desde_entorno()
+    return None
+
+# Registro compartido por el recolector, la calculadora y el escaneo de flota
+client_registry = ClientRegistry()
+
+def get_client(service, region):
+    """Cliente boto3 compartido para (service, region)"""
+    return client_registry.get(service, region)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: simulador de bin packing (empaquetado_nodos) con 50k pods.
+
+Dos escenarios sintéticos: un cluster realista (2.000 Deployments con
+requests típicos) y el peor caso (50k pods con requests todos distintos,
+que fuerza el redondeo a una grilla más gruesa). Reporta el tiempo de FFD
+y BFD y la distancia al límite inferior teórico de nodos.
+
+Uso:
+    python3 benchmarks/bench_empaquetado.py [--pods 50000] [--iterations 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from empaquetado_nodos import Workloads, allocatable, empaquetar  # noqa: E402
+
+def _escenarios(pods, seed=42):
+    rng = np.random.default_rng(seed)
+    # Deployments con requests típicos (múltiplos de 50m / 64Mi)
+    deploy_cpu = rng.choice([0.05, 0.1, 0.25, 0.5, 1, 2], 2000) * rng.integers(1, 3, 2000)
+    deploy_mem = rng.choice([0.0625, 0.125, 0.25, 0.5, 1, 2, 4], 2000) * rng.integers(1, 3, 2000)
+    owner = rng.integers(0, 2000, pods)
+    yield 'Deployments (2.000)', Workloads.desde_arrays(deploy_cpu[owner], deploy_mem[owner])
+    yield 'Requests distintos', Workloads.desde_arrays(rng.uniform(0.01, 2, pods), rng.uniform(0.05, 4, pods))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pods', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--vcpu', type=float, default=16)
+    parser.add_argument('--memory', type=float, default=64)
+    args = parser.parse_args(argv)
+
+    cap_cpu, cap_mem = allocatable(args.vcpu, args.memory)
+    print(f"{'='*72}")
+    print(f"📦 BIN PACKING: {args.pods} pods sobre nodos de {args.vcpu:g} vCPU / {args.memory:g} GiB")
+    print(f"{'='*72}")
+    print(f"  {'Escenario':<22} {'Estrategia':<10} {'Tamaños':>8} {'Nodos':>7} {'Límite inf.':>12} {'Mediana':>10}")
+    for nombre, workloads in _escenarios(args.pods):
+        limite = int(np.ceil(max(workloads.total_cpu / cap_cpu, workloads.total_memory / cap_mem)))
+        for estrategia in ('ffd', 'bfd'):
+            samples = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                nodos, _, _, _ = empaquetar(workloads, args.vcpu, args.memory, estrategia=estrategia)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"  {nombre:<22} {estrategia.upper():<10} {len(workloads.cpu):>8} {nodos:>7} {limite:>12} "
+                  f"{statistics.median(samples):>7.1f} ms")
+    print(f"{'='*72}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
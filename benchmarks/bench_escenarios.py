@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: barrido de escenarios vectorizado vs calcular_escenario() en un bucle.
+
+Evalúa un cluster con mix de tres tipos sobre Monte Carlo de 10k a 1M
+escenarios y compara con el costo por escenario del modelo escalar.
+
+Uso:
+    python3 benchmarks/bench_escenarios.py [--iterations 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calculadora_eks import PerfilCluster, PreciosInstancia, calcular_escenario  # noqa: E402
+from escenarios_eks import monte_carlo  # noqa: E402
+
+PRECIOS = {
+    'm5.large': PreciosInstancia(0.096, 0.0115, True),
+    'c5.2xlarge': PreciosInstancia(0.34, 0.0408, True),
+    'r5.4xlarge': PreciosInstancia(1.008, 0.121, True),
+}
+PERFIL = PerfilCluster(instance_type='m5.large', node_count=60, utilizacion_cpu=0.4, utilizacion_mem=0.55,
+                       monthly_cost_real=20000.0, instance_mix={'m5.large': 30, 'c5.2xlarge': 20, 'r5.4xlarge': 10})
+DISTRIBUCIONES = {
+    'efficiency_gain': 'triangular:0.05:0.2:0.35',
+    'utilizacion_cpu': 'normal:0.4:0.05',
+    'utilizacion_mem': 'normal:0.55:0.05',
+    'fee_percent': 'uniform:0.08:0.16',
+    'discount_factor': 'uniform:0.7:0.95',
+}
+
+def _median_ms(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    escalar_ms = _median_ms(lambda: [calcular_escenario(PERFIL, PRECIOS) for _ in range(1000)], args.iterations) / 1000
+
+    print(f"{'='*72}")
+    print(f"🎲 BARRIDO DE ESCENARIOS ({len(PERFIL.mix())} tipos, {len(DISTRIBUCIONES)} parámetros)")
+    print(f"{'='*72}")
+    print(f"  calcular_escenario():   {escalar_ms*1000:>8.1f} µs por escenario")
+    for n in (10_000, 100_000, 1_000_000):
+        ms = _median_ms(lambda: monte_carlo(PERFIL, PRECIOS, DISTRIBUCIONES, n=n, seed=1), args.iterations)
+        print(f"  Monte Carlo {n:>9,}:  {ms:>8.1f} ms  ({ms*1000/n:.2f} µs por escenario, "
+              f"x{escalar_ms*n/ms:,.0f} vs bucle)")
+    print(f"{'='*72}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pipeline en subprocesos vs pipeline en proceso (analizar_eks).
+
+Mide el costo de cada "salto" del modo compatibilidad (arranque del
+intérprete + import de boto3 + ida y vuelta por variables de entorno)
+contra la evaluación en proceso con un DatosCluster. No requiere
+credenciales: los precios salen de un índice construido con los offer
+files de fixtures/ y los datos del cluster son sintéticos.
+
+Uso:
+    python3 benchmarks/bench_pipeline.py [--iterations 5]
+"""
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from indice_precios import ingest  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'fixtures')
+
+def _median_ms(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def _datos_sinteticos():
+    from recolector_eks_aws import DatosCluster
+    instances = [{'instance_id': f"i-{n:08x}", 'instance_type': 'm5.large', 'launch_time': None}
+                 for n in range(50)]
+    return DatosCluster(cluster_name='bench', region='us-east-1', cluster_version='1.29',
+                        instances=instances, primary_instance='m5.large', cpu_util=35.0,
+                        mem_util=48.0, metric_source='Benchmark',
+                        cost_data={'monthly_cost': 2800.0, 'data_source': 'Benchmark'})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'price_index.bin')
+        ingest([os.path.join(FIXTURES, 'offer_ec2_sample.csv'),
+                os.path.join(FIXTURES, 'offer_eks_sample.json')]).save(index_path)
+
+        env = dict(os.environ, EKS_PRICE_INDEX=index_path, EKS_PRICING_CACHE='0',
+                   EKS_CALCULATOR_LOG_DIR=os.path.join(tmp, 'logs'))
+        os.environ.update({k: env[k] for k in ('EKS_PRICE_INDEX', 'EKS_PRICING_CACHE', 'EKS_CALCULATOR_LOG_DIR')})
+
+        from analizar_eks import parse_env_exports
+        from calculadora_eks import PerfilCluster, evaluar_cluster, imprimir_reporte
+        from recolector_eks_aws import format_env_exports
+
+        datos = _datos_sinteticos()
+        exports = format_env_exports(datos.to_env())
+
+        def salto_recolector():
+            # Arranque del intérprete + import del recolector (boto3) en un subproceso
+            subprocess.run([sys.executable, '-c', 'import recolector_eks_aws'],
+                           cwd=ROOT, env=env, check=True, capture_output=True)
+
+        def salto_calculadora():
+            calc_env = dict(env, **parse_env_exports(exports))
+            subprocess.run([sys.executable, 'calculadora_eks.py'],
+                           cwd=ROOT, env=calc_env, check=True, capture_output=True)
+
+        def en_proceso():
+            perfil = PerfilCluster.desde_recoleccion(datos)
+            imprimir_reporte(evaluar_cluster(perfil), file=io.StringIO())
+
+        recolector_ms = _median_ms(salto_recolector, args.iterations)
+        calculadora_ms = _median_ms(salto_calculadora, args.iterations)
+        en_proceso_ms = _median_ms(en_proceso, max(args.iterations, 50))
+
+    subprocesos_ms = recolector_ms + calculadora_ms
+    print(f"{'='*60}")
+    print(f"⏱️  OVERHEAD DEL PIPELINE (mediana de {args.iterations} iteraciones)")
+    print(f"{'='*60}")
+    print(f"  Subproceso recolector (arranque + imports): {recolector_ms:>9.1f} ms")
+    print(f"  Subproceso calculadora (completa):          {calculadora_ms:>9.1f} ms")
+    print(f"  {'-'*58}")
+    print(f"  Modo subprocesos (--subprocess):            {subprocesos_ms:>9.1f} ms")
+    print(f"  Modo en proceso (default):                  {en_proceso_ms:>9.3f} ms")
+    print(f"  Diferencia:                                 {subprocesos_ms / max(en_proceso_ms, 1e-6):>9.0f}x")
+    print(f"{'='*60}")
+    print("  (Las llamadas a AWS son idénticas en ambos modos y no se incluyen)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recolector + calculadora de punta a punta sobre grabaciones offline.
+
+Graba una vez el pipeline contra clusters sintéticos de 10/100/1000 nodos
+(replay_aws.py) y mide la reproducción sin red ni credenciales. Con
+--latency-ms y --throttle se simulan la latencia y el throttling de AWS (los
+reintentos de aws_utils los manejan como si fueran reales).
+
+Uso:
+    python3 benchmarks/bench_replay.py [--iterations 5] [--latency-ms 30] [--throttle 0.05]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('EKS_CALCULATOR_LOG_DIR', os.path.join(tempfile.gettempdir(), 'eks-bench-logs'))
+
+from aws_utils import RateLimiter  # noqa: E402
+from replay_aws import Grabacion, correr_pipeline, entorno_offline, grabar_cluster_sintetico, reproducir  # noqa: E402
+
+def _median_ms(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latencia simulada por llamada')
+    parser.add_argument('--throttle', type=float, default=0, help='Probabilidad de throttling simulado por llamada')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args(argv)
+
+    print(f"{'='*72}")
+    print(f"📼 PIPELINE OFFLINE (latencia {args.latency_ms:g} ms, throttling {args.throttle:.0%}, "
+          f"mediana de {args.iterations})")
+    print(f"{'='*72}")
+    print(f"  {'Nodos':>6} {'Respuestas':>11} {'Grabación':>11} {'Pipeline':>12} {'Clusters/s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nodes in args.sizes:
+            path = os.path.join(tmp, f'sintetico-{nodes}.json.gz')
+            grabacion = grabar_cluster_sintetico(path, nodes)
+
+            def pipeline():
+                interceptor = reproducir(Grabacion.cargar(path), latencia_ms=args.latency_ms,
+                                         throttle=args.throttle, seed=1)
+                # Sin límite de tasa: se mide el pipeline, no las cuotas de cada API
+                with entorno_offline(interceptor, RateLimiter()):
+                    correr_pipeline(f'sintetico-{nodes}')
+
+            ms = _median_ms(pipeline, args.iterations)
+            print(f"  {nodes:>6} {len(grabacion):>11} {os.path.getsize(path) / 1024:>9.1f}KB "
+                  f"{ms:>10.1f}ms {1000 / ms:>11.1f}")
+    print(f"{'='*72}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: selección de instancias sobre un catálogo sintético de ~1.000 tipos.
+
+Genera familias c/m/r/x/i/z de las generaciones 5 a 8 con atributos (a, i, g)
+y 12 tamaños cada una, y mide el armado del catálogo y la búsqueda
+de la flota óptima para varias demandas.
+
+Uso:
+    python3 benchmarks/bench_seleccion.py [--iterations 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seleccion_instancias import Catalogo, seleccionar_flota  # noqa: E402
+
+TAMANOS = [('large', 2), ('xlarge', 4), ('2xlarge', 8), ('4xlarge', 16), ('8xlarge', 32), ('12xlarge', 48),
+           ('16xlarge', 64), ('24xlarge', 96), ('32xlarge', 128), ('48xlarge', 192), ('metal', 96), ('medium', 1)]
+GIB_POR_VCPU = {'c': 2, 'm': 4, 'r': 8, 'x': 16, 'i': 8, 'z': 8}
+
+def _catalogo_sintetico(seed=3):
+    rng = np.random.default_rng(seed)
+    tipos, vcpu, memory, precio = [], [], [], []
+    for categoria, ratio in GIB_POR_VCPU.items():
+        for generacion in range(5, 9):
+            for atributos in ('', 'a', 'i', 'g'):
+                base = rng.uniform(0.03, 0.05) * (1 + ratio / 8)
+                for tamano, cpus in TAMANOS:
+                    tipos.append(f"{categoria}{generacion}{atributos}.{tamano}")
+                    vcpu.append(cpus)
+                    memory.append(cpus * ratio)
+                    precio.append(cpus * base)
+    precio = np.array(precio)
+    return tipos, vcpu, memory, precio, precio * 0.12
+
+def _median_ms(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    datos = _catalogo_sintetico()
+    catalogo = Catalogo(*datos)
+    build_ms = _median_ms(lambda: Catalogo(*datos), args.iterations)
+
+    print(f"{'='*72}")
+    print(f"🔍 SELECCIÓN DE INSTANCIAS: catálogo de {len(catalogo)} tipos (armado: {build_ms:.1f} ms)")
+    print(f"{'='*72}")
+    for cpu, mem in ((40, 160), (500, 900), (120, 2400), (2000, 4000)):
+        resultado = seleccionar_flota(catalogo, cpu, mem)
+        ms = _median_ms(lambda: seleccionar_flota(catalogo, cpu, mem), args.iterations)
+        flota = ' + '.join(f"{n} x {t}" for t, n in resultado.flota.items())
+        print(f"  {cpu:>5} vCPU / {mem:>5} GiB  {ms:>6.1f} ms  "
+              f"({resultado.tipos_evaluados} elegibles, {resultado.tipos_no_dominados} no dominados)  {flota}")
+    print(f"{'='*72}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
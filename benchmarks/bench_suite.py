@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de los caminos calientes del recolector y la calculadora.
+
+Cada caso corre sobre clusters sintéticos de varios tamaños (respuestas de
+replay_aws.py, sin red ni credenciales) y pasa por los clientes compartidos
+reales (reintentos, instrumentación), sin límite de tasa:
+
+- ce_daily:  30 días de resultados DAILY en get_real_cost_from_cost_explorer()
+- ec2_cpu:   agregación por instancia en get_ec2_cpu_utilization()
+- asg_scan:  búsqueda de ASGs y capacidad deseada en analyze_asg_stability()
+- calculo:   calcular_escenario() con mix de tipos y simulación horaria
+- pipeline:  analizar_eks.run_pipeline() completo (recolector + calculadora)
+
+Los resultados se guardan en JSON (--save) y se comparan contra una línea base
+(--compare): un caso es regresión si su mediana supera la de la base en más
+de --threshold (y en más de --min-delta-ms). Con regresiones sale con código 1.
+
+benchmarks/baseline.json es la línea base de referencia del repositorio. Los
+tiempos dependen de la máquina: antes de comparar en otra, se regenera ahí
+desde la rama principal (--save) y se compara la rama con cambios contra ella.
+
+Uso:
+    python3 benchmarks/bench_suite.py --save benchmarks/baseline.json
+    python3 benchmarks/bench_suite.py --compare --threshold 0.25
+    python3 benchmarks/bench_suite.py --cases ec2_cpu asg_scan --sizes 100 1000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('EKS_CALCULATOR_LOG_DIR', os.path.join(tempfile.gettempdir(), 'eks-bench-logs'))
+
+from aws_utils import RateLimiter  # noqa: E402
+from replay_aws import (entorno_offline, filtrar_asgs, respuestas_sinteticas, responder,  # noqa: E402
+                        PRECIOS_SINTETICOS, FEE_AUTO_MODE)
+
+FORMAT_VERSION = 1
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = (10, 100, 1000)
+REGION = 'us-east-1'
+
+def _median_ms(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+def _cluster(nodes):
+    return f'bench-{nodes}'
+
+def _respuestas(nodes):
+    """
+    Respuestas sintéticas del cluster más lo que crece con la cuenta: un
+    servicio de Cost Explorer cada 10 nodos y ASGs de otros clusters (uno por
+    nodo) en DescribeAutoScalingGroups
+    """
+    base = respuestas_sinteticas(_cluster(nodes), nodes, REGION)
+    servicios = [f'Servicio sintético {k}' for k in range(max(nodes // 10, 1))]
+
+    grupos = base('autoscaling', REGION, 'DescribeAutoScalingGroups', {})['AutoScalingGroups']
+    grupos += [dict(grupos[0], AutoScalingGroupName=f'otro-{k}-asg',
+                    Tags=[dict(grupos[0]['Tags'][0], Value=f'otro-cluster-{k}', ResourceId=f'otro-{k}-asg'),
+                          dict(grupos[0]['Tags'][1], Key=f'kubernetes.io/cluster/otro-cluster-{k}',
+                               ResourceId=f'otro-{k}-asg')])
+               for k in range(nodes)]
+
+    def asgs(params):
+        # Página de MaxRecords (como AWS) sobre los ASGs que pasan los filtros
+        filtrados = filtrar_asgs(grupos, params.get('Filters', []))
+        page_size = params.get('MaxRecords', 50)
+        offset = int(params.get('NextToken', 0))
+        response = {'AutoScalingGroups': filtrados[offset:offset + page_size]}
+        if offset + page_size < len(filtrados):
+            response['NextToken'] = str(offset + page_size)
+        return response
+
+    def funcion(service, region, operation, params):
+        if operation == 'DescribeAutoScalingGroups':
+            return asgs(params)
+        response = base(service, region, operation, params)
+        if operation == 'GetCostAndUsage' and params['Granularity'] == 'DAILY':
+            for result in response['ResultsByTime']:
+                result['Groups'] += [{'Keys': [servicio, 'On Demand Instances'],
+                                      'Metrics': {'AmortizedCost': {'Amount': '0.50', 'Unit': 'USD'},
+                                                  'UsageQuantity': {'Amount': '1', 'Unit': 'N/A'}}}
+                                     for servicio in servicios]
+        return response
+    return funcion
+
+def bench_ce_daily(nodes):
+    from recolector_eks_aws import get_real_cost_from_cost_explorer
+    return lambda: get_real_cost_from_cost_explorer(_cluster(nodes), REGION, [])
+
+def bench_ec2_cpu(nodes):
+    from recolector_eks_aws import get_ec2_cpu_utilization
+    instance_ids = [f'i-{idx:017x}' for idx in range(nodes)]
+    return lambda: get_ec2_cpu_utilization(instance_ids, REGION)
+
+def bench_asg_scan(nodes):
+    from recolector_eks_aws import analyze_asg_stability
+    return lambda: analyze_asg_stability(_cluster(nodes), REGION)
+
+def bench_calculo(nodes):
+    from calculadora_eks import PerfilCluster, PreciosInstancia, calcular_escenario
+    mix = {'m5.large': nodes * 6 // 10 or 1, 'm5.xlarge': nodes * 2 // 10 or 1,
+           'c5.2xlarge': nodes // 10 or 1, 'r5.xlarge': nodes // 10 or 1}
+    precios = {t: PreciosInstancia(PRECIOS_SINTETICOS[t], PRECIOS_SINTETICOS[t] * FEE_AUTO_MODE, True) for t in mix}
+    perfil_horario = [0.35 + 0.15 * (h % 24) / 23 for h in range(168)]
+    perfil = PerfilCluster(instance_type='m5.large', node_count=sum(mix.values()), utilizacion_cpu=0.35,
+                           utilizacion_mem=0.55, monthly_cost_real=nodes * 100.0, instance_mix=mix,
+                           perfil_cpu=perfil_horario, perfil_mem=perfil_horario)
+    return lambda: calcular_escenario(perfil, precios)
+
+def bench_pipeline(nodes):
+    from analizar_eks import run_pipeline
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            run_pipeline(_cluster(nodes), REGION)
+    return run
+
+CASES = {
+    'ce_daily': bench_ce_daily,
+    'ec2_cpu': bench_ec2_cpu,
+    'asg_scan': bench_asg_scan,
+    'calculo': bench_calculo,
+    'pipeline': bench_pipeline,
+}
+
+def run_suite(cases, sizes, iterations):
+    """{'caso[nodos]': {'case', 'nodes', 'median_ms', 'min_ms'}}"""
+    results = {}
+    for nodes in sizes:
+        # Un registro por tamaño: los clientes se crean fuera de la medición
+        with entorno_offline(responder(_respuestas(nodes)), RateLimiter()):
+            for case in cases:
+                func = CASES[case](nodes)
+                func()  # calentamiento (imports, clientes)
+                median_ms, min_ms = _median_ms(func, iterations)
+                results[f'{case}[{nodes}]'] = {'case': case, 'nodes': nodes,
+                                               'median_ms': round(median_ms, 3), 'min_ms': round(min_ms, 3)}
+    return results
+
+def compare(results, baseline, threshold, min_delta_ms=0.5):
+    """
+    Compara contra la línea base
+
+    Returns:
+        list: [(clave, base_ms, actual_ms, cambio relativo, es_regresión)] de
+              los casos presentes en ambos
+    """
+    rows = []
+    for key, result in results.items():
+        base = baseline.get('resultados', {}).get(key)
+        if base is None:
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1 if base['median_ms'] > 0 else 0.0
+        regression = change > threshold and result['median_ms'] - base['median_ms'] > min_delta_ms
+        rows.append((key, base['median_ms'], result['median_ms'], change, regression))
+    return rows
+
+def _maquina():
+    return {'python': platform.python_version(), 'maquina': platform.machine(), 'cpus': os.cpu_count()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--save', help='Guardar los resultados en JSON')
+    parser.add_argument('--compare', nargs='?', const=BASELINE,
+                        help='Línea base JSON contra la que comparar (sin valor: benchmarks/baseline.json)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Aumento relativo de la mediana que cuenta como regresión (default: 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='Diferencia absoluta mínima para considerar una regresión (ruido)')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.cases, args.sizes, args.iterations)
+
+    print(f"{'='*72}")
+    print(f"🏁 SUITE DE BENCHMARKS (mediana de {args.iterations} iteraciones)")
+    print(f"{'='*72}")
+    print(f"  {'Caso':<12}" + ''.join(f"{f'{n} nodos':>14}" for n in args.sizes))
+    for case in args.cases:
+        print(f"  {case:<12}" + ''.join(f"{results[f'{case}[{n}]']['median_ms']:>12.2f}ms" for n in args.sizes))
+    print(f"{'='*72}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'fecha': datetime.now().isoformat(timespec='seconds'),
+                       **_maquina(), 'iteraciones': args.iterations,
+                       'resultados': results}, f, indent=2, ensure_ascii=False)
+        print(f"📄 Resultados guardados en {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold, args.min_delta_ms)
+        regressions = [row for row in rows if row[4]]
+        print(f"\n  Comparación con {args.compare} (umbral +{args.threshold:.0%}):")
+        if any(baseline.get(key) != value for key, value in _maquina().items()):
+            print("  ⚠️  La línea base es de otra máquina o versión de Python: regenerarla acá con --save")
+        for key, base_ms, current_ms, change, regression in rows:
+            icon = '❌' if regression else '✅'
+            print(f"  {icon} {key:<20} {base_ms:>10.2f}ms → {current_ms:>10.2f}ms ({change:+.1%})")
+        if regressions:
+            print(f"\n  ⚠️  {len(regressions)} regresiones")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
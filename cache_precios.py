@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Cache persistente de precios (SQLite) para la calculadora.
+
+Los precios de AWS cambian con poca frecuencia, así que cada consulta al
+Pricing API se guarda localmente con clave (servicio, tipo de instancia,
+región, operación), un TTL configurable y desalojo LRU. Mientras el cache
+esté fresco, la calculadora no hace ninguna llamada al Pricing API.
+
+Uso del comando de precarga:
+    python3 cache_precios.py warmup --regions us-east-1 eu-west-1 --families m5 c5 r5
+    python3 cache_precios.py stats
+    python3 cache_precios.py clear
+"""
+import argparse
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Directorio de cache configurable mediante variable de entorno (igual que los logs)
+CACHE_DIR = os.environ.get('EKS_CALCULATOR_CACHE_DIR', 'cache')
+CACHE_FILE = 'pricing_cache.sqlite'
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 5000
+
+# Tamaños precargados por defecto en el warm-up
+DEFAULT_WARMUP_SIZES = ['medium', 'large', 'xlarge', '2xlarge', '4xlarge', '8xlarge']
+
+class PricingCache:
+    """
+    Cache SQLite de precios con TTL y desalojo LRU
+
+    Las entradas se identifican por (service, instance_type, region, operation).
+    También se guardan los resultados negativos (precio None) para no repetir
+    consultas que el API no puede responder.
+
+    Un hit no escribe en disco: el último acceso queda en memoria y se
+    actualiza en lote en el próximo set() (antes del desalojo), flush() o close().
+    """
+
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None):
+        if path is None:
+            path = os.environ.get('EKS_PRICING_CACHE_PATH') or os.path.join(CACHE_DIR, CACHE_FILE)
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('EKS_PRICING_CACHE_TTL_DAYS', DEFAULT_TTL_DAYS)) * 86400
+        if max_entries is None:
+            max_entries = int(os.environ.get('EKS_PRICING_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._accesos = {}
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS prices (
+                service TEXT NOT NULL,
+                instance_type TEXT NOT NULL,
+                region TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                price REAL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (service, instance_type, region, operation)
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_prices_last_access ON prices (last_access)')
+        self._conn.commit()
+
+    def get(self, service, instance_type, region, operation):
+        """
+        Busca un precio en el cache
+
+        Returns:
+            tuple: (hit, price). hit es False si no existe o expiró.
+        """
+        key = (service, instance_type, region, operation)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT price, fetched_at FROM prices '
+                'WHERE service=? AND instance_type=? AND region=? AND operation=?', key
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                return False, None
+            self._accesos[key] = now
+            return True, row[0]
+
+    def _guardar_accesos(self):
+        """Escribe los últimos accesos pendientes (requiere el lock; sin commit)"""
+        if self._accesos:
+            self._conn.executemany(
+                'UPDATE prices SET last_access=? '
+                'WHERE service=? AND instance_type=? AND region=? AND operation=?',
+                [(now,) + key for key, now in self._accesos.items()]
+            )
+            self._accesos = {}
+
+    def flush(self):
+        """Persiste los últimos accesos de los hits (orden LRU)"""
+        with self._lock:
+            if self._accesos:
+                self._guardar_accesos()
+                self._conn.commit()
+
+    def set(self, service, instance_type, region, operation, price):
+        """Guarda un precio (o None) y aplica el desalojo LRU si se supera el máximo"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO prices '
+                '(service, instance_type, region, operation, price, fetched_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (service, instance_type, region, operation, price, now, now)
+            )
+            self._accesos.pop((service, instance_type, region, operation), None)
+            self._guardar_accesos()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM prices WHERE rowid IN '
+                '(SELECT rowid FROM prices ORDER BY last_access ASC LIMIT ?)', (excess,)
+            )
+
+    def purge_expired(self):
+        """Elimina las entradas vencidas; retorna cuántas se borraron"""
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM prices WHERE fetched_at < ?',
+                                        (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM prices')
+            self._conn.commit()
+
+    def stats(self):
+        """Retorna {'entries', 'fresh', 'expired'}"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            total, fresh = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(fetched_at >= ?), 0) FROM prices', (cutoff,)
+            ).fetchone()
+        return {'entries': total, 'fresh': fresh, 'expired': total - fresh}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """
+    Cache compartido del proceso. Se desactiva con EKS_PRICING_CACHE=0
+    (retorna None).
+    """
+    global _default_cache
+    if os.environ.get('EKS_PRICING_CACHE', '1').lower() in ('0', 'false', 'no'):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PricingCache()
+            atexit.register(_default_cache.flush)
+        return _default_cache
+
+def cached_price(service, instance_type, region, operation, fetch, cache=None, refresh=False):
+    """
+    Retorna el precio desde el cache o lo obtiene con `fetch()` y lo guarda
+
+    Args:
+        fetch: Callable sin argumentos que consulta el Pricing API
+        cache: PricingCache a usar (default: get_default_cache())
+        refresh: Ignora el valor cacheado y vuelve a consultar
+    """
+    cache = cache if cache is not None else get_default_cache()
+    if cache is None:
+        return fetch()
+
+    if not refresh:
+        hit, price = cache.get(service, instance_type, region, operation)
+        if hit:
+            return price
+
+    price = fetch()
+    cache.set(service, instance_type, region, operation, price)
+    return price
+
+def warmup(regions, families, sizes=None, cache=None):
+    """
+    Precarga el cache consultando EC2 y Auto Mode fee para cada combinación
+    de región y tipo de instancia (familia.tamaño)
+
+    Returns:
+        int: Número de tipos de instancia procesados
+    """
+    # Import diferido: la calculadora importa este módulo
+    from calculadora_eks import obtener_precio_ec2_aws, obtener_precio_eks_automode_aws
+
+    cache = cache if cache is not None else get_default_cache()
+    sizes = sizes or DEFAULT_WARMUP_SIZES
+    processed = 0
+    for region in regions:
+        for family in families:
+            for size in sizes:
+                instance_type = f"{family}.{size}"
+                ec2 = obtener_precio_ec2_aws(instance_type, region, cache=cache, refresh=True)
+                fee = obtener_precio_eks_automode_aws(instance_type, region, cache=cache, refresh=True)
+                processed += 1
+                print(f"  {region:<16} {instance_type:<16} EC2: {_fmt(ec2):>10}  Auto Mode fee: {_fmt(fee):>10}")
+    return processed
+
+def _fmt(price):
+    return f"${price:.4f}" if price is not None else "N/D"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache local de precios de la calculadora EKS")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    warm = subparsers.add_parser('warmup', help='Precarga precios para regiones y familias')
+    warm.add_argument('--regions', nargs='+', required=True)
+    warm.add_argument('--families', nargs='+', required=True, help='Ej: m5 c5 r5 t3')
+    warm.add_argument('--sizes', nargs='+', default=DEFAULT_WARMUP_SIZES)
+
+    subparsers.add_parser('stats', help='Muestra el estado del cache')
+    subparsers.add_parser('purge', help='Elimina entradas vencidas')
+    subparsers.add_parser('clear', help='Vacía el cache')
+
+    args = parser.parse_args(argv)
+    cache = PricingCache()
+
+    if args.command == 'warmup':
+        print(f"🔥 Precargando cache de precios en {cache.path}...")
+        processed = warmup(args.regions, args.families, args.sizes, cache=cache)
+        print(f"✅ {processed} tipos de instancia precargados")
+    elif args.command == 'stats':
+        stats = cache.stats()
+        print(f"📦 Cache: {cache.path}")
+        print(f"   Entradas: {stats['entries']} (frescas: {stats['fresh']}, vencidas: {stats['expired']})")
+        print(f"   TTL: {cache.ttl_seconds / 86400:.1f} días, máximo: {cache.max_entries} entradas")
+    elif args.command == 'purge':
+        print(f"🧹 {cache.purge_expired()} entradas vencidas eliminadas")
+    elif args.command == 'clear':
+        cache.clear()
+        print("🧹 Cache vaciado")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
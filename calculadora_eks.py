@@ -2,40 +2,52 @@ import os
 import sys
 import json
 import math
-
-try:
-    import boto3
-    from botocore.exceptions import ClientError, NoCredentialsError
-    BOTO3_AVAILABLE = True
-except ImportError:
-    BOTO3_AVAILABLE = False
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aws_utils import get_client
+from cache_precios import cached_price
+from indice_precios import get_default_index
+
+# boto3 se importa de forma diferida: con el cache de precios fresco la
+# calculadora arranca sin cargarlo
+BOTO3_AVAILABLE = importlib.util.find_spec('boto3') is not None
+
+# Mapeo de códigos de región AWS a los nombres de ubicación del API de pricing
+REGION_NAME_MAP = {
+    'us-east-1': 'US East (N. Virginia)',
+    'us-east-2': 'US East (Ohio)',
+    'us-west-1': 'US West (N. California)',
+    'us-west-2': 'US West (Oregon)',
+    'eu-west-1': 'EU (Ireland)',
+    'eu-central-1': 'EU (Frankfurt)',
+    'ap-southeast-1': 'Asia Pacific (Singapore)',
+    'ap-northeast-1': 'Asia Pacific (Tokyo)',
+    'sa-east-1': 'South America (Sao Paulo)',
+}
 
 def get_region_name_for_pricing(region):
     """Mapeo de códigos de región AWS para el API de pricing"""
-    region_name_map = {
-        'us-east-1': 'US East (N. Virginia)',
-        'us-east-2': 'US East (Ohio)',
-        'us-west-1': 'US West (N. California)',
-        'us-west-2': 'US West (Oregon)',
-        'eu-west-1': 'EU (Ireland)',
-        'eu-central-1': 'EU (Frankfurt)',
-        'ap-southeast-1': 'Asia Pacific (Singapore)',
-        'ap-northeast-1': 'Asia Pacific (Tokyo)',
-        'sa-east-1': 'South America (Sao Paulo)',
-    }
-    return region_name_map.get(region, 'US East (N. Virginia)')
-
-def obtener_precio_ec2_aws(instance_type, region='us-east-1'):
-    """
-    Obtiene el precio On-Demand de una instancia EC2 desde AWS Price List API.
-    Retorna el precio por hora en USD, o None si no se puede obtener.
-    """
+    return REGION_NAME_MAP.get(region, 'US East (N. Virginia)')
+
+class PrecioNoDisponible(Exception):
+    """El Pricing API no pudo responder (sin boto3, sin credenciales, error de API...)"""
+
+def get_pricing_client():
+    """Cliente compartido del Pricing API (boto3 se importa de forma diferida)"""
     if not BOTO3_AVAILABLE:
-        return None
+        raise PrecioNoDisponible("boto3 no está instalado")
+    # El servicio de pricing está disponible en us-east-1
+    return get_client('pricing', 'us-east-1')
+
+def _consultar_precio_ec2_api(instance_type, region):
+    """Consulta el Pricing API; lanza PrecioNoDisponible ante errores de conexión o API"""
+    from botocore.exceptions import ClientError, NoCredentialsError
 
     try:
-        # El servicio de pricing está disponible en us-east-1
-        pricing_client = boto3.client('pricing', region_name='us-east-1')
+        pricing_client = get_pricing_client()
         location = get_region_name_for_pricing(region)
 
         # Consultar pricing
@@ -60,21 +72,40 @@ def obtener_precio_ec2_aws(instance_type, region='us-east-1'):
             return price_per_hour
 
     except (ClientError, NoCredentialsError, KeyError, IndexError) as e:
-        print(f"⚠️  No se pudo obtener precio de AWS API para {instance_type}: {e}", file=sys.stderr)
-        return None
+        raise PrecioNoDisponible(e) from e
 
     return None
 
-def obtener_precio_eks_automode_aws(instance_type, region='us-east-1'):
+def obtener_precio_ec2_aws(instance_type, region='us-east-1', cache=None, refresh=False):
     """
-    Obtiene el precio de EKS Auto Mode para una instancia específica desde AWS Price List API.
+    Obtiene el precio On-Demand de una instancia EC2 desde AWS Price List API.
     Retorna el precio por hora en USD, o None si no se puede obtener.
+
+    Si hay un índice local de offer files (EKS_PRICE_INDEX, ver indice_precios.py)
+    se consulta primero. Los resultados del API se guardan en el cache local de
+    precios (ver cache_precios.py); con el cache fresco no se hace ninguna llamada.
     """
-    if not BOTO3_AVAILABLE:
+    index = get_default_index()
+    if index is not None:
+        price = index.precio_ec2(instance_type, region)
+        if price is not None:
+            return price
+
+    try:
+        return cached_price('AmazonEC2', instance_type, region, 'RunInstances',
+                            lambda: _consultar_precio_ec2_api(instance_type, region),
+                            cache=cache, refresh=refresh)
+    except PrecioNoDisponible as e:
+        if BOTO3_AVAILABLE:
+            print(f"⚠️  No se pudo obtener precio de AWS API para {instance_type}: {e}", file=sys.stderr)
         return None
 
+def _consultar_precio_eks_automode_api(instance_type, region):
+    """Consulta el Pricing API; lanza PrecioNoDisponible ante errores de conexión o API"""
+    from botocore.exceptions import ClientError, NoCredentialsError
+
     try:
-        pricing_client = boto3.client('pricing', region_name='us-east-1')
+        pricing_client = get_pricing_client()
         location = get_region_name_for_pricing(region)
 
         # Consultar pricing para EKS Auto Mode
@@ -101,211 +132,828 @@ def obtener_precio_eks_automode_aws(instance_type, region='us-east-1'):
                     return price_per_hour
 
     except (ClientError, NoCredentialsError, KeyError, IndexError) as e:
-        print(f"⚠️  No se pudo obtener precio EKS Auto Mode de AWS API para {instance_type}: {e}", file=sys.stderr)
-        return None
+        raise PrecioNoDisponible(e) from e
 
     return None
 
-def calcular_ahorro():
-    # --- CONFIGURACIÓN DE PRECIOS (Fallback - us-east-1 On-Demand base) ---
-    # Estos precios se usan solo si no se puede conectar a AWS Price List API
-    precios_ec2_fallback = {
-        "t3.medium": 0.0416, "t3.large": 0.0832, "t3.xlarge": 0.1664,
-        "m5.large": 0.096,   "m5.xlarge": 0.192,  "m5.2xlarge": 0.384, "m5.4xlarge": 0.768,
-        "c5.large": 0.085,   "c5.xlarge": 0.17,   "c5.2xlarge": 0.34,
-        "r5.large": 0.126,   "r5.xlarge": 0.252,  "r5.2xlarge": 0.504,
-        "m6i.large": 0.096,  "m6i.xlarge": 0.192,
-        "t3a.medium": 0.0376, "t3a.large": 0.0752
-    }
-
-    # Constantes de EKS
-    EKS_CONTROL_PLANE_HOURLY = 0.10  # $0.10 por hora por cluster
-    EKS_AUTO_MODE_FEE_PERCENT = 0.12  # 12% adicional para Auto Mode (fallback)
+def obtener_precio_eks_automode_aws(instance_type, region='us-east-1', cache=None, refresh=False):
+    """
+    Obtiene el precio de EKS Auto Mode para una instancia específica desde AWS Price List API.
+    Retorna el precio por hora en USD, o None si no se puede obtener.
 
-    print("--- 📊 Calculadora de Migración a EKS Auto Mode (Automática) ---")
+    Usa el mismo índice local y cache de precios que obtener_precio_ec2_aws().
+    """
+    index = get_default_index()
+    if index is not None:
+        price = index.precio_automode_fee(instance_type, region)
+        if price is not None:
+            return price
 
-    # --- INPUT DESDE VARIABLES DE ENTORNO ---
     try:
-        instance_type = os.environ.get('EKS_PRIMARY_INSTANCE', 'm5.large')
-        node_count = int(float(os.environ.get('EKS_NODE_COUNT', 0)))
-        utilizacion_cpu = float(os.environ.get('EKS_UTIL_CPU', 50)) / 100
-        utilizacion_mem = float(os.environ.get('EKS_UTIL_MEM', 50)) / 100
-        region = os.environ.get('AWS_REGION', 'us-east-1')
-        monthly_cost_real = float(os.environ.get('EKS_MONTHLY_COST', 0))
-        metric_source = os.environ.get('EKS_METRIC_SOURCE', 'No especificada')
-    except ValueError as e:
-        print(f"❌ Error leyendo variables de entorno: {e}")
-        print("Ejecuta primero el script recolector.")
-        sys.exit(1)
+        return cached_price('AmazonEKS', instance_type, region, 'EKSAutoUsage',
+                            lambda: _consultar_precio_eks_automode_api(instance_type, region),
+                            cache=cache, refresh=refresh)
+    except PrecioNoDisponible as e:
+        if BOTO3_AVAILABLE:
+            print(f"⚠️  No se pudo obtener precio EKS Auto Mode de AWS API para {instance_type}: {e}", file=sys.stderr)
+        return None
 
-    if node_count == 0:
-        print("⚠️ Advertencia: Node count es 0. ¿Corriste el recolector?")
+# --- CONFIGURACIÓN DE PRECIOS (Fallback - us-east-1 On-Demand base) ---
+# Estos precios se usan solo si no se puede conectar a AWS Price List API
+PRECIOS_EC2_FALLBACK = {
+    "t3.medium": 0.0416, "t3.large": 0.0832, "t3.xlarge": 0.1664,
+    "m5.large": 0.096,   "m5.xlarge": 0.192,  "m5.2xlarge": 0.384, "m5.4xlarge": 0.768,
+    "c5.large": 0.085,   "c5.xlarge": 0.17,   "c5.2xlarge": 0.34,
+    "r5.large": 0.126,   "r5.xlarge": 0.252,  "r5.2xlarge": 0.504,
+    "m6i.large": 0.096,  "m6i.xlarge": 0.192,
+    "t3a.medium": 0.0376, "t3a.large": 0.0752
+}
+
+# vCPU y memoria (GiB) de los tipos del fallback, para el bin packing sin índice local
+ESPECIFICACIONES_FALLBACK = {
+    "t3.medium": (2, 4), "t3.large": (2, 8), "t3.xlarge": (4, 16),
+    "m5.large": (2, 8),  "m5.xlarge": (4, 16), "m5.2xlarge": (8, 32), "m5.4xlarge": (16, 64),
+    "c5.large": (2, 4),  "c5.xlarge": (4, 8),  "c5.2xlarge": (8, 16),
+    "r5.large": (2, 16), "r5.xlarge": (4, 32), "r5.2xlarge": (8, 64),
+    "m6i.large": (2, 8), "m6i.xlarge": (4, 16),
+    "t3a.medium": (2, 4), "t3a.large": (2, 8)
+}
+
+# Constantes de EKS
+EKS_CONTROL_PLANE_HOURLY = 0.10  # $0.10 por hora por cluster
+EKS_AUTO_MODE_FEE_PERCENT = 0.12  # 12% adicional para Auto Mode (fallback)
+HOURS_MONTH = 730
+
+# Consultas de precios concurrentes al resolver un mix de tipos de instancia
+PRICING_WORKERS = 8
+
+# Supuestos del modelo
+EFFICIENCY_GAIN = 0.20  # Mejora de bin packing respecto a un ASG estático
+MARGEN_DEMANDA = 0.10   # Margen sobre la demanda observada al elegir instancias
+HORAS_ING_AHORRADAS = 10
+COSTO_HORA_ING = 50
+
+def parse_instance_mix(spec):
+    """'m5.large=10,r5.4xlarge=10' -> {'m5.large': 10, 'r5.4xlarge': 10}"""
+    mix = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            instance_type, count = item.split('=', 1)
+            mix[instance_type.strip()] = int(float(count))
+    return mix
+
+def instance_family(instance_type):
+    """'r5.4xlarge' -> 'r5'"""
+    return instance_type.split('.', 1)[0]
+
+def _perfil_semanal(serie):
+    return None if serie is None else serie.perfil_semanal()
+
+def _perfil_fracciones(perfil):
+    """Perfil en porcentaje ('12.5,13.0,...' o secuencia) -> fracciones; None si no hay perfil"""
+    if isinstance(perfil, str):
+        perfil = [x for x in perfil.split(',') if x.strip()]
+    if perfil is None or not len(perfil):
+        return None
+    return [float(x) / 100 for x in perfil]
 
-    # --- OBTENER PRECIOS DE AWS ---
-    print(f"🔍 Obteniendo precios de AWS para {instance_type} en {region}...", file=sys.stderr)
-    
-    # Precio EC2 estándar
-    precio_ec2_hora = obtener_precio_ec2_aws(instance_type, region)
+def _porcentaje(value):
+    """Porcentaje opcional ('62.5') -> fracción; None si no está definido"""
+    if value is None or not str(value).strip():
+        return None
+    return float(value) / 100
+
+@dataclass
+class SimulacionHoraria:
+    """Nodos de Auto Mode por hora del mes ({tipo: array de HOURS_MONTH enteros})"""
+    nodos_hora: dict
+    utilizacion_pico: float
+
+    @property
+    def total(self):
+        return sum(self.nodos_hora.values())
+
+    def horas_nodo(self, instance_type):
+        return float(self.nodos_hora[instance_type].sum())
+
+    @property
+    def nodos_min(self):
+        return int(self.total.min())
+
+    @property
+    def nodos_max(self):
+        return int(self.total.max())
+
+    @property
+    def nodos_promedio(self):
+        return float(self.total.mean())
+
+def simular_nodos_horarios(perfil, efficiency_gain=EFFICIENCY_GAIN, horas=HOURS_MONTH):
+    """
+    Simula la flota de Auto Mode hora a hora sobre el mes con el perfil
+    semanal de utilización del cluster (repetido hasta cubrir `horas`).
+
+    La hora pico (p99 de la utilización) se dimensiona con el mismo modelo
+    que la estimación estática (reducción de waste × efficiency_gain); el
+    resto de las horas escala esa flota con la demanda relativa al pico,
+    porque Auto Mode consolida nodos cuando baja la carga. Con utilización
+    constante el resultado coincide con la estimación estática.
+
+    Con requests de los pods (requests_cpu y requests_mem) cada hora usa
+    max(requests, utilización) por recurso: el scheduler reserva los requests
+    aunque no se usen, así que acotan por abajo el pico y el escalado.
+
+    Returns:
+        SimulacionHoraria o None si el perfil no tiene perfiles horarios
+    """
+    if not perfil.perfil_cpu or not perfil.perfil_mem:
+        return None
+    import numpy as np
+
+    cpu = np.resize(np.asarray(perfil.perfil_cpu, dtype=float), horas)
+    mem = np.resize(np.asarray(perfil.perfil_mem, dtype=float), horas)
+    if perfil.requests_cpu is not None and perfil.requests_mem is not None:
+        cpu = np.maximum(cpu, perfil.requests_cpu)
+        mem = np.maximum(mem, perfil.requests_mem)
+    utilizacion = (cpu + mem) / 2
+    pico = float(np.percentile(utilizacion, 99))
+    if pico <= 0:
+        return None
+    escala = utilizacion / pico
+    nodos_pico = 1 - (1 - pico) * efficiency_gain
+
+    nodos_hora = {}
+    for instance_type, count in perfil.mix().items():
+        # Redondeo hacia arriba en cada hora (con tolerancia para no sumar un
+        # nodo por error de punto flotante); al menos un nodo por tipo
+        nodos = np.ceil(count * nodos_pico * escala - 1e-9)
+        nodos_hora[instance_type] = np.maximum(nodos, 1 if count else 0).astype(np.int64)
+    return SimulacionHoraria(nodos_hora=nodos_hora, utilizacion_pico=pico)
+
+@dataclass
+class PerfilCluster:
+    """
+    Datos de entrada de un cluster a evaluar.
+
+    Las utilizaciones son fracciones (0-1). Si discount_factor es None se
+    deriva del costo real de Cost Explorer comparándolo con On-Demand.
+    instance_mix es el histograma {tipo: nodos}; si está vacío el cluster se
+    considera homogéneo (node_count × instance_type). perfil_cpu y perfil_mem
+    son la utilización promedio por hora de la semana (168 fracciones, lunes
+    00:00 UTC primero); con ambos se simula la flota de Auto Mode hora a hora.
+    requests_cpu y requests_mem son los requests de los pods sobre la
+    capacidad asignable (recolector_k8s.py); con ambos, el waste_factor sale
+    de ellos en lugar de la utilización y la simulación horaria no baja de
+    ellos en ninguna hora.
+    """
+    instance_type: str = 'm5.large'
+    node_count: int = 0
+    utilizacion_cpu: float = 0.5
+    utilizacion_mem: float = 0.5
+    region: str = 'us-east-1'
+    monthly_cost_real: float = 0.0
+    discount_factor: Optional[float] = None
+    metric_source: str = 'No especificada'
+    instance_mix: dict = field(default_factory=dict)
+    perfil_cpu: Optional[list] = None
+    perfil_mem: Optional[list] = None
+    requests_cpu: Optional[float] = None
+    requests_mem: Optional[float] = None
+
+    def ocupacion(self):
+        """(cpu, memoria) en fracciones que definen el waste_factor: requests si los hay, si no utilización"""
+        if self.requests_cpu is not None and self.requests_mem is not None:
+            return self.requests_cpu, self.requests_mem
+        return self.utilizacion_cpu, self.utilizacion_mem
+
+    def mix(self):
+        """Histograma {tipo de instancia: nodos} del cluster"""
+        if self.instance_mix:
+            return dict(self.instance_mix)
+        return {self.instance_type: self.node_count}
+
+    @classmethod
+    def desde_entorno(cls, environ=None):
+        """Construye el perfil desde las variables EKS_* generadas por el recolector"""
+        environ = os.environ if environ is None else environ
+        return cls(
+            instance_type=environ.get('EKS_PRIMARY_INSTANCE', 'm5.large'),
+            node_count=int(float(environ.get('EKS_NODE_COUNT', 0))),
+            utilizacion_cpu=float(environ.get('EKS_UTIL_CPU', 50)) / 100,
+            utilizacion_mem=float(environ.get('EKS_UTIL_MEM', 50)) / 100,
+            region=environ.get('AWS_REGION', 'us-east-1'),
+            monthly_cost_real=float(environ.get('EKS_MONTHLY_COST', 0)),
+            metric_source=environ.get('EKS_METRIC_SOURCE', 'No especificada'),
+            instance_mix=parse_instance_mix(environ.get('EKS_INSTANCE_MIX')),
+            perfil_cpu=_perfil_fracciones(environ.get('EKS_UTIL_CPU_PROFILE')),
+            perfil_mem=_perfil_fracciones(environ.get('EKS_UTIL_MEM_PROFILE')),
+            requests_cpu=_porcentaje(environ.get('EKS_REQUESTS_CPU')),
+            requests_mem=_porcentaje(environ.get('EKS_REQUESTS_MEM')),
+        )
+
+    @classmethod
+    def desde_recoleccion(cls, datos):
+        """Construye el perfil desde un DatosCluster del recolector (sin pasar por el entorno)"""
+        return cls(
+            instance_type=datos.primary_instance,
+            node_count=datos.node_count,
+            utilizacion_cpu=float(datos.cpu_util) / 100,
+            utilizacion_mem=float(datos.mem_util) / 100,
+            region=datos.region,
+            monthly_cost_real=float(datos.cost_data.get('monthly_cost', 0) or 0),
+            metric_source=datos.metric_source or 'No especificada',
+            instance_mix=datos.instance_mix,
+            perfil_cpu=_perfil_fracciones(_perfil_semanal(getattr(datos, 'cpu_series', None))),
+            perfil_mem=_perfil_fracciones(_perfil_semanal(getattr(datos, 'mem_series', None))),
+        )
+
+@dataclass
+class PreciosInstancia:
+    """Precios por hora resueltos para un tipo de instancia"""
+    precio_ec2_hora: float
+    precio_automode_fee_hora: float
+    using_api_pricing: bool
+
+@dataclass
+class ResultadoAhorro:
+    """Resultado estructurado de la evaluación de un cluster"""
+    perfil: PerfilCluster
+    precios: PreciosInstancia
+    # Costo actual
+    control_plane_monthly: float
+    ec2_monthly_cost: float
+    current_monthly_cost: float
+    # Estimación Auto Mode
+    waste_factor: float
+    potential_reduction: float
+    estimated_nodes_auto_decimal: float
+    estimated_nodes_auto: int
+    discount_factor: float
+    ec2_auto_monthly_cost: float
+    ec2_auto_ondemand_monthly: float
+    automode_fee_monthly_cost: float
+    auto_monthly_cost: float
+    # Ahorros
+    ahorro_infra: float
+    ahorro_ops: float
+    total_savings: float
+    horas_ing_ahorradas: float = HORAS_ING_AHORRADAS
+    costo_hora_ing: float = COSTO_HORA_ING
+    # Cluster heterogéneo: precios por tipo y desglose por familia
+    ec2_ondemand_monthly: float = 0.0
+    precios_mix: dict = field(default_factory=dict)
+    desglose_familias: dict = field(default_factory=dict)
+    # Flota de Auto Mode simulada (bin packing o selección de instancias) usada
+    # en lugar de efficiency_gain; expone `flota` y `descripcion`
+    flota_auto: Optional[object] = None
+    # Simulación hora a hora con el perfil semanal de utilización
+    simulacion: Optional[SimulacionHoraria] = None
+
+def _precio_ec2_o_fallback(instance_type, precio_ec2_hora, interactive, info):
+    """Aplica el fallback local (o input() en modo interactivo) si no hubo precio EC2"""
     if precio_ec2_hora is None:
-        if instance_type in precios_ec2_fallback:
-            precio_ec2_hora = precios_ec2_fallback[instance_type]
-            print(f"⚠️  Usando precio EC2 fallback para {instance_type}: ${precio_ec2_hora}/hora", file=sys.stderr)
-        else:
+        if instance_type in PRECIOS_EC2_FALLBACK:
+            precio_ec2_hora = PRECIOS_EC2_FALLBACK[instance_type]
+            info(f"⚠️  Usando precio EC2 fallback para {instance_type}: ${precio_ec2_hora}/hora")
+        elif interactive:
             print(f"⚠️ Tipo de instancia '{instance_type}' no encontrado en AWS API ni en base local.", file=sys.stderr)
             costo_custom = float(input(f"Por favor ingresa costo por hora USD para {instance_type}: "))
             precio_ec2_hora = costo_custom
+        else:
+            raise ValueError(f"Tipo de instancia '{instance_type}' no encontrado en AWS API ni en base local")
     else:
-        print(f"✅ Precio EC2 obtenido de AWS: ${precio_ec2_hora}/hora", file=sys.stderr)
-    
-    # Precio EKS Auto Mode Fee
-    print(f"🔍 Obteniendo precio EKS Auto Mode fee para {instance_type}...", file=sys.stderr)
-    precio_automode_fee_hora = obtener_precio_eks_automode_aws(instance_type, region)
-    
+        info(f"✅ Precio EC2 obtenido de AWS: ${precio_ec2_hora}/hora")
+    return precio_ec2_hora
+
+def _precios_instancia(instance_type, precio_ec2_hora, precio_automode_fee_hora, info):
+    """Arma PreciosInstancia; sin fee de Auto Mode usa el 12% del precio EC2"""
     if precio_automode_fee_hora is None:
         # Fallback: calcular 12% sobre el precio EC2
         precio_automode_fee_hora = precio_ec2_hora * EKS_AUTO_MODE_FEE_PERCENT
-        print(f"⚠️  Precio Auto Mode fee no disponible, usando fallback: ${precio_automode_fee_hora}/hora (12% de EC2)", file=sys.stderr)
+        info(f"⚠️  Precio Auto Mode fee no disponible, usando fallback: ${precio_automode_fee_hora}/hora (12% de EC2)")
         using_api_pricing = False
     else:
-        print(f"✅ Precio EKS Auto Mode fee obtenido de AWS: ${precio_automode_fee_hora}/hora", file=sys.stderr)
+        info(f"✅ Precio EKS Auto Mode fee obtenido de AWS: ${precio_automode_fee_hora}/hora")
         using_api_pricing = True
+    return PreciosInstancia(precio_ec2_hora, precio_automode_fee_hora, using_api_pricing)
 
-    # --- CÁLCULOS ---
-    hours_month = 730
+def resolver_precios(instance_type, region, interactive=False, verbose=True):
+    """
+    Obtiene el precio EC2 y el fee de Auto Mode de un tipo de instancia
+    (índice local → cache → Pricing API → fallback)
+
+    Args:
+        interactive: Si no hay precio disponible, lo solicita por input();
+                     en modo no interactivo lanza ValueError
+        verbose: Muestra el origen de cada precio en stderr
+    """
+    def info(msg):
+        if verbose:
+            print(msg, file=sys.stderr)
+
+    info(f"🔍 Obteniendo precios de AWS para {instance_type} en {region}...")
+
+    # Precio EC2 estándar
+    precio_ec2_hora = _precio_ec2_o_fallback(instance_type, obtener_precio_ec2_aws(instance_type, region),
+                                             interactive, info)
+
+    # Precio EKS Auto Mode Fee
+    info(f"🔍 Obteniendo precio EKS Auto Mode fee para {instance_type}...")
+    return _precios_instancia(instance_type, precio_ec2_hora,
+                              obtener_precio_eks_automode_aws(instance_type, region), info)
+
+def resolver_precios_mix(instance_types, region, interactive=False, verbose=True, max_workers=PRICING_WORKERS):
+    """
+    Resuelve los precios de cada tipo de instancia distinto de un cluster.
+
+    Se hace una sola consulta por tipo distinto (EC2 y fee de Auto Mode), en
+    paralelo sobre el cliente de pricing compartido; el índice local y el
+    cache de precios evitan repetirlas entre ejecuciones.
+
+    Returns:
+        dict: {instance_type: PreciosInstancia}
+    """
+    tipos = list(dict.fromkeys(instance_types))
+    if len(tipos) <= 1:
+        return {t: resolver_precios(t, region, interactive=interactive, verbose=verbose) for t in tipos}
+
+    def info(msg):
+        if verbose:
+            print(msg, file=sys.stderr)
+
+    info(f"🔍 Obteniendo precios de AWS para {len(tipos)} tipos de instancia en {region}...")
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tipos))) as pool:
+        ec2_futures = {t: pool.submit(obtener_precio_ec2_aws, t, region) for t in tipos}
+        fee_futures = {t: pool.submit(obtener_precio_eks_automode_aws, t, region) for t in tipos}
+
+    # Los fallbacks (y el input() interactivo) se aplican en orden, fuera del pool
+    precios = {}
+    for t in tipos:
+        info(f"  {t}:")
+        precio_ec2_hora = _precio_ec2_o_fallback(t, ec2_futures[t].result(), interactive, info)
+        precios[t] = _precios_instancia(t, precio_ec2_hora, fee_futures[t].result(), info)
+    return precios
+
+def calcular_escenario(perfil, precios, efficiency_gain=EFFICIENCY_GAIN,
+                       horas_ing_ahorradas=HORAS_ING_AHORRADAS, costo_hora_ing=COSTO_HORA_ING,
+                       flota_auto=None, simulacion_horaria=True):
+    """
+    Modelo de costos puro: no consulta AWS, no lee el entorno ni imprime.
+
+    Cada tipo de instancia del mix se costea con su propio precio; la
+    reducción de nodos y el redondeo hacia arriba se aplican por tipo.
+
+    Args:
+        perfil: PerfilCluster
+        precios: {instance_type: PreciosInstancia} para cada tipo del mix, o un
+                 único PreciosInstancia que se aplica a todos los tipos
+        flota_auto: Flota simulada (empaquetar_cluster o dimensionar_cluster); su
+                    `flota` reemplaza la estimación con efficiency_gain y sus
+                    tipos deben tener precio en `precios`
+        simulacion_horaria: Si el perfil trae perfiles horarios, costear la
+                    flota hora a hora (simular_nodos_horarios) en lugar de
+                    con una cantidad fija de nodos
+
+    Returns:
+        ResultadoAhorro
+    """
+    mix = perfil.mix()
+    if isinstance(precios, PreciosInstancia):
+        precios_mix = {instance_type: precios for instance_type in mix}
+    else:
+        precios_mix = dict(precios)
+    monthly_cost_real = perfil.monthly_cost_real
 
     # 1. Costo Actual
-    control_plane_monthly = EKS_CONTROL_PLANE_HOURLY * hours_month
-    
+    control_plane_monthly = EKS_CONTROL_PLANE_HOURLY * HOURS_MONTH
+    ondemand_ec2_cost = sum(count * precios_mix[t].precio_ec2_hora * HOURS_MONTH for t, count in mix.items())
+
     # Si tenemos costo real de Cost Explorer, usarlo; sino calcular
     if monthly_cost_real > 0:
         ec2_monthly_cost = monthly_cost_real
-        current_monthly_cost = control_plane_monthly + ec2_monthly_cost
-        print(f"✅ Usando costo real de Cost Explorer: ${monthly_cost_real:.2f}/mes", file=sys.stderr)
     else:
-        ec2_hourly_cost = node_count * precio_ec2_hora
-        ec2_monthly_cost = ec2_hourly_cost * hours_month
-        current_monthly_cost = control_plane_monthly + ec2_monthly_cost
+        ec2_monthly_cost = ondemand_ec2_cost
+    current_monthly_cost = control_plane_monthly + ec2_monthly_cost
 
     # 2. Costo EKS Auto Mode (Estimado)
-    waste_factor = 1 - ((utilizacion_cpu + utilizacion_mem) / 2)
-    efficiency_gain = 0.20
+    ocupacion_cpu, ocupacion_mem = perfil.ocupacion()
+    waste_factor = 1 - ((ocupacion_cpu + ocupacion_mem) / 2)
     potential_reduction = waste_factor * efficiency_gain
 
-    # IMPORTANTE: Redondear hacia arriba porque no puedes pagar por instancias fraccionarias
-    # Si el bin packing óptimo requiere 2.7 instancias, pagarás por 3 instancias completas
-    estimated_nodes_auto_decimal = node_count * (1 - potential_reduction)
-    estimated_nodes_auto = math.ceil(estimated_nodes_auto_decimal)
-
-    # Calcular factor de descuento si tenemos costo real
-    discount_factor = 1.0
-    if monthly_cost_real > 0:
-        # Calcular el descuento implícito comparando costo real vs On-Demand
-        ondemand_ec2_cost = node_count * precio_ec2_hora * hours_month
-        if ondemand_ec2_cost > 0:
+    # Factor de descuento: explícito en el perfil o implícito (costo real vs On-Demand)
+    discount_factor = perfil.discount_factor
+    if discount_factor is None:
+        discount_factor = 1.0
+        if monthly_cost_real > 0 and ondemand_ec2_cost > 0:
             discount_factor = monthly_cost_real / ondemand_ec2_cost
-            print(f"✅ Factor de descuento detectado: {(1-discount_factor)*100:.1f}% (Savings Plans/RI)", file=sys.stderr)
+
+    estimated_nodes_auto_decimal = 0.0
+    estimated_nodes_auto = 0
+    ec2_auto_ondemand_monthly = 0.0
+    automode_fee_monthly_cost = 0.0
+    desglose_familias = {}
+    simulacion = None
+    if flota_auto is None and simulacion_horaria:
+        simulacion = simular_nodos_horarios(perfil, efficiency_gain)
+    # Flota de Auto Mode: simulación de bin packing si se pasó, o reducción heurística por tipo
+    if flota_auto is not None:
+        nodos_auto = {t: (nodes, nodes) for t, nodes in flota_auto.flota.items()}
+    elif simulacion is not None:
+        # Nodos promedio del mes; el costo sale de las horas-nodo simuladas
+        nodos_auto = {t: (nodos.mean(), math.ceil(nodos.mean() - 1e-9))
+                      for t, nodos in simulacion.nodos_hora.items()}
+    else:
+        # IMPORTANTE: Redondear hacia arriba porque no puedes pagar por instancias fraccionarias
+        # Si el bin packing óptimo requiere 2.7 instancias, pagarás por 3 instancias completas
+        nodos_auto = {t: (count * (1 - potential_reduction), math.ceil(count * (1 - potential_reduction)))
+                      for t, count in mix.items()}
+
+    def familia_de(instance_type):
+        return desglose_familias.setdefault(instance_family(instance_type), {
+            'tipos': [], 'nodos': 0, 'nodos_auto': 0, 'costo_actual': 0.0, 'costo_auto': 0.0, 'ahorro': 0.0
+        })
+
+    # El costo actual de cada familia es su parte On-Demand con el mismo descuento
+    for instance_type, count in mix.items():
+        familia = familia_de(instance_type)
+        familia['tipos'].append(instance_type)
+        familia['nodos'] += count
+        familia['costo_actual'] += count * precios_mix[instance_type].precio_ec2_hora * HOURS_MONTH * discount_factor
+
+    for instance_type, (nodes_decimal, nodes) in nodos_auto.items():
+        precio = precios_mix[instance_type]
+        if simulacion is not None:
+            horas_nodo = simulacion.horas_nodo(instance_type)
+            ec2_auto = horas_nodo * precio.precio_ec2_hora
+            fee = horas_nodo * precio.precio_automode_fee_hora  # Fee no tiene descuento
+        else:
+            ec2_auto = nodes * precio.precio_ec2_hora * HOURS_MONTH
+            fee = nodes * precio.precio_automode_fee_hora * HOURS_MONTH  # Fee no tiene descuento
+
+        estimated_nodes_auto_decimal += float(nodes_decimal)
+        estimated_nodes_auto += nodes
+        ec2_auto_ondemand_monthly += ec2_auto
+        automode_fee_monthly_cost += fee
+
+        familia = familia_de(instance_type)
+        if instance_type not in familia['tipos']:
+            familia['tipos'].append(instance_type)
+        familia['nodos_auto'] += nodes
+        familia['costo_auto'] += ec2_auto * discount_factor + fee
+
+    for familia in desglose_familias.values():
+        familia['ahorro'] = familia['costo_actual'] - familia['costo_auto']
 
     # Separar costos: EC2 + Auto Mode Fee
-    ec2_auto_hourly_cost = estimated_nodes_auto * precio_ec2_hora
-    ec2_auto_monthly_cost = ec2_auto_hourly_cost * hours_month * discount_factor  # Aplicar descuento
-    
-    automode_fee_hourly_cost = estimated_nodes_auto * precio_automode_fee_hora
-    automode_fee_monthly_cost = automode_fee_hourly_cost * hours_month  # Fee no tiene descuento
-    
+    ec2_auto_monthly_cost = ec2_auto_ondemand_monthly * discount_factor  # Aplicar descuento
+
     auto_monthly_cost = control_plane_monthly + ec2_auto_monthly_cost + automode_fee_monthly_cost
-    
+
     # Ahorro Operativo
-    horas_ing_ahorradas = 10
-    costo_hora_ing = 50
     ahorro_ops = horas_ing_ahorradas * costo_hora_ing
+    ahorro_infra = current_monthly_cost - auto_monthly_cost
 
-    # --- REPORTE ---
-    print(f"\n{'='*60}")
-    print(f"📊 ANÁLISIS DE CLUSTER ACTUAL")
-    print(f"{'='*60}")
-    print(f"  Nodos:                 {node_count} x {instance_type}")
-    print(f"  Región:                {region}")
-    print(f"  Precio EC2/hora:       ${precio_ec2_hora:.4f}")
-    print(f"  Utilización CPU:       {utilizacion_cpu*100:.1f}%")
-    print(f"  Utilización RAM:       {utilizacion_mem*100:.1f}%")
-    if monthly_cost_real > 0:
-        print(f"  Costo Real (30 días):  ${monthly_cost_real:.2f}")
-    print()
-
-    print(f"{'='*60}")
-    print(f"💰 DESGLOSE DE COSTOS MENSUALES")
-    print(f"{'='*60}")
-    print(f"\n🔵 EKS STANDARD (Managed Node Groups)")
-    print(f"  Control Plane:         ${control_plane_monthly:>10,.2f}  (@$0.10/hora)")
-    print(f"  Instancias EC2:        ${ec2_monthly_cost:>10,.2f}  ({node_count} nodos)")
-    print(f"  {'-'*58}")
-    print(f"  TOTAL MENSUAL:         ${current_monthly_cost:>10,.2f}")
-    print()
-
-    print(f"🟢 EKS AUTO MODE (Estimado)")
-    print(f"  Control Plane:         ${control_plane_monthly:>10,.2f}  (@$0.10/hora)")
-    if discount_factor < 1.0:
-        ec2_auto_ondemand = estimated_nodes_auto * precio_ec2_hora * hours_month
-        print(f"  Instancias EC2:        ${ec2_auto_monthly_cost:>10,.2f}  ({estimated_nodes_auto} nodos @ ${precio_ec2_hora:.4f}/h con descuento)")
-        print(f"    (On-Demand sería:    ${ec2_auto_ondemand:>10,.2f})")
-        if estimated_nodes_auto_decimal != estimated_nodes_auto:
-            print(f"    (Capacidad estimada: {estimated_nodes_auto_decimal:.1f} nodos, redondeado a {estimated_nodes_auto})")
+    return ResultadoAhorro(
+        perfil=perfil,
+        precios=precios_mix.get(perfil.instance_type) or next(iter(precios_mix.values())),
+        control_plane_monthly=control_plane_monthly,
+        ec2_monthly_cost=ec2_monthly_cost,
+        current_monthly_cost=current_monthly_cost,
+        waste_factor=waste_factor,
+        potential_reduction=potential_reduction,
+        estimated_nodes_auto_decimal=estimated_nodes_auto_decimal,
+        estimated_nodes_auto=estimated_nodes_auto,
+        discount_factor=discount_factor,
+        ec2_auto_monthly_cost=ec2_auto_monthly_cost,
+        ec2_auto_ondemand_monthly=ec2_auto_ondemand_monthly,
+        automode_fee_monthly_cost=automode_fee_monthly_cost,
+        auto_monthly_cost=auto_monthly_cost,
+        ahorro_infra=ahorro_infra,
+        ahorro_ops=ahorro_ops,
+        total_savings=ahorro_infra + ahorro_ops,
+        horas_ing_ahorradas=horas_ing_ahorradas,
+        costo_hora_ing=costo_hora_ing,
+        ec2_ondemand_monthly=ondemand_ec2_cost,
+        precios_mix=precios_mix,
+        desglose_familias=desglose_familias,
+        flota_auto=flota_auto,
+        simulacion=simulacion,
+    )
+
+def obtener_especificaciones(instance_type, region='us-east-1'):
+    """(vcpu, memory_gib) del tipo de instancia: índice local o tabla de fallback"""
+    index = get_default_index()
+    if index is not None:
+        specs = index.specs(instance_type, region)
+        if specs is not None:
+            return specs
+    return ESPECIFICACIONES_FALLBACK.get(instance_type)
+
+def empaquetar_cluster(perfil, precios_mix, workloads=None, estrategia='ffd'):
+    """
+    Simula el bin packing de Auto Mode sobre los tipos de instancia del cluster
+    y elige el de menor costo (EC2 + fee de Auto Mode)
+
+    Args:
+        precios_mix: {instance_type: PreciosInstancia}
+        workloads: Requests de pods (empaquetado_nodos.Workloads); si es None se
+                   sintetizan a partir de la utilización del perfil
+
+    Returns:
+        ResultadoEmpaquetado o None si faltan especificaciones o ningún tipo ubica los pods
+    """
+    # numpy se carga solo cuando se usa el simulador
+    from empaquetado_nodos import elegir_empaquetado, workloads_desde_utilizacion
+
+    specs = {t: obtener_especificaciones(t, perfil.region) for t in precios_mix}
+    specs = {t: spec for t, spec in specs.items() if spec is not None}
+    if not specs:
+        return None
+    if workloads is None:
+        mix = {t: count for t, count in perfil.mix().items() if t in specs}
+        workloads = workloads_desde_utilizacion(mix, perfil.utilizacion_cpu, perfil.utilizacion_mem, specs)
+
+    candidatos = [(t, vcpu, gib, precios_mix[t].precio_ec2_hora + precios_mix[t].precio_automode_fee_hora)
+                  for t, (vcpu, gib) in specs.items()]
+    return elegir_empaquetado(workloads, candidatos, estrategia=estrategia)
+
+def catalogo_instancias(region):
+    """
+    Catálogo de tipos de instancia de la región para la selección de instancias:
+    el índice local si existe (cientos de tipos), o los tipos del fallback
+    """
+    from seleccion_instancias import Catalogo
+
+    index = get_default_index()
+    if index is not None:
+        catalogo = Catalogo.desde_indice(index, region, fee_percent=EKS_AUTO_MODE_FEE_PERCENT)
+        if len(catalogo):
+            return catalogo
+    tipos = [t for t in PRECIOS_EC2_FALLBACK if t in ESPECIFICACIONES_FALLBACK]
+    return Catalogo(tipos,
+                    [ESPECIFICACIONES_FALLBACK[t][0] for t in tipos],
+                    [ESPECIFICACIONES_FALLBACK[t][1] for t in tipos],
+                    [PRECIOS_EC2_FALLBACK[t] for t in tipos],
+                    [PRECIOS_EC2_FALLBACK[t] * EKS_AUTO_MODE_FEE_PERCENT for t in tipos])
+
+def demanda_cluster(perfil, margen=MARGEN_DEMANDA):
+    """
+    Demanda de CPU (vCPU) y memoria (GiB) del cluster: capacidad asignable
+    actual × utilización, más un margen para picos y fragmentación
+    """
+    from empaquetado_nodos import allocatable
+
+    demanda_cpu = demanda_mem = 0.0
+    for instance_type, count in perfil.mix().items():
+        specs = obtener_especificaciones(instance_type, perfil.region)
+        if specs is None:
+            continue
+        alloc_cpu, alloc_mem = allocatable(*specs)
+        demanda_cpu += count * alloc_cpu
+        demanda_mem += count * alloc_mem
+    return (demanda_cpu * perfil.utilizacion_cpu * (1 + margen),
+            demanda_mem * perfil.utilizacion_mem * (1 + margen))
+
+def dimensionar_cluster(perfil, workloads=None, margen=MARGEN_DEMANDA, **filtros):
+    """
+    Busca en el catálogo la flota más barata para la demanda del cluster
+    (la de los pods si se pasan workloads, o la derivada de la utilización)
+
+    Returns:
+        ResultadoSeleccion o None si no se puede estimar la demanda o no hay catálogo
+    """
+    from seleccion_instancias import seleccionar_flota
+
+    min_cpu = min_mem = 0.0
+    if workloads is not None and workloads.pods:
+        demanda_cpu = workloads.total_cpu * (1 + margen)
+        demanda_mem = workloads.total_memory * (1 + margen)
+        min_cpu, min_mem = float(workloads.cpu.max()), float(workloads.memory.max())
     else:
-        print(f"  Instancias EC2:        ${ec2_auto_monthly_cost:>10,.2f}  ({estimated_nodes_auto} nodos @ ${precio_ec2_hora:.4f}/h)")
-        if estimated_nodes_auto_decimal != estimated_nodes_auto:
-            print(f"    (Capacidad estimada: {estimated_nodes_auto_decimal:.1f} nodos, redondeado a {estimated_nodes_auto})")
-    print(f"  Auto Mode Fee:         ${automode_fee_monthly_cost:>10,.2f}  (@${precio_automode_fee_hora:.4f}/h por nodo)")
-    print(f"  {'-'*58}")
-    print(f"  TOTAL MENSUAL:         ${auto_monthly_cost:>10,.2f}")
-    print()
+        demanda_cpu, demanda_mem = demanda_cluster(perfil, margen)
+    if demanda_cpu <= 0 and demanda_mem <= 0:
+        return None
+    return seleccionar_flota(catalogo_instancias(perfil.region), demanda_cpu, demanda_mem,
+                             min_cpu=min_cpu, min_mem=min_mem, **filtros)
 
-    ahorro_infra = current_monthly_cost - auto_monthly_cost
-    total_savings = ahorro_infra + ahorro_ops
+def precios_de_seleccion(seleccion):
+    """PreciosInstancia de los tipos elegidos, con los precios del catálogo"""
+    return {t: PreciosInstancia(ec2, fee, fee_api) for t, (ec2, fee, fee_api) in seleccion.precios_hora.items()}
 
-    print(f"{'='*60}")
-    print(f"✨ RESUMEN DE AHORROS")
-    print(f"{'='*60}")
+def evaluar_cluster(perfil, precios=None, interactive=False, verbose=False,
+                    workloads=None, bin_packing=False, rightsizing=False, **kwargs):
+    """
+    Evalúa un cluster en proceso: resuelve precios (si no se pasan) y aplica
+    el modelo de costos. Pensado para evaluar muchos clusters/escenarios sin
+    lanzar un intérprete por cada uno.
+
+    Con `workloads` (o bin_packing=True) la flota de Auto Mode se estima con
+    el simulador de bin packing en lugar de efficiency_gain; con
+    rightsizing=True se busca la flota más barata en todo el catálogo.
+    """
+    if precios is None:
+        precios = resolver_precios_mix(perfil.mix(), perfil.region,
+                                       interactive=interactive, verbose=verbose)
+    if 'flota_auto' not in kwargs:
+        precios_mix = precios if isinstance(precios, dict) else {t: precios for t in perfil.mix()}
+        if rightsizing:
+            seleccion = dimensionar_cluster(perfil, workloads)
+            if seleccion is not None:
+                precios = dict(precios_mix, **precios_de_seleccion(seleccion))
+            kwargs['flota_auto'] = seleccion
+        elif workloads is not None or bin_packing:
+            kwargs['flota_auto'] = empaquetar_cluster(perfil, precios_mix, workloads)
+    return calcular_escenario(perfil, precios, **kwargs)
+
+def imprimir_reporte(resultado, file=None):
+    """Imprime el reporte de migración a partir de un ResultadoAhorro"""
+    out = file or sys.stdout
+    perfil = resultado.perfil
+    precio_ec2_hora = resultado.precios.precio_ec2_hora
+    monthly_cost_real = perfil.monthly_cost_real
+    discount_factor = resultado.discount_factor
+    estimated_nodes_auto = resultado.estimated_nodes_auto
+    estimated_nodes_auto_decimal = resultado.estimated_nodes_auto_decimal
+    ahorro_infra = resultado.ahorro_infra
+    total_savings = resultado.total_savings
+
+    def p(line=''):
+        print(line, file=out)
+
+    p(f"\n{'='*60}")
+    p(f"📊 ANÁLISIS DE CLUSTER ACTUAL")
+    p(f"{'='*60}")
+    mix = perfil.mix()
+    heterogeneo = len(mix) > 1
+    if heterogeneo:
+        p(f"  Nodos:                 {perfil.node_count} ({len(mix)} tipos de instancia)")
+        for instance_type, count in sorted(mix.items(), key=lambda item: -item[1]):
+            p(f"    {count:>5} x {instance_type:<16} @ ${resultado.precios_mix[instance_type].precio_ec2_hora:.4f}/h")
+        p(f"  Región:                {perfil.region}")
+    else:
+        p(f"  Nodos:                 {perfil.node_count} x {perfil.instance_type}")
+        p(f"  Región:                {perfil.region}")
+        p(f"  Precio EC2/hora:       ${precio_ec2_hora:.4f}")
+    p(f"  Utilización CPU:       {perfil.utilizacion_cpu*100:.1f}%")
+    p(f"  Utilización RAM:       {perfil.utilizacion_mem*100:.1f}%")
+    if perfil.requests_cpu is not None and perfil.requests_mem is not None:
+        p(f"  Requests CPU/RAM:      {perfil.requests_cpu*100:.1f}% / {perfil.requests_mem*100:.1f}% de lo asignable")
+    if monthly_cost_real > 0:
+        p(f"  Costo Real (30 días):  ${monthly_cost_real:.2f}")
+    p()
+
+    p(f"{'='*60}")
+    p(f"💰 DESGLOSE DE COSTOS MENSUALES")
+    p(f"{'='*60}")
+    p(f"\n🔵 EKS STANDARD (Managed Node Groups)")
+    p(f"  Control Plane:         ${resultado.control_plane_monthly:>10,.2f}  (@$0.10/hora)")
+    p(f"  Instancias EC2:        ${resultado.ec2_monthly_cost:>10,.2f}  ({perfil.node_count} nodos)")
+    p(f"  {'-'*58}")
+    p(f"  TOTAL MENSUAL:         ${resultado.current_monthly_cost:>10,.2f}")
+    p()
+
+    p(f"🟢 EKS AUTO MODE (Estimado)")
+    p(f"  Control Plane:         ${resultado.control_plane_monthly:>10,.2f}  (@$0.10/hora)")
+    # Tipos de la flota de Auto Mode (pueden diferir de los actuales con bin packing o selección)
+    tipos_auto = list(resultado.flota_auto.flota) if resultado.flota_auto is not None else list(mix)
+    precios_auto = resultado.precios_mix[tipos_auto[0]] if len(tipos_auto) == 1 else None
+    if precios_auto is None:
+        precio_nodos = "mix de tipos"
+    elif tipos_auto[0] != perfil.instance_type or heterogeneo:
+        precio_nodos = f"${precios_auto.precio_ec2_hora:.4f}/h, {tipos_auto[0]}"
+    else:
+        precio_nodos = f"${precio_ec2_hora:.4f}/h"
+    if discount_factor < 1.0:
+        p(f"  Instancias EC2:        ${resultado.ec2_auto_monthly_cost:>10,.2f}  ({estimated_nodes_auto} nodos @ {precio_nodos} con descuento)")
+        p(f"    (On-Demand sería:    ${resultado.ec2_auto_ondemand_monthly:>10,.2f})")
+    else:
+        p(f"  Instancias EC2:        ${resultado.ec2_auto_monthly_cost:>10,.2f}  ({estimated_nodes_auto} nodos @ {precio_nodos})")
+    simulacion = resultado.simulacion
+    if simulacion is not None:
+        p(f"    (Simulación horaria: {simulacion.nodos_min}–{simulacion.nodos_max} nodos, "
+          f"promedio {simulacion.nodos_promedio:.1f})")
+    elif estimated_nodes_auto_decimal != estimated_nodes_auto:
+        p(f"    (Capacidad estimada: {estimated_nodes_auto_decimal:.1f} nodos, redondeado a {estimated_nodes_auto})")
+    if precios_auto is None:
+        p(f"  Auto Mode Fee:         ${resultado.automode_fee_monthly_cost:>10,.2f}  (según tipo de instancia)")
+    else:
+        p(f"  Auto Mode Fee:         ${resultado.automode_fee_monthly_cost:>10,.2f}  (@${precios_auto.precio_automode_fee_hora:.4f}/h por nodo)")
+    p(f"  {'-'*58}")
+    p(f"  TOTAL MENSUAL:         ${resultado.auto_monthly_cost:>10,.2f}")
+    p()
+
+    if len(resultado.desglose_familias) > 1:
+        p(f"{'='*60}")
+        p(f"📦 DESGLOSE POR FAMILIA (sin Control Plane)")
+        p(f"{'='*60}")
+        p(f"  {'Familia':<10} {'Nodos':>11} {'Actual':>12} {'Auto Mode':>12} {'Ahorro':>12}")
+        for familia, datos in sorted(resultado.desglose_familias.items(), key=lambda item: -item[1]['costo_actual']):
+            nodos = f"{datos['nodos']}→{datos['nodos_auto']}"
+            p(f"  {familia:<10} {nodos:>11} ${datos['costo_actual']:>11,.2f} ${datos['costo_auto']:>11,.2f} ${datos['ahorro']:>11,.2f}")
+        p()
+
+    p(f"{'='*60}")
+    p(f"✨ RESUMEN DE AHORROS")
+    p(f"{'='*60}")
     if ahorro_infra > 0:
-        print(f"  Ahorro Infraestructura:  ${ahorro_infra:>10,.2f} / mes")
-        print(f"  Ahorro Operativo:        ${ahorro_ops:>10,.2f} / mes")
-        print(f"  {'-'*58}")
-        print(f"  💰 AHORRO TOTAL:         ${total_savings:>10,.2f} / mes")
-        print(f"                           ${total_savings*12:>10,.2f} / año")
+        p(f"  Ahorro Infraestructura:  ${ahorro_infra:>10,.2f} / mes")
+        p(f"  Ahorro Operativo:        ${resultado.ahorro_ops:>10,.2f} / mes")
+        p(f"  {'-'*58}")
+        p(f"  💰 AHORRO TOTAL:         ${total_savings:>10,.2f} / mes")
+        p(f"                           ${total_savings*12:>10,.2f} / año")
     else:
-        print(f"  ⚠️  Auto Mode sería más caro: ${abs(ahorro_infra):,.2f} / mes")
-        print(f"  Tu cluster está extremadamente optimizado.")
-        print(f"  Los beneficios principales serían operativos.")
-    print(f"{'='*60}")
-    print()
-
-    print(f"ℹ️  NOTAS:")
-    print(f"  • Precios obtenidos de AWS Price List API oficial")
-    print(f"  • Fuente de métricas de utilización: {metric_source}")
+        p(f"  ⚠️  Auto Mode sería más caro: ${abs(ahorro_infra):,.2f} / mes")
+        p(f"  Tu cluster está extremadamente optimizado.")
+        p(f"  Los beneficios principales serían operativos.")
+    p(f"{'='*60}")
+    p()
+
+    p(f"ℹ️  NOTAS:")
+    p(f"  • Precios obtenidos de AWS Price List API oficial")
+    p(f"  • Fuente de métricas de utilización: {perfil.metric_source}")
     if monthly_cost_real > 0:
-        print(f"  • Costo actual basado en Cost Explorer (últimos 30 días)")
+        p(f"  • Costo actual basado en Cost Explorer (últimos 30 días)")
         if discount_factor < 1.0:
-            print(f"  • Descuentos Savings Plans/RI aplicados a Auto Mode ({(1-discount_factor)*100:.1f}%)")
-    if not using_api_pricing:
-        print(f"  • Precio Auto Mode fee calculado como fallback (12% de EC2)")
+            p(f"  • Descuentos Savings Plans/RI aplicados a Auto Mode ({(1-discount_factor)*100:.1f}%)")
+    if not all(precio.using_api_pricing for precio in resultado.precios_mix.values()):
+        p(f"  • Precio Auto Mode fee calculado como fallback (12% de EC2)")
     else:
-        print(f"  • Precio Auto Mode fee obtenido directamente de AWS API")
-    print(f"  • Estimación asume mejora del 20% en bin packing")
-    print(f"  • Número de nodos redondeado hacia arriba (no se pagan instancias fraccionarias)")
-    print(f"  • Ahorro operativo: {horas_ing_ahorradas}h/mes × ${costo_hora_ing}/h")
-    print()
-    
-    print(f"{'='*60}")
-    print(f"🔗 REFERENCIAS DE PRICING")
-    print(f"{'='*60}")
-    print(f"  EC2 Pricing ({instance_type}):")
-    print(f"    https://aws.amazon.com/ec2/pricing/on-demand/")
-    print()
-    print(f"  EKS Control Plane Pricing:")
-    print(f"    https://aws.amazon.com/eks/pricing/")
-    print()
-    print(f"  EKS Auto Mode Pricing:")
-    print(f"    https://docs.aws.amazon.com/eks/latest/userguide/automode.html")
-    print(f"{'='*60}")
+        p(f"  • Precio Auto Mode fee obtenido directamente de AWS API")
+    if resultado.flota_auto is not None:
+        p(f"  • Estimación por {resultado.flota_auto.descripcion}")
+    elif simulacion is not None:
+        p(f"  • Estimación hora a hora ({HOURS_MONTH} h) con el perfil semanal de utilización; "
+          f"pico (p99) {simulacion.utilizacion_pico*100:.1f}% con mejora del {EFFICIENCY_GAIN*100:.0f}% en bin packing")
+    else:
+        p(f"  • Estimación asume mejora del {EFFICIENCY_GAIN*100:.0f}% en bin packing")
+    p(f"  • Número de nodos redondeado hacia arriba (no se pagan instancias fraccionarias)")
+    p(f"  • Ahorro operativo: {resultado.horas_ing_ahorradas}h/mes × ${resultado.costo_hora_ing}/h")
+    p()
+
+    p(f"{'='*60}")
+    p(f"🔗 REFERENCIAS DE PRICING")
+    p(f"{'='*60}")
+    p(f"  EC2 Pricing ({', '.join(mix)}):")
+    p(f"    https://aws.amazon.com/ec2/pricing/on-demand/")
+    p()
+    p(f"  EKS Control Plane Pricing:")
+    p(f"    https://aws.amazon.com/eks/pricing/")
+    p()
+    p(f"  EKS Auto Mode Pricing:")
+    p(f"    https://docs.aws.amazon.com/eks/latest/userguide/automode.html")
+    p(f"{'='*60}")
+
+def calcular_ahorro():
+    """Punto de entrada CLI: lee el perfil del entorno, evalúa e imprime el reporte"""
+    print("--- 📊 Calculadora de Migración a EKS Auto Mode (Automática) ---")
+
+    # --- INPUT DESDE VARIABLES DE ENTORNO ---
+    try:
+        perfil = PerfilCluster.desde_entorno()
+    except ValueError as e:
+        print(f"❌ Error leyendo variables de entorno: {e}")
+        print("Ejecuta primero el script recolector.")
+        sys.exit(1)
+
+    if perfil.node_count == 0:
+        print("⚠️ Advertencia: Node count es 0. ¿Corriste el recolector?")
+
+    # --- OBTENER PRECIOS DE AWS ---
+    precios = resolver_precios_mix(perfil.mix(), perfil.region, interactive=True)
+
+    # --- FLOTA AUTO MODE SIMULADA (opcional) ---
+    flota_auto = None
+    workloads_file = os.environ.get('EKS_WORKLOADS_FILE')
+    workloads = None
+    if workloads_file:
+        from empaquetado_nodos import cargar_workloads
+        workloads = cargar_workloads(workloads_file)
+
+    if os.environ.get('EKS_RIGHTSIZING') == '1':
+        flota_auto = dimensionar_cluster(perfil, workloads)
+        if flota_auto is None:
+            print("⚠️  Selección de instancias no disponible (sin catálogo); "
+                  "usando estimación por eficiencia", file=sys.stderr)
+        else:
+            precios = dict(precios, **precios_de_seleccion(flota_auto))
+            print(f"✅ Selección de instancias: {flota_auto.descripcion}", file=sys.stderr)
+    elif workloads_file or os.environ.get('EKS_BIN_PACKING') == '1':
+        flota_auto = empaquetar_cluster(perfil, precios, workloads)
+        if flota_auto is None:
+            print("⚠️  Bin packing no disponible (sin especificaciones o pods demasiado grandes); "
+                  "usando estimación por eficiencia", file=sys.stderr)
+        else:
+            print(f"✅ Bin packing: {flota_auto.descripcion}", file=sys.stderr)
+
+    # --- CÁLCULOS ---
+    resultado = calcular_escenario(perfil, precios, flota_auto=flota_auto)
+    if perfil.monthly_cost_real > 0:
+        print(f"✅ Usando costo real de Cost Explorer: ${perfil.monthly_cost_real:.2f}/mes", file=sys.stderr)
+        if resultado.ec2_ondemand_monthly > 0:
+            print(f"✅ Factor de descuento detectado: {(1-resultado.discount_factor)*100:.1f}% (Savings Plans/RI)", file=sys.stderr)
+
+    # --- REPORTE ---
+    imprimir_reporte(resultado)
 
 if __name__ == "__main__":
-    calcular_ahorro()
\ No newline at end of file
+    calcular_ahorro()
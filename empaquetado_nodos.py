@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Simulador de bin packing para estimar los nodos de EKS Auto Mode.
+
+Empaqueta los requests de los pods (CPU, memoria y cantidad de pods por nodo)
+sobre tipos de instancia candidatos con First-Fit Decreasing o Best-Fit
+Decreasing y retorna el conjunto mínimo de nodos y su costo. Es la
+alternativa al supuesto fijo de EFFICIENCY_GAIN de la calculadora.
+
+Los pods se agrupan por tamaño (los requests de Kubernetes se repiten mucho:
+réplicas de un mismo Deployment) y cada grupo se ubica de una vez con NumPy
+sobre todos los nodos abiertos, así 50k pods se empaquetan en milisegundos.
+
+Uso:
+    python3 empaquetado_nodos.py pods.csv --tipos m5.large:2:8:0.096 m5.xlarge:4:16:0.192
+    kubectl get pods -A -o json > pods.json && python3 empaquetado_nodos.py pods.json ...
+
+Formato CSV: name,cpu,memory[,replicas] con cantidades de Kubernetes
+(cpu: 250m, 0.5, 2; memory: 512Mi, 1Gi, 1073741824).
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Pods por nodo (límite por defecto de Auto Mode / Karpenter)
+MAX_PODS = 110
+
+ESTRATEGIAS = ('ffd', 'bfd')
+
+# Máximo de tamaños distintos a empaquetar; por encima los requests se
+# redondean hacia arriba a una grilla más gruesa (estimación conservadora)
+MAX_CLASES = 2048
+_GRILLAS = [(0.001, 1 / 1024), (0.01, 16 / 1024), (0.025, 64 / 1024), (0.05, 128 / 1024),
+            (0.1, 256 / 1024), (0.25, 512 / 1024), (0.5, 1.0)]
+
+_MEMORY_SUFFIXES = {
+    'Ki': 2**10, 'Mi': 2**20, 'Gi': 2**30, 'Ti': 2**40,
+    'k': 10**3, 'K': 10**3, 'M': 10**6, 'G': 10**9, 'T': 10**12,
+}
+
+def parse_cpu(value):
+    """Cantidad de CPU de Kubernetes -> vCPU ('250m' -> 0.25)"""
+    value = str(value).strip()
+    if not value:
+        return 0.0
+    if value.endswith('m'):
+        return float(value[:-1]) / 1000
+    return float(value)
+
+def parse_memory(value):
+    """Cantidad de memoria de Kubernetes -> GiB ('512Mi' -> 0.5; sin sufijo son bytes)"""
+    value = str(value).strip()
+    if not value:
+        return 0.0
+    for suffix in sorted(_MEMORY_SUFFIXES, key=len, reverse=True):
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * _MEMORY_SUFFIXES[suffix] / 2**30
+    return float(value) / 2**30
+
+def requests_pod(pod):
+    """
+    Requests efectivos de un pod en (vCPU, GiB): el máximo entre la suma de
+    los contenedores y el init container más grande, más el overhead del
+    RuntimeClass (la misma cuenta que hace el scheduler)
+    """
+    spec = pod.get('spec', {})
+
+    def total(containers, key, parse):
+        return [parse(c.get('resources', {}).get('requests', {}).get(key, 0)) for c in containers]
+
+    result = []
+    for key, parse in (('cpu', parse_cpu), ('memory', parse_memory)):
+        value = max(sum(total(spec.get('containers', []), key, parse)),
+                    max(total(spec.get('initContainers', []), key, parse), default=0.0))
+        result.append(value + parse(spec.get('overhead', {}).get(key, 0)))
+    return tuple(result)
+
+def allocatable(vcpu, memory_gib, max_pods=MAX_PODS):
+    """
+    Capacidad asignable a pods de un nodo (reservas de kubelet/sistema de EKS)
+
+    CPU: 6% del primer core, 1% del segundo, 0.5% del 3º y 4º, 0.25% del resto.
+    Memoria: 255Mi + 11Mi por pod máximo, más 100Mi de umbral de desalojo.
+
+    Returns:
+        tuple: (vcpu, memory_gib) asignables
+    """
+    reserved_cpu = (0.06 * min(vcpu, 1) + 0.01 * min(max(vcpu - 1, 0), 1) +
+                    0.005 * min(max(vcpu - 2, 0), 2) + 0.0025 * max(vcpu - 4, 0))
+    reserved_mem = (255 + 11 * max_pods + 100) / 1024
+    return max(vcpu - reserved_cpu, 0.0), max(memory_gib - reserved_mem, 0.0)
+
+@dataclass
+class Workloads:
+    """Requests de pods agrupados por tamaño: cpu (vCPU), memoria (GiB) y réplicas"""
+    cpu: np.ndarray
+    memory: np.ndarray
+    replicas: np.ndarray
+
+    @classmethod
+    def desde_arrays(cls, cpu, memory, replicas=None):
+        """Agrupa pods con requests idénticos (redondeados a 1m de CPU y 1Mi de memoria)"""
+        cpu = np.round(np.asarray(cpu, dtype=float), 3)
+        memory = np.round(np.asarray(memory, dtype=float) * 1024) / 1024
+        replicas = np.ones(len(cpu), dtype=np.int64) if replicas is None else np.asarray(replicas, dtype=np.int64)
+        if len(cpu) == 0:
+            return cls(cpu, memory, replicas)
+        sizes, inverse = np.unique(np.column_stack([cpu, memory]), axis=0, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=replicas, minlength=len(sizes)).astype(np.int64)
+        keep = counts > 0
+        return cls(sizes[keep, 0], sizes[keep, 1], counts[keep])
+
+    def limitar_clases(self, max_clases=MAX_CLASES):
+        """Redondea los requests hacia arriba hasta quedar con a lo sumo `max_clases` tamaños"""
+        workloads = self
+        for step_cpu, step_mem in _GRILLAS[1:]:
+            if len(workloads.cpu) <= max_clases:
+                break
+            workloads = Workloads.desde_arrays(np.ceil(self.cpu / step_cpu - 1e-9) * step_cpu,
+                                               np.ceil(self.memory / step_mem - 1e-9) * step_mem,
+                                               self.replicas)
+        return workloads
+
+    @property
+    def pods(self):
+        return int(self.replicas.sum())
+
+    @property
+    def total_cpu(self):
+        return float(self.cpu @ self.replicas)
+
+    @property
+    def total_memory(self):
+        return float(self.memory @ self.replicas)
+
+def _pods_desde_kubectl(data):
+    """Requests por pod desde `kubectl get pods -o json` (requests_pod)"""
+    for pod in data.get('items', []):
+        if pod.get('status', {}).get('phase') in ('Succeeded', 'Failed'):
+            continue
+        cpu, memory = requests_pod(pod)
+        yield cpu, memory, 1
+
+def cargar_workloads(path):
+    """
+    Lee los requests de pods de un CSV (name,cpu,memory[,replicas]), una lista
+    JSON de objetos con las mismas claves o la salida de `kubectl get pods -o json`
+
+    Returns:
+        Workloads
+    """
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+            if isinstance(data, dict):
+                rows = list(_pods_desde_kubectl(data))
+            else:
+                rows = [(parse_cpu(item.get('cpu', 0)), parse_memory(item.get('memory', 0)),
+                         int(item.get('replicas', 1))) for item in data]
+        else:
+            for row in csv.DictReader(f):
+                rows.append((parse_cpu(row.get('cpu', 0)), parse_memory(row.get('memory', 0)),
+                             int(row.get('replicas') or 1)))
+    if not rows:
+        return Workloads.desde_arrays([], [], [])
+    cpu, memory, replicas = zip(*rows)
+    return Workloads.desde_arrays(cpu, memory, replicas)
+
+def workloads_desde_utilizacion(mix, utilizacion_cpu, utilizacion_mem, specs, pod_cpu=0.5):
+    """
+    Sintetiza pods uniformes a partir de la utilización agregada del cluster
+    (cuando no hay requests por pod): la demanda total se reparte en pods de
+    `pod_cpu` vCPU con la misma proporción CPU/memoria observada.
+
+    Args:
+        mix: {instance_type: nodos}
+        specs: {instance_type: (vcpu, memory_gib)}
+    """
+    demanda_cpu = sum(count * allocatable(*specs[t])[0] for t, count in mix.items()) * utilizacion_cpu
+    demanda_mem = sum(count * allocatable(*specs[t])[1] for t, count in mix.items()) * utilizacion_mem
+    pods = max(math.ceil(demanda_cpu / pod_cpu), 1)
+    return Workloads.desde_arrays([demanda_cpu / pods], [demanda_mem / pods], [pods])
+
+@dataclass
+class ResultadoEmpaquetado:
+    """Nodos necesarios para un conjunto de pods sobre un tipo de instancia"""
+    instance_type: str
+    nodos: int
+    precio_hora: float
+    pods: int
+    sin_ubicar: int
+    utilizacion_cpu: float
+    utilizacion_mem: float
+    estrategia: str
+    alternativas: dict = field(default_factory=dict)
+
+    @property
+    def costo_hora(self):
+        return self.nodos * self.precio_hora
+
+    @property
+    def flota(self):
+        """Flota de Auto Mode {instance_type: nodos} para la calculadora"""
+        return {self.instance_type: self.nodos}
+
+    @property
+    def descripcion(self):
+        return (f"bin packing {self.estrategia.upper()} de {self.pods} pods: "
+                f"{self.nodos} x {self.instance_type}")
+
+def empaquetar(workloads, vcpu, memory_gib, max_pods=MAX_PODS, estrategia='ffd'):
+    """
+    Empaqueta los pods sobre nodos de un tipo de instancia.
+
+    Los grupos de pods se recorren de mayor a menor (tamaño dominante relativo
+    al nodo). Cada grupo se reparte en una sola pasada vectorizada sobre los
+    nodos abiertos —en orden de apertura (FFD) o del más lleno al más vacío
+    (BFD)— y lo que no entra abre nodos nuevos ya llenos.
+
+    Returns:
+        tuple: (nodos, pods_sin_ubicar, cpu_usada, memoria_usada)
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia desconocida: {estrategia} (opciones: {', '.join(ESTRATEGIAS)})")
+    cap_cpu, cap_mem = allocatable(vcpu, memory_gib, max_pods)
+    workloads = workloads.limitar_clases()
+
+    # Tamaños mínimos para no dividir por cero (pods sin requests)
+    cpu = np.maximum(workloads.cpu, 1e-6)
+    mem = np.maximum(workloads.memory, 1e-6)
+    order = np.argsort(-np.maximum(cpu / max(cap_cpu, 1e-9), mem / max(cap_mem, 1e-9)), kind='stable')
+
+    size = 64
+    rem_cpu = np.empty(size)
+    rem_mem = np.empty(size)
+    rem_pods = np.empty(size, dtype=np.int64)
+    n = 0
+    sin_ubicar = 0
+
+    for idx in order:
+        c, m, k = cpu[idx], mem[idx], int(workloads.replicas[idx])
+        if c > cap_cpu or m > cap_mem:
+            sin_ubicar += k
+            continue
+
+        if n:
+            fit = np.minimum(np.minimum(np.floor(rem_cpu[:n] / c + 1e-9), np.floor(rem_mem[:n] / m + 1e-9)),
+                             rem_pods[:n]).astype(np.int64)
+            if estrategia == 'bfd':
+                nodes = np.argsort(rem_cpu[:n] / cap_cpu + rem_mem[:n] / cap_mem, kind='stable')
+                fit = fit[nodes]
+            else:
+                nodes = slice(0, n)
+            before = np.cumsum(fit) - fit
+            take = np.clip(k - before, 0, fit)
+            rem_cpu[nodes] -= take * c
+            rem_mem[nodes] -= take * m
+            rem_pods[nodes] -= take
+            k -= int(take.sum())
+
+        if k > 0:
+            per_node = int(min(math.floor(cap_cpu / c + 1e-9), math.floor(cap_mem / m + 1e-9), max_pods))
+            new = math.ceil(k / per_node)
+            if n + new > size:
+                size = max(size * 2, n + new)
+                rem_cpu = np.resize(rem_cpu, size)
+                rem_mem = np.resize(rem_mem, size)
+                rem_pods = np.resize(rem_pods, size)
+            placed = np.full(new, per_node, dtype=np.int64)
+            placed[-1] = k - per_node * (new - 1)
+            rem_cpu[n:n + new] = cap_cpu - placed * c
+            rem_mem[n:n + new] = cap_mem - placed * m
+            rem_pods[n:n + new] = max_pods - placed
+            n += new
+
+    used_cpu = float(n * cap_cpu - rem_cpu[:n].sum())
+    used_mem = float(n * cap_mem - rem_mem[:n].sum())
+    return n, sin_ubicar, used_cpu, used_mem
+
+def elegir_empaquetado(workloads, candidatos, max_pods=MAX_PODS, estrategia='ffd'):
+    """
+    Empaqueta sobre cada tipo candidato y elige el de menor costo por hora
+    (entre los que ubican todos los pods)
+
+    Args:
+        candidatos: Lista de (instance_type, vcpu, memory_gib, precio_hora)
+
+    Returns:
+        ResultadoEmpaquetado o None si ningún candidato ubica todos los pods
+    """
+    mejor = None
+    alternativas = {}
+    for instance_type, vcpu, memory_gib, precio_hora in candidatos:
+        nodos, sin_ubicar, used_cpu, used_mem = empaquetar(workloads, vcpu, memory_gib, max_pods, estrategia)
+        if sin_ubicar:
+            continue
+        alternativas[instance_type] = {'nodos': nodos, 'costo_hora': nodos * precio_hora}
+        if mejor is None or nodos * precio_hora < mejor.costo_hora:
+            cap_cpu, cap_mem = allocatable(vcpu, memory_gib, max_pods)
+            mejor = ResultadoEmpaquetado(
+                instance_type=instance_type,
+                nodos=nodos,
+                precio_hora=precio_hora,
+                pods=workloads.pods,
+                sin_ubicar=sin_ubicar,
+                utilizacion_cpu=used_cpu / (nodos * cap_cpu) if nodos else 0.0,
+                utilizacion_mem=used_mem / (nodos * cap_mem) if nodos else 0.0,
+                estrategia=estrategia,
+            )
+    if mejor is not None:
+        mejor.alternativas = alternativas
+    return mejor
+
+def _parse_tipo(spec):
+    """'m5.large:2:8:0.096' -> ('m5.large', 2.0, 8.0, 0.096)"""
+    instance_type, vcpu, memory_gib, precio = spec.split(':')
+    return instance_type, float(vcpu), float(memory_gib), float(precio)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador de bin packing de pods sobre tipos de instancia")
+    parser.add_argument('workloads', help='CSV/JSON de requests o salida de kubectl get pods -o json')
+    parser.add_argument('--tipos', nargs='+', required=True, type=_parse_tipo,
+                        help='Candidatos tipo:vcpu:GiB:precio_hora (ej: m5.large:2:8:0.096)')
+    parser.add_argument('--estrategia', choices=ESTRATEGIAS, default='ffd')
+    parser.add_argument('--max-pods', type=int, default=MAX_PODS)
+    args = parser.parse_args(argv)
+
+    workloads = cargar_workloads(args.workloads)
+    print(f"📦 {workloads.pods} pods ({len(workloads.cpu)} tamaños distintos): "
+          f"{workloads.total_cpu:.1f} vCPU, {workloads.total_memory:.1f} GiB")
+
+    resultado = elegir_empaquetado(workloads, args.tipos, args.max_pods, args.estrategia)
+    if resultado is None:
+        print("❌ Ningún tipo candidato puede ubicar todos los pods", file=sys.stderr)
+        return 1
+
+    for instance_type, alt in sorted(resultado.alternativas.items(), key=lambda item: item[1]['costo_hora']):
+        marca = '✅' if instance_type == resultado.instance_type else '  '
+        print(f"  {marca} {instance_type:<14} {alt['nodos']:>6} nodos  ${alt['costo_hora']*730:>11,.2f}/mes")
+    print(f"\n💰 Mínimo: {resultado.nodos} x {resultado.instance_type} (${resultado.costo_hora*730:,.2f}/mes), "
+          f"utilización CPU {resultado.utilizacion_cpu*100:.1f}%, RAM {resultado.utilizacion_mem*100:.1f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
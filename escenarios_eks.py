@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Barrido de escenarios (what-if) sobre los parámetros del modelo de costos.
+
+La calculadora evalúa un único escenario con supuestos fijos (efficiency_gain
+del 20%, fee de Auto Mode, descuento, horas de ingeniería, utilización). Este
+módulo evalúa el mismo modelo de `calcular_escenario()` de forma vectorizada
+sobre arrays de parámetros:
+
+- Grilla: producto cartesiano de listas de valores por parámetro.
+- Monte Carlo: muestras de distribuciones por parámetro (1M de muestras en
+  menos de un segundo).
+
+Los precios se resuelven una sola vez; cada muestra cuesta unas pocas
+operaciones de NumPy por tipo de instancia del mix. El resultado incluye
+intervalos de confianza del ahorro, probabilidad de ahorro y tablas de
+sensibilidad por parámetro.
+
+Se usa la estimación estática por efficiency_gain (sin bin packing, selección
+de instancias ni simulación horaria).
+
+Uso:
+    python3 escenarios_eks.py --grid efficiency_gain=0.1,0.2,0.3 --grid fee_percent=0.10,0.12
+    python3 escenarios_eks.py --dist efficiency_gain=triangular:0.05:0.2:0.3 \\
+        --dist utilizacion_cpu=normal:0.45:0.05 -n 1000000 --seed 7
+"""
+import argparse
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from calculadora_eks import (
+    PerfilCluster, PreciosInstancia, resolver_precios_mix,
+    EFFICIENCY_GAIN, HORAS_ING_AHORRADAS, COSTO_HORA_ING,
+    EKS_CONTROL_PLANE_HOURLY, HOURS_MONTH,
+)
+
+# Parámetros que se pueden barrer (nombres de PerfilCluster / calcular_escenario)
+PARAMETROS = ('utilizacion_cpu', 'utilizacion_mem', 'efficiency_gain', 'fee_percent',
+              'discount_factor', 'horas_ing_ahorradas', 'costo_hora_ing')
+
+# Fracciones que se recortan a [0, 1] al muestrear
+_FRACCIONES = ('utilizacion_cpu', 'utilizacion_mem', 'efficiency_gain')
+
+MUESTRAS_DEFAULT = 1_000_000
+
+def parse_grilla(spec):
+    """
+    Valores de un parámetro para la grilla:
+      '0.1,0.2,0.3'      -> lista explícita
+      'lin:0.1:0.3:5'    -> 5 valores equiespaciados entre 0.1 y 0.3
+    """
+    spec = spec.strip()
+    if spec.startswith('lin:'):
+        partes = spec.split(':')
+        if len(partes) != 4:
+            raise ValueError(f"Grilla inválida '{spec}' (formato lin:desde:hasta:n)")
+        return np.linspace(float(partes[1]), float(partes[2]), int(partes[3]))
+    return np.array([float(x) for x in spec.split(',') if x.strip()])
+
+def muestrear(spec, n, rng):
+    """
+    Muestras de una distribución:
+      'uniform:a:b', 'normal:media:desvio', 'triangular:min:moda:max',
+      'lognormal:media:desvio' (de la normal subyacente) o un valor fijo
+    """
+    nombre, _, resto = str(spec).partition(':')
+    if not resto:
+        return np.full(n, float(nombre))
+    args = [float(x) for x in resto.split(':')]
+    esperados = {'uniform': 2, 'normal': 2, 'triangular': 3, 'lognormal': 2}
+    if esperados.get(nombre) != len(args):
+        raise ValueError(f"Distribución inválida '{spec}' "
+                         f"(uniform:a:b, normal:media:desvio, triangular:min:moda:max, lognormal:media:desvio)")
+    return getattr(rng, nombre)(*args, size=n)
+
+def _parse_asignacion(texto):
+    """'nombre=spec' -> (nombre, spec) validando el nombre del parámetro"""
+    nombre, sep, spec = texto.partition('=')
+    if not sep or nombre not in PARAMETROS:
+        raise ValueError(f"Parámetro inválido '{texto}' (opciones: {', '.join(PARAMETROS)})")
+    return nombre, spec
+
+@dataclass
+class ResultadoBarrido:
+    """Resultado vectorizado: un valor por escenario en cada array"""
+    parametros: dict
+    current_monthly_cost: float
+    nodos_auto: np.ndarray
+    auto_monthly_cost: np.ndarray
+    ahorro_infra: np.ndarray
+    ahorro_ops: np.ndarray
+    total_savings: np.ndarray
+    barridos: tuple = field(default_factory=tuple)
+
+    def __len__(self):
+        return len(self.total_savings)
+
+    def intervalo(self, nivel=0.90, metrica='total_savings'):
+        """(inferior, mediana, superior) del intervalo central de `nivel`"""
+        cola = (1 - nivel) / 2 * 100
+        inferior, mediana, superior = np.percentile(getattr(self, metrica), [cola, 50, 100 - cola])
+        return float(inferior), float(mediana), float(superior)
+
+    def prob_ahorro(self, metrica='ahorro_infra'):
+        """Fracción de escenarios en los que Auto Mode es más barato"""
+        return float(np.mean(getattr(self, metrica) > 0))
+
+    def sensibilidad(self, parametro, bins=5, metrica='total_savings'):
+        """
+        Ahorro por tramo de un parámetro: un tramo por valor en una grilla o
+        por cuantil en Monte Carlo.
+
+        Returns:
+            list[dict]: desde, hasta, escenarios, media, p5, p95
+        """
+        x = self.parametros[parametro]
+        y = getattr(self, metrica)
+        valores = np.unique(x)
+        if len(valores) <= bins:
+            tramo = np.searchsorted(valores, x)
+            limites = [(v, v) for v in valores]
+        else:
+            bordes = np.quantile(x, np.linspace(0, 1, bins + 1))
+            tramo = np.clip(np.searchsorted(bordes, x, side='right') - 1, 0, bins - 1)
+            limites = list(zip(bordes[:-1], bordes[1:]))
+
+        filas = []
+        for idx, (desde, hasta) in enumerate(limites):
+            seleccion = y[tramo == idx]
+            if not len(seleccion):
+                continue
+            p5, p95 = np.percentile(seleccion, [5, 95])
+            filas.append({'desde': float(desde), 'hasta': float(hasta), 'escenarios': len(seleccion),
+                          'media': float(seleccion.mean()), 'p5': float(p5), 'p95': float(p95)})
+        return filas
+
+    def correlaciones(self, metrica='total_savings'):
+        """Correlación de cada parámetro barrido con la métrica, de mayor a menor impacto"""
+        y = getattr(self, metrica)
+        resultado = {}
+        for nombre in self.barridos:
+            x = self.parametros[nombre]
+            if x.std() > 0 and y.std() > 0:
+                resultado[nombre] = float(np.corrcoef(x, y)[0, 1])
+        return dict(sorted(resultado.items(), key=lambda item: -abs(item[1])))
+
+def valores_base(perfil, precios_mix):
+    """Valores por defecto de cada parámetro (los que usaría calcular_escenario)"""
+    discount_factor = perfil.discount_factor
+    if discount_factor is None:
+        discount_factor = 1.0
+        ondemand = sum(count * precios_mix[t].precio_ec2_hora * HOURS_MONTH for t, count in perfil.mix().items())
+        if perfil.monthly_cost_real > 0 and ondemand > 0:
+            discount_factor = perfil.monthly_cost_real / ondemand
+    # Con requests de pods el waste_factor sale de ellos (PerfilCluster.ocupacion);
+    # evaluar_vectorizado no deja que un barrido de utilización baje de ellos
+    ocupacion_cpu, ocupacion_mem = perfil.ocupacion()
+    return {
+        'utilizacion_cpu': ocupacion_cpu,
+        'utilizacion_mem': ocupacion_mem,
+        'efficiency_gain': EFFICIENCY_GAIN,
+        'fee_percent': None,  # None: fee por tipo resuelto (API o fallback)
+        'discount_factor': discount_factor,
+        'horas_ing_ahorradas': HORAS_ING_AHORRADAS,
+        'costo_hora_ing': COSTO_HORA_ING,
+    }
+
+def evaluar_vectorizado(perfil, precios, **parametros):
+    """
+    Evalúa el modelo de calcular_escenario() para arrays de parámetros.
+
+    Args:
+        perfil: PerfilCluster
+        precios: {instance_type: PreciosInstancia} o un único PreciosInstancia
+        **parametros: Nombre de PARAMETROS -> escalar o array (mismo largo);
+                      los que faltan toman su valor base. fee_percent
+                      reemplaza el fee de cada tipo por precio EC2 × fee_percent.
+
+    Returns:
+        ResultadoBarrido
+    """
+    mix = perfil.mix()
+    if isinstance(precios, PreciosInstancia):
+        precios_mix = {instance_type: precios for instance_type in mix}
+    else:
+        precios_mix = dict(precios)
+
+    desconocidos = set(parametros) - set(PARAMETROS)
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+
+    valores = valores_base(perfil, precios_mix)
+    valores.update({k: v for k, v in parametros.items() if v is not None})
+    n = max((np.size(v) for v in valores.values() if v is not None), default=1)
+    arrays = {k: (np.broadcast_to(np.asarray(v, dtype=float), (n,)) if v is not None else None)
+              for k, v in valores.items()}
+
+    # Costo actual (no depende de los parámetros barridos)
+    control_plane_monthly = EKS_CONTROL_PLANE_HOURLY * HOURS_MONTH
+    ondemand_ec2_cost = sum(count * precios_mix[t].precio_ec2_hora * HOURS_MONTH for t, count in mix.items())
+    ec2_monthly_cost = perfil.monthly_cost_real if perfil.monthly_cost_real > 0 else ondemand_ec2_cost
+    current_monthly_cost = control_plane_monthly + ec2_monthly_cost
+
+    # Con requests de pods la ocupación no baja de ellos (como simular_nodos_horarios):
+    # un barrido de utilización usa max(requests, utilización muestreada)
+    ocupacion_cpu, ocupacion_mem = arrays['utilizacion_cpu'], arrays['utilizacion_mem']
+    if perfil.requests_cpu is not None and perfil.requests_mem is not None:
+        ocupacion_cpu = np.maximum(ocupacion_cpu, perfil.requests_cpu)
+        ocupacion_mem = np.maximum(ocupacion_mem, perfil.requests_mem)
+
+    # Misma secuencia de operaciones que calcular_escenario (resultados idénticos por escenario)
+    waste_factor = 1 - ((ocupacion_cpu + ocupacion_mem) / 2)
+    potential_reduction = waste_factor * arrays['efficiency_gain']
+
+    nodos_auto = np.zeros(n, dtype=np.int64)
+    ec2_auto_ondemand = np.zeros(n)
+    fee_monthly = np.zeros(n)
+    for instance_type, count in mix.items():
+        precio = precios_mix[instance_type]
+        nodes = np.ceil(count * (1 - potential_reduction))
+        fee_hora = (precio.precio_ec2_hora * arrays['fee_percent'] if arrays['fee_percent'] is not None
+                    else precio.precio_automode_fee_hora)
+        nodos_auto += nodes.astype(np.int64)
+        ec2_auto_ondemand += nodes * precio.precio_ec2_hora * HOURS_MONTH
+        fee_monthly += nodes * fee_hora * HOURS_MONTH
+
+    auto_monthly_cost = control_plane_monthly + ec2_auto_ondemand * arrays['discount_factor'] + fee_monthly
+    ahorro_ops = arrays['horas_ing_ahorradas'] * arrays['costo_hora_ing']
+    ahorro_infra = current_monthly_cost - auto_monthly_cost
+
+    return ResultadoBarrido(
+        parametros={k: v for k, v in arrays.items() if v is not None},
+        current_monthly_cost=current_monthly_cost,
+        nodos_auto=nodos_auto,
+        auto_monthly_cost=auto_monthly_cost,
+        ahorro_infra=ahorro_infra,
+        ahorro_ops=np.broadcast_to(ahorro_ops, (n,)),
+        total_savings=ahorro_infra + ahorro_ops,
+        barridos=tuple(k for k in PARAMETROS if k in parametros and parametros[k] is not None),
+    )
+
+def barrido_grilla(perfil, precios, grilla):
+    """
+    Producto cartesiano de los valores de cada parámetro.
+
+    Args:
+        grilla: {parametro: secuencia de valores (o spec de parse_grilla)}
+    """
+    nombres = list(grilla)
+    ejes = [parse_grilla(v) if isinstance(v, str) else np.asarray(v, dtype=float) for v in grilla.values()]
+    mallas = np.meshgrid(*ejes, indexing='ij') if ejes else []
+    return evaluar_vectorizado(perfil, precios, **{k: m.ravel() for k, m in zip(nombres, mallas)})
+
+def monte_carlo(perfil, precios, distribuciones, n=MUESTRAS_DEFAULT, seed=None):
+    """
+    Simulación de Monte Carlo con parámetros independientes.
+
+    Args:
+        distribuciones: {parametro: spec de muestrear() o array de n muestras}
+        n: Cantidad de escenarios
+        seed: Semilla del generador (reproducibilidad)
+    """
+    rng = np.random.default_rng(seed)
+    muestras = {}
+    for nombre, spec in distribuciones.items():
+        valores = np.asarray(spec, dtype=float) if not isinstance(spec, str) else muestrear(spec, n, rng)
+        if nombre in _FRACCIONES:
+            valores = np.clip(valores, 0.0, 1.0)
+        elif nombre != 'discount_factor':
+            valores = np.maximum(valores, 0.0)
+        muestras[nombre] = valores
+    return evaluar_vectorizado(perfil, precios, **muestras)
+
+def imprimir_barrido(resultado, nivel=0.90, bins=5, file=None):
+    """Reporte de un barrido: intervalo de confianza y sensibilidad por parámetro"""
+    out = file or sys.stdout
+
+    def p(line=''):
+        print(line, file=out)
+
+    inferior, mediana, superior = resultado.intervalo(nivel)
+    infra_inf, infra_med, infra_sup = resultado.intervalo(nivel, 'ahorro_infra')
+    p(f"\n{'='*60}")
+    p(f"🎲 BARRIDO DE ESCENARIOS ({len(resultado):,} escenarios)")
+    p(f"{'='*60}")
+    p(f"  Costo actual:            ${resultado.current_monthly_cost:>10,.2f} / mes")
+    p(f"  Nodos Auto Mode:         {int(resultado.nodos_auto.min())}–{int(resultado.nodos_auto.max())}")
+    p(f"  Ahorro Infraestructura:  ${infra_med:>10,.2f}  (IC {nivel*100:.0f}%: ${infra_inf:,.2f} a ${infra_sup:,.2f})")
+    p(f"  💰 Ahorro Total:         ${mediana:>10,.2f}  (IC {nivel*100:.0f}%: ${inferior:,.2f} a ${superior:,.2f})")
+    p(f"  Probabilidad de ahorro en infraestructura: {resultado.prob_ahorro()*100:.1f}%")
+
+    correlaciones = resultado.correlaciones()
+    for nombre in resultado.barridos:
+        p()
+        impacto = f" (correlación {correlaciones[nombre]:+.2f})" if nombre in correlaciones else ""
+        p(f"📈 Sensibilidad: {nombre}{impacto}")
+        p(f"  {'Tramo':<21} {'Escenarios':>10} {'Ahorro medio':>14} {'p5':>12} {'p95':>12}")
+        for fila in resultado.sensibilidad(nombre, bins):
+            tramo = (f"{fila['desde']:.4g}" if fila['desde'] == fila['hasta']
+                     else f"{fila['desde']:.4g} – {fila['hasta']:.4g}")
+            p(f"  {tramo:<21} {fila['escenarios']:>10,} ${fila['media']:>13,.2f} ${fila['p5']:>11,.2f} ${fila['p95']:>11,.2f}")
+    p(f"{'='*60}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de escenarios sobre el modelo de costos de Auto Mode")
+    parser.add_argument('--grid', action='append', default=[], metavar='PARAM=VALORES',
+                        help="Valores de la grilla: 'efficiency_gain=0.1,0.2,0.3' o 'fee_percent=lin:0.08:0.16:5'")
+    parser.add_argument('--dist', action='append', default=[], metavar='PARAM=DIST',
+                        help="Distribución Monte Carlo: 'efficiency_gain=triangular:0.05:0.2:0.3'")
+    parser.add_argument('-n', '--samples', type=int, default=MUESTRAS_DEFAULT, help='Escenarios de Monte Carlo')
+    parser.add_argument('--seed', type=int, help='Semilla del generador')
+    parser.add_argument('--nivel', type=float, default=0.90, help='Nivel del intervalo de confianza')
+    parser.add_argument('--bins', type=int, default=5, help='Tramos de las tablas de sensibilidad')
+    args = parser.parse_args(argv)
+
+    if bool(args.grid) == bool(args.dist):
+        parser.error("usar --grid (grilla) o --dist (Monte Carlo)")
+    try:
+        perfil = PerfilCluster.desde_entorno()
+        specs = dict(_parse_asignacion(texto) for texto in (args.grid or args.dist))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    precios = resolver_precios_mix(perfil.mix(), perfil.region, interactive=False, verbose=False)
+    try:
+        if args.grid:
+            resultado = barrido_grilla(perfil, precios, specs)
+        else:
+            resultado = monte_carlo(perfil, precios, specs, n=args.samples, seed=args.seed)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    imprimir_barrido(resultado, nivel=args.nivel, bins=args.bins)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Escaneo de flota: analiza muchos clusters EKS en varias regiones.
+
+Los clusters se descubren con eks:ListClusters en cada región (o se leen de
+un archivo) y se analizan con un pool acotado de threads o procesos, con un
+límite de clusters concurrentes por región. Todas las llamadas a AWS pasan
+por el limitador de tasa por servicio de aws_utils.
+
+Los costos de Cost Explorer se piden para toda la flota antes del análisis con
+dos consultas agrupadas (tag aws:eks:cluster-name y Control Plane por región)
+en lugar de una por cluster; los clusters sin datos consultan individualmente.
+Con --account-costs se atribuye todo el costo etiquetado de la cuenta en una
+pasada (sin listar clusters ni analizarlos).
+
+Uso:
+    python3 flota_eks.py --regions us-east-1 eu-west-1 --workers 8 --per-region 2
+    python3 flota_eks.py --file clusters.txt --output flota.json
+    python3 flota_eks.py --account-costs
+
+Formato de --file: una línea por cluster, `cluster,region` (o separado por
+espacios); las líneas vacías y las que empiezan con # se ignoran.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from aws_utils import rate_limiter, parse_rates, call_metrics
+from logger_utils import setup_logger, log_aws_api_call, finalizar_instrumentacion
+from recolector_eks_aws import create_client, recolectar_cluster, get_fleet_costs, atribuir_costos
+from calculadora_eks import PerfilCluster, evaluar_cluster
+
+logger = setup_logger('flota_eks', 'eks_fleet.log')
+
+def discover_clusters(regions):
+    """
+    Lista los clusters EKS de cada región con eks:ListClusters (paginado)
+
+    Returns:
+        list: [(cluster_name, region), ...]
+    """
+    clusters = []
+    for region in regions:
+        eks = create_client('eks', region)
+        log_aws_api_call(logger, 'EKS', 'list_clusters', {'region': region})
+        found = 0
+        for page in eks.get_paginator('list_clusters').paginate():
+            for name in page.get('clusters', []):
+                clusters.append((name, region))
+                found += 1
+        logger.info("Región %s: %d clusters", region, found)
+    return clusters
+
+def load_clusters_file(path):
+    """Lee `cluster,region` (o `cluster region`) por línea"""
+    clusters = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.replace(',', ' ').split()
+            if len(parts) != 2:
+                raise ValueError(f"{path}:{line_number}: se esperaba 'cluster,region'")
+            clusters.append((parts[0], parts[1]))
+    return clusters
+
+def analizar_cluster(cluster_name, region, cost_data=None):
+    """
+    Analiza un cluster sin interacción (recolector + calculadora en proceso)
+
+    Args:
+        cost_data: Costos ya obtenidos para la flota (get_fleet_costs)
+
+    Returns:
+        dict: Resultado serializable (también con status='error' si falla)
+    """
+    start = time.perf_counter()
+    result = {'cluster': cluster_name, 'region': region}
+    try:
+        datos = recolectar_cluster(cluster_name, region, interactive=False, cost_data=cost_data)
+        resultado = evaluar_cluster(PerfilCluster.desde_recoleccion(datos))
+        result.update({
+            'status': 'ok',
+            'node_count': datos.node_count,
+            'primary_instance': datos.primary_instance,
+            'instance_mix': datos.instance_mix,
+            'cpu_util': datos.cpu_util,
+            'mem_util': datos.mem_util,
+            'metric_source': datos.metric_source,
+            'cost_source': datos.cost_data.get('data_source'),
+            'current_monthly_cost': round(resultado.current_monthly_cost, 2),
+            'auto_monthly_cost': round(resultado.auto_monthly_cost, 2),
+            'estimated_nodes_auto': resultado.estimated_nodes_auto,
+            'ahorro_infra': round(resultado.ahorro_infra, 2),
+            'ahorro_ops': round(resultado.ahorro_ops, 2),
+            'total_savings': round(resultado.total_savings, 2),
+        })
+    except Exception as e:
+        logger.error(f"Error analizando {cluster_name} ({region}): {e}")
+        result.update({'status': 'error', 'error': str(e)})
+    result['duration_s'] = round(time.perf_counter() - start, 2)
+    return result
+
+def _init_worker(rate_share):
+    """Inicializa un proceso del pool con su parte de la cuota de cada servicio"""
+    rate_limiter.escalar(rate_share)
+
+def _positivo(value):
+    """Tipo de argparse: entero >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"debe ser >= 1 (recibido {value})")
+    return number
+
+def run_fleet(clusters, max_workers=8, per_region=2, use_processes=False,
+              analyzer=analizar_cluster, on_result=None, costs=None):
+    """
+    Analiza la flota con un pool acotado
+
+    Args:
+        clusters: Lista de (cluster_name, region)
+        max_workers: Clusters analizados en paralelo en total
+        per_region: Máximo de clusters concurrentes por región
+        use_processes: ProcessPoolExecutor en lugar de threads (la cuota de
+                       cada servicio se reparte entre los procesos)
+        analyzer: Función (cluster_name, region) -> dict
+        on_result: Callback opcional por cada resultado completado
+        costs: {(cluster_name, region): cost_data} precargados; se pasan al
+               analyzer como cost_data
+
+    Returns:
+        list: Resultados en el mismo orden que `clusters`
+    """
+    # Sin al menos un lugar global y por región no se planifica nada y wait() no bloquea
+    if max_workers < 1 or per_region < 1:
+        raise ValueError(f"max_workers y per_region deben ser >= 1 (recibidos {max_workers} y {per_region})")
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                       initargs=(1.0 / max_workers,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    pending = list(enumerate(clusters))
+    in_flight = defaultdict(int)
+    running = {}
+    results = [None] * len(clusters)
+
+    # La planificación por región se hace en este proceso, así funciona igual con threads o procesos
+    with executor:
+        while pending or running:
+            for item in list(pending):
+                if len(running) >= max_workers:
+                    break
+                idx, (cluster_name, region) = item
+                if in_flight[region] >= per_region:
+                    continue
+                pending.remove(item)
+                in_flight[region] += 1
+                kwargs = {'cost_data': costs[(cluster_name, region)]} if costs and (cluster_name, region) in costs else {}
+                running[executor.submit(analyzer, cluster_name, region, **kwargs)] = (idx, region)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, region = running.pop(future)
+                in_flight[region] -= 1
+                results[idx] = future.result()
+                if on_result:
+                    on_result(results[idx])
+
+    return results
+
+def aggregate(results):
+    """Totales de la flota y desglose por región"""
+    summary = {
+        'clusters': len(results),
+        'ok': 0,
+        'errors': 0,
+        'node_count': 0,
+        'current_monthly_cost': 0.0,
+        'auto_monthly_cost': 0.0,
+        'ahorro_infra': 0.0,
+        'total_savings': 0.0,
+        'by_region': {},
+    }
+    for result in results:
+        region = summary['by_region'].setdefault(result['region'], {
+            'clusters': 0, 'current_monthly_cost': 0.0, 'auto_monthly_cost': 0.0, 'total_savings': 0.0
+        })
+        region['clusters'] += 1
+        if result.get('status') != 'ok':
+            summary['errors'] += 1
+            continue
+        summary['ok'] += 1
+        summary['node_count'] += result['node_count']
+        for key in ('current_monthly_cost', 'auto_monthly_cost', 'total_savings'):
+            summary[key] += result[key]
+            region[key] += result[key]
+        summary['ahorro_infra'] += result['ahorro_infra']
+    return summary
+
+def print_fleet_report(results, summary):
+    print(f"\n{'='*96}")
+    print(f"🌐 ANÁLISIS DE FLOTA EKS ({summary['ok']}/{summary['clusters']} clusters analizados)")
+    print(f"{'='*96}")
+    print(f"  {'Cluster':<32} {'Región':<15} {'Nodos':>6} {'Actual/mes':>13} {'Auto Mode/mes':>14} {'Ahorro/mes':>12}")
+    print(f"  {'-'*94}")
+    for r in results:
+        if r.get('status') == 'ok':
+            print(f"  {r['cluster'][:32]:<32} {r['region']:<15} {r['node_count']:>6} "
+                  f"${r['current_monthly_cost']:>12,.2f} ${r['auto_monthly_cost']:>13,.2f} ${r['total_savings']:>11,.2f}")
+        else:
+            print(f"  {r['cluster'][:32]:<32} {r['region']:<15} ❌ {r.get('error', 'error')[:50]}")
+    print(f"  {'-'*94}")
+    print(f"  {'TOTAL':<32} {'':<15} {summary['node_count']:>6} ${summary['current_monthly_cost']:>12,.2f} "
+          f"${summary['auto_monthly_cost']:>13,.2f} ${summary['total_savings']:>11,.2f}")
+    print()
+    print(f"  Por región:")
+    for region, data in sorted(summary['by_region'].items()):
+        print(f"    {region:<15} {data['clusters']:>3} clusters   ahorro: ${data['total_savings']:>11,.2f}/mes")
+    if summary['errors']:
+        print(f"\n  ⚠️  {summary['errors']} clusters con error (ver logs/eks_fleet.log)")
+    print(f"\n  💰 AHORRO TOTAL DE LA FLOTA: ${summary['total_savings']:,.2f}/mes (${summary['total_savings']*12:,.2f}/año)")
+    print(f"{'='*96}")
+
+def print_cost_attribution(atribucion):
+    """Tabla de costos del Data Plane por cluster (atribuir_costos)"""
+    rows = atribucion.tabla()
+    print(f"\n{'='*96}")
+    print(f"💰 ATRIBUCIÓN DE COSTOS DE LA CUENTA ({len(rows)} clusters, últimos {atribucion.days} días, "
+          f"{atribucion.requests} requests)")
+    print(f"{'='*96}")
+    print(f"  {'Cluster':<32} {'Costo/mes':>13} {'On-Demand eq.':>14} {'Ahorro':>8} {'Spot/mes':>12} {'SP+RI/mes':>12}")
+    print(f"  {'-'*94}")
+    for row in rows:
+        print(f"  {row['cluster'][:32]:<32} ${row['monthly_cost']:>12,.2f} ${row['monthly_ondemand']:>13,.2f} "
+              f"{row['savings_percentage']:>7.1f}% ${row['spot']:>11,.2f} ${row['savings_plans'] + row['reserved']:>11,.2f}")
+    print(f"  {'-'*94}")
+    print(f"  {'TOTAL DATA PLANE':<32} ${sum(row['monthly_cost'] for row in rows):>12,.2f}")
+    control_plane = sum(atribucion.control_plane.values()) / atribucion.days * 30
+    print(f"  {'CONTROL PLANE (todas las regiones)':<32} ${control_plane:>12,.2f}")
+    print(f"{'='*96}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis de migración a EKS Auto Mode para una flota de clusters")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--regions', nargs='+', help='Descubrir clusters con eks:ListClusters en estas regiones')
+    source.add_argument('--file', help='Archivo con `cluster,region` por línea')
+    source.add_argument('--account-costs', action='store_true',
+                        help='Solo atribuir el costo etiquetado de la cuenta por cluster (una pasada por Cost Explorer)')
+    parser.add_argument('--workers', type=_positivo, default=8, help='Clusters analizados en paralelo (default: 8)')
+    parser.add_argument('--per-region', type=_positivo, default=2, help='Máximo de clusters concurrentes por región (default: 2)')
+    parser.add_argument('--processes', action='store_true', help='Usar procesos en lugar de threads')
+    parser.add_argument('--rate', action='append', default=[],
+                        help='Límite por servicio, ej: --rate ce=5 --rate cloudwatch=40')
+    parser.add_argument('--no-fleet-costs', action='store_true',
+                        help='Consultar Cost Explorer por cluster en lugar de una consulta agrupada para la flota')
+    parser.add_argument('--output', help='Guardar resultados por cluster y totales en JSON')
+    parser.add_argument('--profile', action='store_true',
+                        help='Mostrar al final el resumen de tiempos por etapa y llamada a AWS (también EKS_PROFILE=1)')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar el progreso detallado de cada cluster')
+    args = parser.parse_args(argv)
+
+    for service, rate in parse_rates(','.join(args.rate)).items():
+        rate_limiter.set_rate(service, rate)
+
+    if args.account_costs:
+        atribucion = atribuir_costos()
+        print_cost_attribution(atribucion)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'clusters': atribucion.tabla(), 'control_plane': atribucion.control_plane},
+                          f, indent=2, ensure_ascii=False)
+            print(f"📄 Resultados guardados en {args.output}")
+        return 0
+
+    logger.info("=== INICIANDO ANÁLISIS DE FLOTA ===")
+    clusters = load_clusters_file(args.file) if args.file else discover_clusters(args.regions)
+    print(f"🔍 {len(clusters)} clusters a analizar ({args.workers} workers, {args.per_region} por región)")
+    if not clusters:
+        return 0
+
+    def progress(result):
+        icon = '✅' if result.get('status') == 'ok' else '❌'
+        print(f"  {icon} {result['cluster']} ({result['region']}) en {result['duration_s']}s", flush=True)
+
+    start = time.perf_counter()
+    costs = None
+    if not args.no_fleet_costs:
+        # Con --regions la flota es toda la cuenta: se trae todo lo etiquetado en lugar de listar nombres
+        costs = get_fleet_costs(clusters, account_wide=bool(args.regions))
+        print(f"💰 Costos de Cost Explorer precargados para {len(costs)}/{len(clusters)} clusters")
+    # El detalle de cada cluster va a stderr; en paralelo se vuelve ilegible, así que se silencia
+    with contextlib.ExitStack() as quiet:
+        if not args.verbose:
+            quiet.enter_context(contextlib.redirect_stderr(quiet.enter_context(open(os.devnull, 'w'))))
+        results = run_fleet(clusters, max_workers=args.workers, per_region=args.per_region,
+                            use_processes=args.processes, on_result=progress, costs=costs)
+    elapsed = time.perf_counter() - start
+
+    summary = aggregate(results)
+    print_fleet_report(results, summary)
+    print(f"⏱️  {len(clusters)} clusters en {elapsed:.1f}s")
+    # Con --processes cada proceso lleva sus propias métricas: acá solo quedan las del proceso principal
+    aws_calls = call_metrics.totals()
+    print(f"🔁 AWS: {aws_calls['calls']} llamadas, {aws_calls['throttles']} throttles, "
+          f"{aws_calls['retries']} reintentos ({aws_calls['backoff_s']:.1f}s de backoff)")
+    logger.info(f"Flota analizada: {summary['ok']} ok, {summary['errors']} errores en {elapsed:.1f}s")
+    logger.info("Llamadas a AWS: %s", call_metrics.snapshot())
+    finalizar_instrumentacion(args.profile or None, file=sys.stdout)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'clusters': results, 'aws_calls': call_metrics.snapshot()},
+                      f, indent=2, ensure_ascii=False)
+        print(f"📄 Resultados guardados en {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Índice local de precios construido a partir de los offer files públicos de AWS.
+
+En lugar de consultar get_products (MaxResults=1) por cada tipo de instancia,
+se procesan en streaming los offer files de AmazonEC2 y AmazonEKS (CSV o JSON,
+opcionalmente .gz o por URL) y se guarda un índice columnar compacto con clave
+(región, tipo de instancia, sistema operativo, tenancy). Las filas del fee de
+EKS Auto Mode se guardan en el mismo índice con operación 'EKSAutoUsage'.
+
+Uso:
+    python3 indice_precios.py ingest --ec2 index_ec2.csv --eks index_eks.json \\
+        --regions us-east-1 eu-west-1 -o cache/price_index.bin
+    python3 indice_precios.py lookup m5.large --region us-east-1
+
+    export EKS_PRICE_INDEX=cache/price_index.bin   # la calculadora lo usa como backend
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from urllib.request import urlopen
+
+# URLs públicas de los offer files (no requieren credenciales)
+OFFER_URL = 'https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/{service}/current/{region}index.{fmt}'
+
+OPERATION_EC2 = 'RunInstances'
+OPERATION_AUTOMODE = 'EKSAutoUsage'
+
+_MAGIC = b'EKSIDX1\n'
+_CHUNK_SIZE = 1024 * 1024
+
+def offer_url(service, region=None, fmt='csv'):
+    """URL del offer file de un servicio (opcionalmente el archivo regional, mucho más chico)"""
+    return OFFER_URL.format(service=service, region=f"{region}/" if region else '', fmt=fmt)
+
+def _location_to_region(location):
+    from calculadora_eks import REGION_NAME_MAP
+    return {name: code for code, name in REGION_NAME_MAP.items()}.get(location)
+
+def _parse_memory_gib(value):
+    """'8 GiB' -> 8.0, '0.5 GiB' -> 0.5; None si no se puede interpretar"""
+    try:
+        return float(str(value).replace(',', '').split()[0])
+    except (ValueError, IndexError):
+        return None
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+# ============================================
+# ÍNDICE COLUMNAR
+# ============================================
+
+class IndicePrecios:
+    """
+    Índice columnar de precios por hora
+
+    Las columnas de texto se codifican contra tablas de strings (array 'H') y
+    las numéricas se guardan en arrays de float ('d' precio, 'f' vCPU y GiB),
+    de modo que cientos de miles de filas ocupan pocos MB.
+    """
+
+    TEXT_COLUMNS = ('region', 'instance_type', 'os', 'tenancy', 'operation')
+
+    def __init__(self):
+        self.strings = {col: [] for col in self.TEXT_COLUMNS}
+        self._codes = {col: {} for col in self.TEXT_COLUMNS}
+        self.columns = {col: array('H') for col in self.TEXT_COLUMNS}
+        self.price = array('d')
+        self.vcpu = array('f')
+        self.memory_gib = array('f')
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.price)
+
+    def _encode(self, col, value):
+        codes = self._codes[col]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.strings[col])
+            self.strings[col].append(value)
+        return code
+
+    def add(self, region, instance_type, os_name, tenancy, operation, price, vcpu=None, memory_gib=None):
+        """Agrega una fila; si la clave ya existe se conserva la primera"""
+        key = (region, instance_type, os_name, tenancy, operation)
+        lookup = self._get_lookup()
+        if key in lookup:
+            return
+        lookup[key] = len(self.price)
+        for col, value in zip(self.TEXT_COLUMNS, key):
+            self.columns[col].append(self._encode(col, value))
+        self.price.append(price)
+        self.vcpu.append(vcpu if vcpu is not None else float('nan'))
+        self.memory_gib.append(memory_gib if memory_gib is not None else float('nan'))
+
+    def _get_lookup(self):
+        if self._lookup is None:
+            rows = zip(*(self.columns[col] for col in self.TEXT_COLUMNS))
+            self._lookup = {
+                tuple(self.strings[col][code] for col, code in zip(self.TEXT_COLUMNS, codes)): idx
+                for idx, codes in enumerate(rows)
+            }
+        return self._lookup
+
+    def get(self, region, instance_type, os_name='Linux', tenancy='Shared', operation=OPERATION_EC2):
+        """Precio por hora de la fila, o None si no existe"""
+        idx = self._get_lookup().get((region, instance_type, os_name, tenancy, operation))
+        return self.price[idx] if idx is not None else None
+
+    def precio_ec2(self, instance_type, region, os_name='Linux', tenancy='Shared'):
+        return self.get(region, instance_type, os_name, tenancy, OPERATION_EC2)
+
+    def precio_automode_fee(self, instance_type, region):
+        return self.get(region, instance_type, 'NA', 'NA', OPERATION_AUTOMODE)
+
+    def specs(self, instance_type, region):
+        """(vCPU, GiB) del tipo de instancia, o None si no está en el índice"""
+        idx = self._get_lookup().get((region, instance_type, 'Linux', 'Shared', OPERATION_EC2))
+        if idx is None or self.vcpu[idx] != self.vcpu[idx]:
+            return None
+        return float(self.vcpu[idx]), float(self.memory_gib[idx])
+
+    def instance_types(self, region, operation=OPERATION_EC2):
+        """Tipos de instancia con precio en la región"""
+        return sorted({key[1] for key in self._get_lookup() if key[0] == region and key[4] == operation})
+
+    def save(self, path):
+        """Guarda el índice en formato binario: header JSON + arrays crudos"""
+        header = json.dumps({
+            'rows': len(self),
+            'strings': self.strings,
+            'typecodes': {name: arr.typecode for name, arr in self._arrays()},
+        }).encode('utf-8')
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for _, arr in self._arrays():
+                arr.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} no es un índice de precios válido")
+            (header_len,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            rows = header['rows']
+            index.strings = header['strings']
+            index._codes = {col: {v: i for i, v in enumerate(values)} for col, values in index.strings.items()}
+            for name, arr in index._arrays():
+                arr.fromfile(f, rows)
+        return index
+
+    def _arrays(self):
+        for col in self.TEXT_COLUMNS:
+            yield col, self.columns[col]
+        yield 'price', self.price
+        yield 'vcpu', self.vcpu
+        yield 'memory_gib', self.memory_gib
+
+# ============================================
+# LECTURA EN STREAMING DE OFFER FILES
+# ============================================
+
+def open_offer(source):
+    """Abre un offer file local, .gz o URL como stream de texto"""
+    if source.startswith(('http://', 'https://')):
+        raw = urlopen(source)
+    else:
+        raw = open(source, 'rb')
+    if source.endswith('.gz'):
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+def _keep_row(attrs, regions):
+    """Normaliza atributos de producto a una fila del índice, o None si se descarta"""
+    instance_type = attrs.get('instanceType')
+    operation = attrs.get('operation', '')
+    if not instance_type:
+        return None
+
+    region = attrs.get('regionCode') or _location_to_region(attrs.get('location', ''))
+    if not region or (regions and region not in regions):
+        return None
+
+    if operation == OPERATION_AUTOMODE:
+        return (region, instance_type, 'NA', 'NA', OPERATION_AUTOMODE, None, None)
+
+    # EC2: solo capacidad usada y sin software preinstalado (mismo criterio que get_products)
+    if attrs.get('capacitystatus', 'Used') != 'Used' or attrs.get('preInstalledSw', 'NA') != 'NA':
+        return None
+    if not operation.startswith(OPERATION_EC2):
+        return None
+    return (region, instance_type, attrs.get('operatingSystem', ''), attrs.get('tenancy', ''),
+            OPERATION_EC2, _parse_float(attrs.get('vcpu')), _parse_memory_gib(attrs.get('memory')))
+
+# Columnas del CSV -> nombres de atributo del JSON
+_CSV_COLUMNS = {
+    'Instance Type': 'instanceType',
+    'Location': 'location',
+    'Region Code': 'regionCode',
+    'Operating System': 'operatingSystem',
+    'Tenancy': 'tenancy',
+    'CapacityStatus': 'capacitystatus',
+    'Pre Installed S/W': 'preInstalledSw',
+    'operation': 'operation',
+    'vCPU': 'vcpu',
+    'Memory': 'memory',
+}
+
+def iter_offer_csv(stream, regions=None):
+    """
+    Recorre un offer file CSV fila por fila (sin cargarlo en memoria)
+
+    Yields:
+        tuple: (region, instance_type, os, tenancy, operation, price, vcpu, memory_gib)
+    """
+    reader = csv.reader(stream)
+    header = None
+    for row in reader:
+        if row and row[0] == 'SKU':
+            header = {name: idx for idx, name in enumerate(row)}
+            break
+    if header is None:
+        raise ValueError("No se encontró la fila de encabezado (SKU,...) en el CSV")
+
+    columns = {attr: header[col] for col, attr in _CSV_COLUMNS.items() if col in header}
+    term_idx, unit_idx = header['TermType'], header['Unit']
+    price_idx, currency_idx = header['PricePerUnit'], header['Currency']
+
+    for row in reader:
+        if len(row) < len(header) or row[term_idx] != 'OnDemand' or row[currency_idx] != 'USD':
+            continue
+        if row[unit_idx] not in ('Hrs', 'Hours'):
+            continue
+        kept = _keep_row({attr: row[idx] for attr, idx in columns.items()}, regions)
+        price = _parse_float(row[price_idx])
+        if kept and price is not None:
+            yield kept[:5] + (price,) + kept[5:]
+
+class _JsonStream:
+    """Lector JSON incremental: decodifica un valor a la vez sobre un buffer acotado"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.pos > _CHUNK_SIZE:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.stream.read(_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                raise ValueError("Fin inesperado del offer file JSON")
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Se esperaba '{char}' en la posición {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Un número al final del buffer podría estar truncado
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def items(self):
+        """Itera los pares (clave, stream) de un objeto; el llamador consume cada valor"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def skip(self):
+        """Descarta un valor; los objetos se recorren por claves para no decodificarlos enteros"""
+        if self.peek() == '{':
+            for _ in self.items():
+                self.skip()
+        else:
+            self.value()
+
+def _on_demand_price(terms):
+    for term in terms.values():
+        for dimension in term.get('priceDimensions', {}).values():
+            if dimension.get('unit') in ('Hrs', 'Hours'):
+                return _parse_float(dimension.get('pricePerUnit', {}).get('USD'))
+    return None
+
+def iter_offer_json(stream, regions=None):
+    """
+    Recorre un offer file JSON de forma incremental: cada producto y cada término
+    se decodifican por separado, sin materializar el documento completo
+
+    Yields:
+        tuple: (region, instance_type, os, tenancy, operation, price, vcpu, memory_gib)
+    """
+    parser = _JsonStream(stream)
+    products = {}
+    pending_prices = {}
+    products_done = False
+
+    for key in parser.items():
+        if key == 'products':
+            for sku in parser.items():
+                product = parser.value()
+                kept = _keep_row(product.get('attributes', {}), regions)
+                if kept:
+                    products[sku] = kept
+            products_done = True
+        elif key == 'terms':
+            for term_type in parser.items():
+                if term_type != 'OnDemand':
+                    parser.skip()
+                    continue
+                for sku in parser.items():
+                    terms = parser.value()
+                    if products_done and sku not in products:
+                        continue
+                    price = _on_demand_price(terms)
+                    if price is not None:
+                        pending_prices[sku] = price
+        else:
+            parser.skip()
+
+    for sku, price in pending_prices.items():
+        kept = products.get(sku)
+        if kept:
+            yield kept[:5] + (price,) + kept[5:]
+
+def ingest(sources, index=None, regions=None):
+    """
+    Construye (o amplía) un IndicePrecios a partir de offer files
+
+    Args:
+        sources: Lista de rutas/URLs (.csv, .json, opcionalmente .gz)
+        regions: Conjunto de regiones a conservar (default: todas)
+    """
+    index = index if index is not None else IndicePrecios()
+    regions = set(regions) if regions else None
+    for source in sources:
+        name = source[:-3] if source.endswith('.gz') else source
+        with open_offer(source) as stream:
+            rows = iter_offer_json(stream, regions) if name.endswith('.json') else iter_offer_csv(stream, regions)
+            for row in rows:
+                index.add(*row)
+    return index
+
+_default_index = None
+_default_index_loaded = False
+_default_index_lock = threading.Lock()
+
+def get_default_index():
+    """Índice configurado en EKS_PRICE_INDEX (cargado una vez por proceso), o None"""
+    global _default_index, _default_index_loaded
+    with _default_index_lock:
+        if not _default_index_loaded:
+            path = os.environ.get('EKS_PRICE_INDEX')
+            if path and os.path.exists(path):
+                _default_index = IndicePrecios.load(path)
+            _default_index_loaded = True
+        return _default_index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice local de precios desde offer files de AWS")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ing = subparsers.add_parser('ingest', help='Procesa offer files y guarda el índice')
+    ing.add_argument('--ec2', nargs='*', default=[], help='Offer files de AmazonEC2 (ruta o URL)')
+    ing.add_argument('--eks', nargs='*', default=[], help='Offer files de AmazonEKS (ruta o URL)')
+    ing.add_argument('--regions', nargs='*', help='Regiones a conservar')
+    ing.add_argument('--download', action='store_true',
+                     help='Usa los offer files regionales públicos de las regiones indicadas')
+    ing.add_argument('-o', '--output', default=os.path.join('cache', 'price_index.bin'))
+
+    look = subparsers.add_parser('lookup', help='Consulta un tipo de instancia en el índice')
+    look.add_argument('instance_type')
+    look.add_argument('--region', default='us-east-1')
+    look.add_argument('-i', '--index', default=os.environ.get('EKS_PRICE_INDEX',
+                                                              os.path.join('cache', 'price_index.bin')))
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        sources = list(args.ec2) + list(args.eks)
+        if args.download:
+            for region in args.regions or ['us-east-1']:
+                sources.append(offer_url('AmazonEC2', region))
+                sources.append(offer_url('AmazonEKS', region))
+        if not sources:
+            parser.error("Indica al menos un offer file (--ec2/--eks) o --download")
+        print(f"⏳ Procesando {len(sources)} offer files...")
+        index = ingest(sources, regions=args.regions)
+        index.save(args.output)
+        print(f"✅ Índice guardado en {args.output}: {len(index)} filas")
+    elif args.command == 'lookup':
+        index = IndicePrecios.load(args.index)
+        ec2 = index.precio_ec2(args.instance_type, args.region)
+        fee = index.precio_automode_fee(args.instance_type, args.region)
+        specs = index.specs(args.instance_type, args.region)
+        print(f"{args.instance_type} en {args.region}:")
+        print(f"  EC2 On-Demand:  {f'${ec2:.4f}/h' if ec2 is not None else 'N/D'}")
+        print(f"  Auto Mode fee:  {f'${fee:.4f}/h' if fee is not None else 'N/D'}")
+        if specs:
+            print(f"  Capacidad:      {specs[0]:g} vCPU, {specs[1]:g} GiB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
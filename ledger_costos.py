@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Ledger local de costos diarios de Cost Explorer (SQLite).
+
+Cost Explorer cobra $0.01 por request y es lento, pero los costos de un día
+dejan de cambiar una vez que AWS los finaliza. El ledger guarda las filas
+diarias de cada consulta (clave, día, servicio, tipo de compra) y registra
+qué días ya están finalizados (`Estimated: false` en la respuesta):
+
+- En cada ejecución solo se piden los días que faltan o que seguían
+  estimados, en un único rango contiguo y siguiendo NextPageToken.
+- Las ventanas de 30/60/90 días se arman con sumas locales; si el ledger ya
+  las cubre con días finalizados no se hace ninguna llamada.
+
+Claves de consulta usadas por el recolector:
+    cluster:<región>:<cluster>   (tag aws:eks:cluster-name o servicio EKS en la región,
+                                  por SERVICE y PURCHASE_TYPE; el Control Plane son las
+                                  filas del servicio EKS)
+    control_plane:<región>       (solo servicio EKS en la región, get_control_plane_cost)
+    flota:<todos|hash>           (atribuir_costos: por tag aws:eks:cluster-name y PURCHASE_TYPE;
+                                  el hash identifica el conjunto de clusters pedido)
+    control_plane_flota:<regiones|todas>
+                                 (atribuir_costos: servicio EKS agrupado por REGION)
+
+El ledger no distingue cuentas de AWS: usar un EKS_COST_LEDGER_PATH por cuenta.
+
+Uso:
+    python3 ledger_costos.py ventanas --cluster mi-cluster --region us-east-1
+    python3 ledger_costos.py stats
+    python3 ledger_costos.py clear
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from cache_precios import CACHE_DIR
+
+LEDGER_FILE = 'cost_ledger.sqlite'
+VENTANAS_DEFAULT = (30, 60, 90)
+
+# Servicio del Control Plane en Cost Explorer
+EKS_SERVICE = 'Amazon Elastic Kubernetes Service'
+
+def _dia(value):
+    return value if isinstance(value, str) else value.strftime('%Y-%m-%d')
+
+def _rango_dias(start, end):
+    """Días 'YYYY-MM-DD' de [start, end) (End exclusivo, como Cost Explorer)"""
+    start = date.fromisoformat(_dia(start))
+    end = date.fromisoformat(_dia(end))
+    return [_dia(start + timedelta(days=i)) for i in range((end - start).days)]
+
+def clave_cluster(cluster_name, region):
+    return f"cluster:{region}:{cluster_name}"
+
+def clave_control_plane(region):
+    return f"control_plane:{region}"
+
+def clave_flota(cluster_names=None):
+    """Cada conjunto de clusters filtra distinto en Cost Explorer, así que tiene su propia clave"""
+    if cluster_names is None:
+        return "flota:todos"
+    digest = hashlib.sha1('\n'.join(sorted(cluster_names)).encode()).hexdigest()[:12]
+    return f"flota:{digest}"
+
+def clave_control_plane_flota(regions=None):
+    return f"control_plane_flota:{','.join(sorted(regions)) if regions else 'todas'}"
+
+class CostLedger:
+    """
+    Filas diarias de Cost Explorer por (clave de consulta, día, servicio, tipo de compra)
+
+    La tabla `dias` registra cada día consultado (aunque no tenga costos) y si
+    ya estaba finalizado; solo los días finalizados se consideran cubiertos.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get('EKS_COST_LEDGER_PATH') or os.path.join(CACHE_DIR, LEDGER_FILE)
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS costos (
+                clave TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                servicio TEXT NOT NULL,
+                tipo_compra TEXT NOT NULL,
+                amortized REAL NOT NULL,
+                usage REAL NOT NULL,
+                PRIMARY KEY (clave, dia, servicio, tipo_compra)
+            );
+            CREATE TABLE IF NOT EXISTS dias (
+                clave TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                final INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (clave, dia)
+            );
+        """)
+        self._conn.commit()
+
+    def dias_pendientes(self, clave, start, end):
+        """Días de [start, end) sin datos o todavía estimados"""
+        dias = _rango_dias(start, end)
+        if not dias:
+            return []
+        with self._lock:
+            finales = {row[0] for row in self._conn.execute(
+                'SELECT dia FROM dias WHERE clave=? AND final=1 AND dia >= ? AND dia < ?',
+                (clave, dias[0], _dia(end))
+            )}
+        return [dia for dia in dias if dia not in finales]
+
+    def guardar(self, clave, start, end, results):
+        """
+        Reemplaza los días [start, end) con los ResultsByTime de Cost Explorer
+        (todas las páginas), en una sola transacción
+
+        Los grupos se guardan por (servicio, tipo de compra); sin GroupBy se
+        guarda el Total con servicio y tipo de compra vacíos.
+        """
+        dias = _rango_dias(start, end)
+        filas = {}
+        estimados = set()
+        for result in results:
+            dia = result['TimePeriod']['Start']
+            if result.get('Estimated'):
+                estimados.add(dia)
+            grupos = result.get('Groups')
+            if grupos is None and result.get('Total'):
+                grupos = [{'Keys': [], 'Metrics': result['Total']}]
+            for group in grupos or []:
+                keys = list(group.get('Keys', []))
+                servicio = keys[0] if keys else ''
+                tipo_compra = keys[1] if len(keys) > 1 else ''
+                metrics = group.get('Metrics', {})
+                amortized = float(metrics.get('AmortizedCost', {}).get('Amount', 0))
+                usage = float(metrics.get('UsageQuantity', {}).get('Amount', 0))
+                # Una misma fecha puede venir repartida en varias páginas
+                total = filas.get((dia, servicio, tipo_compra), (0.0, 0.0))
+                filas[(dia, servicio, tipo_compra)] = (total[0] + amortized, total[1] + usage)
+
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM costos WHERE clave=? AND dia >= ? AND dia < ?',
+                                   (clave, dias[0], _dia(end)))
+                self._conn.executemany(
+                    'INSERT INTO costos (clave, dia, servicio, tipo_compra, amortized, usage) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(clave, dia, servicio, tipo_compra, amortized, usage)
+                     for (dia, servicio, tipo_compra), (amortized, usage) in filas.items()]
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO dias (clave, dia, final, fetched_at) VALUES (?, ?, ?, ?)',
+                    [(clave, dia, int(dia not in estimados), now) for dia in dias]
+                )
+
+    def totales(self, clave, start, end):
+        """{(servicio, tipo_compra): (amortized, usage)} sumados sobre [start, end)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT servicio, tipo_compra, SUM(amortized), SUM(usage) FROM costos '
+                'WHERE clave=? AND dia >= ? AND dia < ? GROUP BY servicio, tipo_compra',
+                (clave, _dia(start), _dia(end))
+            ).fetchall()
+        return {(servicio, tipo_compra): (amortized, usage) for servicio, tipo_compra, amortized, usage in rows}
+
+    def total(self, clave, start, end):
+        """Costo amortizado total de [start, end)"""
+        return sum(amortized for amortized, _ in self.totales(clave, start, end).values())
+
+    def cubre(self, clave, start, end):
+        """True si todos los días de [start, end) están finalizados en el ledger"""
+        return not self.dias_pendientes(clave, start, end)
+
+    def ultimo_dia(self, clave):
+        """Último día registrado para la clave (o None)"""
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(dia) FROM dias WHERE clave=?', (clave,)).fetchone()
+        return row[0]
+
+    def stats(self):
+        """Retorna {'claves', 'dias', 'dias_finales', 'filas'}"""
+        with self._lock:
+            claves, dias, finales = self._conn.execute(
+                'SELECT COUNT(DISTINCT clave), COUNT(*), COALESCE(SUM(final), 0) FROM dias'
+            ).fetchone()
+            filas = self._conn.execute('SELECT COUNT(*) FROM costos').fetchone()[0]
+        return {'claves': claves, 'dias': dias, 'dias_finales': finales, 'filas': filas}
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM costos')
+                self._conn.execute('DELETE FROM dias')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def sincronizar(ledger, clave, start, end, fetch_page):
+    """
+    Trae de Cost Explorer solo los días pendientes de [start, end)
+
+    Los días pendientes se piden en un único rango contiguo (del primero al
+    último pendiente) siguiendo NextPageToken hasta la última página.
+
+    Args:
+        fetch_page: Callable (start, end, next_page_token) -> respuesta de get_cost_and_usage
+                    (next_page_token es None en la primera página)
+
+    Returns:
+        int: Requests realizados (0 si el ledger ya cubría el período)
+    """
+    pendientes = ledger.dias_pendientes(clave, start, end)
+    if not pendientes:
+        return 0
+
+    desde = pendientes[0]
+    hasta = _dia(date.fromisoformat(pendientes[-1]) + timedelta(days=1))
+    results = []
+    token = None
+    requests_made = 0
+    while True:
+        response = fetch_page(desde, hasta, token)
+        requests_made += 1
+        results.extend(response.get('ResultsByTime', []))
+        token = response.get('NextPageToken')
+        if not token:
+            break
+
+    ledger.guardar(clave, desde, hasta, results)
+    return requests_made
+
+_default_ledger = None
+_default_ledger_pid = None
+_default_ledger_lock = threading.Lock()
+
+def get_default_ledger():
+    """
+    Ledger compartido del proceso. Con EKS_COST_LEDGER=0 se usa un ledger en
+    memoria por llamada (sin persistencia entre ejecuciones).
+
+    Tras un fork (flota_eks --processes) se abre una conexión nueva: las
+    conexiones SQLite no se pueden compartir entre procesos.
+    """
+    global _default_ledger, _default_ledger_pid
+    if os.environ.get('EKS_COST_LEDGER', '1').lower() in ('0', 'false', 'no'):
+        return CostLedger(':memory:')
+    with _default_ledger_lock:
+        if _default_ledger is None or _default_ledger_pid != os.getpid():
+            _default_ledger = CostLedger()
+            _default_ledger_pid = os.getpid()
+        return _default_ledger
+
+def ventanas_locales(ledger, cluster_name, region, ventanas=VENTANAS_DEFAULT, end=None):
+    """
+    Costo mensualizado del cluster (Data Plane + Control Plane) para cada
+    ventana, solo con datos locales
+
+    Args:
+        end: Fin exclusivo de las ventanas (default: último día registrado + 1)
+
+    Returns:
+        dict: {dias: {'monthly_cost', 'data_plane', 'control_plane', 'completa'}}
+    """
+    clave = clave_cluster(cluster_name, region)
+    if end is None:
+        ultimo = ledger.ultimo_dia(clave)
+        if ultimo is None:
+            return {}
+        end = date.fromisoformat(ultimo) + timedelta(days=1)
+    end = date.fromisoformat(_dia(end))
+
+    resultado = {}
+    for dias in ventanas:
+        start = end - timedelta(days=dias)
+        totales = ledger.totales(clave, start, end)
+        costo_control = sum(costo for (servicio, _), (costo, _) in totales.items() if servicio == EKS_SERVICE)
+        costo_data = sum(costo for (servicio, _), (costo, _) in totales.items() if servicio != EKS_SERVICE)
+        resultado[dias] = {
+            'monthly_cost': round((costo_data + costo_control) / dias * 30, 2),
+            'data_plane': round(costo_data / dias * 30, 2),
+            'control_plane': round(costo_control / dias * 30, 2),
+            'completa': ledger.cubre(clave, start, end),
+        }
+    return resultado
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ledger local de costos de Cost Explorer")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ventanas = subparsers.add_parser('ventanas', help='Costo mensual por ventana desde el ledger (sin llamadas)')
+    ventanas.add_argument('--cluster', required=True)
+    ventanas.add_argument('--region', default='us-east-1')
+    ventanas.add_argument('--dias', nargs='+', type=int, default=list(VENTANAS_DEFAULT))
+
+    subparsers.add_parser('stats', help='Muestra el estado del ledger')
+    subparsers.add_parser('clear', help='Vacía el ledger')
+
+    args = parser.parse_args(argv)
+    ledger = CostLedger()
+
+    if args.command == 'ventanas':
+        resultado = ventanas_locales(ledger, args.cluster, args.region, args.dias)
+        if not resultado:
+            print(f"⚠️  Sin datos de {args.cluster} ({args.region}) en {ledger.path}")
+            return 1
+        print(f"📒 Costos de {args.cluster} ({args.region}) desde {ledger.path}")
+        for dias, datos in resultado.items():
+            aviso = "" if datos['completa'] else "  ⚠️  ventana incompleta"
+            print(f"   {dias:>3} días: ${datos['monthly_cost']:>10,.2f}/mes "
+                  f"(Data Plane ${datos['data_plane']:,.2f}, Control Plane ${datos['control_plane']:,.2f}){aviso}")
+    elif args.command == 'stats':
+        stats = ledger.stats()
+        print(f"📒 Ledger: {ledger.path}")
+        print(f"   Consultas: {stats['claves']}, días: {stats['dias']} "
+              f"(finalizados: {stats['dias_finales']}), filas: {stats['filas']}")
+    elif args.command == 'clear':
+        ledger.clear()
+        print("🧹 Ledger vaciado")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
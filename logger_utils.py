@@ -1,12 +1,23 @@
 #!/usr/bin/env python3
+import atexit
+import functools
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 # Directorio de logs configurable mediante variable de entorno
 LOG_DIR = os.environ.get('EKS_CALCULATOR_LOG_DIR', 'logs')
+# Rotación por tamaño de cada archivo de log (EKS_LOG_MAX_BYTES=0 desactiva la rotación)
+LOG_MAX_BYTES = int(os.environ.get('EKS_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('EKS_LOG_BACKUP_COUNT', '5'))
 
 def ensure_log_dir(log_dir=None):
     """Crea el directorio de logs si no existe"""
@@ -14,10 +25,92 @@ def ensure_log_dir(log_dir=None):
     Path(target_dir).mkdir(parents=True, exist_ok=True)
     return target_dir
 
+class _MarcaFlush:
+    """Marca encolada por AsyncFileHandler.flush(): el listener la señala al llegar a ella"""
+
+    def __init__(self):
+        self.procesada = threading.Event()
+
+class _ListenerArchivo(logging.handlers.QueueListener):
+    def handle(self, record):
+        if isinstance(record, _MarcaFlush):
+            record.procesada.set()
+            return
+        super().handle(record)
+
+class AsyncFileHandler(logging.handlers.QueueHandler):
+    """
+    Encola los registros y un QueueListener los escribe en un
+    RotatingFileHandler desde su propio thread: los threads que loguean (por
+    ejemplo un escaneo de flota) no esperan la escritura a disco.
+
+    El listener se detiene (vaciando la cola) al salir del proceso. En un
+    proceso hijo creado por fork el thread del listener no existe y los
+    workers de un pool terminan sin correr atexit: ahí se escribe de forma
+    sincrónica, en modo append y sin rotar (solo el proceso padre rota, así
+    los hijos no pisan los archivos rotados entre sí).
+    """
+
+    # Espera máxima de flush() por el listener (segundos)
+    FLUSH_TIMEOUT = 5
+
+    def __init__(self, log_path, formatter, max_bytes=None, backup_count=None):
+        super().__init__(queue.SimpleQueue())
+        self.log_path = log_path
+        self.formatter_archivo = formatter
+        self.max_bytes = LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.backup_count = LOG_BACKUP_COUNT if backup_count is None else backup_count
+        self._start_listener()
+
+    def _file_handler(self):
+        file_handler = logging.handlers.RotatingFileHandler(
+            self.log_path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8')
+        file_handler.setFormatter(self.formatter_archivo)
+        return file_handler
+
+    def _append_handler(self):
+        file_handler = logging.FileHandler(self.log_path, mode='a', encoding='utf-8')
+        file_handler.setFormatter(self.formatter_archivo)
+        return file_handler
+
+    def _start_listener(self):
+        self.listener = _ListenerArchivo(self.queue, self._file_handler())
+        self.listener.start()
+        self._pid = os.getpid()
+        self._sincronico = None
+        atexit.register(self.close)
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            if self._sincronico is None:
+                self._sincronico = self._append_handler()
+            self._sincronico.handle(record)
+            return
+        super().emit(record)
+
+    def flush(self):
+        """Espera a que el listener escriba todo lo encolado hasta ahora (sin detenerlo)"""
+        if self._pid == os.getpid() and self.listener._thread is not None:
+            marca = _MarcaFlush()
+            self.queue.put_nowait(marca)
+            marca.procesada.wait(self.FLUSH_TIMEOUT)
+
+    def close(self):
+        if self._sincronico is not None:
+            self._sincronico.close()
+        if self._pid == os.getpid() and self.listener._thread is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+        super().close()
+
 def setup_logger(name, log_file=None, level=logging.INFO, log_dir=None):
     """
     Configura un logger con formato consistente
 
+    La escritura a disco es asíncrona (AsyncFileHandler) y los archivos rotan
+    por tamaño (EKS_LOG_MAX_BYTES, EKS_LOG_BACKUP_COUNT).
+
     Args:
         name: Nombre del logger
         log_file: Nombre del archivo de log (sin ruta)
@@ -45,26 +138,207 @@ def setup_logger(name, log_file=None, level=logging.INFO, log_dir=None):
         target_dir = ensure_log_dir(log_dir)
         log_path = os.path.join(target_dir, log_file)
 
-        file_handler = logging.FileHandler(log_path)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        logger.addHandler(AsyncFileHandler(log_path, formatter))
 
     return logger
 
 def log_command_execution(logger, command, result=None, error=None):
     """Log estandarizado para ejecución de comandos"""
-    logger.info(f"Ejecutando comando: {command}")
+    logger.info("Ejecutando comando: %s", command)
     if result:
-        logger.info(f"Resultado exitoso: {result}")
+        logger.info("Resultado exitoso: %s", result)
     if error:
-        logger.error(f"Error en comando: {error}")
+        logger.error("Error en comando: %s", error)
 
 def log_aws_api_call(logger, service, operation, params=None, result=None, error=None):
-    """Log estandarizado para llamadas AWS API"""
-    logger.info(f"AWS API: {service}.{operation}")
+    """Log estandarizado para llamadas AWS API (formato diferido: no cuesta nada si el nivel está desactivado)"""
+    logger.info("AWS API: %s.%s", service, operation)
     if params:
-        logger.debug(f"Parámetros: {params}")
+        logger.debug("Parámetros: %s", params)
     if result:
-        logger.info(f"API exitosa: {operation}")
+        logger.info("API exitosa: %s", operation)
     if error:
-        logger.error(f"Error API {service}.{operation}: {error}")
+        logger.error("Error API %s.%s: %s", service, operation, error)
+
+# ============================================
+# INSTRUMENTACIÓN: latencia, payload, reintentos y resultados por llamada
+# ============================================
+# EKS_EVENTS_FILE: eventos JSON (uno por línea); EKS_METRICS_FILE: OpenMetrics al finalizar;
+# EKS_PROFILE=1: resumen de tiempos al finalizar
+EVENTS_FILE = os.environ.get('EKS_EVENTS_FILE')
+METRICS_FILE = os.environ.get('EKS_METRICS_FILE')
+
+_contexto = threading.local()
+
+def etapa_actual():
+    """Etapa del recolector que corre en este thread ('-' fuera de una etapa)"""
+    return getattr(_contexto, 'etapa', '-')
+
+@contextmanager
+def en_etapa(nombre):
+    """Atribuye a `nombre` los eventos registrados en este thread"""
+    anterior = getattr(_contexto, 'etapa', None)
+    _contexto.etapa = nombre
+    try:
+        yield
+    finally:
+        if anterior is None:
+            del _contexto.etapa
+        else:
+            _contexto.etapa = anterior
+
+def _escapar_label(value):
+    """Valor de label de OpenMetrics: escapa barra invertida, comillas y saltos de línea"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Instrumentacion:
+    """
+    Agregados thread-safe de los eventos medidos, por (tipo, etapa, nombre)
+
+    Cada evento es un dict con tipo ('aws', 'etapa', 'funcion'), nombre, etapa,
+    duracion_ms y opcionalmente payload_bytes, reintentos, resultados y error.
+    Con `events_file` cada evento se agrega además como una línea JSON, fuera
+    del lock de los agregados y sobre un único archivo abierto.
+    """
+
+    CAMPOS = ('payload_bytes', 'reintentos', 'resultados')
+
+    def __init__(self, events_file=None):
+        self.events_file = events_file
+        self._lock = threading.Lock()
+        self._agregados = {}
+        self._archivo = None
+        self._archivo_lock = threading.Lock()
+
+    def registrar(self, evento):
+        clave = (evento['tipo'], evento.get('etapa', '-'), evento['nombre'])
+        with self._lock:
+            agregado = self._agregados.get(clave)
+            if agregado is None:
+                agregado = self._agregados[clave] = {'llamadas': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'errores': 0,
+                                                     **dict.fromkeys(self.CAMPOS, 0)}
+            agregado['llamadas'] += 1
+            agregado['total_ms'] += evento['duracion_ms']
+            agregado['max_ms'] = max(agregado['max_ms'], evento['duracion_ms'])
+            agregado['errores'] += 1 if evento.get('error') else 0
+            for campo in self.CAMPOS:
+                agregado[campo] += evento.get(campo) or 0
+        if self.events_file:
+            self._escribir(json.dumps(evento, ensure_ascii=False, default=str) + '\n')
+
+    def _escribir(self, linea):
+        with self._archivo_lock:
+            if self._archivo is None:
+                # Append con buffer de línea: cada evento llega al archivo sin reabrirlo
+                # y un proceso hijo (fork) no hereda líneas a medio escribir
+                self._archivo = open(self.events_file, 'a', encoding='utf-8', buffering=1)
+            self._archivo.write(linea)
+
+    def cerrar(self):
+        """Cierra el archivo de eventos (se reabre con el próximo evento)"""
+        with self._archivo_lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def resumen(self):
+        """Filas agregadas de mayor a menor tiempo total"""
+        with self._lock:
+            filas = [{'tipo': tipo, 'etapa': etapa, 'nombre': nombre, **agregado}
+                     for (tipo, etapa, nombre), agregado in self._agregados.items()]
+        return sorted(filas, key=lambda fila: fila['total_ms'], reverse=True)
+
+    def imprimir_resumen(self, file=None, top=25):
+        """Tabla de dónde se fue el tiempo (etapas, llamadas a AWS y funciones medidas)"""
+        file = file or sys.stderr
+        filas = self.resumen()
+        if not filas:
+            return
+        print(f"\n{'='*100}", file=file)
+        print("⏱️  RESUMEN DE TIEMPOS", file=file)
+        print(f"{'='*100}", file=file)
+        print(f"  {'Tipo':<8} {'Etapa':<18} {'Nombre':<34} {'N':>5} {'Total ms':>10} {'Máx ms':>9} "
+              f"{'Reint.':>6} {'KB':>8}", file=file)
+        print(f"  {'-'*98}", file=file)
+        for fila in filas[:top]:
+            print(f"  {fila['tipo']:<8} {fila['etapa'][:18]:<18} {fila['nombre'][:34]:<34} {fila['llamadas']:>5} "
+                  f"{fila['total_ms']:>10.1f} {fila['max_ms']:>9.1f} {fila['reintentos']:>6} "
+                  f"{fila['payload_bytes'] / 1024:>8.1f}", file=file)
+        if len(filas) > top:
+            print(f"  ... {len(filas) - top} filas más", file=file)
+        print(f"{'='*100}", file=file)
+
+    def openmetrics(self):
+        """Agregados en formato de texto OpenMetrics"""
+        familias = [
+            ('eks_calculator_duration_seconds', 'summary', 'Duración de las operaciones medidas',
+             lambda a: [('_count', a['llamadas']), ('_sum', a['total_ms'] / 1000)]),
+            ('eks_calculator_retries', 'counter', 'Reintentos', lambda a: [('_total', a['reintentos'])]),
+            ('eks_calculator_errors', 'counter', 'Operaciones con error', lambda a: [('_total', a['errores'])]),
+            ('eks_calculator_payload_bytes', 'counter', 'Bytes de respuesta', lambda a: [('_total', a['payload_bytes'])]),
+            ('eks_calculator_results', 'counter', 'Elementos devueltos', lambda a: [('_total', a['resultados'])]),
+        ]
+        filas = self.resumen()
+        lines = []
+        for nombre, tipo, ayuda, muestras in familias:
+            lines.append(f"# TYPE {nombre} {tipo}")
+            lines.append(f"# HELP {nombre} {ayuda}")
+            for fila in filas:
+                labels = ','.join(f'{k}="{_escapar_label(fila[k])}"' for k in ('tipo', 'etapa', 'nombre'))
+                for sufijo, valor in muestras(fila):
+                    lines.append(f"{nombre}{sufijo}{{{labels}}} {valor:g}")
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def escribir_openmetrics(self, path):
+        Path(path).write_text(self.openmetrics(), encoding='utf-8')
+
+    def reset(self):
+        with self._lock:
+            self._agregados = {}
+
+# Instrumentación compartida por todo el proceso
+instrumentacion = Instrumentacion(EVENTS_FILE)
+
+@contextmanager
+def medir(tipo, nombre, **campos):
+    """
+    Mide el bloque y registra el evento al salir (también si falla). El dict
+    entregado se puede completar con payload_bytes, reintentos o resultados.
+    """
+    evento = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'tipo': tipo, 'nombre': nombre,
+              'etapa': etapa_actual(), **campos}
+    inicio = time.perf_counter()
+    try:
+        yield evento
+    except Exception as e:
+        evento['error'] = type(e).__name__
+        raise
+    finally:
+        evento['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        instrumentacion.registrar(evento)
+
+def instrumentado(nombre=None, tipo='funcion'):
+    """Decorador: mide cada llamada de la función con medir()"""
+    def decorador(func):
+        etiqueta = nombre or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir(tipo, etiqueta):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorador
+
+def finalizar_instrumentacion(profile=None, file=None):
+    """
+    Cierre de una ejecución: escribe EKS_METRICS_FILE si está definido e
+    imprime el resumen de tiempos con `profile` (o EKS_PROFILE=1)
+    """
+    instrumentacion.cerrar()
+    if METRICS_FILE:
+        instrumentacion.escribir_openmetrics(METRICS_FILE)
+    if profile is None:
+        profile = os.environ.get('EKS_PROFILE') == '1'
+    if profile:
+        instrumentacion.imprimir_resumen(file=file)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Motor de métricas CloudWatch basado en GetMetricData.
+
+Agrupa hasta 500 consultas por request y pagina con NextToken, de modo que
+obtener series para N instancias cuesta O(N/500) llamadas en lugar de una
+llamada a get_metric_statistics por instancia.
+"""
+from itertools import islice
+from logger_utils import setup_logger, log_aws_api_call
+
+logger = setup_logger('recolector_aws', 'eks_collector_aws.log')
+
+# Límite de MetricDataQueries por request de GetMetricData
+MAX_QUERIES_PER_REQUEST = 500
+
+def build_metric_query(query_id, namespace, metric_name, dimensions, period, stat):
+    """
+    Construye una MetricDataQuery para GetMetricData
+
+    Args:
+        query_id: Identificador único (debe empezar con minúscula: ^[a-z][a-zA-Z0-9_]*$)
+        namespace: Namespace de CloudWatch (ej: 'AWS/EC2')
+        metric_name: Nombre de la métrica (ej: 'CPUUtilization')
+        dimensions: Dict {nombre: valor} de dimensiones
+        period: Período en segundos
+        stat: Estadística ('Average', 'Minimum', 'Maximum', ...)
+    """
+    return {
+        'Id': query_id,
+        'MetricStat': {
+            'Metric': {
+                'Namespace': namespace,
+                'MetricName': metric_name,
+                'Dimensions': [{'Name': k, 'Value': v} for k, v in dimensions.items()]
+            },
+            'Period': period,
+            'Stat': stat
+        },
+        'ReturnData': True
+    }
+
+def _chunks(iterable, size):
+    """Divide un iterable en listas de hasta `size` elementos sin materializarlo entero"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_metric_data(cloudwatch, queries, start_time, end_time):
+    """
+    Ejecuta un conjunto de MetricDataQueries en lotes de hasta 500 por request,
+    siguiendo NextToken hasta agotar cada lote, y entrega cada MetricDataResult
+    apenas llega (una misma query puede aparecer en varias páginas).
+
+    Permite plegar series largas o muchas instancias sin retener todos los
+    puntos en memoria (ver series_utilizacion.SerieUtilizacion).
+
+    Args:
+        cloudwatch: Cliente boto3 de CloudWatch
+        queries: Iterable de queries (ver build_metric_query)
+        start_time: Inicio del período
+        end_time: Fin del período
+
+    Yields:
+        dict: MetricDataResult ('Id', 'Label', 'Timestamps', 'Values', ...)
+    """
+    requests_made = 0
+
+    for batch in _chunks(queries, MAX_QUERIES_PER_REQUEST):
+        params = {
+            'MetricDataQueries': batch,
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+
+        while True:
+            log_aws_api_call(logger, 'CloudWatch', 'get_metric_data', {'queries': len(batch)})
+            response = cloudwatch.get_metric_data(**params)
+            requests_made += 1
+
+            yield from response.get('MetricDataResults', [])
+
+            next_token = response.get('NextToken')
+            if not next_token:
+                break
+            params['NextToken'] = next_token
+
+    logger.info("GetMetricData: %d requests", requests_made)
+
+def get_metric_data_batch(cloudwatch, queries, start_time, end_time):
+    """
+    Igual que iter_metric_data pero acumula las series completas.
+
+    Returns:
+        dict: {query_id: {'label': str, 'timestamps': [...], 'values': [...]}}
+              Las queries sin datos aparecen con listas vacías.
+    """
+    series = {}
+
+    for result in iter_metric_data(cloudwatch, queries, start_time, end_time):
+        serie = series.setdefault(result['Id'], {
+            'label': result.get('Label', result['Id']),
+            'timestamps': [],
+            'values': []
+        })
+        serie['timestamps'].extend(result.get('Timestamps', []))
+        serie['values'].extend(result.get('Values', []))
+
+    logger.info("GetMetricData: %d series obtenidas", len(series))
+    return series
+
+def average(values):
+    """Promedio simple; None si no hay valores"""
+    if not values:
+        return None
+    return sum(values) / len(values)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Planificador de etapas del recolector.
+
+Cada etapa declara de qué otras etapas depende; las etapas cuyas entradas ya
+están resueltas se ejecutan en paralelo en un pool de threads. El tiempo total
+queda acotado por la cadena de dependencias más lenta y no por la suma de
+todas las llamadas.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from logger_utils import setup_logger, medir, en_etapa
+
+logger = setup_logger('recolector_aws', 'eks_collector_aws.log')
+
+# name: identificador de la etapa
+# func: callable que recibe como kwargs los resultados de sus entradas
+# inputs: tupla con los nombres de las etapas de las que depende
+Stage = namedtuple('Stage', ['name', 'func', 'inputs'])
+Stage.__new__.__defaults__ = ((),)
+
+def _validate(stages):
+    """Verifica nombres únicos, entradas existentes y ausencia de ciclos"""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Etapa duplicada: {stage.name}")
+        by_name[stage.name] = stage
+
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in by_name]
+        if missing:
+            raise ValueError(f"Etapa '{stage.name}' depende de etapas inexistentes: {missing}")
+
+    # Orden topológico (Kahn) solo para detectar ciclos
+    pending = {s.name: set(s.inputs) for s in stages}
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"Ciclo de dependencias entre etapas: {sorted(pending)}")
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+
+    return by_name
+
+def run_stages(stages, max_workers=None):
+    """
+    Ejecuta un grafo de etapas respetando dependencias
+
+    Args:
+        stages: Lista de Stage
+        max_workers: Tamaño del pool (default: número de etapas)
+
+    Returns:
+        dict: {nombre_etapa: resultado}
+
+    Si una etapa lanza una excepción, se cancelan las pendientes y se propaga.
+    """
+    by_name = _validate(stages)
+    results = {}
+    durations = {}
+    remaining = dict(by_name)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(stages), 1)) as executor:
+        while remaining or running:
+            for name in [n for n, s in remaining.items() if all(i in results for i in s.inputs)]:
+                stage = remaining.pop(name)
+                kwargs = {i: results[i] for i in stage.inputs}
+                logger.info("Etapa iniciada: %s", name)
+                future = executor.submit(_timed, name, stage.func, kwargs)
+                running[future] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], durations[name] = future.result()
+                except Exception:
+                    logger.error("Etapa fallida: %s", name)
+                    for pending in running:
+                        pending.cancel()
+                    raise
+                logger.info("Etapa completada: %s (%.2fs)", name, durations[name])
+
+    return results
+
+def _timed(name, func, kwargs):
+    # Las llamadas a AWS hechas dentro de la etapa (en este thread) quedan atribuidas a ella
+    start = time.perf_counter()
+    with en_etapa(name), medir('etapa', name):
+        result = func(**kwargs)
+    return result, time.perf_counter() - start
@@ -1,17 +1,46 @@
 #!/usr/bin/env python3
-import boto3
+import os
 import sys
+import threading
 from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from logger_utils import setup_logger, log_aws_api_call
+from logger_utils import setup_logger, log_aws_api_call, finalizar_instrumentacion
+from aws_utils import get_client, call_metrics
+from metricas_cloudwatch import build_metric_query, get_metric_data_batch, iter_metric_data
+from series_utilizacion import SerieUtilizacion, formatear_perfil
+from planificador_etapas import Stage, run_stages
+from ledger_costos import (get_default_ledger, sincronizar, clave_cluster, clave_control_plane, clave_flota,
+                           clave_control_plane_flota, EKS_SERVICE)
 
 # Configurar logging
 logger = setup_logger('recolector_aws', 'eks_collector_aws.log')
 
+# Tag que EKS aplica a los recursos del Data Plane (el Control Plane no lo lleva)
+CLUSTER_TAG = 'aws:eks:cluster-name'
+# Servicio con el que se reporta el Data Plane de las consultas agrupadas por tag (sin SERVICE)
+DATA_PLANE_SERVICE = 'Data Plane (tag aws:eks:cluster-name)'
+
+# Resolución (segundos) de las series de utilización: 5 minutos capturan los
+# picos y CloudWatch los retiene 63 días (1 minuto solo 15 días)
+METRIC_PERIOD = int(os.getenv('EKS_METRIC_PERIOD', '300'))
+
+# DescribeNodegroup concurrentes por cluster (el limitador de tasa de EKS acota el total)
+NODEGROUP_WORKERS = int(os.getenv('EKS_NODEGROUP_WORKERS', '8'))
+
+def create_client(service, region):
+    """
+    Cliente boto3 compartido del registro de aws_utils: se crea una vez por
+    (servicio, región) y sus llamadas pasan por el limitador de tasa.
+    """
+    return get_client(service, region)
+
 def get_cluster_info(cluster_name, region):
     """Obtiene información del cluster EKS"""
     logger.info(f"Obteniendo información del cluster: {cluster_name} en {region}")
-    eks = boto3.client('eks', region_name=region)
+    eks = create_client('eks', region)
     try:
         log_aws_api_call(logger, 'EKS', 'describe_cluster', {'name': cluster_name})
         response = eks.describe_cluster(name=cluster_name)
@@ -24,32 +53,126 @@ def get_cluster_info(cluster_name, region):
         print(f"❌ Error obteniendo info del cluster: {e}", file=sys.stderr)
         return None
 
-def get_cluster_nodes(cluster_name, region):
-    """Obtiene los nodos EC2 del cluster EKS"""
-    logger.info(f"Buscando nodos EC2 para cluster: {cluster_name}")
-    ec2 = boto3.client('ec2', region_name=region)
+def _node_record(instance):
+    """Atributos por nodo que usan las etapas posteriores (sin describes extra)"""
+    tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+    return {
+        'instance_id': instance['InstanceId'],
+        'instance_type': instance['InstanceType'],
+        'launch_time': instance['LaunchTime'],
+        'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
+        'lifecycle': 'spot' if instance.get('InstanceLifecycle') == 'spot' else 'on-demand',
+        'nodegroup': tags.get('eks:nodegroup-name'),
+        'asg_name': tags.get('aws:autoscaling:groupName'),
+    }
+
+def iter_cluster_nodes(cluster_name, region, page_size=1000):
+    """
+    Itera los nodos EC2 del cluster a medida que llegan las páginas de
+    describe_instances (el paginador sigue NextToken, sin truncar clusters grandes)
+    """
+    ec2 = create_client('ec2', region)
     filters = [
         {'Name': 'tag:eks:cluster-name', 'Values': [cluster_name]},
         {'Name': 'instance-state-name', 'Values': ['running']}
     ]
-    
-    try:
-        log_aws_api_call(logger, 'EC2', 'describe_instances', {'Filters': filters})
-        response = ec2.describe_instances(Filters=filters)
-        
-        instances = []
-        for reservation in response['Reservations']:
+    log_aws_api_call(logger, 'EC2', 'describe_instances', {'Filters': filters})
+    paginator = ec2.get_paginator('describe_instances')
+    for page_number, page in enumerate(paginator.paginate(Filters=filters,
+                                                          PaginationConfig={'PageSize': page_size}), 1):
+        logger.debug("describe_instances página %d: %d reservas", page_number, len(page['Reservations']))
+        for reservation in page['Reservations']:
             for instance in reservation['Instances']:
-                instances.append({
-                    'instance_id': instance['InstanceId'],
-                    'instance_type': instance['InstanceType'],
-                    'launch_time': instance['LaunchTime']
-                })
-        
+                yield _node_record(instance)
+
+def describe_nodegroup(cluster_name, region, nodegroup_name):
+    """ASGs, tipos de instancia, tipo de capacidad y escalado de un managed node group"""
+    eks = create_client('eks', region)
+    nodegroup = eks.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)['nodegroup']
+    return {
+        'name': nodegroup_name,
+        'status': nodegroup.get('status'),
+        'capacity_type': nodegroup.get('capacityType', 'ON_DEMAND'),
+        # Vacío si los tipos vienen del launch template
+        'instance_types': nodegroup.get('instanceTypes', []),
+        'scaling': nodegroup.get('scalingConfig', {}),
+        'asg_names': [g['name'] for g in nodegroup.get('resources', {}).get('autoScalingGroups', [])],
+    }
+
+_nodegroup_inventory = {}
+_nodegroup_locks = {}
+_nodegroup_lock = threading.Lock()
+
+def get_nodegroup_inventory(cluster_name, region, refresh=False):
+    """
+    Inventario de managed node groups del cluster: ListNodegroups paginado y
+    un DescribeNodegroup por node group en paralelo.
+
+    Se cachea por (cluster, región): el recolector y analyze_asg_stability
+    lo comparten sin repetir las llamadas. Con refresh=True se vuelve a pedir
+    (una vez por recolección) y recolectar_cluster lo descarta al terminar
+    con clear_nodegroup_inventory().
+
+    Returns:
+        list: [{'name', 'status', 'capacity_type', 'instance_types', 'scaling', 'asg_names'}]
+              ([] si el cluster no tiene managed node groups, None si falló)
+    """
+    key = (cluster_name, region)
+    with _nodegroup_lock:
+        lock = _nodegroup_locks.setdefault(key, threading.Lock())
+
+    # Un lock por cluster: las etapas concurrentes esperan la misma consulta
+    with lock:
+        if not refresh and key in _nodegroup_inventory:
+            return _nodegroup_inventory[key]
+
+        try:
+            eks = create_client('eks', region)
+            log_aws_api_call(logger, 'EKS', 'list_nodegroups', {'clusterName': cluster_name})
+            names = [name for page in eks.get_paginator('list_nodegroups').paginate(clusterName=cluster_name)
+                     for name in page['nodegroups']]
+            inventory = []
+            if names:
+                with ThreadPoolExecutor(max_workers=min(len(names), NODEGROUP_WORKERS)) as executor:
+                    inventory = list(executor.map(
+                        lambda name: describe_nodegroup(cluster_name, region, name), names))
+        except Exception as e:
+            log_aws_api_call(logger, 'EKS', 'describe_nodegroup', error=str(e))
+            logger.warning("No se pudo obtener el inventario de node groups de %s: %s", cluster_name, e)
+            return None
+
+        logger.info("Node groups de %s: %s", cluster_name,
+                    ', '.join(f"{ng['name']} ({ng['capacity_type']}, ASGs: {len(ng['asg_names'])})"
+                              for ng in inventory) or 'ninguno')
+        _nodegroup_inventory[key] = inventory
+        return inventory
+
+def clear_nodegroup_inventory(cluster_name, region):
+    """Descarta el inventario cacheado (y su lock) de un cluster"""
+    with _nodegroup_lock:
+        _nodegroup_inventory.pop((cluster_name, region), None)
+        _nodegroup_locks.pop((cluster_name, region), None)
+
+def get_cluster_nodes(cluster_name, region):
+    """
+    Obtiene los nodos EC2 del cluster EKS
+
+    Solo hace el describe_instances filtrado por el tag del cluster: el node
+    group y el tipo de capacidad se agregan después con anotar_nodegroups(),
+    así los nodos no esperan al inventario.
+    """
+    logger.info(f"Buscando nodos EC2 para cluster: {cluster_name}")
+    instances = []
+    types = Counter()
+
+    try:
+        for node in iter_cluster_nodes(cluster_name, region):
+            instances.append(node)
+            types[node['instance_type']] += 1
+
         logger.info(f"Encontrados {len(instances)} nodos")
         if instances:
-            types = [i['instance_type'] for i in instances]
-            logger.info(f"Tipos de instancia: {Counter(types)}")
+            logger.info(f"Tipos de instancia: {types}")
         
         log_aws_api_call(logger, 'EC2', 'describe_instances', result=f"{len(instances)} instancias")
         return instances
@@ -58,111 +181,124 @@ def get_cluster_nodes(cluster_name, region):
         print(f"❌ Error obteniendo nodos: {e}", file=sys.stderr)
         return []
 
-def get_cpu_utilization(cluster_name, region, days=7):
-    """Obtiene utilización promedio de CPU desde CloudWatch"""
-    logger.info(f"Obteniendo utilización CPU de CloudWatch para {cluster_name} (últimos {days} días)")
-    cloudwatch = boto3.client('cloudwatch', region_name=region)
-    try:
-        end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-        start_time = end_time - timedelta(days=days)
-        
-        params = {
-            'Namespace': 'ContainerInsights',
-            'MetricName': 'node_cpu_utilization',
-            'Dimensions': [{'Name': 'ClusterName', 'Value': cluster_name}],
-            'StartTime': start_time,
-            'EndTime': end_time,
-            'Period': 3600,
-            'Statistics': ['Average']
-        }
-        
-        log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', params)
-        response = cloudwatch.get_metric_statistics(**params)
-        
-        if response['Datapoints']:
-            avg_cpu = sum(dp['Average'] for dp in response['Datapoints']) / len(response['Datapoints'])
-            result = round(avg_cpu, 2)
-            logger.info(f"CPU utilización promedio: {result}% ({len(response['Datapoints'])} puntos de datos)")
-            log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', result=f"CPU: {result}%")
-            return result
+def anotar_nodegroups(instances, nodegroups):
+    """
+    Copia de los nodos con el node group (por su ASG) y el tipo de capacidad
+    del inventario de managed node groups; capacity_type queda en None para
+    los nodos que no son de un managed node group
+    """
+    by_asg = {asg_name: ng for ng in nodegroups or [] for asg_name in ng['asg_names']}
+    annotated = []
+    for node in instances or []:
+        nodegroup = by_asg.get(node['asg_name'])
+        if nodegroup is None:
+            annotated.append(dict(node, capacity_type=None))
         else:
-            logger.warning("No se encontraron datos de CPU en CloudWatch")
-            return None
-    except Exception as e:
-        log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', error=str(e))
-        print(f"⚠️  No se pudo obtener CPU de CloudWatch: {e}", file=sys.stderr)
-        return None
+            annotated.append(dict(node, nodegroup=nodegroup['name'], capacity_type=nodegroup['capacity_type']))
+    return annotated
 
-def get_memory_utilization(cluster_name, region, days=7):
-    """Obtiene utilización promedio de memoria desde CloudWatch"""
-    logger.info(f"Obteniendo utilización memoria de CloudWatch para {cluster_name} (últimos {days} días)")
-    cloudwatch = boto3.client('cloudwatch', region_name=region)
-    try:
-        end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-        start_time = end_time - timedelta(days=days)
+def _metric_window(days, period=None):
+    """(start_time, end_time, period) para las consultas de utilización"""
+    end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
+    return end_time - timedelta(days=days), end_time, period or METRIC_PERIOD
 
-        params = {
-            'Namespace': 'ContainerInsights',
-            'MetricName': 'node_memory_utilization',
-            'Dimensions': [{'Name': 'ClusterName', 'Value': cluster_name}],
-            'StartTime': start_time,
-            'EndTime': end_time,
-            'Period': 3600,
-            'Statistics': ['Average']
-        }
+def get_utilization_series(cluster_name, region, metric_name, days=7, period=None):
+    """
+    Serie de utilización de Container Insights (promedio del cluster por intervalo)
+
+    Returns:
+        SerieUtilizacion o None si no hay datos
+    """
+    logger.info(f"Obteniendo serie {metric_name} de CloudWatch para {cluster_name} (últimos {days} días)")
+    cloudwatch = create_client('cloudwatch', region)
+    start_time, end_time, period = _metric_window(days, period)
 
-        log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', params)
-        response = cloudwatch.get_metric_statistics(**params)
+    query = build_metric_query('u', 'ContainerInsights', metric_name,
+                               {'ClusterName': cluster_name}, period, 'Average')
+    serie = SerieUtilizacion(start_time, end_time, period)
+    for result in iter_metric_data(cloudwatch, [query], start_time, end_time):
+        serie.agregar(result.get('Timestamps', []), result.get('Values', []))
 
-        if response['Datapoints']:
-            avg_mem = sum(dp['Average'] for dp in response['Datapoints']) / len(response['Datapoints'])
-            result = round(avg_mem, 2)
-            logger.info(f"Memoria utilización promedio: {result}% ({len(response['Datapoints'])} puntos de datos)")
-            log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', result=f"Memoria: {result}%")
-            return result
-        else:
-            logger.warning("No se encontraron datos de memoria en CloudWatch")
+    if not len(serie):
+        return None
+    logger.info(f"{metric_name}: {len(serie)} intervalos de {period}s, "
+                f"p50/p95/p99 = {_format_percentiles(serie)}")
+    return serie
+
+def _format_percentiles(serie):
+    return '/'.join(f"{v:.1f}%" for v in serie.percentiles().values())
+
+def _utilization_from_series(cluster_name, region, metric_name, label, days):
+    try:
+        serie = get_utilization_series(cluster_name, region, metric_name, days)
+        if serie is None:
+            logger.warning(f"No se encontraron datos de {label} en CloudWatch")
             return None
+        result = round(serie.promedio(), 2)
+        logger.info(f"{label} utilización promedio: {result}% ({len(serie)} puntos de datos)")
+        log_aws_api_call(logger, 'CloudWatch', 'get_metric_data', result=f"{label}: {result}%")
+        return result
     except Exception as e:
-        log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', error=str(e))
-        print(f"⚠️  No se pudo obtener memoria de CloudWatch: {e}", file=sys.stderr)
+        log_aws_api_call(logger, 'CloudWatch', 'get_metric_data', error=str(e))
+        print(f"⚠️  No se pudo obtener {label} de CloudWatch: {e}", file=sys.stderr)
         return None
 
-def get_ec2_cpu_utilization(instance_ids, region, days=7):
-    """Obtiene CPUUtilization promedio de las instancias EC2 (métricas básicas)"""
-    logger.info(f"Obteniendo métricas EC2 básicas para {len(instance_ids)} instancias (últimos {days} días)")
-    cloudwatch = boto3.client('cloudwatch', region_name=region)
+def get_cpu_utilization(cluster_name, region, days=7):
+    """Obtiene utilización promedio de CPU desde CloudWatch"""
+    return _utilization_from_series(cluster_name, region, 'node_cpu_utilization', 'CPU', days)
+
+def get_memory_utilization(cluster_name, region, days=7):
+    """Obtiene utilización promedio de memoria desde CloudWatch"""
+    return _utilization_from_series(cluster_name, region, 'node_memory_utilization', 'Memoria', days)
 
-    try:
-        end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-        start_time = end_time - timedelta(days=days)
+def get_ec2_cpu_utilization(instance_ids, region, days=7, serie=None):
+    """
+    Obtiene CPUUtilization promedio de las instancias EC2 (métricas básicas)
 
-        cpu_values = []
-        for instance_id in instance_ids:
-            params = {
-                'Namespace': 'AWS/EC2',
-                'MetricName': 'CPUUtilization',
-                'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}],
-                'StartTime': start_time,
-                'EndTime': end_time,
-                'Period': 3600,
-                'Statistics': ['Average']
-            }
+    Todas las instancias se consultan con GetMetricData en lotes de 500,
+    por lo que el costo es O(nodos/500) requests. Cada página se pliega en
+    sumas por instancia (y en `serie`, si se pasa una SerieUtilizacion) sin
+    retener los puntos, así la memoria no crece con nodos × puntos.
+    """
+    logger.info(f"Obteniendo métricas EC2 básicas (últimos {days} días)")
+    cloudwatch = create_client('cloudwatch', region)
 
-            log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics',
-                           {'instance': instance_id, 'metric': 'CPUUtilization'})
-            response = cloudwatch.get_metric_statistics(**params)
+    try:
+        start_time, end_time, period = _metric_window(days, serie.period if serie else 3600)
+
+        # Los Ids de GetMetricData no admiten guiones: se mapean por índice.
+        # Las queries se generan a medida que el motor arma cada lote.
+        query_ids = {}
+
+        def queries():
+            for idx, instance_id in enumerate(instance_ids):
+                query_id = f"i{idx}"
+                query_ids[query_id] = instance_id
+                yield build_metric_query(query_id, 'AWS/EC2', 'CPUUtilization',
+                                         {'InstanceId': instance_id}, period, 'Average')
+
+        totals = {}
+        for result in iter_metric_data(cloudwatch, queries(), start_time, end_time):
+            values = result.get('Values', [])
+            if not values:
+                continue
+            total, count = totals.get(result['Id'], (0.0, 0))
+            totals[result['Id']] = (total + sum(values), count + len(values))
+            if serie is not None:
+                serie.agregar(result.get('Timestamps', []), values)
+        logger.info("Métricas EC2 consultadas para %d instancias", len(query_ids))
 
-            if response['Datapoints']:
-                avg = sum(dp['Average'] for dp in response['Datapoints']) / len(response['Datapoints'])
-                cpu_values.append(avg)
-                logger.debug(f"Instancia {instance_id}: CPU {avg:.2f}%")
+        cpu_values = []
+        for query_id, (total, count) in totals.items():
+            avg = total / count
+            cpu_values.append(avg)
+            logger.debug("Instancia %s: CPU %.2f%%", query_ids.get(query_id, query_id), avg)
 
         if cpu_values:
             avg_cpu = sum(cpu_values) / len(cpu_values)
             result = round(avg_cpu, 2)
             logger.info(f"CPU utilización promedio EC2: {result}% ({len(cpu_values)} instancias)")
-            log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics',
+            log_aws_api_call(logger, 'CloudWatch', 'get_metric_data',
                            result=f"EC2 CPU: {result}%")
             return result
         else:
@@ -170,66 +306,102 @@ def get_ec2_cpu_utilization(instance_ids, region, days=7):
             return None
 
     except Exception as e:
-        log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics', error=str(e))
+        log_aws_api_call(logger, 'CloudWatch', 'get_metric_data', error=str(e))
         print(f"⚠️  No se pudo obtener CPU de métricas EC2: {e}", file=sys.stderr)
         return None
 
-def analyze_asg_stability(cluster_name, region, days=30):
-    """Analiza estabilidad del ASG para inferir sobreasignación"""
-    logger.info(f"Analizando estabilidad del ASG para {cluster_name} (últimos {days} días)")
-
-    try:
-        asg = boto3.client('autoscaling', region_name=region)
-        cloudwatch = boto3.client('cloudwatch', region_name=region)
+def asg_filters(cluster_name):
+    """
+    Filtros de describe_auto_scaling_groups que identifican los ASGs del
+    cluster: eks:cluster-name (managed node groups) y la clave
+    kubernetes.io/cluster/<nombre> (self-managed, eksctl). AWS combina los
+    filtros de una misma llamada con AND, por eso va uno por consulta.
+    """
+    return [
+        [{'Name': 'tag:eks:cluster-name', 'Values': [cluster_name]}],
+        [{'Name': 'tag-key', 'Values': [f'kubernetes.io/cluster/{cluster_name}']}],
+    ]
 
-        # Buscar ASG del cluster
-        log_aws_api_call(logger, 'AutoScaling', 'describe_auto_scaling_groups',
-                       {'cluster': cluster_name})
-        response = asg.describe_auto_scaling_groups()
+def iter_cluster_asgs(cluster_name, region, page_size=100):
+    """
+    Itera los ASGs del cluster con filtro de tags en el servidor, siguiendo
+    NextToken; cada ASG se entrega una sola vez aunque lleve ambos tags
+    """
+    asg = create_client('autoscaling', region)
+    paginator = asg.get_paginator('describe_auto_scaling_groups')
+    seen = set()
+    for filters in asg_filters(cluster_name):
+        log_aws_api_call(logger, 'AutoScaling', 'describe_auto_scaling_groups', {'Filters': filters})
+        for page_number, page in enumerate(paginator.paginate(Filters=filters,
+                                                              PaginationConfig={'PageSize': page_size}), 1):
+            logger.debug("describe_auto_scaling_groups página %d: %d ASGs",
+                         page_number, len(page['AutoScalingGroups']))
+            for group in page['AutoScalingGroups']:
+                if group['AutoScalingGroupName'] not in seen:
+                    seen.add(group['AutoScalingGroupName'])
+                    yield group
+
+def analyze_asg_stability(cluster_name, region, days=30, instances=None):
+    """
+    Analiza estabilidad del ASG para inferir sobreasignación
 
-        cluster_asgs = [
-            g for g in response['AutoScalingGroups']
-            if any(cluster_name in tag.get('Value', '') for tag in g.get('Tags', []))
-        ]
+    Args:
+        instances: Nodos del cluster (get_cluster_nodes); sus ASGs se suman a
+            los del inventario y la búsqueda por tags solo corre si alguno no
+            es de un managed node group (o si no se pasan nodos)
+    """
+    logger.info(f"Analizando estabilidad del ASG para {cluster_name} (últimos {days} días)")
 
-        if not cluster_asgs:
+    try:
+        cloudwatch = create_client('cloudwatch', region)
+
+        # ASGs de los managed node groups (inventario cacheado) más los de los
+        # nodos (tag aws:autoscaling:groupName), sin repetir nombres
+        inventory_asgs = [asg_name for ng in get_nodegroup_inventory(cluster_name, region) or []
+                          for asg_name in ng['asg_names']]
+        node_asgs = [node['asg_name'] for node in instances or [] if node.get('asg_name')]
+        asg_names = list(dict.fromkeys(inventory_asgs + node_asgs))
+
+        # Cluster mixto (o sin nodos): la búsqueda filtrada por tags trae los
+        # self-managed, también los que están escalados a 0
+        if instances is None or not asg_names or not set(node_asgs) <= set(inventory_asgs):
+            asg_names += [g['AutoScalingGroupName'] for g in iter_cluster_asgs(cluster_name, region)]
+            asg_names = list(dict.fromkeys(asg_names))
+
+        if not asg_names:
             logger.warning(f"No se encontraron ASGs para el cluster {cluster_name}")
             return {'scaling_observed': True, 'reason': 'no_asg_found'}
 
-        logger.info(f"Encontrados {len(cluster_asgs)} ASGs para el cluster")
+        logger.info(f"Encontrados {len(asg_names)} ASGs para el cluster")
 
-        scaling_observed = False
-        for asg_data in cluster_asgs:
-            asg_name = asg_data['AutoScalingGroupName']
-            logger.info(f"Analizando ASG: {asg_name}")
-
-            end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-            start_time = end_time - timedelta(days=days)
-
-            # Obtener métrica de capacidad deseada
-            params = {
-                'Namespace': 'AWS/AutoScaling',
-                'MetricName': 'GroupDesiredCapacity',
-                'Dimensions': [{'Name': 'AutoScalingGroupName', 'Value': asg_name}],
-                'StartTime': start_time,
-                'EndTime': end_time,
-                'Period': 86400,  # 1 día
-                'Statistics': ['Minimum', 'Maximum']
-            }
+        end_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
+        start_time = end_time - timedelta(days=days)
+
+        # Capacidad deseada (mínimo y máximo diario) de todos los ASGs en un solo lote
+        queries = []
+        for idx, asg_name in enumerate(asg_names):
+            for stat in ('Minimum', 'Maximum'):
+                queries.append(build_metric_query(
+                    f"g{idx}_{stat.lower()}", 'AWS/AutoScaling', 'GroupDesiredCapacity',
+                    {'AutoScalingGroupName': asg_name}, 86400, stat  # 1 día
+                ))
+        series = get_metric_data_batch(cloudwatch, queries, start_time, end_time)
 
-            log_aws_api_call(logger, 'CloudWatch', 'get_metric_statistics',
-                           {'asg': asg_name, 'metric': 'GroupDesiredCapacity'})
-            response = cloudwatch.get_metric_statistics(**params)
+        scaling_observed = False
+        for idx, asg_name in enumerate(asg_names):
+            logger.info("Analizando ASG: %s", asg_name)
+            minimums = series.get(f"g{idx}_minimum", {}).get('values', [])
+            maximums = series.get(f"g{idx}_maximum", {}).get('values', [])
 
-            if response['Datapoints']:
-                min_cap = min(dp['Minimum'] for dp in response['Datapoints'])
-                max_cap = max(dp['Maximum'] for dp in response['Datapoints'])
+            if minimums and maximums:
+                min_cap = min(minimums)
+                max_cap = max(maximums)
 
-                logger.info(f"ASG {asg_name}: Min={min_cap}, Max={max_cap}")
+                logger.info("ASG %s: Min=%s, Max=%s", asg_name, min_cap, max_cap)
 
                 if min_cap != max_cap:
                     scaling_observed = True
-                    logger.info(f"ASG {asg_name} ha escalado (variación de capacidad detectada)")
+                    logger.info("ASG %s ha escalado (variación de capacidad detectada)", asg_name)
 
         if not scaling_observed:
             logger.warning("⚠️  Ningún ASG ha escalado en los últimos 30 días - cluster posiblemente sobreaprovisionado")
@@ -282,6 +454,22 @@ def get_manual_utilization():
     logger.info("Usuario optó por no ingresar valores manuales")
     return None, None
 
+def normalizar_tipo_compra(purchase_option):
+    """
+    PURCHASE_TYPE de Cost Explorer -> clave de cost_by_purchase
+    ('on_demand', 'reserved', 'savings_plans', 'spot' o None si no aplica)
+    """
+    po_lower = (purchase_option or '').lower()
+    if 'on demand' in po_lower or 'ondemand' in po_lower:
+        return 'on_demand'
+    if 'reserved' in po_lower or 'reservation' in po_lower:
+        return 'reserved'
+    if 'saving' in po_lower:
+        return 'savings_plans'
+    if 'spot' in po_lower:
+        return 'spot'
+    return None
+
 def calculate_ondemand_equivalent(cost_by_purchase, total_amortized):
     """
     Calcula el costo On-Demand equivalente cuando hay RIs/SPs
@@ -297,10 +485,20 @@ def calculate_ondemand_equivalent(cost_by_purchase, total_amortized):
 
     return ondemand_from_ri + ondemand_from_sp + ondemand_direct + cost_by_purchase['spot']
 
+FALLBACK_SOURCE = 'Fallback (solo Control Plane)'
+
+def log_fallback_instances(instances):
+    """Nodos detectados que el fallback no puede costear (solo informativo)"""
+    instance_types = Counter([inst['instance_type'] for inst in instances])
+    logger.info(f"")
+    logger.info(f"📊 Instancias detectadas:")
+    for itype, count in instance_types.most_common():
+        logger.info("   %s: %d nodos", itype, count)
+
 def calculate_fallback_cost(cluster_name, instances, region, days):
     """
     Cálculo de fallback cuando no hay tag
-    Usa: nodos detectados + control plane fijo
+    Usa: control plane fijo (los nodos detectados solo se registran)
     """
     logger.warning(f"")
     logger.warning(f"{'='*60}")
@@ -316,11 +514,8 @@ def calculate_fallback_cost(cluster_name, instances, region, days):
     logger.warning(f"⚠️  Recomendación: Verificar que las instancias tengan el tag:")
     logger.warning(f"    aws:eks:cluster-name = {cluster_name}")
 
-    instance_types = Counter([inst['instance_type'] for inst in instances])
-    logger.info(f"")
-    logger.info(f"📊 Instancias detectadas:")
-    for itype, count in instance_types.most_common():
-        logger.info(f"   {itype}: {count} nodos")
+    if instances:
+        log_fallback_instances(instances)
 
     return {
         'monthly_cost': CONTROL_PLANE_MONTHLY,
@@ -332,11 +527,33 @@ def calculate_fallback_cost(cluster_name, instances, region, days):
         'by_service': {'Amazon Elastic Kubernetes Service': CONTROL_PLANE_MONTHLY},
         'by_purchase': {},
         'has_control_plane': True,
-        'data_source': 'Fallback (solo Control Plane)',
+        'data_source': FALLBACK_SOURCE,
         'warning': f'Tag aws:eks:cluster-name no encontrado. Solo se calculó Control Plane.',
         'days_analyzed': days
     }
 
+def sync_cost_explorer(ce, ledger, clave, start_date, end_date, operation, log_params, **query):
+    """
+    Completa el ledger con get_cost_and_usage para los días pendientes de
+    [start_date, end_date), siguiendo NextPageToken
+
+    Returns:
+        int: Requests a Cost Explorer (0 si el ledger ya cubría el período)
+    """
+    def fetch_page(start, end, token):
+        params = dict(query, TimePeriod={'Start': start, 'End': end})
+        if token:
+            params['NextPageToken'] = token
+        log_aws_api_call(logger, 'CostExplorer', operation, dict(log_params, start=start, end=end))
+        return ce.get_cost_and_usage(**params)
+
+    requests_made = sincronizar(ledger, clave, start_date, end_date, fetch_page)
+    if requests_made:
+        logger.info(f"Cost Explorer ({clave}): {requests_made} requests para los días pendientes")
+    else:
+        logger.info(f"Cost Explorer ({clave}): período cubierto por el ledger local, sin requests")
+    return requests_made
+
 def get_control_plane_cost(cluster_name, region, days=30):
     """
     Obtiene el costo del Control Plane de EKS de manera separada
@@ -356,7 +573,7 @@ def get_control_plane_cost(cluster_name, region, days=30):
         float: Costo mensual del Control Plane, o None si no se encuentra
     """
     logger.info(f"Consultando costo de Control Plane EKS para: {cluster_name}")
-    ce = boto3.client('ce', region_name='us-east-1')
+    ce = create_client('ce', 'us-east-1')
 
     try:
         end_date = datetime.now().date() - timedelta(days=2)
@@ -364,41 +581,34 @@ def get_control_plane_cost(cluster_name, region, days=30):
 
         # Query para EKS Control Plane
         # Estrategia: Filtrar por servicio EKS + región
-        log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage_control_plane', {
-            'cluster': cluster_name,
-            'service': 'Amazon Elastic Kubernetes Service',
-            'region': region
-        })
-
-        response = ce.get_cost_and_usage(
-            TimePeriod={
-                'Start': start_date.strftime('%Y-%m-%d'),
-                'End': end_date.strftime('%Y-%m-%d')
-            },
-            Granularity='DAILY',
-            Metrics=['AmortizedCost'],
-            Filter={
-                'And': [
-                    {
-                        'Dimensions': {
-                            'Key': 'SERVICE',
-                            'Values': ['Amazon Elastic Kubernetes Service']
-                        }
-                    },
-                    {
-                        'Dimensions': {
-                            'Key': 'REGION',
-                            'Values': [region]
-                        }
-                    }
-                ]
-            }
-        )
-
-        total_cost = 0
-        for result in response['ResultsByTime']:
-            if 'Total' in result and 'AmortizedCost' in result['Total']:
-                total_cost += float(result['Total']['AmortizedCost']['Amount'])
+        # Solo se piden los días que el ledger local no tiene finalizados
+        ledger = get_default_ledger()
+        sync_cost_explorer(ce, ledger, clave_control_plane(region), start_date, end_date,
+                           'get_cost_and_usage_control_plane', {
+                               'cluster': cluster_name,
+                               'service': 'Amazon Elastic Kubernetes Service',
+                               'region': region
+                           },
+                           Granularity='DAILY',
+                           Metrics=['AmortizedCost'],
+                           Filter={
+                               'And': [
+                                   {
+                                       'Dimensions': {
+                                           'Key': 'SERVICE',
+                                           'Values': ['Amazon Elastic Kubernetes Service']
+                                       }
+                                   },
+                                   {
+                                       'Dimensions': {
+                                           'Key': 'REGION',
+                                           'Values': [region]
+                                       }
+                                   }
+                               ]
+                           })
+
+        total_cost = ledger.total(clave_control_plane(region), start_date, end_date)
 
         actual_days = (end_date - start_date).days
         monthly_cost = (total_cost / actual_days) * 30 if actual_days > 0 else 0
@@ -417,15 +627,168 @@ def get_control_plane_cost(cluster_name, region, days=30):
         log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage_control_plane', error=str(e))
         return None
 
+def costos_desde_grupos(cluster_name, region, grupos, actual_days, instances=(), days=30, data_source='Cost Explorer'):
+    """
+    Análisis de costos y ahorros a partir de los totales del período
+
+    Args:
+        grupos: {(servicio, tipo de compra): (costo amortizado, uso)}; las
+                filas del servicio EKS se toman como Control Plane
+        actual_days: Días cubiertos por los totales (para mensualizar)
+        instances: Nodos del cluster (solo para el fallback)
+
+    Returns:
+        dict: cost_data del recolector (o el fallback si no hay costos)
+    """
+    total_amortized = 0
+    cost_by_service = {}
+    cost_by_purchase = {
+        'on_demand': 0,
+        'reserved': 0,
+        'savings_plans': 0,
+        'spot': 0
+    }
+
+    # Control Plane: filas del servicio EKS (no llevan el tag del cluster)
+    control_plane_cost = sum(cost for (service, _), (cost, _) in grupos.items() if service == EKS_SERVICE)
+    data_plane_groups = {key: value for key, value in grupos.items() if key[0] != EKS_SERVICE}
+    if control_plane_cost > 0:
+        total_amortized += control_plane_cost
+        cost_by_service[EKS_SERVICE] = control_plane_cost
+        logger.info(f"Control Plane agregado: ${control_plane_cost / actual_days * 30:.2f}/mes")
+
+    # Si no hay resultados de Data Plane pero sí Control Plane, continuar
+    if not data_plane_groups:
+        if control_plane_cost > 0:
+            logger.warning("⚠️  Tag 'aws:eks:cluster-name' no encontrado para Data Plane")
+            logger.info("✅ Pero se encontró costo de Control Plane")
+            # Continuar con solo Control Plane
+        else:
+            logger.warning("❌ No se encontraron costos ni para Control Plane ni Data Plane")
+            return calculate_fallback_cost(cluster_name, instances, region, days)
+
+    for (service, purchase_option), (cost, usage) in data_plane_groups.items():
+        purchase_option = purchase_option or 'Unknown'
+
+        total_amortized += cost
+
+        # Por servicio
+        cost_by_service[service] = cost_by_service.get(service, 0) + cost
+
+        # Por tipo de compra (normalizar nombres)
+        purchase_key = normalizar_tipo_compra(purchase_option)
+        if purchase_key:
+            cost_by_purchase[purchase_key] += cost
+
+    if total_amortized == 0:
+        logger.warning("❌ No se encontraron costos en el período")
+        return calculate_fallback_cost(cluster_name, instances, region, days)
+
+    # ============================================
+    # CALCULAR COSTO ON-DEMAND EQUIVALENTE
+    # ============================================
+    total_ondemand_equivalent = calculate_ondemand_equivalent(
+        cost_by_purchase, total_amortized
+    )
+
+    # ============================================
+    # CALCULAR AHORROS
+    # ============================================
+    monthly_cost = (total_amortized / actual_days) * 30
+    monthly_ondemand = (total_ondemand_equivalent / actual_days) * 30
+
+    total_savings_amount = monthly_ondemand - monthly_cost
+    savings_percentage = (total_savings_amount / monthly_ondemand * 100) if monthly_ondemand > 0 else 0
+
+    # Desglose de ahorros
+    ri_percentage = (cost_by_purchase['reserved'] / total_amortized * 100) if total_amortized > 0 else 0
+    sp_percentage = (cost_by_purchase['savings_plans'] / total_amortized * 100) if total_amortized > 0 else 0
+
+    # ============================================
+    # LOGGING DETALLADO
+    # ============================================
+    logger.info(f"")
+    logger.info(f"{'='*60}")
+    logger.info(f"📊 ANÁLISIS DE COSTOS - {cluster_name}")
+    logger.info(f"{'='*60}")
+    logger.info(f"")
+    logger.info(f"💰 COSTOS MENSUALES:")
+    logger.info(f"   Costo Real:       ${monthly_cost:>10.2f}/mes")
+    logger.info(f"   Costo On-Demand:  ${monthly_ondemand:>10.2f}/mes")
+    logger.info(f"   Ahorro Total:     ${total_savings_amount:>10.2f}/mes ({savings_percentage:.1f}%)")
+    logger.info(f"")
+    logger.info(f"📋 DESGLOSE POR TIPO DE COMPRA:")
+    logger.info(f"   On-Demand:        ${cost_by_purchase['on_demand']:>10.2f} ({cost_by_purchase['on_demand']/total_amortized*100:>5.1f}%)")
+    logger.info(f"   Reserved Inst.:   ${cost_by_purchase['reserved']:>10.2f} ({ri_percentage:>5.1f}%)")
+    logger.info(f"   Savings Plans:    ${cost_by_purchase['savings_plans']:>10.2f} ({sp_percentage:>5.1f}%)")
+    if cost_by_purchase['spot'] > 0:
+        logger.info(f"   Spot:             ${cost_by_purchase['spot']:>10.2f} ({cost_by_purchase['spot']/total_amortized*100:>5.1f}%)")
+    logger.info(f"")
+    logger.info(f"🏗️  DESGLOSE POR SERVICIO:")
+    for service, cost in sorted(cost_by_service.items(), key=lambda x: x[1], reverse=True):
+        service_monthly = (cost / actual_days) * 30
+        service_name = service.replace('Amazon ', '').replace('Elastic ', 'E')[:30]
+        logger.info("   %-30s $%10.2f/mes", service_name, service_monthly)
+    logger.info(f"{'='*60}")
+
+    # Verificar si hay control plane (ahora se busca explícitamente)
+    has_control_plane = EKS_SERVICE in cost_by_service
+    if not has_control_plane:
+        logger.warning(f"⚠️  No se detectó costo de Control Plane (debería ser ~$72/mes)")
+        logger.warning(f"⚠️  Verifica que el cluster esté activo en la región {region}")
+    else:
+        cp_cost = cost_by_service[EKS_SERVICE]
+        cp_monthly = (cp_cost / actual_days) * 30
+        logger.info(f"✅ Control Plane detectado: ${cp_monthly:.2f}/mes")
+
+    log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage',
+                   result=f"${monthly_cost:.2f}/mes (ahorro: {savings_percentage:.1f}%)")
+
+    return {
+        'monthly_cost': round(monthly_cost, 2),
+        'monthly_ondemand': round(monthly_ondemand, 2),
+        'savings_amount': round(total_savings_amount, 2),
+        'savings_percentage': round(savings_percentage, 1),
+        'ri_percentage': round(ri_percentage, 1),
+        'sp_percentage': round(sp_percentage, 1),
+        'by_service': {k: round((v/actual_days)*30, 2) for k, v in cost_by_service.items()},
+        'by_purchase': cost_by_purchase,
+        'has_control_plane': has_control_plane,
+        'data_source': data_source,
+        'days_analyzed': actual_days
+    }
+
+
+def cost_explorer_filter_cluster(cluster_name, region):
+    """Data Plane (tag del cluster) + Control Plane (servicio EKS en la región) en un solo filtro"""
+    return {
+        'Or': [
+            {
+                'Tags': {
+                    'Key': CLUSTER_TAG,
+                    'Values': [cluster_name]
+                }
+            },
+            {
+                'And': [
+                    {'Dimensions': {'Key': 'SERVICE', 'Values': [EKS_SERVICE]}},
+                    {'Dimensions': {'Key': 'REGION', 'Values': [region]}}
+                ]
+            }
+        ]
+    }
+
 def get_real_cost_from_cost_explorer(cluster_name, region, instances, days=30):
     """
     Obtiene costo real del cluster con análisis de ahorros
-    - Incluye Control Plane + Data Plane
+    - Incluye Control Plane + Data Plane en una única consulta (filtro Or,
+      agrupada por SERVICE y PURCHASE_TYPE); el Control Plane se separa
+      localmente por servicio
     - Calcula % ahorro por RIs y Savings Plans
     - Fallback si no encuentra tag
     """
     logger.info(f"Consultando Cost Explorer para cluster: {cluster_name} (últimos {days} días)")
-    ce = boto3.client('ce', region_name='us-east-1')  # Cost Explorer siempre en us-east-1
+    ce = create_client('ce', 'us-east-1')  # Cost Explorer siempre en us-east-1
 
     try:
         end_date = datetime.now().date() - timedelta(days=2)
@@ -433,171 +796,21 @@ def get_real_cost_from_cost_explorer(cluster_name, region, instances, days=30):
 
         logger.info(f"Período: {start_date} a {end_date}")
 
-        # ============================================
-        # QUERY 0: Control Plane (servicio EKS)
-        # ============================================
-        control_plane_cost_monthly = get_control_plane_cost(cluster_name, region, days)
-
-        # ============================================
-        # QUERY 1: Data Plane - Costo Real (con descuentos)
-        # ============================================
-        log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage', {
-            'cluster': cluster_name,
-            'start': start_date,
-            'end': end_date
-        })
-
-        response = ce.get_cost_and_usage(
-            TimePeriod={
-                'Start': start_date.strftime('%Y-%m-%d'),
-                'End': end_date.strftime('%Y-%m-%d')
-            },
-            Granularity='DAILY',
-            Metrics=['AmortizedCost', 'UsageQuantity'],  # ✅ Costo real con RIs/SPs
-            Filter={
-                'Tags': {
-                    'Key': 'aws:eks:cluster-name',
-                    'Values': [cluster_name]
-                }
-            },
-            GroupBy=[
-                {'Type': 'DIMENSION', 'Key': 'SERVICE'},
-                {'Type': 'DIMENSION', 'Key': 'PURCHASE_TYPE'}  # ✅ Tipo de compra
-            ]
-        )
-
-        # ============================================
-        # PROCESAR RESULTADOS
-        # ============================================
-        total_amortized = 0
-        cost_by_service = {}
-        cost_by_purchase = {
-            'on_demand': 0,
-            'reserved': 0,
-            'savings_plans': 0,
-            'spot': 0
-        }
-
-        # Agregar Control Plane si se obtuvo
-        if control_plane_cost_monthly and control_plane_cost_monthly > 0:
-            # Convertir costo mensual a costo del período
-            control_plane_cost_period = (control_plane_cost_monthly / 30) * days
-            total_amortized += control_plane_cost_period
-            cost_by_service['Amazon Elastic Kubernetes Service'] = control_plane_cost_period
-            logger.info(f"Control Plane agregado: ${control_plane_cost_monthly:.2f}/mes")
-
-        # Si no hay resultados de Data Plane pero sí Control Plane, continuar
-        if not response['ResultsByTime']:
-            if control_plane_cost_monthly and control_plane_cost_monthly > 0:
-                logger.warning("⚠️  Tag 'aws:eks:cluster-name' no encontrado para Data Plane")
-                logger.info("✅ Pero se encontró costo de Control Plane")
-                # Continuar con solo Control Plane
-            else:
-                logger.warning("❌ No se encontraron costos ni para Control Plane ni Data Plane")
-                return calculate_fallback_cost(cluster_name, instances, region, days)
-
-        for result in response['ResultsByTime']:
-            for group in result.get('Groups', []):
-                service = group['Keys'][0]
-                purchase_option = group['Keys'][1] if len(group['Keys']) > 1 else 'Unknown'
-
-                cost = float(group['Metrics']['AmortizedCost']['Amount'])
-                usage = float(group['Metrics']['UsageQuantity']['Amount'])
-
-                total_amortized += cost
-
-                # Por servicio
-                cost_by_service[service] = cost_by_service.get(service, 0) + cost
-
-                # Por tipo de compra (normalizar nombres)
-                po_lower = purchase_option.lower()
-                if 'on demand' in po_lower or 'ondemand' in po_lower:
-                    cost_by_purchase['on_demand'] += cost
-                elif 'reserved' in po_lower or 'reservation' in po_lower:
-                    cost_by_purchase['reserved'] += cost
-                elif 'saving' in po_lower:
-                    cost_by_purchase['savings_plans'] += cost
-                elif 'spot' in po_lower:
-                    cost_by_purchase['spot'] += cost
-
-        if total_amortized == 0:
-            logger.warning("❌ No se encontraron costos en el período")
-            return calculate_fallback_cost(cluster_name, instances, region, days)
-
-        # ============================================
-        # CALCULAR COSTO ON-DEMAND EQUIVALENTE
-        # ============================================
-        total_ondemand_equivalent = calculate_ondemand_equivalent(
-            cost_by_purchase, total_amortized
-        )
-
-        # ============================================
-        # CALCULAR AHORROS
-        # ============================================
-        actual_days = (end_date - start_date).days
-        monthly_cost = (total_amortized / actual_days) * 30
-        monthly_ondemand = (total_ondemand_equivalent / actual_days) * 30
-
-        total_savings_amount = monthly_ondemand - monthly_cost
-        savings_percentage = (total_savings_amount / monthly_ondemand * 100) if monthly_ondemand > 0 else 0
-
-        # Desglose de ahorros
-        ri_percentage = (cost_by_purchase['reserved'] / total_amortized * 100) if total_amortized > 0 else 0
-        sp_percentage = (cost_by_purchase['savings_plans'] / total_amortized * 100) if total_amortized > 0 else 0
-
-        # ============================================
-        # LOGGING DETALLADO
-        # ============================================
-        logger.info(f"")
-        logger.info(f"{'='*60}")
-        logger.info(f"📊 ANÁLISIS DE COSTOS - {cluster_name}")
-        logger.info(f"{'='*60}")
-        logger.info(f"")
-        logger.info(f"💰 COSTOS MENSUALES:")
-        logger.info(f"   Costo Real:       ${monthly_cost:>10.2f}/mes")
-        logger.info(f"   Costo On-Demand:  ${monthly_ondemand:>10.2f}/mes")
-        logger.info(f"   Ahorro Total:     ${total_savings_amount:>10.2f}/mes ({savings_percentage:.1f}%)")
-        logger.info(f"")
-        logger.info(f"📋 DESGLOSE POR TIPO DE COMPRA:")
-        logger.info(f"   On-Demand:        ${cost_by_purchase['on_demand']:>10.2f} ({cost_by_purchase['on_demand']/total_amortized*100:>5.1f}%)")
-        logger.info(f"   Reserved Inst.:   ${cost_by_purchase['reserved']:>10.2f} ({ri_percentage:>5.1f}%)")
-        logger.info(f"   Savings Plans:    ${cost_by_purchase['savings_plans']:>10.2f} ({sp_percentage:>5.1f}%)")
-        if cost_by_purchase['spot'] > 0:
-            logger.info(f"   Spot:             ${cost_by_purchase['spot']:>10.2f} ({cost_by_purchase['spot']/total_amortized*100:>5.1f}%)")
-        logger.info(f"")
-        logger.info(f"🏗️  DESGLOSE POR SERVICIO:")
-        for service, cost in sorted(cost_by_service.items(), key=lambda x: x[1], reverse=True):
-            service_monthly = (cost / actual_days) * 30
-            service_name = service.replace('Amazon ', '').replace('Elastic ', 'E')[:30]
-            logger.info(f"   {service_name:<30} ${service_monthly:>10.2f}/mes")
-        logger.info(f"{'='*60}")
-
-        # Verificar si hay control plane (ahora se busca explícitamente)
-        has_control_plane = 'Amazon Elastic Kubernetes Service' in cost_by_service
-        if not has_control_plane:
-            logger.warning(f"⚠️  No se detectó costo de Control Plane (debería ser ~$72/mes)")
-            logger.warning(f"⚠️  Verifica que el cluster esté activo en la región {region}")
-        else:
-            cp_cost = cost_by_service['Amazon Elastic Kubernetes Service']
-            cp_monthly = (cp_cost / actual_days) * 30
-            logger.info(f"✅ Control Plane detectado: ${cp_monthly:.2f}/mes")
-
-        log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage',
-                       result=f"${monthly_cost:.2f}/mes (ahorro: {savings_percentage:.1f}%)")
-
-        return {
-            'monthly_cost': round(monthly_cost, 2),
-            'monthly_ondemand': round(monthly_ondemand, 2),
-            'savings_amount': round(total_savings_amount, 2),
-            'savings_percentage': round(savings_percentage, 1),
-            'ri_percentage': round(ri_percentage, 1),
-            'sp_percentage': round(sp_percentage, 1),
-            'by_service': {k: round((v/actual_days)*30, 2) for k, v in cost_by_service.items()},
-            'by_purchase': cost_by_purchase,
-            'has_control_plane': has_control_plane,
-            'data_source': 'Cost Explorer',
-            'days_analyzed': actual_days
-        }
+        # Solo los días que el ledger local no tiene finalizados
+        ledger = get_default_ledger()
+        key = clave_cluster(cluster_name, region)
+        sync_cost_explorer(ce, ledger, key, start_date, end_date,
+                           'get_cost_and_usage', {'cluster': cluster_name, 'region': region},
+                           Granularity='DAILY',
+                           Metrics=['AmortizedCost', 'UsageQuantity'],  # ✅ Costo real con RIs/SPs
+                           Filter=cost_explorer_filter_cluster(cluster_name, region),
+                           GroupBy=[
+                               {'Type': 'DIMENSION', 'Key': 'SERVICE'},
+                               {'Type': 'DIMENSION', 'Key': 'PURCHASE_TYPE'}  # ✅ Tipo de compra
+                           ])
+        grupos = ledger.totales(key, start_date, end_date)
+
+        return costos_desde_grupos(cluster_name, region, grupos, (end_date - start_date).days, instances, days)
 
     except Exception as e:
         logger.error(f"❌ Error en Cost Explorer: {e}")
@@ -605,52 +818,201 @@ def get_real_cost_from_cost_explorer(cluster_name, region, instances, days=30):
         print(f"⚠️  Error consultando Cost Explorer: {e}", file=sys.stderr)
         return calculate_fallback_cost(cluster_name, instances, region, days)
 
-def main():
-    logger.info("=== INICIANDO RECOLECTOR AWS ===")
-    
-    print("Nombre del cluster EKS: ", end='', file=sys.stderr, flush=True)
-    cluster_name = input().strip() or "ppay-arg-dev-eks-tools"
-    
-    print("Región AWS (default: us-east-1): ", end='', file=sys.stderr, flush=True)
-    region = input().strip() or "us-east-1"
-    
-    logger.info(f"Parámetros: cluster={cluster_name}, region={region}")
-    
-    print(f"\n⏳ Recolectando datos del cluster {cluster_name} en {region}...", file=sys.stderr)
-    
-    # Obtener información del cluster
-    cluster_info = get_cluster_info(cluster_name, region)
-    if not cluster_info:
-        logger.error("No se pudo obtener información del cluster")
-        sys.exit(1)
-    
-    print(f"✅ Cluster encontrado: {cluster_info['name']} (versión {cluster_info['version']})", file=sys.stderr)
-    
-    # Obtener nodos
-    instances = get_cluster_nodes(cluster_name, region)
-    if not instances:
-        logger.error("No se encontraron nodos en el cluster")
-        print("❌ No se encontraron nodos en el cluster", file=sys.stderr)
-        sys.exit(1)
-    
-    node_count = len(instances)
-    instance_types = [inst['instance_type'] for inst in instances]
-    primary_instance = Counter(instance_types).most_common(1)[0][0]
-    
-    logger.info(f"Nodos: {node_count}, Tipo principal: {primary_instance}")
-    print(f"✅ Nodos encontrados: {node_count} ({primary_instance})", file=sys.stderr)
-    
-    # Obtener métricas de utilización con cascada de fallback
-    logger.info("=== Iniciando obtención de métricas de utilización ===")
-    cpu_util = None
-    mem_util = None
-    metric_source = None
+def _group_tag_value(key):
+    """'aws:eks:cluster-name$prod' -> 'prod' (vacío si el recurso no tiene el tag)"""
+    return key.split('$', 1)[1] if '$' in key else key
+
+@dataclass
+class AtribucionCostos:
+    """
+    Costos de Cost Explorer agregados por cluster en una pasada
+
+    data_plane: {cluster: {tipo de compra: (costo amortizado, uso)}} según el
+    tag aws:eks:cluster-name; control_plane: {región: costo del servicio EKS}
+    """
+    days: int
+    data_plane: dict = field(default_factory=dict)
+    control_plane: dict = field(default_factory=dict)
+    requests: int = 0
+
+    def agregar_data_plane(self, totales):
+        """Suma los totales del ledger agrupados por TAG aws:eks:cluster-name y PURCHASE_TYPE"""
+        for (tag, purchase), (cost, usage) in totales.items():
+            name = _group_tag_value(tag)
+            if not name:
+                continue
+            previous = self.data_plane.setdefault(name, {}).get(purchase, (0.0, 0.0))
+            self.data_plane[name][purchase] = (previous[0] + cost, previous[1] + usage)
+
+    def agregar_control_plane(self, totales):
+        """Suma los totales del ledger del servicio EKS agrupados por REGION"""
+        for (region, _), (cost, _) in totales.items():
+            self.control_plane[region] = self.control_plane.get(region, 0.0) + cost
+
+    def clusters(self):
+        return sorted(self.data_plane)
+
+    def total(self, cluster_name):
+        return sum(cost for cost, _ in self.data_plane.get(cluster_name, {}).values())
+
+    def tabla(self):
+        """
+        Resumen mensualizado del Data Plane por cluster, de mayor a menor costo
+
+        Returns:
+            list: [{'cluster', 'monthly_cost', 'monthly_ondemand', 'savings_percentage',
+                    'on_demand', 'reserved', 'savings_plans', 'spot'}, ...]
+        """
+        rows = []
+        for name, purchases in self.data_plane.items():
+            cost_by_purchase = {'on_demand': 0, 'reserved': 0, 'savings_plans': 0, 'spot': 0}
+            for purchase, (cost, _) in purchases.items():
+                purchase_key = normalizar_tipo_compra(purchase)
+                if purchase_key:
+                    cost_by_purchase[purchase_key] += cost
+            total = self.total(name)
+            ondemand = calculate_ondemand_equivalent(cost_by_purchase, total)
+            rows.append({
+                'cluster': name,
+                'monthly_cost': round(total / self.days * 30, 2),
+                'monthly_ondemand': round(ondemand / self.days * 30, 2),
+                'savings_percentage': round((ondemand - total) / ondemand * 100, 1) if ondemand > 0 else 0.0,
+                **{key: round(value / self.days * 30, 2) for key, value in cost_by_purchase.items()},
+            })
+        return sorted(rows, key=lambda row: row['monthly_cost'], reverse=True)
+
+    def cost_data(self, cluster_name, region, clusters_region=1, data_source='Cost Explorer (flota)'):
+        """
+        cost_data del recolector para un cluster (None si no tiene Data Plane etiquetado)
+
+        El Control Plane de la región se reparte en partes iguales entre sus
+        `clusters_region` clusters: Cost Explorer no lo separa por cluster.
+        """
+        if cluster_name not in self.data_plane:
+            return None
+        grupos = {(DATA_PLANE_SERVICE, purchase): values for purchase, values in self.data_plane[cluster_name].items()}
+        if self.control_plane.get(region):
+            grupos[(EKS_SERVICE, '')] = (self.control_plane[region] / max(clusters_region, 1), 0.0)
+        return costos_desde_grupos(cluster_name, region, grupos, self.days, days=self.days, data_source=data_source)
+
+def atribuir_costos(cluster_names=None, regions=None, days=30):
+    """
+    Trae los costos de EKS de la cuenta en una pasada: una consulta del Data
+    Plane agrupada por TAG aws:eks:cluster-name y PURCHASE_TYPE y otra del
+    Control Plane agrupada por REGION, en paralelo. Las requests son
+    O(páginas) y no O(clusters).
+
+    Las filas diarias pasan por el ledger local (claves flota:* y
+    control_plane_flota:*): las ejecuciones siguientes solo piden los días
+    pendientes y la tabla por cluster se arma con sumas locales.
+
+    El tag no distingue regiones: dos clusters con el mismo nombre comparten
+    el Data Plane, y el Control Plane de una región suma todos sus clusters.
 
-    # 1. Intentar Container Insights (más preciso)
-    print(f"⏳ Intentando obtener métricas de Container Insights...", file=sys.stderr)
-    cpu_util = get_cpu_utilization(cluster_name, region)
-    mem_util = get_memory_utilization(cluster_name, region)
+    Args:
+        cluster_names: Limita el Data Plane a estos clusters; None trae todo el
+                       costo de la cuenta que tenga el tag
+        regions: Limita el Control Plane a estas regiones (None: todas)
 
+    Returns:
+        AtribucionCostos
+    """
+    ce = create_client('ce', 'us-east-1')
+    end_date = datetime.now().date() - timedelta(days=2)
+    start_date = end_date - timedelta(days=days)
+
+    if cluster_names is None:
+        tag_filter = {'Not': {'Tags': {'Key': CLUSTER_TAG, 'MatchOptions': ['ABSENT']}}}
+        log_params = {'clusters': 'todos'}
+    else:
+        tag_filter = {'Tags': {'Key': CLUSTER_TAG, 'Values': sorted(cluster_names)}}
+        log_params = {'clusters': len(cluster_names)}
+    service_filter = {'Dimensions': {'Key': 'SERVICE', 'Values': [EKS_SERVICE]}}
+    if regions:
+        control_plane_filter = {'And': [service_filter, {'Dimensions': {'Key': 'REGION', 'Values': sorted(regions)}}]}
+    else:
+        control_plane_filter = service_filter
+
+    ledger = get_default_ledger()
+    atribucion = AtribucionCostos(days=days)
+    queries = [
+        (clave_flota(cluster_names), 'get_cost_and_usage_fleet', log_params, atribucion.agregar_data_plane, {
+            'Metrics': ['AmortizedCost', 'UsageQuantity'], 'Filter': tag_filter,
+            'GroupBy': [{'Type': 'TAG', 'Key': CLUSTER_TAG}, {'Type': 'DIMENSION', 'Key': 'PURCHASE_TYPE'}]}),
+        (clave_control_plane_flota(regions), 'get_cost_and_usage_control_plane_fleet', {'regions': regions or 'todas'},
+         atribucion.agregar_control_plane, {
+            'Metrics': ['AmortizedCost'], 'Filter': control_plane_filter,
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'REGION'}]}),
+    ]
+
+    def run(clave, operation, params, agregar, query):
+        requests_made = sync_cost_explorer(ce, ledger, clave, start_date, end_date, operation, params,
+                                           Granularity='DAILY', **query)
+        agregar(ledger.totales(clave, start_date, end_date))
+        return requests_made
+
+    # Cada consulta usa su propia clave del ledger y su propia tabla, así que pueden correr en paralelo
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        futures = [executor.submit(run, *query) for query in queries]
+        atribucion.requests = sum(future.result() for future in futures)
+
+    logger.info(f"Atribución de costos: {len(atribucion.data_plane)} clusters y "
+                f"{len(atribucion.control_plane)} regiones en {atribucion.requests} requests")
+    return atribucion
+
+def get_fleet_costs(clusters, days=30, account_wide=False):
+    """
+    Costos de varios clusters de la misma cuenta con atribuir_costos() en
+    lugar de una consulta por cluster
+
+    Args:
+        clusters: Lista de (cluster_name, region) de una misma cuenta
+        account_wide: Trae todo el costo etiquetado de la cuenta en lugar de
+                      filtrar por los nombres (evita listas largas de valores)
+
+    Returns:
+        dict: {(cluster_name, region): cost_data} solo para los clusters con
+              costos (los demás siguen con la consulta individual); vacío si
+              Cost Explorer falla
+    """
+    if not clusters:
+        return {}
+    names = {name for name, _ in clusters}
+    regions = {region for _, region in clusters}
+    logger.info(f"Consultando Cost Explorer para {len(names)} clusters en {len(regions)} regiones (últimos {days} días)")
+    try:
+        atribucion = atribuir_costos(None if account_wide else names, regions, days)
+    except Exception as e:
+        logger.error(f"❌ Error en Cost Explorer (flota): {e}")
+        log_aws_api_call(logger, 'CostExplorer', 'get_cost_and_usage_fleet', error=str(e))
+        return {}
+
+    # Cada cluster de la flota paga su parte del Control Plane de la región, no el total
+    clusters_region = Counter(region for _, region in set(clusters))
+    costs = {}
+    for name, region in clusters:
+        cost_data = atribucion.cost_data(name, region, clusters_region[region])
+        if cost_data is not None:
+            costs[(name, region)] = cost_data
+    ajenos = set(atribucion.data_plane) - names
+    if ajenos:
+        logger.info(f"Costos etiquetados de {len(ajenos)} clusters fuera de la flota: {', '.join(sorted(ajenos))}")
+    logger.info(f"Costos de flota: {len(costs)}/{len(clusters)} clusters con Data Plane etiquetado")
+    return costs
+
+def resolve_utilization(cluster_name, region, instances, cpu_ci, mem_ci, interactive=True):
+    """
+    Cascada de fallback de métricas de utilización a partir del resultado de
+    Container Insights (ya consultado en paralelo por el planificador)
+
+    Returns:
+        tuple: (cpu_util, mem_util, metric_source)
+    """
+    cpu_util = cpu_ci
+    mem_util = mem_ci
+    metric_source = None
+
+    # 1. Container Insights (más preciso)
     if cpu_util is not None and mem_util is not None:
         metric_source = "Container Insights"
         logger.info(f"✅ Métricas obtenidas de Container Insights - CPU: {cpu_util}%, Memoria: {mem_util}%")
@@ -662,7 +1024,7 @@ def main():
         print(f"⚠️  Container Insights no disponible", file=sys.stderr)
         print(f"⏳ Intentando obtener métricas EC2 básicas...", file=sys.stderr)
 
-        instance_ids = [inst['instance_id'] for inst in instances]
+        instance_ids = (inst['instance_id'] for inst in instances)
         cpu_util_ec2 = get_ec2_cpu_utilization(instance_ids, region)
 
         if cpu_util_ec2 is not None:
@@ -682,7 +1044,7 @@ def main():
             print(f"⚠️  Métricas EC2 no disponibles", file=sys.stderr)
             print(f"⏳ Analizando patrones de Auto Scaling Groups...", file=sys.stderr)
 
-            asg_analysis = analyze_asg_stability(cluster_name, region)
+            asg_analysis = analyze_asg_stability(cluster_name, region, instances=instances)
 
             if not asg_analysis.get('scaling_observed'):
                 # ASG estático = cluster probablemente sobreaprovisionado
@@ -693,9 +1055,11 @@ def main():
                 print(f"⚠️  ASG no ha escalado en 30 días - cluster posiblemente sobreaprovisionado", file=sys.stderr)
                 print(f"   Usando valores conservadores: CPU: {cpu_util}%, Memoria: {mem_util}%", file=sys.stderr)
             else:
-                # 4. Intentar input manual
-                logger.info("ASG con escalado observado, ofreciendo input manual...")
-                cpu_manual, mem_manual = get_manual_utilization()
+                # 4. Intentar input manual (solo en modo interactivo)
+                cpu_manual, mem_manual = None, None
+                if interactive:
+                    logger.info("ASG con escalado observado, ofreciendo input manual...")
+                    cpu_manual, mem_manual = get_manual_utilization()
 
                 if cpu_manual is not None and mem_manual is not None:
                     cpu_util = cpu_manual
@@ -715,10 +1079,193 @@ def main():
 
     logger.info(f"Métricas finales - Fuente: {metric_source}, CPU: {cpu_util}%, MEM: {mem_util}%")
     print(f"   Fuente de métricas: {metric_source}", file=sys.stderr)
+    return cpu_util, mem_util, metric_source
+
+def build_collector_stages(cluster_name, region, interactive=True, cost_data=None):
+    """
+    Describe el recolector como un grafo de etapas con entradas declaradas.
+
+    Cadenas independientes (se ejecutan en paralelo):
+      - cluster_info
+      - nodegroups, nodes -> instances (nodos anotados con su node group)
+      - cost_ce (Control Plane + Data Plane en una consulta)
+      - cpu_ci, mem_ci -> utilization (cascada de fallback, requiere instances)
+
+    cost une cost_ce con nodes: Cost Explorer no espera a los nodos, que
+    solo hacen falta para el fallback sin tag. Del mismo modo, describe_instances
+    no espera al inventario de node groups: instances los une al final.
+
+    cpu_ci y mem_ci entregan la serie completa (SerieUtilizacion); la cascada
+    trabaja sobre sus promedios. Con `cost_data` (ya obtenido, por ejemplo por
+    get_fleet_costs) no se consulta Cost Explorer.
+    """
+    def series(metric_name, label):
+        def stage():
+            try:
+                return get_utilization_series(cluster_name, region, metric_name)
+            except Exception as e:
+                log_aws_api_call(logger, 'CloudWatch', 'get_metric_data', error=str(e))
+                print(f"⚠️  No se pudo obtener {label} de CloudWatch: {e}", file=sys.stderr)
+                return None
+        return stage
+
+    def utilization(cluster_info, instances, cpu_ci, mem_ci):
+        # Sin cluster o sin nodos no tiene sentido seguir la cascada (ni pedir input manual)
+        if not cluster_info or not instances:
+            return None
+        cpu_avg = round(cpu_ci.promedio(), 2) if cpu_ci is not None else None
+        mem_avg = round(mem_ci.promedio(), 2) if mem_ci is not None else None
+        return resolve_utilization(cluster_name, region, instances, cpu_avg, mem_avg, interactive)
+
+    def cost_ce():
+        if cost_data is not None:
+            return cost_data
+        print(f"⏳ Consultando costo real en Cost Explorer...", file=sys.stderr)
+        return get_real_cost_from_cost_explorer(cluster_name, region, ())
+
+    def cost(cost_ce, nodes):
+        if not nodes:
+            return None
+        if cost_ce and cost_ce.get('data_source') == FALLBACK_SOURCE:
+            log_fallback_instances(nodes)
+        return cost_ce
+
+    return [
+        Stage('cluster_info', lambda: get_cluster_info(cluster_name, region)),
+        Stage('nodegroups', lambda: get_nodegroup_inventory(cluster_name, region, refresh=True)),
+        Stage('nodes', lambda: get_cluster_nodes(cluster_name, region)),
+        Stage('instances', lambda nodes, nodegroups: anotar_nodegroups(nodes, nodegroups), ('nodes', 'nodegroups')),
+        Stage('cpu_ci', series('node_cpu_utilization', 'CPU')),
+        Stage('mem_ci', series('node_memory_utilization', 'memoria')),
+        Stage('utilization', utilization, ('cluster_info', 'instances', 'cpu_ci', 'mem_ci')),
+        Stage('cost_ce', cost_ce),
+        Stage('cost', cost, ('cost_ce', 'nodes')),
+    ]
+
+class RecoleccionError(Exception):
+    """No se pudieron recolectar los datos mínimos del cluster (cluster o nodos)"""
+
+@dataclass
+class DatosCluster:
+    """Resultado estructurado del recolector"""
+    cluster_name: str
+    region: str
+    cluster_version: str
+    instances: list
+    primary_instance: str
+    cpu_util: float
+    mem_util: float
+    metric_source: str
+    cost_data: dict = field(default_factory=dict)
+    # Series de Container Insights (None con otras fuentes de métricas)
+    cpu_series: Optional[SerieUtilizacion] = None
+    mem_series: Optional[SerieUtilizacion] = None
+    # Inventario de managed node groups (get_nodegroup_inventory)
+    nodegroups: list = field(default_factory=list)
+
+    @property
+    def node_count(self):
+        return len(self.instances)
+
+    @property
+    def instance_mix(self):
+        """Histograma {tipo de instancia: nodos}, del más común al menos común"""
+        return dict(Counter(inst['instance_type'] for inst in self.instances).most_common())
+
+    def to_env(self):
+        """Variables EKS_* del formato de compatibilidad (export KEY='valor')"""
+        cost_data = self.cost_data
+        env = {
+            'EKS_PRIMARY_INSTANCE': self.primary_instance,
+            'EKS_NODE_COUNT': str(self.node_count),
+            'EKS_UTIL_CPU': str(self.cpu_util),
+            'EKS_UTIL_MEM': str(self.mem_util),
+            'AWS_REGION': self.region,
+            'EKS_MONTHLY_COST': str(cost_data.get('monthly_cost', 0)),
+            'EKS_MONTHLY_COST_ONDEMAND': str(cost_data.get('monthly_ondemand', 0)),
+            'EKS_SAVINGS_PERCENTAGE': str(cost_data.get('savings_percentage', 0)),
+            'EKS_METRIC_SOURCE': self.metric_source,
+            'EKS_COST_SOURCE': cost_data.get('data_source', 'Unknown'),
+            'EKS_INSTANCE_MIX': ','.join(f"{t}={n}" for t, n in self.instance_mix.items()),
+        }
+        if self.cpu_series is not None and self.mem_series is not None:
+            # Percentiles y perfil por hora de la semana (168 valores, lunes 00:00 UTC primero)
+            for key, serie in (('CPU', self.cpu_series), ('MEM', self.mem_series)):
+                for p, value in serie.percentiles().items():
+                    env[f"EKS_UTIL_{key}_P{p}"] = f"{value:.2f}"
+                env[f"EKS_UTIL_{key}_PROFILE"] = formatear_perfil(serie.perfil_semanal())
+        return env
+
+def format_env_exports(env_vars):
+    """
+    Líneas `export KEY='valor'` con quoting de shell: las comillas simples
+    dentro del valor se escapan, así `eval` y shlex las interpretan bien
+    """
+    def quote(value):
+        return "'" + str(value).replace("'", "'\"'\"'") + "'"
+    return '\n'.join(f"export {key}={quote(value)}" for key, value in env_vars.items())
+
+def recolectar_cluster(cluster_name, region, interactive=True, cost_data=None):
+    """
+    Ejecuta el recolector completo en proceso
+
+    Args:
+        interactive: Permite pedir métricas manuales por input() como último recurso
+        cost_data: Costos ya obtenidos (get_fleet_costs); evita consultar Cost Explorer
+
+    Returns:
+        DatosCluster
+
+    Raises:
+        RecoleccionError: si no se encuentra el cluster o no tiene nodos
+    """
+    logger.info(f"Parámetros: cluster={cluster_name}, region={region}")
     
-    # Obtener costo real desde Cost Explorer
-    print(f"⏳ Consultando costo real en Cost Explorer...", file=sys.stderr)
-    cost_data = get_real_cost_from_cost_explorer(cluster_name, region, instances)
+    print(f"\n⏳ Recolectando datos del cluster {cluster_name} en {region}...", file=sys.stderr)
+    print(f"⏳ Consultando cluster, nodos, métricas de Container Insights y costos en paralelo...", file=sys.stderr)
+
+    try:
+        results = run_stages(build_collector_stages(cluster_name, region, interactive, cost_data))
+    finally:
+        # El inventario ya quedó en results: en una flota el cache no crece por cluster
+        clear_nodegroup_inventory(cluster_name, region)
+
+    # Obtener información del cluster
+    cluster_info = results['cluster_info']
+    if not cluster_info:
+        logger.error("No se pudo obtener información del cluster")
+        raise RecoleccionError(f"No se pudo obtener información del cluster {cluster_name}")
+    
+    print(f"✅ Cluster encontrado: {cluster_info['name']} (versión {cluster_info['version']})", file=sys.stderr)
+    
+    # Obtener nodos (con su node group)
+    instances = results['instances']
+    if not instances:
+        logger.error("No se encontraron nodos en el cluster")
+        print("❌ No se encontraron nodos en el cluster", file=sys.stderr)
+        raise RecoleccionError(f"No se encontraron nodos en el cluster {cluster_name}")
+    
+    node_count = len(instances)
+    instance_mix = Counter(inst['instance_type'] for inst in instances).most_common()
+    primary_instance = instance_mix[0][0]
+    
+    logger.info(f"Nodos: {node_count}, Tipo principal: {primary_instance}, Mix: {instance_mix}")
+    mix_desc = ', '.join(f"{n} x {t}" for t, n in instance_mix)
+    print(f"✅ Nodos encontrados: {node_count} ({mix_desc})", file=sys.stderr)
+    if results['nodegroups']:
+        print(f"   Node groups: " + ', '.join(f"{ng['name']} ({ng['capacity_type']}, "
+                                              f"{ng['scaling'].get('minSize', '?')}-{ng['scaling'].get('maxSize', '?')})"
+                                              for ng in results['nodegroups']), file=sys.stderr)
+    
+    cpu_util, mem_util, metric_source = results['utilization']
+    cost_data = results['cost']
+
+    # Las series solo describen el cluster si la utilización salió de Container Insights
+    cpu_series = mem_series = None
+    if metric_source == "Container Insights":
+        cpu_series, mem_series = results['cpu_ci'], results['mem_ci']
+        print(f"   CPU p50/p95/p99: {_format_percentiles(cpu_series)}, "
+              f"Memoria p50/p95/p99: {_format_percentiles(mem_series)}", file=sys.stderr)
 
     # Mostrar resultados al usuario
     if cost_data and cost_data.get('monthly_cost', 0) > 0:
@@ -750,25 +1297,43 @@ def main():
             'data_source': 'No disponible'
         }
 
-    # Generar variables de entorno (a stdout)
-    env_vars = {
-        'EKS_PRIMARY_INSTANCE': primary_instance,
-        'EKS_NODE_COUNT': str(node_count),
-        'EKS_UTIL_CPU': str(cpu_util),
-        'EKS_UTIL_MEM': str(mem_util),
-        'AWS_REGION': region,
-        'EKS_MONTHLY_COST': str(cost_data.get('monthly_cost', 0)),
-        'EKS_MONTHLY_COST_ONDEMAND': str(cost_data.get('monthly_ondemand', 0)),
-        'EKS_SAVINGS_PERCENTAGE': str(cost_data.get('savings_percentage', 0)),
-        'EKS_METRIC_SOURCE': metric_source,
-        'EKS_COST_SOURCE': cost_data.get('data_source', 'Unknown')
-    }
+    return DatosCluster(
+        cluster_name=cluster_name,
+        region=region,
+        cluster_version=cluster_info['version'],
+        instances=instances,
+        primary_instance=primary_instance,
+        cpu_util=cpu_util,
+        mem_util=mem_util,
+        metric_source=metric_source,
+        cost_data=cost_data,
+        cpu_series=cpu_series,
+        mem_series=mem_series,
+        nodegroups=results['nodegroups'] or []
+    )
 
-    logger.info(f"Variables generadas: {env_vars}")
+def main():
+    logger.info("=== INICIANDO RECOLECTOR AWS ===")
+    
+    print("Nombre del cluster EKS: ", end='', file=sys.stderr, flush=True)
+    cluster_name = input().strip() or "ppay-arg-dev-eks-tools"
     
-    for key, value in env_vars.items():
-        print(f"export {key}='{value}'")
+    print("Región AWS (default: us-east-1): ", end='', file=sys.stderr, flush=True)
+    region = input().strip() or "us-east-1"
+
+    try:
+        datos = recolectar_cluster(cluster_name, region)
+    except RecoleccionError:
+        sys.exit(1)
+
+    # Generar variables de entorno (a stdout)
+    env_vars = datos.to_env()
+    logger.info(f"Variables generadas: {env_vars}")
+    print(format_env_exports(env_vars))
     
+    logger.info("Llamadas a AWS: %s", call_metrics.totals())
+    # El resumen va a stderr: stdout queda solo con los exports
+    finalizar_instrumentacion()
     logger.info("=== RECOLECTOR AWS COMPLETADO ===")
 
 if __name__ == "__main__":
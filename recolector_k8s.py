@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Recolector de requests de pods desde el API de Kubernetes.
+
+Lista pods y nodos en páginas (`limit`/`continue`) y guarda de cada uno solo
+lo que usa la calculadora (nodo, requests efectivos, asignable), así la
+memoria queda acotada aun en clusters de 20k pods. El estado se cachea en
+disco con el resourceVersion de cada lista: las ejecuciones siguientes
+aplican los cambios con un watch desde esa versión en lugar de volver a
+listar todo (si la versión expiró, el API responde 410 y se lista de nuevo).
+
+El resultado es el requested vs asignable de CPU/memoria por nodo, que la
+calculadora usa para el waste_factor (EKS_REQUESTS_CPU/EKS_REQUESTS_MEM), y
+los pods para el bin packing.
+
+Uso:
+    python3 recolector_k8s.py --context mi-cluster
+    python3 recolector_k8s.py --context mi-cluster --output pods.json   # workloads para --workloads
+    python3 recolector_k8s.py --context mi-cluster --env                # exports para la calculadora
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from logger_utils import setup_logger
+from empaquetado_nodos import parse_cpu, parse_memory, requests_pod, Workloads
+
+logger = setup_logger('recolector_k8s', 'eks_collector_k8s.log')
+
+CACHE_DIR = os.environ.get('EKS_CALCULATOR_CACHE_DIR', 'cache')
+FORMAT_VERSION = 1
+
+# Objetos por página de las listas
+PAGE_SIZE = int(os.getenv('EKS_K8S_PAGE_SIZE', '500'))
+# Segundos que el API server mantiene abierto el watch de cambios: los eventos
+# pendientes desde el resourceVersion llegan enseguida, el resto es espera
+WATCH_TIMEOUT = int(os.getenv('EKS_K8S_WATCH_TIMEOUT', '2'))
+
+# Los pods terminados no ocupan capacidad: el API server los filtra en la
+# lista y los informa como DELETED en el watch cuando dejan de cumplir el filtro
+POD_FIELD_SELECTOR = 'status.phase!=Succeeded,status.phase!=Failed'
+INSTANCE_TYPE_LABELS = ('node.kubernetes.io/instance-type', 'beta.kubernetes.io/instance-type')
+
+HTTP_GONE = 410
+
+def _registro_pod(pod):
+    """[nodo, cpu, memoria] (nodo None si todavía no fue programado)"""
+    cpu, memory = requests_pod(pod)
+    return [pod.get('spec', {}).get('nodeName'), round(cpu, 4), round(memory, 6)]
+
+def _registro_nodo(node):
+    """[tipo de instancia, cpu asignable, memoria asignable]"""
+    labels = node.get('metadata', {}).get('labels', {})
+    allocatable = node.get('status', {}).get('allocatable', {})
+    instance_type = next((labels[label] for label in INSTANCE_TYPE_LABELS if label in labels), None)
+    return [instance_type, parse_cpu(allocatable.get('cpu', 0)), round(parse_memory(allocatable.get('memory', 0)), 6)]
+
+def _terminado(pod):
+    return pod.get('status', {}).get('phase') in ('Succeeded', 'Failed')
+
+class CacheK8s:
+    """
+    Estado compacto de pods y nodos del cluster con el resourceVersion de
+    cada recurso, para retomar con un watch desde donde quedó
+
+    pods: {uid: [nodo, cpu, memoria]}
+    nodes: {nombre: [tipo de instancia, cpu asignable, memoria asignable]}
+    """
+
+    RECURSOS = ('pods', 'nodes')
+
+    def __init__(self):
+        self.objetos = {'pods': {}, 'nodes': {}}
+        self.versiones = {'pods': None, 'nodes': None}
+        self.listados = 0
+        self.eventos = 0
+
+    @property
+    def pods(self):
+        return self.objetos['pods']
+
+    @property
+    def nodes(self):
+        return self.objetos['nodes']
+
+    def _llamada(self, api, recurso):
+        if recurso == 'pods':
+            return lambda **kw: api.list_pod_for_all_namespaces(field_selector=POD_FIELD_SELECTOR, **kw)
+        return api.list_node
+
+    def _clave_y_registro(self, recurso, objeto):
+        metadata = objeto.get('metadata', {})
+        if recurso == 'pods':
+            return metadata.get('uid') or f"{metadata.get('namespace')}/{metadata.get('name')}", _registro_pod
+        return metadata.get('name'), _registro_nodo
+
+    def listar(self, api, recurso, page_size=None):
+        """Lista completa en páginas; reemplaza el estado del recurso al terminar"""
+        from kubernetes.client.rest import ApiException
+
+        llamada = self._llamada(api, recurso)
+        page_size = page_size or PAGE_SIZE
+        objetos, token, paginas = {}, None, 0
+        while True:
+            kwargs = {'limit': page_size, '_preload_content': False}
+            if token:
+                kwargs['_continue'] = token
+            try:
+                page = json.loads(llamada(**kwargs).data)
+            except ApiException as e:
+                if e.status != HTTP_GONE or not token:
+                    raise
+                # El token de continuación expiró: se empieza de nuevo
+                logger.warning("Token de continuación de %s expirado, listando de nuevo", recurso)
+                objetos, token, paginas = {}, None, 0
+                continue
+            paginas += 1
+            for objeto in page.get('items', []):
+                if recurso == 'pods' and _terminado(objeto):
+                    continue
+                clave, registro = self._clave_y_registro(recurso, objeto)
+                objetos[clave] = registro(objeto)
+            token = page.get('metadata', {}).get('continue')
+            if not token:
+                break
+
+        self.objetos[recurso] = objetos
+        self.versiones[recurso] = page.get('metadata', {}).get('resourceVersion')
+        self.listados += 1
+        logger.info("Lista de %s: %d objetos en %d páginas (resourceVersion %s)",
+                    recurso, len(objetos), paginas, self.versiones[recurso])
+
+    def aplicar(self, recurso, tipo, objeto):
+        """Aplica un evento del watch (ADDED, MODIFIED, DELETED, BOOKMARK)"""
+        version = objeto.get('metadata', {}).get('resourceVersion')
+        if tipo != 'BOOKMARK':
+            clave, registro = self._clave_y_registro(recurso, objeto)
+            if tipo == 'DELETED' or (recurso == 'pods' and _terminado(objeto)):
+                self.objetos[recurso].pop(clave, None)
+            else:
+                self.objetos[recurso][clave] = registro(objeto)
+            self.eventos += 1
+        if version:
+            self.versiones[recurso] = version
+
+    def observar(self, api, recurso, timeout_seconds=None):
+        """
+        Aplica los cambios desde el último resourceVersion con un watch
+
+        Returns:
+            bool: False si la versión expiró (410) y hay que listar de nuevo
+        """
+        from kubernetes.client.rest import ApiException
+        from kubernetes.watch.watch import iter_resp_lines
+
+        timeout_seconds = WATCH_TIMEOUT if timeout_seconds is None else timeout_seconds
+        try:
+            resp = self._llamada(api, recurso)(
+                watch=True, resource_version=self.versiones[recurso], timeout_seconds=timeout_seconds,
+                allow_watch_bookmarks=True, _preload_content=False,
+                _request_timeout=(10, timeout_seconds + 10))
+        except ApiException as e:
+            if e.status == HTTP_GONE:
+                return False
+            raise
+        eventos = self.eventos
+        try:
+            for line in iter_resp_lines(resp):
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event['type'] == 'ERROR':
+                    status = event.get('object', {})
+                    if status.get('code') == HTTP_GONE:
+                        logger.info("resourceVersion de %s expirado, listando de nuevo", recurso)
+                        return False
+                    raise ApiException(status=status.get('code'), reason=status.get('message'))
+                self.aplicar(recurso, event['type'], event['object'])
+        finally:
+            resp.close()
+            resp.release_conn()
+        logger.info("Watch de %s: %d eventos (resourceVersion %s)",
+                    recurso, self.eventos - eventos, self.versiones[recurso])
+        return True
+
+    def sincronizar(self, api, timeout_seconds=None):
+        """
+        Pone al día pods y nodos (en paralelo): watch si hay una versión
+        previa, lista completa si no la hay o expiró
+        """
+        def sincronizar_recurso(recurso):
+            if self.versiones[recurso] is None or not self.observar(api, recurso, timeout_seconds):
+                self.listar(api, recurso)
+
+        with ThreadPoolExecutor(max_workers=len(self.RECURSOS)) as executor:
+            list(executor.map(sincronizar_recurso, self.RECURSOS))
+
+    def requests(self):
+        """Requested vs asignable por nodo (RequestsCluster)"""
+        uso = {name: {'node': name, 'instance_type': node[0], 'allocatable_cpu': node[1],
+                      'allocatable_mem': node[2], 'requested_cpu': 0.0, 'requested_mem': 0.0, 'pods': 0}
+               for name, node in self.nodes.items()}
+        pendientes = 0
+        for node_name, cpu, memory in self.pods.values():
+            nodo = uso.get(node_name)
+            if nodo is None:
+                # Sin programar (o en un nodo que ya no existe)
+                pendientes += 1
+                continue
+            nodo['requested_cpu'] += cpu
+            nodo['requested_mem'] += memory
+            nodo['pods'] += 1
+        return RequestsCluster(nodos=sorted(uso.values(), key=lambda n: n['node']), pendientes=pendientes)
+
+    def workloads(self):
+        """Requests de todos los pods (programados o no) para el bin packing"""
+        if not self.pods:
+            return Workloads.desde_arrays([], [], [])
+        _, cpu, memory = zip(*self.pods.values())
+        return Workloads.desde_arrays(cpu, memory)
+
+    def guardar(self, path):
+        """Guarda el estado (escritura atómica)"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'guardado': time.time(),
+                       'versiones': self.versiones, 'objetos': self.objetos}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def cargar(cls, path):
+        """Estado guardado, o un cache vacío si no existe o es de otro formato"""
+        cache = cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if data.get('version') == FORMAT_VERSION:
+            cache.objetos = {recurso: data['objetos'].get(recurso, {}) for recurso in cls.RECURSOS}
+            cache.versiones = {recurso: data['versiones'].get(recurso) for recurso in cls.RECURSOS}
+        return cache
+
+@dataclass
+class RequestsCluster:
+    """Requested vs asignable (vCPU, GiB) de cada nodo del cluster"""
+    nodos: list = field(default_factory=list)
+    pendientes: int = 0
+
+    @property
+    def pods(self):
+        return sum(n['pods'] for n in self.nodos)
+
+    def _fraccion(self, requested, allocatable):
+        total = sum(n[allocatable] for n in self.nodos)
+        return sum(n[requested] for n in self.nodos) / total if total > 0 else 0.0
+
+    @property
+    def fraccion_cpu(self):
+        """CPU pedida por los pods sobre la asignable de todos los nodos (0-1)"""
+        return self._fraccion('requested_cpu', 'allocatable_cpu')
+
+    @property
+    def fraccion_mem(self):
+        """Memoria pedida por los pods sobre la asignable de todos los nodos (0-1)"""
+        return self._fraccion('requested_mem', 'allocatable_mem')
+
+    def to_env(self):
+        """Variables EKS_REQUESTS_* (porcentajes) que lee PerfilCluster.desde_entorno()"""
+        return {'EKS_REQUESTS_CPU': f"{self.fraccion_cpu * 100:.2f}",
+                'EKS_REQUESTS_MEM': f"{self.fraccion_mem * 100:.2f}"}
+
+def cliente_k8s(context=None):
+    """CoreV1Api desde el kubeconfig (o la configuración in-cluster)"""
+    from kubernetes import client, config
+
+    try:
+        config.load_kube_config(context=context)
+    except config.ConfigException:
+        config.load_incluster_config()
+    return client.CoreV1Api()
+
+def _contexto_actual():
+    from kubernetes import config
+    try:
+        return config.list_kube_config_contexts()[1]['name']
+    except Exception:
+        return 'in-cluster'
+
+def ruta_cache(context):
+    """Archivo de cache por contexto; None si EKS_K8S_CACHE=0"""
+    if os.environ.get('EKS_K8S_CACHE') == '0':
+        return None
+    nombre = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in context)
+    return os.path.join(CACHE_DIR, f'k8s_{nombre}.json')
+
+def recolectar_requests(context=None, api=None, cache_path=None):
+    """
+    Sincroniza el cache del cluster (watch o lista completa) y retorna el
+    cache actualizado
+
+    Args:
+        context: Contexto del kubeconfig (default: el actual)
+        api: CoreV1Api ya configurado (ej: en pruebas)
+        cache_path: Archivo del cache (default: ruta_cache(context))
+    """
+    if api is None:
+        api = cliente_k8s(context)
+    if cache_path is None:
+        cache_path = ruta_cache(context or _contexto_actual())
+
+    cache = CacheK8s.cargar(cache_path) if cache_path else CacheK8s()
+    start = time.perf_counter()
+    cache.sincronizar(api)
+    logger.info("Cache de Kubernetes sincronizado en %.2fs: %d pods, %d nodos, %d listas, %d eventos",
+                time.perf_counter() - start, len(cache.pods), len(cache.nodes), cache.listados, cache.eventos)
+    if cache_path:
+        cache.guardar(cache_path)
+    return cache
+
+def imprimir_requests(requests, file=sys.stdout):
+    print(f"{'='*72}", file=file)
+    print(f"📦 REQUESTS DE PODS VS ASIGNABLE ({len(requests.nodos)} nodos, {requests.pods} pods)", file=file)
+    print(f"{'='*72}", file=file)
+    print(f"  {'Nodo':<34} {'Tipo':<12} {'CPU pedida':>14} {'Mem pedida':>16}", file=file)
+    for nodo in requests.nodos:
+        print(f"  {nodo['node'][:34]:<34} {nodo['instance_type'] or '-':<12} "
+              f"{nodo['requested_cpu']:>5.2f}/{nodo['allocatable_cpu']:<5.2f}vCPU "
+              f"{nodo['requested_mem']:>6.1f}/{nodo['allocatable_mem']:<6.1f}GiB", file=file)
+    print(f"  {'-'*70}", file=file)
+    print(f"  Total: CPU {requests.fraccion_cpu*100:.1f}% y memoria {requests.fraccion_mem*100:.1f}% "
+          f"de lo asignable", file=file)
+    if requests.pendientes:
+        print(f"  ⚠️  {requests.pendientes} pods sin programar", file=file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Requests de pods vs capacidad asignable desde el API de Kubernetes")
+    parser.add_argument('--context', help='Contexto del kubeconfig (default: el actual)')
+    parser.add_argument('--output', help='Guardar los requests de los pods como workloads JSON (para --workloads)')
+    parser.add_argument('--env', action='store_true', help='Imprimir exports EKS_REQUESTS_* para la calculadora')
+    parser.add_argument('--no-cache', action='store_true', help='Listar todo sin usar ni guardar el cache')
+    args = parser.parse_args(argv)
+
+    cache = recolectar_requests(args.context, cache_path='' if args.no_cache else None)
+    requests = cache.requests()
+
+    if args.env:
+        for key, value in requests.to_env().items():
+            print(f"export {key}='{value}'")
+    else:
+        imprimir_requests(requests)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([{'name': uid, 'cpu': f"{cpu * 1000:.0f}m", 'memory': f"{memory * 1024:.0f}Mi"}
+                       for uid, (_, cpu, memory) in cache.pods.items()], f)
+        print(f"📄 {len(cache.pods)} pods guardados en {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
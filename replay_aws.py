@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Grabación y reproducción de respuestas de AWS (modo offline).
+
+Envuelve los clientes boto3 del registro compartido (aws_utils) por debajo de
+los reintentos y el limitador de tasa:
+
+- Grabación (EKS_AWS_RECORD=archivo.json.gz): cada respuesta se guarda con
+  una clave (servicio, región, operación, parámetros normalizados) y el
+  archivo comprimido se escribe al salir del proceso. Mientras se graba no se
+  usan el cache de precios, el ledger de costos ni el índice local, así la
+  grabación trae todas las llamadas a Pricing y Cost Explorer.
+- Reproducción (EKS_AWS_REPLAY=archivo.json.gz): las llamadas se responden
+  desde el archivo sin red ni credenciales. Las fechas de los parámetros no
+  forman parte de la clave y las de la respuesta se corren a la ventana de la
+  llamada actual, así una grabación vieja sigue cayendo dentro del período
+  consultado. Opcionalmente con latencia (EKS_AWS_REPLAY_LATENCY_MS) y
+  throttling simulados (EKS_AWS_REPLAY_THROTTLE, probabilidad por llamada).
+- Clusters sintéticos: `respuestas_sinteticas()` genera respuestas plausibles
+  de EKS, EC2, CloudWatch, Auto Scaling, Cost Explorer y Pricing para un
+  cluster de N nodos; `grabar_cluster_sintetico()` corre el pipeline contra
+  ellas y deja una grabación lista para reproducir (benchmarks, pruebas).
+
+Uso:
+    EKS_AWS_RECORD=fixtures/prod.json.gz python3 analizar_eks.py --cluster prod
+    EKS_AWS_REPLAY=fixtures/prod.json.gz python3 analizar_eks.py --cluster prod
+    python3 replay_aws.py sintetico --nodes 1000 --output /tmp/bench-1000.json.gz
+    python3 replay_aws.py info /tmp/bench-1000.json.gz
+"""
+import argparse
+import atexit
+import contextlib
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, date, timedelta, timezone
+
+FORMAT_VERSION = 1
+
+_FECHA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _a_json(value):
+    """Respuesta de botocore -> estructura JSON (datetimes como {'__datetime__': iso})"""
+    if isinstance(value, dict):
+        return {k: _a_json(v) for k, v in value.items() if k != 'ResponseMetadata'}
+    if isinstance(value, (list, tuple)):
+        return [_a_json(v) for v in value]
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    return value
+
+def _desde_json(value, delta=None):
+    """Inversa de _a_json; con `delta` corre datetimes y fechas YYYY-MM-DD"""
+    if isinstance(value, dict):
+        if '__datetime__' in value:
+            parsed = datetime.fromisoformat(value['__datetime__'])
+            return parsed + delta if delta else parsed
+        return {k: _desde_json(v, delta) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_desde_json(v, delta) for v in value]
+    if delta and isinstance(value, str) and _FECHA.match(value):
+        return (date.fromisoformat(value) + timedelta(days=round(delta.total_seconds() / 86400))).isoformat()
+    return value
+
+def _sin_fechas(value):
+    if isinstance(value, dict):
+        return {k: _sin_fechas(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_sin_fechas(v) for v in value]
+    if isinstance(value, (datetime, date)) or (isinstance(value, str) and _FECHA.match(value)):
+        return '<fecha>'
+    return value
+
+def clave_llamada(service, region, operation, params):
+    """Clave de una llamada: las fechas de los parámetros no cuentan (la ventana se mueve entre ejecuciones)"""
+    normalizados = json.dumps(_sin_fechas(params), sort_keys=True, default=str)
+    digest = hashlib.sha1(normalizados.encode('utf-8')).hexdigest()[:16]
+    return f"{service}:{region}:{operation}:{digest}"
+
+def _ancla(params):
+    """Fin de la ventana consultada (EndTime de CloudWatch o TimePeriod.End de Cost Explorer)"""
+    end = params.get('EndTime')
+    if isinstance(end, datetime):
+        return end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    end = params.get('TimePeriod', {}).get('End')
+    if isinstance(end, str) and _FECHA.match(end):
+        return datetime.fromisoformat(end).replace(tzinfo=timezone.utc)
+    return None
+
+def _client_error(operation, code, message, status=400):
+    from botocore.exceptions import ClientError
+    return ClientError({'Error': {'Code': code, 'Message': message},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+class Grabacion:
+    """
+    Respuestas grabadas por clave de llamada. Una misma clave puede tener
+    varias respuestas (llamadas repetidas): se reproducen en orden y después
+    se repite la última.
+    """
+
+    def __init__(self, llamadas=None):
+        self.llamadas = llamadas or {}
+        self._cursores = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(entradas) for entradas in self.llamadas.values())
+
+    def agregar(self, service, region, operation, params, response=None, error=None):
+        entrada = {'operation': operation}
+        ancla = _ancla(params)
+        if ancla is not None:
+            entrada['ancla'] = ancla.isoformat()
+        if error is not None:
+            entrada['error'] = error
+        else:
+            entrada['response'] = _a_json(response)
+        with self._lock:
+            self.llamadas.setdefault(clave_llamada(service, region, operation, params), []).append(entrada)
+
+    def siguiente(self, service, region, operation, params):
+        """Próxima entrada grabada para la llamada (KeyError si no hay)"""
+        clave = clave_llamada(service, region, operation, params)
+        with self._lock:
+            entradas = self.llamadas[clave]
+            cursor = self._cursores.get(clave, 0)
+            self._cursores[clave] = cursor + 1
+        return entradas[min(cursor, len(entradas) - 1)]
+
+    def operaciones(self):
+        """{'servicio.Operacion': respuestas grabadas}"""
+        conteo = {}
+        for clave, entradas in self.llamadas.items():
+            service = clave.split(':', 1)[0]
+            for entrada in entradas:
+                nombre = f"{service}.{entrada['operation']}"
+                conteo[nombre] = conteo.get(nombre, 0) + 1
+        return dict(sorted(conteo.items()))
+
+    def guardar(self, path):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'llamadas': self.llamadas}, f, separators=(',', ':'))
+
+    @classmethod
+    def cargar(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: versión de grabación no soportada ({data.get('version')})")
+        return cls(data['llamadas'])
+
+def grabar(grabacion):
+    """Interceptor que llama a AWS y graba cada respuesta (los throttles no se graban)"""
+    from aws_utils import is_throttling_error
+
+    def interceptor(client, service, region):
+        make_api_call = client._make_api_call
+
+        def _make_api_call(operation_name, api_params):
+            try:
+                response = make_api_call(operation_name, api_params)
+            except Exception as e:
+                error = getattr(e, 'response', None)
+                if isinstance(error, dict) and not is_throttling_error(e):
+                    grabacion.agregar(service, region, operation_name, api_params, error={
+                        'Code': error.get('Error', {}).get('Code'),
+                        'Message': error.get('Error', {}).get('Message', ''),
+                        'HTTPStatusCode': error.get('ResponseMetadata', {}).get('HTTPStatusCode', 400),
+                    })
+                raise
+            grabacion.agregar(service, region, operation_name, api_params, response=response)
+            return response
+
+        client._make_api_call = _make_api_call
+        return client
+    return interceptor
+
+def reproducir(grabacion, latencia_ms=0, throttle=0.0, seed=None, sleep=time.sleep):
+    """
+    Interceptor que responde desde la grabación sin tocar la red
+
+    Args:
+        latencia_ms: Latencia simulada por llamada
+        throttle: Probabilidad de responder un error de throttling (los
+                  reintentos de aws_utils lo manejan como uno real)
+        seed: Semilla del throttling simulado (determinístico)
+    """
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    def interceptor(client, service, region):
+        def _make_api_call(operation_name, api_params):
+            if latencia_ms:
+                sleep(latencia_ms / 1000)
+            if throttle:
+                with rng_lock:
+                    throttled = rng.random() < throttle
+                if throttled:
+                    raise _client_error(operation_name, 'Throttling', 'Rate exceeded (simulado)')
+            try:
+                entrada = grabacion.siguiente(service, region, operation_name, api_params)
+            except KeyError:
+                raise _client_error(operation_name, 'RespuestaNoGrabada',
+                                    f"{service}.{operation_name} ({region}) no está en la grabación") from None
+            if 'error' in entrada:
+                error = entrada['error']
+                raise _client_error(operation_name, error['Code'], error['Message'], error['HTTPStatusCode'])
+            delta = None
+            ancla = _ancla(api_params)
+            if ancla is not None and 'ancla' in entrada:
+                delta = ancla - datetime.fromisoformat(entrada['ancla'])
+            response = _desde_json(entrada['response'], delta)
+            response['ResponseMetadata'] = {'HTTPStatusCode': 200, 'HTTPHeaders': {}}
+            return response
+
+        client._make_api_call = _make_api_call
+        return client
+    return interceptor
+
+def responder(funcion):
+    """Interceptor que responde con funcion(service, region, operation, params) (clusters sintéticos)"""
+    def interceptor(client, service, region):
+        def _make_api_call(operation_name, api_params):
+            response = funcion(service, region, operation_name, api_params)
+            response['ResponseMetadata'] = {'HTTPStatusCode': 200, 'HTTPHeaders': {}}
+            return response
+
+        client._make_api_call = _make_api_call
+        return client
+    return interceptor
+
+def encadenar(*interceptores):
+    """Aplica los interceptores en orden (el primero queda más cerca de la red)"""
+    def interceptor(client, service, region):
+        for func in interceptores:
+            client = func(client, service, region)
+        return client
+    return interceptor
+
+def interceptor_desde_entorno():
+    """Interceptor configurado por EKS_AWS_REPLAY / EKS_AWS_RECORD (None si no hay ninguno)"""
+    replay = os.environ.get('EKS_AWS_REPLAY')
+    if replay:
+        return reproducir(Grabacion.cargar(replay),
+                          latencia_ms=float(os.environ.get('EKS_AWS_REPLAY_LATENCY_MS', '0')),
+                          throttle=float(os.environ.get('EKS_AWS_REPLAY_THROTTLE', '0')),
+                          seed=os.environ.get('EKS_AWS_REPLAY_SEED'))
+    record = os.environ.get('EKS_AWS_RECORD')
+    if record:
+        # Con un cache o ledger tibio faltarían llamadas y la reproducción en
+        # una máquina sin ellos fallaría con RespuestaNoGrabada
+        os.environ.update({'EKS_PRICING_CACHE': '0', 'EKS_COST_LEDGER': '0'})
+        os.environ.pop('EKS_PRICE_INDEX', None)
+        grabacion = Grabacion()
+        atexit.register(grabacion.guardar, record)
+        return grabar(grabacion)
+    return None
+
+# ============================================
+# CLUSTERS SINTÉTICOS
+# ============================================
+# Precio On-Demand por hora (us-east-1) de los tipos del cluster sintético
+PRECIOS_SINTETICOS = {
+    'm5.large': 0.096,
+    'm5.xlarge': 0.192,
+    'c5.2xlarge': 0.34,
+    'r5.xlarge': 0.252,
+}
+FEE_AUTO_MODE = 0.12
+
+def _tipo_nodo(idx):
+    # Mix 60/20/10/10 determinístico
+    return ('m5.large', 'm5.large', 'm5.large', 'm5.large', 'm5.large', 'm5.large',
+            'm5.xlarge', 'm5.xlarge', 'c5.2xlarge', 'r5.xlarge')[idx % 10]
+
+def _utilizacion(metric_name, ts):
+    """Utilización con ciclo diario (pico a las 15 UTC)"""
+    hora = ts.hour + ts.minute / 60
+    base, amplitud = {'node_cpu_utilization': (35, 15), 'node_memory_utilization': (55, 10)}.get(metric_name, (30, 12))
+    return round(base + amplitud * math.sin((hora - 9) / 24 * 2 * math.pi), 3)
+
+def filtrar_asgs(grupos, filters):
+    """Aplica los filtros tag:<clave> y tag-key de describe_auto_scaling_groups (AND entre filtros)"""
+    for filtro in filters:
+        if filtro['Name'] == 'tag-key':
+            grupos = [g for g in grupos if any(t['Key'] in filtro['Values'] for t in g['Tags'])]
+        elif filtro['Name'].startswith('tag:'):
+            key = filtro['Name'][4:]
+            grupos = [g for g in grupos if any(t['Key'] == key and t['Value'] in filtro['Values'] for t in g['Tags'])]
+    return grupos
+
+def respuestas_sinteticas(cluster_name, nodes, region='us-east-1'):
+    """
+    Función (service, region, operation, params) -> respuesta para un cluster
+    sintético de `nodes` nodos (mix fijo de tipos, 10% spot, 3 nodegroups)
+    """
+    launch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    instancias = [{
+        'InstanceId': f'i-{idx:017x}',
+        'InstanceType': _tipo_nodo(idx),
+        'LaunchTime': launch,
+        'Placement': {'AvailabilityZone': f"{region}{'abc'[idx % 3]}"},
+        'Tags': [{'Key': 'eks:cluster-name', 'Value': cluster_name},
+                 {'Key': 'eks:nodegroup-name', 'Value': f'ng-{idx % 3}'},
+                 {'Key': 'aws:autoscaling:groupName', 'Value': f'eks-ng-{idx % 3}-asg'}],
+        **({'InstanceLifecycle': 'spot'} if idx % 10 == 9 else {}),
+    } for idx in range(nodes)]
+    costo_hora = sum(PRECIOS_SINTETICOS[inst['InstanceType']] * (0.35 if 'InstanceLifecycle' in inst else 1)
+                     for inst in instancias)
+    costo_spot_hora = sum(PRECIOS_SINTETICOS[inst['InstanceType']] * 0.35 for inst in instancias
+                          if 'InstanceLifecycle' in inst)
+
+    def metric_data(params):
+        start, end = params['StartTime'], params['EndTime']
+        results = []
+        for query in params['MetricDataQueries']:
+            stat = query['MetricStat']
+            period = stat['Period']
+            metric_name = stat['Metric']['MetricName']
+            timestamps, values = [], []
+            ts = start
+            while ts < end:
+                timestamps.append(ts)
+                if metric_name == 'GroupDesiredCapacity':
+                    per_group = nodes / 3
+                    values.append(round(per_group * (0.8 if stat['Stat'] == 'Minimum' else 1.0)))
+                else:
+                    values.append(_utilizacion(metric_name, ts))
+                ts += timedelta(seconds=period)
+            results.append({'Id': query['Id'], 'Label': metric_name, 'Timestamps': timestamps,
+                            'Values': values, 'StatusCode': 'Complete'})
+        return {'MetricDataResults': results}
+
+    def cost_and_usage(params):
+        start = date.fromisoformat(params['TimePeriod']['Start'])
+        end = date.fromisoformat(params['TimePeriod']['End'])
+        group_by = [g['Key'] for g in params.get('GroupBy', [])]
+        if params['Granularity'] == 'DAILY':
+            periodos = [(start + timedelta(days=i), 1) for i in range((end - start).days)]
+        else:
+            periodos = [(start, (end - start).days)]
+
+        def grupo(keys, amount, usage=0.0):
+            return {'Keys': keys, 'Metrics': {'AmortizedCost': {'Amount': f"{amount:.6f}", 'Unit': 'USD'},
+                                              'UsageQuantity': {'Amount': f"{usage:.3f}", 'Unit': 'Hrs'}}}
+
+        results = []
+        for inicio, dias in periodos:
+            horas = 24 * dias
+            ondemand, spot = (costo_hora - costo_spot_hora) * horas, costo_spot_hora * horas
+            control_plane = 0.10 * horas
+            if group_by == ['SERVICE', 'PURCHASE_TYPE']:
+                groups = [grupo(['Amazon Elastic Compute Cloud - Compute', 'On Demand Instances'], ondemand, nodes * horas),
+                          grupo(['Amazon Elastic Compute Cloud - Compute', 'Spot Instances'], spot),
+                          grupo(['Amazon Elastic Kubernetes Service', 'On Demand Instances'], control_plane, horas)]
+            elif group_by == ['aws:eks:cluster-name', 'PURCHASE_TYPE']:
+                groups = [grupo([f'aws:eks:cluster-name${cluster_name}', 'On Demand Instances'], ondemand, nodes * horas),
+                          grupo([f'aws:eks:cluster-name${cluster_name}', 'Spot Instances'], spot)]
+            elif group_by == ['REGION']:
+                groups = [grupo([region], control_plane)]
+            else:
+                groups = []
+            results.append({'TimePeriod': {'Start': inicio.isoformat(), 'End': (inicio + timedelta(days=dias)).isoformat()},
+                            'Total': {} if groups else {'AmortizedCost': {'Amount': f"{ondemand + spot:.6f}", 'Unit': 'USD'}},
+                            'Groups': groups, 'Estimated': False})
+        return {'ResultsByTime': results}
+
+    def products(params):
+        filtros = {f['Field']: f['Value'] for f in params.get('Filters', [])}
+        precio = PRECIOS_SINTETICOS.get(filtros.get('instanceType'))
+        if precio is None:
+            return {'PriceList': []}
+        if params['ServiceCode'] == 'AmazonEKS':
+            precio, atributos = precio * FEE_AUTO_MODE, {'eksproducttype': 'AutoMode'}
+        else:
+            atributos = {'instanceType': filtros['instanceType']}
+        item = {'product': {'attributes': atributos},
+                'terms': {'OnDemand': {'t': {'priceDimensions': {'d': {'pricePerUnit': {'USD': f"{precio:.6f}"}}}}}}}
+        return {'PriceList': [json.dumps(item)]}
+
+    def describe_instances(params):
+        page_size = params.get('MaxResults', 1000)
+        offset = int(params.get('NextToken', 0))
+        response = {'Reservations': [{'Instances': instancias[offset:offset + page_size]}]}
+        if offset + page_size < len(instancias):
+            response['NextToken'] = str(offset + page_size)
+        return response
+
+    def describe_asgs(params):
+        return {'AutoScalingGroups': filtrar_asgs([{
+            'AutoScalingGroupName': f'eks-ng-{n}-asg', 'MinSize': 0, 'MaxSize': nodes, 'DesiredCapacity': nodes // 3,
+            'DefaultCooldown': 300, 'AvailabilityZones': [f'{region}a'], 'HealthCheckType': 'EC2',
+            'CreatedTime': launch,
+            'Tags': [{'Key': key, 'Value': value, 'ResourceId': f'eks-ng-{n}-asg',
+                      'ResourceType': 'auto-scaling-group', 'PropagateAtLaunch': True}
+                     for key, value in (('eks:cluster-name', cluster_name),
+                                        (f'kubernetes.io/cluster/{cluster_name}', 'owned'))],
+        } for n in range(3)], params.get('Filters', []))}
+
+    def describe_nodegroup(params):
+        n = int(params['nodegroupName'].split('-')[-1])
+        return {'nodegroup': {
+            'nodegroupName': params['nodegroupName'], 'clusterName': cluster_name, 'status': 'ACTIVE',
+            'capacityType': 'ON_DEMAND', 'createdAt': launch,
+            'instanceTypes': sorted({_tipo_nodo(idx) for idx in range(n, nodes, 3)}),
+            'scalingConfig': {'minSize': 0, 'maxSize': nodes, 'desiredSize': len(range(n, nodes, 3))},
+            'resources': {'autoScalingGroups': [{'name': f'eks-ng-{n}-asg'}]},
+        }}
+
+    handlers = {
+        ('eks', 'ListNodegroups'): lambda p: {'nodegroups': [f'ng-{n}' for n in range(3)]},
+        ('eks', 'DescribeNodegroup'): describe_nodegroup,
+        ('eks', 'DescribeCluster'): lambda p: {'cluster': {
+            'name': p['name'], 'version': '1.29', 'status': 'ACTIVE', 'createdAt': launch,
+            'arn': f'arn:aws:eks:{region}:000000000000:cluster/{p["name"]}'}},
+        ('ec2', 'DescribeInstances'): describe_instances,
+        ('cloudwatch', 'GetMetricData'): metric_data,
+        ('autoscaling', 'DescribeAutoScalingGroups'): describe_asgs,
+        ('ce', 'GetCostAndUsage'): cost_and_usage,
+        ('pricing', 'GetProducts'): products,
+    }
+
+    def funcion(service, region_llamada, operation, params):
+        handler = handlers.get((service, operation))
+        if handler is None:
+            raise _client_error(operation, 'OperacionNoSintetizada', f"{service}.{operation}")
+        return handler(params)
+    return funcion
+
+@contextlib.contextmanager
+def entorno_offline(interceptor, limiter=None):
+    """
+    Registro de clientes con `interceptor`, sin cache de precios, índice local
+    ni ledger persistente: cada corrida hace las mismas llamadas
+
+    Args:
+        limiter: RateLimiter de los clientes (default: el compartido, con las cuotas de cada API)
+    """
+    import aws_utils
+    import indice_precios
+
+    anterior = aws_utils.client_registry
+    aws_utils.client_registry = aws_utils.ClientRegistry(limiter=limiter, interceptor=interceptor)
+    env = {k: os.environ.get(k) for k in ('EKS_PRICING_CACHE', 'EKS_COST_LEDGER')}
+    os.environ.update({'EKS_PRICING_CACHE': '0', 'EKS_COST_LEDGER': '0'})
+    index = (indice_precios._default_index, indice_precios._default_index_loaded)
+    indice_precios._default_index, indice_precios._default_index_loaded = None, True
+    try:
+        yield aws_utils.client_registry
+    finally:
+        aws_utils.client_registry = anterior
+        indice_precios._default_index, indice_precios._default_index_loaded = index
+        for key, value in env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def correr_pipeline(cluster_name, region='us-east-1'):
+    """Recolector + calculadora en proceso, sin interacción (stderr silenciado)"""
+    from recolector_eks_aws import recolectar_cluster
+    from calculadora_eks import PerfilCluster, evaluar_cluster
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        datos = recolectar_cluster(cluster_name, region, interactive=False)
+        resultado = evaluar_cluster(PerfilCluster.desde_recoleccion(datos))
+    return datos, resultado
+
+def grabar_cluster_sintetico(path, nodes, cluster_name=None, region='us-east-1'):
+    """
+    Corre el pipeline contra un cluster sintético de `nodes` nodos y guarda la
+    grabación en `path`
+
+    Returns:
+        Grabacion
+    """
+    cluster_name = cluster_name or f'sintetico-{nodes}'
+    grabacion = Grabacion()
+    interceptor = encadenar(responder(respuestas_sinteticas(cluster_name, nodes, region)), grabar(grabacion))
+    with entorno_offline(interceptor):
+        correr_pipeline(cluster_name, region)
+    grabacion.guardar(path)
+    return grabacion
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grabaciones de respuestas de AWS para el modo offline")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sintetico = sub.add_parser('sintetico', help='Grabar el pipeline sobre un cluster sintético')
+    sintetico.add_argument('--nodes', type=int, default=100)
+    sintetico.add_argument('--cluster', help='Nombre del cluster (default: sintetico-<nodos>)')
+    sintetico.add_argument('--region', default='us-east-1')
+    sintetico.add_argument('--output', required=True, help='Archivo .json.gz de salida')
+
+    info = sub.add_parser('info', help='Resumen de una grabación')
+    info.add_argument('path')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'sintetico':
+        grabacion = grabar_cluster_sintetico(args.output, args.nodes, args.cluster, args.region)
+        print(f"✅ {len(grabacion)} respuestas grabadas en {args.output} "
+              f"({os.path.getsize(args.output) / 1024:.1f} KB)")
+    else:
+        grabacion = Grabacion.cargar(args.path)
+        print(f"📼 {args.path}: {len(grabacion)} respuestas")
+        for operacion, cantidad in grabacion.operaciones().items():
+            print(f"   {operacion:<40} {cantidad:>5}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Selección de tipos de instancia (right-sizing) para EKS Auto Mode.
+
+Auto Mode (Karpenter) elige los tipos de instancia por su cuenta, así que el
+costo estimado no debería asumir que se mantiene el tipo actual. Este módulo
+busca en el catálogo de EC2 la flota más barata (uno o dos tipos) que cubre la
+demanda de CPU y memoria observada.
+
+El catálogo se arma una vez por región a partir del índice local de precios
+(arrays de precio, vCPU y GiB asignables, agrupados por familia). La búsqueda:
+
+1. Filtra como el NodePool por defecto de Auto Mode (categorías c/m/r,
+   generación > 4) y por el tamaño del pod más grande.
+2. Descarta los tipos dominados (otro es igual o más barato y tiene al menos
+   la misma CPU y memoria): nunca forman parte de la flota óptima.
+3. Evalúa de forma vectorizada todos los tipos solos y todos los pares, con
+   la solución del LP de cobertura de cada par redondeada a nodos enteros
+   (el óptimo continuo de un problema con dos recursos usa a lo sumo dos tipos).
+
+Uso:
+    python3 seleccion_instancias.py --cpu 120 --memory 480 --region us-east-1 [-i price_index.bin]
+"""
+import argparse
+import re
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from empaquetado_nodos import MAX_PODS, allocatable
+
+# NodePool general-purpose de Auto Mode: instance-category In [c, m, r], instance-generation Gt 4
+CATEGORIAS_DEFAULT = ('c', 'm', 'r')
+GENERACION_MINIMA = 5
+
+# Fee de Auto Mode cuando el índice no lo tiene (igual que la calculadora)
+FEE_PERCENT_FALLBACK = 0.12
+
+_FAMILY_RE = re.compile(r'^([a-z]+?)(\d+)([a-z-]*)$')
+
+def parse_familia(instance_type):
+    """'c6gn.2xlarge' -> ('c6gn', 'c', 6, 'gn'); None si el nombre no sigue el patrón"""
+    family = instance_type.split('.', 1)[0]
+    match = _FAMILY_RE.match(family)
+    if not match:
+        return None
+    categoria, generacion, atributos = match.groups()
+    return family, categoria, int(generacion), atributos
+
+class Catalogo:
+    """
+    Catálogo de tipos de instancia de una región como arrays paralelos
+    (capacidad asignable y precio por hora EC2 + fee), con índices por familia
+    """
+
+    def __init__(self, tipos, vcpu, memory_gib, precio_ec2, precio_fee, max_pods=MAX_PODS, fee_api=None):
+        self.tipos = np.asarray(tipos, dtype=object)
+        self.vcpu = np.asarray(vcpu, dtype=float)
+        self.memory_gib = np.asarray(memory_gib, dtype=float)
+        self.precio_ec2 = np.asarray(precio_ec2, dtype=float)
+        self.precio_fee = np.asarray(precio_fee, dtype=float)
+        self.precio = self.precio_ec2 + self.precio_fee
+        # True si el fee de Auto Mode viene del offer file y no del porcentaje de fallback
+        self.fee_api = np.zeros(len(self.tipos), dtype=bool) if fee_api is None else np.asarray(fee_api, dtype=bool)
+        alloc = [allocatable(c, m, max_pods) for c, m in zip(self.vcpu, self.memory_gib)]
+        self.alloc_cpu = np.array([a[0] for a in alloc], dtype=float).reshape(-1)
+        self.alloc_mem = np.array([a[1] for a in alloc], dtype=float).reshape(-1)
+
+        self.familias = {}
+        for idx, instance_type in enumerate(self.tipos):
+            parsed = parse_familia(instance_type)
+            family = parsed[0] if parsed else instance_type.split('.', 1)[0]
+            self.familias.setdefault(family, []).append(idx)
+        self.familias = {f: np.array(sorted(idxs, key=lambda i: self.vcpu[i])) for f, idxs in self.familias.items()}
+
+    def __len__(self):
+        return len(self.tipos)
+
+    @classmethod
+    def desde_indice(cls, index, region, fee_percent=FEE_PERCENT_FALLBACK, max_pods=MAX_PODS):
+        """Arma el catálogo con los tipos del índice local que tienen precio y especificaciones"""
+        tipos, vcpu, memory, ec2, fee, fee_api = [], [], [], [], [], []
+        for instance_type in index.instance_types(region):
+            specs = index.specs(instance_type, region)
+            precio = index.precio_ec2(instance_type, region)
+            if specs is None or not precio:
+                continue
+            precio_fee = index.precio_automode_fee(instance_type, region)
+            tipos.append(instance_type)
+            vcpu.append(specs[0])
+            memory.append(specs[1])
+            ec2.append(precio)
+            fee.append(precio_fee if precio_fee is not None else precio * fee_percent)
+            fee_api.append(precio_fee is not None)
+        return cls(tipos, vcpu, memory, ec2, fee, max_pods, fee_api)
+
+    def filtrar(self, categorias=CATEGORIAS_DEFAULT, generacion_minima=GENERACION_MINIMA,
+                graviton=False, familias=None, min_cpu=0.0, min_mem=0.0):
+        """
+        Índices de los tipos elegibles
+
+        Args:
+            categorias: Letras de categoría permitidas (None = todas)
+            graviton: Incluir familias ARM (atributo 'g'); por defecto no, ya
+                      que las imágenes pueden no ser multi-arquitectura
+            familias: Lista explícita de familias (reemplaza categoría/generación)
+            min_cpu, min_mem: Capacidad asignable mínima (el pod más grande)
+        """
+        if familias is not None:
+            candidatos = [self.familias[f] for f in familias if f in self.familias]
+        else:
+            candidatos = []
+            for family, idxs in self.familias.items():
+                parsed = parse_familia(family + '.x')
+                if parsed is None:
+                    continue
+                _, categoria, generacion, atributos = parsed
+                if categorias is not None and categoria not in categorias:
+                    continue
+                if generacion < generacion_minima or (not graviton and 'g' in atributos):
+                    continue
+                candidatos.append(idxs)
+        if not candidatos:
+            return np.array([], dtype=np.int64)
+        idxs = np.concatenate(candidatos)
+        keep = (self.alloc_cpu[idxs] >= min_cpu) & (self.alloc_mem[idxs] >= min_mem) & (self.precio[idxs] > 0)
+        return idxs[keep]
+
+def _no_dominados(cpu, mem, precio):
+    """Máscara de los tipos que ningún otro domina (más barato o igual, con más o igual CPU y memoria)"""
+    igual_o_mejor = ((precio[:, None] <= precio[None, :]) & (cpu[:, None] >= cpu[None, :]) &
+                     (mem[:, None] >= mem[None, :]))
+    estricto = ((precio[:, None] < precio[None, :]) | (cpu[:, None] > cpu[None, :]) |
+                (mem[:, None] > mem[None, :]))
+    dominado = (igual_o_mejor & estricto).any(axis=0)
+    # Entre tipos idénticos se conserva el primero
+    _, primeros = np.unique(np.column_stack([cpu, mem, precio]), axis=0, return_index=True)
+    unicos = np.zeros(len(cpu), dtype=bool)
+    unicos[primeros] = True
+    return ~dominado & unicos
+
+@dataclass
+class ResultadoSeleccion:
+    """Flota de menor costo que cubre la demanda"""
+    flota: dict
+    costo_hora: float
+    demanda_cpu: float
+    demanda_mem: float
+    precios_hora: dict
+    tipos_evaluados: int
+    tipos_no_dominados: int
+    alternativas: list = field(default_factory=list)
+
+    @property
+    def nodos(self):
+        return sum(self.flota.values())
+
+    @property
+    def descripcion(self):
+        flota = ' + '.join(f"{n} x {t}" for t, n in self.flota.items())
+        return f"selección de instancias sobre {self.tipos_evaluados} tipos: {flota}"
+
+def seleccionar_flota(catalogo, demanda_cpu, demanda_mem, min_cpu=0.0, min_mem=0.0, **filtros):
+    """
+    Busca la flota más barata (uno o dos tipos) cuya capacidad asignable cubre
+    la demanda de CPU (vCPU) y memoria (GiB)
+
+    Args:
+        catalogo: Catalogo de la región
+        min_cpu, min_mem: Requests del pod más grande (cada nodo debe poder alojarlo)
+        **filtros: Ver Catalogo.filtrar
+
+    Returns:
+        ResultadoSeleccion o None si no hay tipos elegibles
+    """
+    idxs = catalogo.filtrar(min_cpu=min_cpu, min_mem=min_mem, **filtros)
+    if len(idxs) == 0:
+        return None
+    evaluados = len(idxs)
+
+    idxs = idxs[_no_dominados(catalogo.alloc_cpu[idxs], catalogo.alloc_mem[idxs], catalogo.precio[idxs])]
+    cpu = catalogo.alloc_cpu[idxs]
+    mem = catalogo.alloc_mem[idxs]
+    precio = catalogo.precio[idxs]
+    demanda_cpu = max(float(demanda_cpu), 0.0)
+    demanda_mem = max(float(demanda_mem), 0.0)
+
+    # Un solo tipo
+    solo = np.maximum(np.ceil(np.maximum(demanda_cpu / cpu, demanda_mem / mem) - 1e-9), 0)
+    costo_solo = solo * precio
+    mejor = int(np.argmin(costo_solo))
+    flota = {idxs[mejor]: int(solo[mejor])}
+    costo = float(costo_solo[mejor])
+
+    # Pares (i, j): solución del LP de cobertura con ambas restricciones activas
+    if len(idxs) > 1 and demanda_cpu > 0 and demanda_mem > 0:
+        ci, cj = cpu[:, None], cpu[None, :]
+        mi, mj = mem[:, None], mem[None, :]
+        det = ci * mj - cj * mi
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xi = (demanda_cpu * mj - cj * demanda_mem) / det
+            xj = (ci * demanda_mem - demanda_cpu * mi) / det
+        valido = (np.abs(det) > 1e-9) & (xi > 0) & (xj > 0)
+        if valido.any():
+            for redondeo in (np.floor, np.ceil):
+                ni = np.where(valido, redondeo(np.nan_to_num(xi)), 0)
+                resto = np.maximum((demanda_cpu - ni * ci) / cj, (demanda_mem - ni * mi) / mj)
+                nj = np.maximum(np.ceil(resto - 1e-9), 0)
+                total = np.where(valido, ni * precio[:, None] + nj * precio[None, :], np.inf)
+                i, j = np.unravel_index(int(np.argmin(total)), total.shape)
+                if total[i, j] < costo - 1e-9:
+                    costo = float(total[i, j])
+                    flota = {idxs[i]: int(ni[i, j]), idxs[j]: int(nj[i, j])}
+
+    flota = {catalogo.tipos[k]: n for k, n in sorted(flota.items(), key=lambda item: -item[1]) if n > 0}
+    precios_hora = {t: (float(catalogo.precio_ec2[k]), float(catalogo.precio_fee[k]), bool(catalogo.fee_api[k]))
+                    for k, t in enumerate(catalogo.tipos) if t in flota}
+    orden = np.argsort(costo_solo)[:5]
+    alternativas = [(catalogo.tipos[idxs[k]], int(solo[k]), float(costo_solo[k])) for k in orden]
+
+    return ResultadoSeleccion(
+        flota=flota,
+        costo_hora=costo,
+        demanda_cpu=demanda_cpu,
+        demanda_mem=demanda_mem,
+        precios_hora=precios_hora,
+        tipos_evaluados=evaluados,
+        tipos_no_dominados=len(idxs),
+        alternativas=alternativas,
+    )
+
+def main(argv=None):
+    from indice_precios import IndicePrecios, get_default_index
+
+    parser = argparse.ArgumentParser(description="Busca la flota de instancias más barata para una demanda")
+    parser.add_argument('--cpu', type=float, required=True, help='Demanda de CPU (vCPU)')
+    parser.add_argument('--memory', type=float, required=True, help='Demanda de memoria (GiB)')
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('-i', '--index', help='Índice de precios (default: EKS_PRICE_INDEX)')
+    parser.add_argument('--familias', nargs='+', help='Limitar a estas familias (ej: m6i c6i r6i)')
+    parser.add_argument('--graviton', action='store_true', help='Incluir familias ARM (Graviton)')
+    args = parser.parse_args(argv)
+
+    index = IndicePrecios.load(args.index) if args.index else get_default_index()
+    if index is None:
+        print("❌ Se necesita un índice de precios (--index o EKS_PRICE_INDEX)", file=sys.stderr)
+        return 1
+
+    catalogo = Catalogo.desde_indice(index, args.region)
+    resultado = seleccionar_flota(catalogo, args.cpu, args.memory, familias=args.familias, graviton=args.graviton)
+    if resultado is None:
+        print("❌ No hay tipos de instancia elegibles", file=sys.stderr)
+        return 1
+
+    print(f"🔍 {len(catalogo)} tipos en el catálogo de {args.region}, {resultado.tipos_evaluados} elegibles, "
+          f"{resultado.tipos_no_dominados} no dominados")
+    print(f"\n  Mejores opciones de un solo tipo:")
+    for instance_type, nodos, costo_hora in resultado.alternativas:
+        print(f"    {instance_type:<16} {nodos:>5} nodos  ${costo_hora*730:>11,.2f}/mes")
+    print(f"\n💰 Flota óptima: {' + '.join(f'{n} x {t}' for t, n in resultado.flota.items())} "
+          f"(${resultado.costo_hora*730:,.2f}/mes EC2 + fee)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
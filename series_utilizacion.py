@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Series de utilización con memoria acotada.
+
+SerieUtilizacion divide el período consultado en intervalos fijos (uno por
+`period` segundos) y acumula suma y cantidad por intervalo en arrays de NumPy
+preasignados. Las series de CloudWatch se pliegan a medida que llegan, así la
+memoria depende solo de la cantidad de intervalos (30 días a 1 minuto ≈ 43.200
+intervalos ≈ 0.5 MB) y no de cuántos nodos o páginas se agregan.
+
+Los percentiles y los perfiles por hora del día / hora de la semana se
+calculan de forma vectorizada sobre los promedios de cada intervalo.
+"""
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+HORAS_SEMANA = 168
+
+def _epoch(value):
+    """datetime (con o sin zona, se asume UTC) o número -> segundos epoch"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+class SerieUtilizacion:
+    """Serie agregada (promedio por intervalo) de una o más series de CloudWatch"""
+
+    def __init__(self, start, end, period):
+        self.start = _epoch(start)
+        self.period = int(period)
+        self.size = max(math.ceil((_epoch(end) - self.start) / self.period), 1)
+        self._suma = np.zeros(self.size)
+        self._cuenta = np.zeros(self.size, dtype=np.uint32)
+
+    def agregar(self, timestamps, values):
+        """
+        Pliega puntos (timestamp, valor) en los intervalos; los fuera de rango se ignoran.
+        Los timestamps pueden ser datetimes o un array de segundos epoch.
+        """
+        if not len(values):
+            return
+        if isinstance(timestamps, np.ndarray):
+            t = timestamps.astype(float, copy=False)
+        else:
+            t = np.fromiter((_epoch(ts) for ts in timestamps), dtype=float, count=len(timestamps))
+        v = np.asarray(values, dtype=float)
+        idx = ((t - self.start) // self.period).astype(np.int64)
+        ok = (idx >= 0) & (idx < self.size) & ~np.isnan(v)
+        # bincount acumula índices repetidos (varios nodos en el mismo intervalo)
+        self._suma += np.bincount(idx[ok], weights=v[ok], minlength=self.size)
+        self._cuenta += np.bincount(idx[ok], minlength=self.size).astype(np.uint32)
+
+    def __len__(self):
+        """Intervalos con datos"""
+        return int(np.count_nonzero(self._cuenta))
+
+    @property
+    def nbytes(self):
+        return self._suma.nbytes + self._cuenta.nbytes
+
+    def valores(self):
+        """Promedio de cada intervalo (NaN donde no hubo datos)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self._cuenta > 0, self._suma / np.maximum(self._cuenta, 1), np.nan)
+
+    def _con_datos(self):
+        valores = self.valores()
+        return valores[~np.isnan(valores)]
+
+    def promedio(self):
+        """Promedio de los intervalos con datos; None si la serie está vacía"""
+        datos = self._con_datos()
+        return float(datos.mean()) if len(datos) else None
+
+    def percentiles(self, ps=(50, 95, 99)):
+        """{p: valor} sobre los intervalos con datos (vacío si no hay datos)"""
+        datos = self._con_datos()
+        if not len(datos):
+            return {}
+        return dict(zip(ps, (float(x) for x in np.percentile(datos, ps))))
+
+    def _perfil(self, bucket_seconds, buckets, offset_hours=0):
+        valores = self.valores()
+        ok = ~np.isnan(valores)
+        if not ok.any():
+            return None
+        centros = self.start + (np.arange(self.size) + 0.5) * self.period
+        bucket = ((centros // bucket_seconds + offset_hours) % buckets).astype(np.int64)
+        suma = np.bincount(bucket[ok], weights=valores[ok], minlength=buckets)
+        cuenta = np.bincount(bucket[ok], minlength=buckets)
+        perfil = np.where(cuenta > 0, suma / np.maximum(cuenta, 1), np.nan)
+        # Horas sin datos (series de menos de una semana): promedio general
+        return np.where(np.isnan(perfil), valores[ok].mean(), perfil)
+
+    def perfil_horario(self):
+        """Promedio por hora del día UTC (24 valores)"""
+        return self._perfil(3600, 24)
+
+    def perfil_semanal(self):
+        """Promedio por hora de la semana UTC (168 valores, lunes 00:00 primero)"""
+        # El epoch (1970-01-01) fue jueves: +72 horas para empezar la semana en lunes
+        return self._perfil(3600, HORAS_SEMANA, offset_hours=72)
+
+def formatear_perfil(perfil, decimales=1):
+    """Perfil -> '12.5,13.0,...' (para variables de entorno)"""
+    return ','.join(f"{x:.{decimales}f}" for x in perfil)
+
+def parsear_perfil(texto):
+    """'12.5,13.0,...' -> lista de floats; None si está vacío"""
+    if not texto:
+        return None
+    return [float(x) for x in texto.split(',') if x.strip()]
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Pruebas del pipeline en proceso y del formato de compatibilidad por exports
+"""
+import analizar_eks
+from recolector_eks_aws import DatosCluster, format_env_exports
+from calculadora_eks import PreciosInstancia
+
+def _datos():
+    return DatosCluster(cluster_name='prod', region='us-east-1', cluster_version='1.29',
+                        instances=[{'instance_id': 'i-1', 'instance_type': 'm5.large'}] * 4,
+                        primary_instance='m5.large', cpu_util=30.0, mem_util=50.0,
+                        metric_source="Input Manual (it's \"raro\")",
+                        cost_data={'monthly_cost': 200.0, 'data_source': 'Cost Explorer'})
+
+def test_exports_con_comillas_ida_y_vuelta():
+    env_vars = _datos().to_env()
+    assert analizar_eks.parse_env_exports(format_env_exports(env_vars)) == env_vars
+
+def test_pipeline_en_proceso(monkeypatch, capsys):
+    monkeypatch.setattr(analizar_eks, 'recolectar_cluster', lambda cluster, region: _datos())
+    monkeypatch.setattr('calculadora_eks.resolver_precios',
+                        lambda *a, **k: PreciosInstancia(0.096, 0.01152, True))
+
+    resultado = analizar_eks.run_pipeline('prod', 'us-east-1')
+
+    assert resultado.perfil.node_count == 4
+    assert resultado.perfil.utilizacion_cpu == 0.3
+    assert resultado.perfil.monthly_cost_real == 200.0
+    assert 'RESUMEN DE AHORROS' in capsys.readouterr().out
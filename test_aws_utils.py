@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Pruebas del registro de clientes boto3 compartidos, del limitador de tasa y de los reintentos
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from botocore.stub import Stubber
+
+from aws_utils import ClientRegistry, RateLimiter, CallMetrics, TokenBucket, attach_retry, backoff_delay, parse_rates
+
+def test_un_cliente_por_servicio_y_region():
+    registry = ClientRegistry(max_pool_connections=7, limiter=RateLimiter())
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: registry.get('cloudwatch', 'us-east-1'), range(32)))
+
+    assert all(c is clients[0] for c in clients)
+    assert registry.get('cloudwatch', 'eu-west-1') is not clients[0]
+    assert registry.created == 2
+    assert clients[0].meta.config.max_pool_connections == 7
+
+def test_clientes_descartados_tras_fork():
+    registry = ClientRegistry(limiter=RateLimiter())
+    client = registry.get('eks', 'us-east-1')
+
+    registry._pid = -1  # simula un proceso hijo
+    assert registry.get('eks', 'us-east-1') is not client
+    assert len(registry) == 1
+
+def _cloudwatch_con_reintentos(max_attempts=4):
+    client = boto3.client('cloudwatch', region_name='us-east-1',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    limiter = RateLimiter({'cloudwatch': 1000})
+    metrics = CallMetrics()
+    sleeps = []
+    attach_retry(client, 'cloudwatch', limiter, metrics, max_attempts=max_attempts, sleep=sleeps.append)
+    return client, limiter, metrics, sleeps
+
+def test_reintenta_solo_throttling():
+    client, limiter, metrics, sleeps = _cloudwatch_con_reintentos()
+    with Stubber(client) as stubber:
+        stubber.add_client_error('list_metrics', 'Throttling', http_status_code=400)
+        stubber.add_client_error('list_metrics', 'TooManyRequestsException', http_status_code=429)
+        stubber.add_response('list_metrics', {'Metrics': []})
+        stubber.add_client_error('list_metrics', 'AccessDenied', http_status_code=403)
+
+        assert client.list_metrics()['Metrics'] == []
+        with pytest.raises(ClientError):
+            client.list_metrics()
+        stubber.assert_no_pending_responses()
+
+    assert len(sleeps) == 2
+    counters = metrics.snapshot()['cloudwatch.ListMetrics']
+    assert {k: counters[k] for k in ('calls', 'throttles', 'retries', 'errors')} == \
+        {'calls': 4, 'throttles': 2, 'retries': 2, 'errors': 1}
+    assert counters['backoff_s'] == round(sum(sleeps), 3)
+    # Dos throttles bajan la tasa a un cuarto; la llamada exitosa recupera un 5% de la cuota
+    assert limiter.get_rate('cloudwatch') == pytest.approx(1000 * (0.25 + 0.05))
+
+def test_se_rinde_tras_max_attempts():
+    client, _, metrics, sleeps = _cloudwatch_con_reintentos(max_attempts=3)
+    with Stubber(client) as stubber:
+        for _ in range(3):
+            stubber.add_client_error('list_metrics', 'Throttling', http_status_code=400)
+        with pytest.raises(ClientError):
+            client.list_metrics()
+    assert len(sleeps) == 2
+    assert metrics.totals()['throttles'] == 3 and metrics.totals()['errors'] == 1
+
+def test_reintenta_errores_transitorios_sin_bajar_la_tasa():
+    client, limiter, metrics, sleeps = _cloudwatch_con_reintentos()
+    with Stubber(client) as stubber:
+        stubber.add_client_error('list_metrics', 'InternalError', http_status_code=500)
+        stubber.add_client_error('list_metrics', 'Unknown', http_status_code=503)
+        stubber.add_response('list_metrics', {'Metrics': []})
+        for _ in range(3):
+            stubber.add_client_error('list_metrics', 'ServiceUnavailable', http_status_code=503)
+
+        assert client.list_metrics()['Metrics'] == []
+        with pytest.raises(ClientError):
+            client.list_metrics()  # los transitorios se cortan en 3 intentos aunque max_attempts sea 4
+        stubber.assert_no_pending_responses()
+
+    assert len(sleeps) == 4 and limiter.get_rate('cloudwatch') == 1000
+    counters = metrics.snapshot()['cloudwatch.ListMetrics']
+    assert {k: counters[k] for k in ('calls', 'throttles', 'retries', 'errors')} == \
+        {'calls': 6, 'throttles': 0, 'retries': 4, 'errors': 1}
+
+def test_reintenta_timeouts_de_lectura():
+    class Cliente:
+        intentos = 0
+
+        def _make_api_call(self, operation_name, api_params):
+            self.intentos += 1
+            if self.intentos == 1:
+                raise ReadTimeoutError(endpoint_url='https://monitoring.us-east-1.amazonaws.com')
+            return {'Metrics': []}
+
+    client = Cliente()
+    sleeps = []
+    attach_retry(client, 'cloudwatch', RateLimiter(), CallMetrics(), sleep=sleeps.append)
+    assert client._make_api_call('ListMetrics', {}) == {'Metrics': []}
+    assert client.intentos == 2 and len(sleeps) == 1
+
+def test_backoff_y_tasa_adaptativa():
+    assert all(0 <= backoff_delay(n, base=0.5, cap=4) <= min(4, 0.5 * 2 ** n) for n in range(1, 10) for _ in range(20))
+
+    bucket = TokenBucket(rate=10)
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == 0.5  # piso: 5% de la cuota
+    for _ in range(30):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+def test_rate_limiter():
+    assert parse_rates('ce=5, cloudwatch=40') == {'ce': 5.0, 'cloudwatch': 40.0}
+
+    bucket = TokenBucket(rate=100, capacity=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() > 0
+
+    limiter = RateLimiter({'ce': 5})
+    assert limiter.get_rate('ce') == 5
+    assert limiter.acquire('eks') == 0.0  # sin límite configurado
+    limiter.escalar(0.5)  # la parte de un proceso del pool
+    assert limiter.get_rate('ce') == 2.5 and limiter.get_rate('eks') is None
+
+def test_llamadas_registradas_en_instrumentacion(monkeypatch):
+    import logger_utils
+    monkeypatch.setattr(logger_utils, 'instrumentacion', logger_utils.Instrumentacion())
+    client, _, _, _ = _cloudwatch_con_reintentos()
+    with Stubber(client) as stubber:
+        stubber.add_client_error('list_metrics', 'Throttling', http_status_code=400)
+        stubber.add_response('list_metrics', {'Metrics': [{'MetricName': 'a'}, {'MetricName': 'b'}]})
+        client.list_metrics()
+
+    [fila] = logger_utils.instrumentacion.resumen()
+    assert (fila['tipo'], fila['nombre'], fila['llamadas']) == ('aws', 'cloudwatch.ListMetrics', 1)
+    assert (fila['reintentos'], fila['resultados'], fila['errores']) == (1, 2, 0)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Pruebas del cache persistente de precios
+"""
+import calculadora_eks
+from cache_precios import PricingCache, cached_price
+
+def test_cache_hit_evita_consultar_api(tmp_path):
+    cache = PricingCache(path=str(tmp_path / 'precios.sqlite'), ttl_seconds=3600, max_entries=10)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 0.096
+
+    assert cached_price('AmazonEC2', 'm5.large', 'us-east-1', 'RunInstances', fetch, cache=cache) == 0.096
+    assert cached_price('AmazonEC2', 'm5.large', 'us-east-1', 'RunInstances', fetch, cache=cache) == 0.096
+    assert len(calls) == 1
+
+    # Persistente entre instancias (otra ejecución de la calculadora)
+    cache.close()
+    reopened = PricingCache(path=str(tmp_path / 'precios.sqlite'), ttl_seconds=3600, max_entries=10)
+    assert reopened.get('AmazonEC2', 'm5.large', 'us-east-1', 'RunInstances') == (True, 0.096)
+
+def test_ttl_vencido_y_resultados_negativos():
+    cache = PricingCache(path=':memory:', ttl_seconds=0, max_entries=10)
+    cache.set('AmazonEKS', 'm5.large', 'us-east-1', 'EKSAutoUsage', None)
+    assert cache.get('AmazonEKS', 'm5.large', 'us-east-1', 'EKSAutoUsage') == (False, None)
+
+    cache.ttl_seconds = 3600
+    assert cache.get('AmazonEKS', 'm5.large', 'us-east-1', 'EKSAutoUsage') == (True, None)
+
+def test_desalojo_lru():
+    cache = PricingCache(path=':memory:', ttl_seconds=3600, max_entries=2)
+    cache.set('AmazonEC2', 'a', 'r', 'op', 1.0)
+    cache.set('AmazonEC2', 'b', 'r', 'op', 2.0)
+    cache.get('AmazonEC2', 'a', 'r', 'op')  # 'a' pasa a ser el más reciente
+    cache.set('AmazonEC2', 'c', 'r', 'op', 3.0)
+
+    assert cache.get('AmazonEC2', 'b', 'r', 'op') == (False, None)
+    assert cache.get('AmazonEC2', 'a', 'r', 'op') == (True, 1.0)
+    assert cache.stats()['entries'] == 2
+
+def test_hits_no_escriben_hasta_flush(tmp_path):
+    path = str(tmp_path / 'precios.sqlite')
+    cache = PricingCache(path=path, ttl_seconds=3600, max_entries=10)
+    cache.set('AmazonEC2', 'a', 'r', 'op', 1.0)
+    guardado = cache._conn.execute('SELECT last_access FROM prices').fetchone()[0]
+    for _ in range(3):
+        assert cache.get('AmazonEC2', 'a', 'r', 'op') == (True, 1.0)
+    assert cache._conn.total_changes == 1  # solo el INSERT del set()
+
+    cache.close()
+    reopened = PricingCache(path=path, ttl_seconds=3600, max_entries=10)
+    assert reopened._conn.execute('SELECT last_access FROM prices').fetchone()[0] > guardado
+
+def test_calculadora_usa_cache_sin_pricing_api(monkeypatch):
+    cache = PricingCache(path=':memory:', ttl_seconds=3600, max_entries=10)
+    cache.set('AmazonEC2', 'm5.large', 'us-east-1', 'RunInstances', 0.096)
+    cache.set('AmazonEKS', 'm5.large', 'us-east-1', 'EKSAutoUsage', 0.01152)
+
+    def sin_api():
+        raise AssertionError("No debería consultarse el Pricing API")
+
+    monkeypatch.setattr(calculadora_eks, 'get_pricing_client', sin_api)
+    assert calculadora_eks.obtener_precio_ec2_aws('m5.large', 'us-east-1', cache=cache) == 0.096
+    assert calculadora_eks.obtener_precio_eks_automode_aws('m5.large', 'us-east-1', cache=cache) == 0.01152
+
+def test_errores_de_api_no_se_cachean(monkeypatch):
+    cache = PricingCache(path=':memory:', ttl_seconds=3600, max_entries=10)
+
+    def falla():
+        raise calculadora_eks.PrecioNoDisponible("sin credenciales")
+
+    monkeypatch.setattr(calculadora_eks, 'get_pricing_client', falla)
+    assert calculadora_eks.obtener_precio_ec2_aws('m5.large', 'us-east-1', cache=cache) is None
+    assert cache.get('AmazonEC2', 'm5.large', 'us-east-1', 'RunInstances') == (False, None)
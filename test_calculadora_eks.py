@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la API de librería de la calculadora (sin AWS ni variables de entorno)
+"""
+import io
+
+import pytest
+
+import calculadora_eks
+from calculadora_eks import (PerfilCluster, PreciosInstancia, calcular_escenario,
+                             evaluar_cluster, imprimir_reporte)
+
+PRECIOS_M5 = PreciosInstancia(precio_ec2_hora=0.096, precio_automode_fee_hora=0.01152, using_api_pricing=True)
+
+def test_calcular_escenario_on_demand():
+    perfil = PerfilCluster(instance_type='m5.large', node_count=10, utilizacion_cpu=0.3, utilizacion_mem=0.5)
+    resultado = calcular_escenario(perfil, PRECIOS_M5)
+
+    # Desperdicio 60% × 20% = 12% menos nodos → 8.8 → 9 nodos
+    assert resultado.waste_factor == pytest.approx(0.6)
+    assert resultado.estimated_nodes_auto_decimal == pytest.approx(8.8)
+    assert resultado.estimated_nodes_auto == 9
+    assert resultado.discount_factor == 1.0
+    assert resultado.current_monthly_cost == pytest.approx(73 + 10 * 0.096 * 730)
+    assert resultado.auto_monthly_cost == pytest.approx(73 + 9 * (0.096 + 0.01152) * 730)
+    assert resultado.total_savings == pytest.approx(resultado.ahorro_infra + 500)
+
+def test_descuento_derivado_y_explicito():
+    perfil = PerfilCluster(node_count=10, monthly_cost_real=0.5 * 10 * 0.096 * 730)
+    assert calcular_escenario(perfil, PRECIOS_M5).discount_factor == pytest.approx(0.5)
+
+    perfil.discount_factor = 0.7
+    resultado = calcular_escenario(perfil, PRECIOS_M5)
+    assert resultado.ec2_auto_monthly_cost == pytest.approx(resultado.ec2_auto_ondemand_monthly * 0.7)
+
+def test_perfil_desde_entorno():
+    perfil = PerfilCluster.desde_entorno({
+        'EKS_PRIMARY_INSTANCE': 'c5.xlarge', 'EKS_NODE_COUNT': '7.0',
+        'EKS_UTIL_CPU': '42.5', 'EKS_UTIL_MEM': '60', 'AWS_REGION': 'eu-west-1',
+    })
+    assert (perfil.instance_type, perfil.node_count, perfil.region) == ('c5.xlarge', 7, 'eu-west-1')
+    assert perfil.utilizacion_cpu == pytest.approx(0.425)
+
+def test_evaluar_cluster_no_interactivo(monkeypatch):
+    monkeypatch.setattr(calculadora_eks, 'obtener_precio_ec2_aws', lambda *a, **k: None)
+    monkeypatch.setattr(calculadora_eks, 'obtener_precio_eks_automode_aws', lambda *a, **k: None)
+
+    resultado = evaluar_cluster(PerfilCluster(instance_type='m5.large', node_count=4))
+    assert resultado.precios.precio_ec2_hora == 0.096
+    assert resultado.precios.using_api_pricing is False
+
+    # Sin precio y sin modo interactivo no se llama a input()
+    with pytest.raises(ValueError):
+        evaluar_cluster(PerfilCluster(instance_type='x9.huge', node_count=4))
+
+def test_imprimir_reporte():
+    out = io.StringIO()
+    imprimir_reporte(calcular_escenario(PerfilCluster(node_count=10, utilizacion_cpu=0.2, utilizacion_mem=0.2),
+                                        PRECIOS_M5), file=out)
+    assert 'RESUMEN DE AHORROS' in out.getvalue()
+    assert '10 x m5.large' in out.getvalue()
+
+def test_mix_heterogeneo_costea_cada_tipo(monkeypatch):
+    llamadas = []
+
+    def precio_ec2(instance_type, region, **kwargs):
+        llamadas.append(instance_type)
+        return {'m5.large': 0.096, 'r5.4xlarge': 1.008, 'm5.xlarge': 0.192}[instance_type]
+
+    monkeypatch.setattr(calculadora_eks, 'obtener_precio_ec2_aws', precio_ec2)
+    monkeypatch.setattr(calculadora_eks, 'obtener_precio_eks_automode_aws', lambda *a, **k: None)
+
+    perfil = PerfilCluster.desde_entorno({
+        'EKS_PRIMARY_INSTANCE': 'm5.large', 'EKS_NODE_COUNT': '22',
+        'EKS_INSTANCE_MIX': 'm5.large=10,r5.4xlarge=10,m5.xlarge=2',
+        'EKS_UTIL_CPU': '30', 'EKS_UTIL_MEM': '50',
+    })
+    resultado = evaluar_cluster(perfil)
+
+    assert sorted(llamadas) == ['m5.large', 'm5.xlarge', 'r5.4xlarge']  # una consulta por tipo
+    assert resultado.current_monthly_cost == pytest.approx(73 + (10 * 0.096 + 10 * 1.008 + 2 * 0.192) * 730)
+    assert resultado.estimated_nodes_auto == 9 + 9 + 2
+    assert set(resultado.desglose_familias) == {'m5', 'r5'}
+    assert resultado.desglose_familias['m5']['nodos'] == 12
+    assert resultado.precios.precio_ec2_hora == 0.096
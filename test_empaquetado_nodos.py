@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Pruebas del simulador de bin packing
+"""
+import json
+
+import numpy as np
+import pytest
+
+import calculadora_eks
+from calculadora_eks import PerfilCluster, PreciosInstancia, evaluar_cluster
+from empaquetado_nodos import (Workloads, allocatable, cargar_workloads, elegir_empaquetado,
+                               empaquetar, parse_cpu, parse_memory)
+
+def test_cantidades_kubernetes():
+    assert parse_cpu('250m') == 0.25
+    assert parse_cpu('2') == 2.0
+    assert parse_memory('512Mi') == 0.5
+    assert parse_memory('1Gi') == 1.0
+    assert parse_memory(str(2**30)) == 1.0
+
+def test_ffd_llena_nodos_antes_de_abrir_nuevos():
+    cap_cpu, cap_mem = allocatable(4, 16)
+    # 3 pods grandes (60% CPU) + 6 chicos que entran en los huecos
+    workloads = Workloads.desde_arrays([cap_cpu * 0.6] * 3 + [cap_cpu * 0.2] * 6, [1.0] * 9)
+    nodos, sin_ubicar, used_cpu, _ = empaquetar(workloads, 4, 16)
+    assert (nodos, sin_ubicar) == (3, 0)
+    assert used_cpu == pytest.approx(cap_cpu * 3)
+
+    # Límite de pods por nodo
+    assert empaquetar(Workloads.desde_arrays([0.001] * 250, [0.001] * 250), 4, 16, max_pods=110)[0] == 3
+
+@pytest.mark.parametrize('estrategia', ['ffd', 'bfd'])
+def test_cerca_del_limite_inferior(estrategia):
+    rng = np.random.default_rng(7)
+    workloads = Workloads.desde_arrays(rng.choice([0.1, 0.25, 0.5, 1], 5000), rng.choice([0.25, 0.5, 1, 2], 5000))
+    cap_cpu, cap_mem = allocatable(8, 32)
+    limite = np.ceil(max(workloads.total_cpu / cap_cpu, workloads.total_memory / cap_mem))
+
+    nodos, sin_ubicar, _, _ = empaquetar(workloads, 8, 32, estrategia=estrategia)
+    assert sin_ubicar == 0
+    assert limite <= nodos <= limite * 1.05
+
+def test_elige_el_candidato_mas_barato_y_descarta_chicos():
+    workloads = Workloads.desde_arrays([3.0] * 4, [4.0] * 4)
+    resultado = elegir_empaquetado(workloads, [('m5.large', 2, 8, 0.108), ('m5.xlarge', 4, 16, 0.215),
+                                               ('m5.2xlarge', 8, 32, 0.43)])
+    assert 'm5.large' not in resultado.alternativas  # el pod no entra
+    assert resultado.flota == {'m5.xlarge': 4}
+
+def test_cargar_workloads_kubectl_y_csv(tmp_path):
+    pods = {'items': [
+        {'spec': {'containers': [{'resources': {'requests': {'cpu': '250m', 'memory': '256Mi'}}},
+                                 {'resources': {'requests': {'cpu': '250m', 'memory': '256Mi'}}}]},
+         'status': {'phase': 'Running'}},
+        {'spec': {'containers': [{'resources': {}}]}, 'status': {'phase': 'Succeeded'}},
+        # El init container más grande y el overhead cuentan como en el scheduler
+        {'spec': {'containers': [{'resources': {'requests': {'cpu': '250m', 'memory': '256Mi'}}}],
+                  'initContainers': [{'resources': {'requests': {'cpu': '1', 'memory': '128Mi'}}}],
+                  'overhead': {'cpu': '250m', 'memory': '256Mi'}},
+         'status': {'phase': 'Pending'}},
+    ]}
+    (tmp_path / 'pods.json').write_text(json.dumps(pods))
+    workloads = cargar_workloads(str(tmp_path / 'pods.json'))
+    assert (workloads.pods, workloads.total_cpu, workloads.total_memory) == (2, 1.75, 1.0)
+
+    (tmp_path / 'pods.csv').write_text("name,cpu,memory,replicas\napi,500m,1Gi,3\nworker,1,2Gi,\n")
+    workloads = cargar_workloads(str(tmp_path / 'pods.csv'))
+    assert (workloads.pods, workloads.total_cpu, workloads.total_memory) == (4, 2.5, 5.0)
+
+def test_calculadora_usa_bin_packing(monkeypatch):
+    monkeypatch.setattr(calculadora_eks, 'get_default_index', lambda: None)
+    precios = {'m5.large': PreciosInstancia(0.096, 0.01152, True)}
+    perfil = PerfilCluster(instance_type='m5.large', node_count=10)
+
+    workloads = Workloads.desde_arrays([0.5] * 20, [1.0] * 20)
+    resultado = evaluar_cluster(perfil, precios, workloads=workloads)
+
+    assert resultado.flota_auto.flota == {'m5.large': 7}  # 3 pods de 0.5 vCPU por nodo de 1.93 vCPU
+    assert resultado.estimated_nodes_auto == 7
+    assert resultado.auto_monthly_cost == pytest.approx(73 + 7 * (0.096 + 0.01152) * 730)
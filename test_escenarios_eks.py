@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pruebas del barrido de escenarios vectorizado
+"""
+import time
+
+import numpy as np
+import pytest
+
+from calculadora_eks import PerfilCluster, PreciosInstancia, calcular_escenario
+from escenarios_eks import barrido_grilla, monte_carlo, parse_grilla, muestrear, main
+
+PRECIOS = {
+    'm5.large': PreciosInstancia(precio_ec2_hora=0.096, precio_automode_fee_hora=0.0115, using_api_pricing=True),
+    'r5.xlarge': PreciosInstancia(precio_ec2_hora=0.252, precio_automode_fee_hora=0.0302, using_api_pricing=True),
+}
+
+def _perfil(**kwargs):
+    return PerfilCluster(instance_type='m5.large', node_count=17, utilizacion_cpu=0.35, utilizacion_mem=0.55,
+                         monthly_cost_real=1500.0, instance_mix={'m5.large': 12, 'r5.xlarge': 5}, **kwargs)
+
+def test_grilla_coincide_con_calcular_escenario():
+    perfil = _perfil()
+    grilla = {'efficiency_gain': [0.1, 0.2, 0.3], 'horas_ing_ahorradas': [0, 10],
+              'utilizacion_cpu': 'lin:0.2:0.6:3'}
+    resultado = barrido_grilla(perfil, PRECIOS, grilla)
+    assert len(resultado) == 18
+
+    for idx in range(len(resultado)):
+        escenario = _perfil()
+        escenario.utilizacion_cpu = resultado.parametros['utilizacion_cpu'][idx]
+        esperado = calcular_escenario(escenario, PRECIOS,
+                                      efficiency_gain=resultado.parametros['efficiency_gain'][idx],
+                                      horas_ing_ahorradas=resultado.parametros['horas_ing_ahorradas'][idx])
+        assert resultado.nodos_auto[idx] == esperado.estimated_nodes_auto
+        assert resultado.auto_monthly_cost[idx] == pytest.approx(esperado.auto_monthly_cost, rel=1e-12)
+        assert resultado.total_savings[idx] == pytest.approx(esperado.total_savings, rel=1e-12)
+
+    filas = resultado.sensibilidad('efficiency_gain')
+    assert [fila['desde'] for fila in filas] == [0.1, 0.2, 0.3]
+    assert filas[0]['media'] < filas[-1]['media']
+
+def test_fee_percent_reemplaza_fee_por_tipo():
+    resultado = barrido_grilla(_perfil(), PRECIOS, {'fee_percent': [0.12]})
+    precios = {t: PreciosInstancia(p.precio_ec2_hora, p.precio_ec2_hora * 0.12, False) for t, p in PRECIOS.items()}
+    assert resultado.auto_monthly_cost[0] == pytest.approx(calcular_escenario(_perfil(), precios).auto_monthly_cost)
+
+def test_barrido_de_utilizacion_no_baja_de_los_requests():
+    perfil = _perfil(requests_cpu=0.6, requests_mem=0.7)
+    resultado = barrido_grilla(perfil, PRECIOS, {'utilizacion_cpu': [0.2, 0.6, 0.9]})
+    # Por debajo de los requests el escenario es el mismo que sin barrido
+    assert resultado.auto_monthly_cost[0] == resultado.auto_monthly_cost[1] == \
+        pytest.approx(calcular_escenario(perfil, PRECIOS).auto_monthly_cost)
+    # Por encima manda la utilización
+    assert resultado.auto_monthly_cost[2] == pytest.approx(
+        calcular_escenario(_perfil(requests_cpu=0.9, requests_mem=0.7), PRECIOS).auto_monthly_cost)
+    # Los parámetros conservan los valores barridos
+    assert list(resultado.parametros['utilizacion_cpu']) == [0.2, 0.6, 0.9]
+
+def test_monte_carlo_un_millon_de_muestras():
+    inicio = time.perf_counter()
+    resultado = monte_carlo(_perfil(), PRECIOS, {
+        'efficiency_gain': 'triangular:0.05:0.2:0.35',
+        'utilizacion_cpu': 'normal:0.35:0.05',
+        'discount_factor': 'uniform:0.7:0.9',
+    }, n=1_000_000, seed=7)
+    duracion = time.perf_counter() - inicio
+
+    assert len(resultado) == 1_000_000
+    assert duracion < 5
+    inferior, mediana, superior = resultado.intervalo(0.90)
+    assert inferior < mediana < superior
+    assert 0 <= resultado.prob_ahorro() <= 1
+    # Más eficiencia y menos descuento → más ahorro; más descuento en Auto Mode abarata la alternativa
+    correlaciones = resultado.correlaciones()
+    assert correlaciones['efficiency_gain'] > 0
+    assert correlaciones['discount_factor'] < 0
+    assert sum(fila['escenarios'] for fila in resultado.sensibilidad('discount_factor')) == 1_000_000
+
+def test_specs_invalidas():
+    assert list(parse_grilla('0.1, 0.2')) == [0.1, 0.2]
+    assert muestrear('0.3', 4, np.random.default_rng(0)).tolist() == [0.3] * 4
+    with pytest.raises(ValueError):
+        muestrear('beta:1', 4, np.random.default_rng(0))
+    with pytest.raises(ValueError):
+        parse_grilla('lin:0:1')
+
+def test_cli(monkeypatch, capsys):
+    import escenarios_eks
+    monkeypatch.setattr(escenarios_eks, 'resolver_precios_mix', lambda mix, region, **kwargs: PRECIOS)
+    for key, value in {'EKS_PRIMARY_INSTANCE': 'm5.large', 'EKS_NODE_COUNT': '17', 'EKS_UTIL_CPU': '35',
+                       'EKS_UTIL_MEM': '55', 'EKS_INSTANCE_MIX': 'm5.large=12,r5.xlarge=5'}.items():
+        monkeypatch.setenv(key, value)
+
+    assert main(['--dist', 'efficiency_gain=uniform:0.1:0.3', '-n', '10000', '--seed', '1']) == 0
+    salida = capsys.readouterr().out
+    assert '10,000 escenarios' in salida
+    assert 'Sensibilidad: efficiency_gain' in salida
+    assert main(['--grid', 'no_existe=1']) == 1
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pruebas del escaneo de flota (descubrimiento y pool acotado por región)
+"""
+import threading
+import time
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import flota_eks
+
+def test_discover_clusters_paginado(monkeypatch):
+    eks = boto3.client('eks', region_name='us-east-1',
+                       aws_access_key_id='test', aws_secret_access_key='test')
+    stubber = Stubber(eks)
+    stubber.add_response('list_clusters', {'clusters': ['a', 'b'], 'nextToken': 't1'}, {})
+    stubber.add_response('list_clusters', {'clusters': ['c']}, {'nextToken': 't1'})
+    stubber.activate()
+    monkeypatch.setattr(flota_eks, 'create_client', lambda service, region: eks)
+
+    assert flota_eks.discover_clusters(['us-east-1']) == [('a', 'us-east-1'), ('b', 'us-east-1'), ('c', 'us-east-1')]
+    stubber.assert_no_pending_responses()
+
+def test_load_clusters_file(tmp_path):
+    path = tmp_path / 'clusters.txt'
+    path.write_text("# flota\nprod,us-east-1\n\nstaging eu-west-1\n")
+    assert flota_eks.load_clusters_file(str(path)) == [('prod', 'us-east-1'), ('staging', 'eu-west-1')]
+
+def test_run_fleet_respeta_limite_por_region():
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+
+    def fake_analyzer(cluster_name, region):
+        with lock:
+            in_flight[region] = in_flight.get(region, 0) + 1
+            peak[region] = max(peak.get(region, 0), in_flight[region])
+        time.sleep(0.02)
+        with lock:
+            in_flight[region] -= 1
+        return {'cluster': cluster_name, 'region': region, 'status': 'ok', 'node_count': 1,
+                'current_monthly_cost': 10.0, 'auto_monthly_cost': 8.0, 'ahorro_infra': 2.0,
+                'total_savings': 2.0}
+
+    clusters = [(f'c{i}', 'us-east-1' if i % 3 else 'eu-west-1') for i in range(12)]
+    results = flota_eks.run_fleet(clusters, max_workers=6, per_region=2, analyzer=fake_analyzer)
+
+    assert [r['cluster'] for r in results] == [c for c, _ in clusters]
+    assert peak == {'us-east-1': 2, 'eu-west-1': 2}
+
+    summary = flota_eks.aggregate(results + [{'cluster': 'x', 'region': 'eu-west-1', 'status': 'error'}])
+    assert (summary['ok'], summary['errors'], summary['node_count']) == (12, 1, 12)
+    assert summary['total_savings'] == 24.0
+    assert summary['by_region']['eu-west-1']['clusters'] == 5
+
+def test_run_fleet_rechaza_limites_vacios():
+    for kwargs in ({'max_workers': 0}, {'per_region': 0}):
+        with pytest.raises(ValueError):
+            flota_eks.run_fleet([('a', 'us-east-1')], analyzer=lambda c, r: {}, **kwargs)
+    with pytest.raises(SystemExit):
+        flota_eks.main(['--per-region', '0'])
+
+def test_run_fleet_pasa_costos_precargados():
+    recibidos = {}
+
+    def fake_analyzer(cluster_name, region, cost_data=None):
+        recibidos[cluster_name] = cost_data
+        return {'cluster': cluster_name, 'region': region, 'status': 'ok'}
+
+    costs = {('a', 'us-east-1'): {'monthly_cost': 100.0}}
+    flota_eks.run_fleet([('a', 'us-east-1'), ('b', 'us-east-1')], max_workers=2, analyzer=fake_analyzer, costs=costs)
+    assert recibidos == {'a': {'monthly_cost': 100.0}, 'b': None}
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Pruebas offline del índice de precios contra offer files de ejemplo (fixtures/)
+"""
+import io
+import os
+
+import calculadora_eks
+import indice_precios
+from indice_precios import IndicePrecios, ingest, iter_offer_json
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+EC2_CSV = os.path.join(FIXTURES, 'offer_ec2_sample.csv')
+EKS_JSON = os.path.join(FIXTURES, 'offer_eks_sample.json')
+
+def test_ingesta_csv_y_json():
+    index = ingest([EC2_CSV, EKS_JSON])
+
+    assert index.precio_ec2('m5.large', 'us-east-1') == 0.096
+    assert index.precio_ec2('m5.large', 'eu-west-1') == 0.107
+    assert index.precio_ec2('m5.large', 'us-east-1', os_name='Windows') == 0.188
+    assert index.precio_ec2('m5.large', 'us-east-1', tenancy='Dedicated') == 0.1056
+    assert index.specs('r5.4xlarge', 'us-east-1') == (16.0, 128.0)
+    # Región resuelta desde 'location' cuando falta regionCode
+    assert index.precio_automode_fee('r5.4xlarge', 'us-east-1') == 0.12096
+    assert index.precio_automode_fee('m5.large', 'eu-west-1') == 0.01284
+    # Las filas sin instanceType (Control Plane) y los términos Reserved no entran
+    assert index.instance_types('us-east-1', indice_precios.OPERATION_AUTOMODE) == ['m5.large', 'r5.4xlarge']
+
+def test_filtro_de_regiones_y_roundtrip(tmp_path):
+    index = ingest([EC2_CSV, EKS_JSON], regions=['us-east-1'])
+    assert index.precio_ec2('m5.large', 'eu-west-1') is None
+
+    path = str(tmp_path / 'price_index.bin')
+    index.save(path)
+    loaded = IndicePrecios.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.precio_ec2('c5.large', 'us-east-1') == 0.085
+    assert loaded.precio_automode_fee('m5.large', 'us-east-1') == 0.01152
+
+def test_json_incremental_con_buffer_chico(monkeypatch):
+    # Forzar lecturas de pocos bytes para ejercitar el rellenado del buffer
+    monkeypatch.setattr(indice_precios, '_CHUNK_SIZE', 7)
+    with open(EKS_JSON, encoding='utf-8') as f:
+        rows = list(iter_offer_json(io.StringIO(f.read())))
+    assert len(rows) == 3
+
+def test_calculadora_usa_indice_como_backend(tmp_path, monkeypatch):
+    path = str(tmp_path / 'price_index.bin')
+    ingest([EC2_CSV, EKS_JSON]).save(path)
+    monkeypatch.setenv('EKS_PRICE_INDEX', path)
+    monkeypatch.setattr(indice_precios, '_default_index', None)
+    monkeypatch.setattr(indice_precios, '_default_index_loaded', False)
+
+    def sin_api():
+        raise AssertionError("No debería consultarse el Pricing API")
+
+    monkeypatch.setattr(calculadora_eks, 'get_pricing_client', sin_api)
+    assert calculadora_eks.obtener_precio_ec2_aws('r5.4xlarge', 'us-east-1') == 1.008
+    assert calculadora_eks.obtener_precio_eks_automode_aws('m5.large', 'us-east-1') == 0.01152
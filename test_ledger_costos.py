@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Pruebas del ledger local de costos de Cost Explorer
+"""
+from datetime import datetime, timedelta
+
+from botocore.stub import ANY
+
+import recolector_eks_aws
+from ledger_costos import CostLedger, ventanas_locales, clave_cluster, EKS_SERVICE
+from test_recolector_eks_aws import _stub_client
+
+def _dias(start, end):
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days)]
+
+def _results(dias, estimados=(), grupos=True, control_plane=False):
+    results = []
+    for dia in dias:
+        siguiente = (datetime.strptime(dia, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        result = {'TimePeriod': {'Start': dia, 'End': siguiente}, 'Estimated': dia in estimados}
+        if grupos:
+            result['Total'] = {}
+            result['Groups'] = [
+                {'Keys': ['Amazon Elastic Compute Cloud - Compute', 'On Demand Instances'],
+                 'Metrics': {'AmortizedCost': {'Amount': '10', 'Unit': 'USD'},
+                             'UsageQuantity': {'Amount': '24', 'Unit': 'Hrs'}}},
+                {'Keys': ['Amazon Elastic Compute Cloud - Compute', 'Savings Plans'],
+                 'Metrics': {'AmortizedCost': {'Amount': '5', 'Unit': 'USD'},
+                             'UsageQuantity': {'Amount': '24', 'Unit': 'Hrs'}}},
+            ]
+            if control_plane:
+                result['Groups'].append(
+                    {'Keys': [EKS_SERVICE, 'On Demand Instances'],
+                     'Metrics': {'AmortizedCost': {'Amount': '2.4', 'Unit': 'USD'},
+                                 'UsageQuantity': {'Amount': '24', 'Unit': 'Hrs'}}})
+        else:
+            result['Total'] = {'AmortizedCost': {'Amount': '2.4', 'Unit': 'USD'}}
+        results.append(result)
+    return results
+
+def test_solo_pide_dias_pendientes_y_sigue_next_page_token(tmp_path, monkeypatch):
+    ledger = CostLedger(str(tmp_path / 'ledger.sqlite'))
+    monkeypatch.setattr(recolector_eks_aws, 'get_default_ledger', lambda: ledger)
+    stubber = _stub_client(monkeypatch, 'ce')
+
+    end_date = datetime.now().date() - timedelta(days=2)
+    dias = _dias(end_date - timedelta(days=30), end_date)
+    estimados = dias[-2:]
+    consulta = {'Granularity': 'DAILY', 'Metrics': ['AmortizedCost', 'UsageQuantity'],
+                'Filter': recolector_eks_aws.cost_explorer_filter_cluster('prod', 'us-east-1'), 'GroupBy': ANY}
+    periodo = {'Start': dias[0], 'End': end_date.strftime('%Y-%m-%d')}
+
+    # Primera ejecución: 30 días en una sola consulta (Control Plane + Data Plane) de dos páginas
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': _results(dias[:20], estimados, control_plane=True),
+                                                'NextPageToken': 'p2'},
+                         {**consulta, 'TimePeriod': periodo})
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': _results(dias[20:], estimados, control_plane=True)},
+                         {**consulta, 'TimePeriod': periodo, 'NextPageToken': 'p2'})
+    # Segunda ejecución: solo los 2 días que seguían estimados
+    pendientes = {'Start': estimados[0], 'End': end_date.strftime('%Y-%m-%d')}
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': _results(estimados, control_plane=True)},
+                         {**consulta, 'TimePeriod': pendientes})
+
+    with stubber:
+        for _ in range(2):
+            cost = recolector_eks_aws.get_real_cost_from_cost_explorer('prod', 'us-east-1', [])
+            assert cost['data_source'] == 'Cost Explorer'
+            assert cost['monthly_cost'] == round((15 + 2.4) * 30, 2)
+            assert cost['sp_percentage'] == round(5 / 17.4 * 100, 1)
+            assert cost['has_control_plane'] and cost['by_service'][EKS_SERVICE] == 72.0
+
+        # Tercera ejecución: todo finalizado, sin requests
+        assert recolector_eks_aws.get_real_cost_from_cost_explorer('prod', 'us-east-1', [])['monthly_cost'] == 522.0
+        stubber.assert_no_pending_responses()
+
+    assert ledger.cubre(clave_cluster('prod', 'us-east-1'), dias[0], end_date)
+    ventanas = ventanas_locales(ledger, 'prod', 'us-east-1', (30, 60))
+    assert ventanas[30] == {'monthly_cost': 522.0, 'data_plane': 450.0, 'control_plane': 72.0, 'completa': True}
+    assert ventanas[60]['completa'] is False
+
+def _grupo(keys, cost, usage=0):
+    return {'Keys': keys, 'Metrics': {'AmortizedCost': {'Amount': str(cost), 'Unit': 'USD'},
+                                      'UsageQuantity': {'Amount': str(usage), 'Unit': 'Hrs'}}}
+
+def _periodo_flota(days=30):
+    """Primer día de la ventana de atribuir_costos (las filas diarias se guardan en el ledger)"""
+    start = datetime.now().date() - timedelta(days=2 + days)
+    return {'Start': start.strftime('%Y-%m-%d'), 'End': (start + timedelta(days=1)).strftime('%Y-%m-%d')}
+
+def test_costos_de_flota_con_dos_consultas(monkeypatch):
+    monkeypatch.setattr(recolector_eks_aws, 'get_default_ledger', lambda: CostLedger(':memory:'))
+    stubber = _stub_client(monkeypatch, 'ce')
+    clusters = [('prod', 'us-east-1'), ('staging', 'us-east-1'), ('eu', 'eu-west-1'), ('sin-tag', 'us-east-1')]
+    periodo = _periodo_flota()
+
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': [{'TimePeriod': periodo, 'Total': {}, 'Groups': [
+        _grupo(['aws:eks:cluster-name$prod', 'On Demand Instances'], 300, 720),
+        _grupo(['aws:eks:cluster-name$prod', 'Savings Plans'], 100, 720),
+    ]}], 'NextPageToken': 'p2'})
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': [{'TimePeriod': periodo, 'Total': {}, 'Groups': [
+        _grupo(['aws:eks:cluster-name$staging', 'Spot Instances'], 50, 720),
+        _grupo(['aws:eks:cluster-name$eu', 'On Demand Instances'], 80, 720),
+    ]}]})
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': [{'TimePeriod': periodo, 'Total': {}, 'Groups': [
+        _grupo(['us-east-1'], 144), _grupo(['eu-west-1'], 72),
+    ]}]})
+
+    # Serializa las dos consultas para que el orden del Stubber sea determinístico
+    monkeypatch.setattr(recolector_eks_aws, 'ThreadPoolExecutor', _SerialExecutor)
+    with stubber:
+        costos = recolector_eks_aws.get_fleet_costs(clusters, days=30)
+        stubber.assert_no_pending_responses()
+
+    assert set(costos) == {('prod', 'us-east-1'), ('staging', 'us-east-1'), ('eu', 'eu-west-1')}
+    prod = costos[('prod', 'us-east-1')]
+    assert prod['data_source'] == 'Cost Explorer (flota)'
+    # El Control Plane de us-east-1 (144) se reparte entre sus 3 clusters de la flota
+    assert prod['monthly_cost'] == 448.0
+    assert prod['sp_percentage'] == round(100 / 448 * 100, 1)
+    assert costos[('staging', 'us-east-1')]['monthly_cost'] == 98.0
+    assert costos[('eu', 'eu-west-1')]['monthly_cost'] == 152.0
+
+class _SerialExecutor:
+    """ThreadPoolExecutor que ejecuta cada submit() en el momento"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+def test_guardar_reemplaza_dias_y_suma_paginas():
+    ledger = CostLedger(':memory:')
+    dias = ['2025-01-01', '2025-01-02']
+    # El mismo día repartido en dos páginas se suma; la segunda escritura reemplaza
+    ledger.guardar('k', '2025-01-01', '2025-01-03', _results(dias, estimados=dias) + _results(dias[:1]))
+    assert ledger.total('k', '2025-01-01', '2025-01-03') == 45.0
+    assert ledger.dias_pendientes('k', '2025-01-01', '2025-01-04') == dias + ['2025-01-03']
+
+    ledger.guardar('k', '2025-01-01', '2025-01-03', _results(dias))
+    assert ledger.total('k', '2025-01-01', '2025-01-03') == 30.0
+    assert ledger.dias_pendientes('k', '2025-01-01', '2025-01-03') == []
+    assert ledger.stats() == {'claves': 1, 'dias': 2, 'dias_finales': 2, 'filas': 4}
+
+def test_atribucion_de_la_cuenta_en_una_pasada(monkeypatch, capsys):
+    import flota_eks
+    ledger = CostLedger(':memory:')
+    monkeypatch.setattr(recolector_eks_aws, 'get_default_ledger', lambda: ledger)
+    stubber = _stub_client(monkeypatch, 'ce')
+    periodo = _periodo_flota()
+    data_plane = {'TimePeriod': ANY, 'Granularity': 'DAILY', 'Metrics': ['AmortizedCost', 'UsageQuantity'],
+                  'Filter': {'Not': {'Tags': {'Key': 'aws:eks:cluster-name', 'MatchOptions': ['ABSENT']}}},
+                  'GroupBy': ANY}
+
+    # 50 clusters en tres páginas: 3 requests en lugar de 50
+    nombres = [f'c{i:02d}' for i in range(50)]
+    paginas = [nombres[:20], nombres[20:40], nombres[40:]]
+    for numero, pagina in enumerate(paginas):
+        response = {'ResultsByTime': [{'TimePeriod': periodo, 'Total': {}, 'Groups': [
+            _grupo([f'aws:eks:cluster-name${nombre}', 'On Demand Instances'], 100, 720) for nombre in pagina
+        ] + [_grupo(['aws:eks:cluster-name$', 'On Demand Instances'], 999)]}]}
+        params = dict(data_plane)
+        if numero:
+            params['NextPageToken'] = f'p{numero}'
+        if numero < len(paginas) - 1:
+            response['NextPageToken'] = f'p{numero + 1}'
+        stubber.add_response('get_cost_and_usage', response, params)
+    stubber.add_response('get_cost_and_usage', {'ResultsByTime': [{'TimePeriod': periodo, 'Total': {}, 'Groups': [
+        _grupo(['us-east-1'], 72)]}]},
+        {'TimePeriod': ANY, 'Granularity': 'DAILY', 'Metrics': ['AmortizedCost'],
+         'Filter': {'Dimensions': {'Key': 'SERVICE', 'Values': [EKS_SERVICE]}}, 'GroupBy': ANY})
+
+    monkeypatch.setattr(recolector_eks_aws, 'ThreadPoolExecutor', _SerialExecutor)
+    with stubber:
+        atribucion = recolector_eks_aws.atribuir_costos(days=30)
+        stubber.assert_no_pending_responses()
+
+    assert atribucion.requests == 4
+    assert atribucion.clusters() == nombres  # las filas sin tag no se atribuyen
+    assert atribucion.control_plane == {'us-east-1': 72.0}
+    tabla = atribucion.tabla()
+    assert len(tabla) == 50 and tabla[0]['monthly_cost'] == 100.0 and tabla[0]['on_demand'] == 100.0
+    assert atribucion.cost_data('c07', 'us-east-1')['monthly_cost'] == 172.0
+    assert atribucion.cost_data('otro', 'us-east-1') is None
+
+    # Los días ya finalizados salen del ledger: la segunda pasada no consulta Cost Explorer
+    with stubber:
+        repetida = recolector_eks_aws.atribuir_costos(days=30)
+    assert repetida.requests == 0
+    assert repetida.tabla() == tabla and repetida.control_plane == atribucion.control_plane
+
+    monkeypatch.setattr(flota_eks, 'atribuir_costos', lambda: atribucion)
+    assert flota_eks.main(['--account-costs']) == 0
+    salida = capsys.readouterr().out
+    assert '50 clusters' in salida and '4 requests' in salida
@@ -2,7 +2,18 @@
 """
 Script de prueba para verificar que el logging funciona correctamente
 """
-from logger_utils import setup_logger, log_command_execution, log_aws_api_call
+import json
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+import logger_utils
+from logger_utils import (setup_logger, log_command_execution, log_aws_api_call, AsyncFileHandler, Instrumentacion,
+                          medir, instrumentado, en_etapa, finalizar_instrumentacion)
+from planificador_etapas import Stage, run_stages
 
 def test_logging():
     # Configurar logger
@@ -33,5 +44,77 @@ def test_logging():
     print("   export EKS_CALCULATOR_LOG_DIR='/var/log/eks-calculator'")
     print("   python3 test_logging.py")
 
+def test_instrumentacion_por_etapa(tmp_path, monkeypatch, capsys):
+    eventos = tmp_path / 'eventos.jsonl'
+    monkeypatch.setattr(logger_utils, 'instrumentacion', Instrumentacion(str(eventos)))
+    monkeypatch.setattr(logger_utils, 'METRICS_FILE', str(tmp_path / 'metricas.txt'))
+
+    @instrumentado()
+    def describe(n):
+        with medir('aws', 'ec2.DescribeInstances') as evento:
+            evento.update(payload_bytes=2048, resultados=n, reintentos=1)
+        return n
+
+    run_stages([Stage('nodos', lambda: describe(3)), Stage('costo', lambda nodos: describe(nodos), inputs=('nodos',))])
+    with en_etapa('costo'):
+        with pytest.raises(ValueError):
+            with medir('aws', 'ce.GetCostAndUsage'):
+                raise ValueError('boom')
+
+    filas = {(f['tipo'], f['etapa'], f['nombre']): f for f in logger_utils.instrumentacion.resumen()}
+    assert set(filas) == {('etapa', 'nodos', 'nodos'), ('etapa', 'costo', 'costo'),
+                          ('funcion', 'nodos', 'describe'), ('funcion', 'costo', 'describe'),
+                          ('aws', 'nodos', 'ec2.DescribeInstances'), ('aws', 'costo', 'ec2.DescribeInstances'),
+                          ('aws', 'costo', 'ce.GetCostAndUsage')}
+    assert filas[('aws', 'costo', 'ec2.DescribeInstances')]['payload_bytes'] == 2048
+    assert filas[('aws', 'costo', 'ce.GetCostAndUsage')]['errores'] == 1
+
+    lineas = [json.loads(linea) for linea in eventos.read_text().splitlines()]
+    assert len(lineas) == 7 and all('duracion_ms' in evento for evento in lineas)
+
+    finalizar_instrumentacion(profile=True, file=sys.stdout)
+    assert 'RESUMEN DE TIEMPOS' in capsys.readouterr().out
+    metricas = (tmp_path / 'metricas.txt').read_text()
+    assert 'eks_calculator_retries_total{tipo="aws",etapa="nodos",nombre="ec2.DescribeInstances"} 1' in metricas
+    assert metricas.endswith('# EOF\n')
+
+def test_openmetrics_escapa_labels():
+    instrumentacion = Instrumentacion()
+    instrumentacion.registrar({'tipo': 'funcion', 'etapa': 'a"b', 'nombre': 'c:\\tmp', 'duracion_ms': 1.0})
+    metricas = instrumentacion.openmetrics()
+    assert 'eks_calculator_errors_total{tipo="funcion",etapa="a\\"b",nombre="c:\\\\tmp"} 0' in metricas
+    assert '# HELP eks_calculator_retries Reintentos\n' in metricas
+
+def test_logger_asincronico_con_rotacion(tmp_path, monkeypatch):
+    formatter = logging.Formatter('%(levelname)s - %(message)s')
+    handler = AsyncFileHandler(str(tmp_path / 'rot.log'), formatter, max_bytes=2000, backup_count=2)
+    logger = logging.getLogger('test_logger_asincronico')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(200):
+            logger.info("línea %d: %s", i, 'x' * 40)
+        threads = set(threading.enumerate())
+        handler.flush()
+        assert set(threading.enumerate()) == threads  # flush no reinicia el listener
+        archivos = sorted(p.name for p in tmp_path.iterdir())
+        assert archivos == ['rot.log', 'rot.log.1', 'rot.log.2']
+        assert all(p.stat().st_size <= 2000 for p in tmp_path.iterdir())
+        assert 'INFO - línea 199: ' in (tmp_path / 'rot.log').read_text(encoding='utf-8')
+
+        # Proceso hijo (fork): escritura sincrónica en append, sin rotar
+        pid = os.getpid()
+        monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+        for i in range(100):
+            logger.info("desde el hijo %d: %s", i, 'x' * 40)
+        assert 'desde el hijo 99' in (tmp_path / 'rot.log').read_text(encoding='utf-8')
+        assert sorted(p.name for p in tmp_path.iterdir()) == archivos
+        assert (tmp_path / 'rot.log').stat().st_size > 2000
+    finally:
+        logger.removeHandler(handler)
+        monkeypatch.undo()
+        handler.close()
+
 if __name__ == "__main__":
     test_logging()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor GetMetricData con clientes botocore stubbeados
+"""
+from datetime import datetime, timedelta
+
+import boto3
+from botocore.stub import Stubber, ANY
+
+from metricas_cloudwatch import build_metric_query, get_metric_data_batch, MAX_QUERIES_PER_REQUEST
+
+def _results(queries, value):
+    return [
+        {'Id': q['Id'], 'Label': q['Id'], 'Timestamps': [datetime(2025, 1, 1)],
+         'Values': [value], 'StatusCode': 'Complete'}
+        for q in queries
+    ]
+
+def test_get_metric_data_batch_agrupa_y_pagina():
+    cloudwatch = boto3.client('cloudwatch', region_name='us-east-1',
+                              aws_access_key_id='test', aws_secret_access_key='test')
+    end_time = datetime(2025, 1, 8)
+    start_time = end_time - timedelta(days=7)
+
+    queries = [
+        build_metric_query(f"i{idx}", 'AWS/EC2', 'CPUUtilization',
+                           {'InstanceId': f"i-{idx:08x}"}, 3600, 'Average')
+        for idx in range(1200)
+    ]
+    batches = [queries[0:500], queries[500:1000], queries[1000:1200]]
+
+    stubber = Stubber(cloudwatch)
+    # Lote 1: una página
+    stubber.add_response('get_metric_data', {'MetricDataResults': _results(batches[0], 10.0)},
+                         {'MetricDataQueries': batches[0], 'StartTime': ANY, 'EndTime': ANY,
+                          'ScanBy': 'TimestampAscending'})
+    # Lote 2: dos páginas (NextToken)
+    stubber.add_response('get_metric_data', {'MetricDataResults': _results(batches[1], 20.0),
+                                             'NextToken': 'pagina-2'},
+                         {'MetricDataQueries': batches[1], 'StartTime': ANY, 'EndTime': ANY,
+                          'ScanBy': 'TimestampAscending'})
+    stubber.add_response('get_metric_data', {'MetricDataResults': _results(batches[1], 30.0)},
+                         {'MetricDataQueries': batches[1], 'StartTime': ANY, 'EndTime': ANY,
+                          'ScanBy': 'TimestampAscending', 'NextToken': 'pagina-2'})
+    # Lote 3: resto
+    stubber.add_response('get_metric_data', {'MetricDataResults': _results(batches[2], 40.0)},
+                         {'MetricDataQueries': batches[2], 'StartTime': ANY, 'EndTime': ANY,
+                          'ScanBy': 'TimestampAscending'})
+
+    with stubber:
+        series = get_metric_data_batch(cloudwatch, iter(queries), start_time, end_time)
+        stubber.assert_no_pending_responses()
+
+    assert MAX_QUERIES_PER_REQUEST == 500
+    assert len(series) == 1200
+    assert series['i0']['values'] == [10.0]
+    assert series['i600']['values'] == [20.0, 30.0]
+    assert series['i1199']['values'] == [40.0]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Pruebas del planificador de etapas del recolector
+"""
+import time
+
+import pytest
+
+from planificador_etapas import Stage, run_stages
+
+def test_etapas_independientes_corren_en_paralelo():
+    def lenta(valor):
+        def func(**kwargs):
+            time.sleep(0.2)
+            return valor
+        return func
+
+    stages = [
+        Stage('a', lenta(1)),
+        Stage('b', lenta(2)),
+        Stage('c', lenta(3)),
+        Stage('suma', lambda a, b, c: a + b + c, ('a', 'b', 'c')),
+    ]
+
+    start = time.perf_counter()
+    results = run_stages(stages)
+    elapsed = time.perf_counter() - start
+
+    assert results['suma'] == 6
+    # Tres etapas de 0.2s en paralelo: acotado por la más lenta, no por la suma
+    assert elapsed < 0.5
+
+def test_error_en_etapa_se_propaga():
+    def falla():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_stages([Stage('falla', falla), Stage('despues', lambda falla: falla, ('falla',))])
+
+def test_ciclos_y_entradas_inexistentes():
+    with pytest.raises(ValueError):
+        run_stages([Stage('a', lambda b: b, ('b',)), Stage('b', lambda a: a, ('a',))])
+    with pytest.raises(ValueError):
+        run_stages([Stage('a', lambda x: x, ('x',))])
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pruebas del recolector con clientes botocore stubbeados
+"""
+import threading
+from datetime import datetime, timezone
+
+import boto3
+from botocore.stub import Stubber, ANY
+
+import recolector_eks_aws
+from planificador_etapas import run_stages
+
+def _instance(idx, instance_type='m5.large', spot=False):
+    instance = {
+        'InstanceId': f'i-{idx:017x}',
+        'InstanceType': instance_type,
+        'LaunchTime': datetime(2025, 1, 1, tzinfo=timezone.utc),
+        'Placement': {'AvailabilityZone': 'us-east-1a' if idx % 2 else 'us-east-1b'},
+        'Tags': [{'Key': 'eks:nodegroup-name', 'Value': 'ng-general'},
+                 {'Key': 'aws:autoscaling:groupName', 'Value': 'eks-ng-general-asg'}],
+    }
+    if spot:
+        instance['InstanceLifecycle'] = 'spot'
+    return instance
+
+def _stub_client(monkeypatch, service):
+    client = boto3.client(service, region_name='us-east-1',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    stubber = Stubber(client)
+    monkeypatch.setattr(recolector_eks_aws, 'create_client', lambda s, r: client)
+    return stubber
+
+def test_get_cluster_nodes_sigue_next_token(monkeypatch):
+    stubber = _stub_client(monkeypatch, 'ec2')
+    expected = {'Filters': ANY, 'MaxResults': 1000}
+    stubber.add_response('describe_instances', {
+        'Reservations': [{'Instances': [_instance(i) for i in range(3)]}], 'NextToken': 'p2'
+    }, expected)
+    stubber.add_response('describe_instances', {
+        'Reservations': [{'Instances': [_instance(3, 'c5.xlarge', spot=True)]}]
+    }, {**expected, 'NextToken': 'p2'})
+    stubber.activate()
+
+    nodes = recolector_eks_aws.get_cluster_nodes('demo', 'us-east-1')
+
+    stubber.assert_no_pending_responses()
+    assert len(nodes) == 4
+    assert nodes[0]['nodegroup'] == 'ng-general'
+    assert nodes[0]['asg_name'] == 'eks-ng-general-asg'
+    assert nodes[1]['availability_zone'] == 'us-east-1a'
+    assert [n['lifecycle'] for n in nodes] == ['on-demand'] * 3 + ['spot']
+
+def _asg(name, tags):
+    return {'AutoScalingGroupName': name, 'MinSize': 0, 'MaxSize': 10, 'DesiredCapacity': 3,
+            'DefaultCooldown': 300, 'AvailabilityZones': ['us-east-1a'], 'HealthCheckType': 'EC2',
+            'CreatedTime': datetime(2025, 1, 1, tzinfo=timezone.utc),
+            'Tags': [{'Key': k, 'Value': v, 'ResourceId': name} for k, v in tags.items()]}
+
+def test_analyze_asg_stability_filtra_pagina_y_consulta_en_lote(monkeypatch):
+    asg = boto3.client('autoscaling', region_name='us-east-1',
+                       aws_access_key_id='test', aws_secret_access_key='test')
+    cloudwatch = boto3.client('cloudwatch', region_name='us-east-1',
+                              aws_access_key_id='test', aws_secret_access_key='test')
+    clients = {'autoscaling': asg, 'cloudwatch': cloudwatch}
+    monkeypatch.setattr(recolector_eks_aws, 'create_client', lambda s, r: clients[s])
+    asg_stubber, cw_stubber = Stubber(asg), Stubber(cloudwatch)
+
+    managed = {'eks:cluster-name': 'prod', 'kubernetes.io/cluster/prod': 'owned'}
+    por_nombre = {'Filters': [{'Name': 'tag:eks:cluster-name', 'Values': ['prod']}], 'MaxRecords': 100}
+    por_clave = {'Filters': [{'Name': 'tag-key', 'Values': ['kubernetes.io/cluster/prod']}], 'MaxRecords': 100}
+    asg_stubber.add_response('describe_auto_scaling_groups',
+                             {'AutoScalingGroups': [_asg('ng-a', managed)], 'NextToken': 'p2'}, por_nombre)
+    asg_stubber.add_response('describe_auto_scaling_groups',
+                             {'AutoScalingGroups': [_asg('ng-b', managed)]}, {**por_nombre, 'NextToken': 'p2'})
+    # El ASG self-managed solo lleva la clave de Kubernetes; ng-a aparece en ambas consultas
+    asg_stubber.add_response('describe_auto_scaling_groups', {'AutoScalingGroups': [
+        _asg('ng-a', managed), _asg('self-managed', {'kubernetes.io/cluster/prod': 'owned'})]}, por_clave)
+
+    # Un único GetMetricData con mínimo y máximo de los 3 ASGs
+    queries = {f"g{idx}_{stat}": values for idx, values in enumerate(([3, 3], [2, 5], [1, 1]))
+               for stat, values in (('minimum', [min(values)]), ('maximum', [max(values)]))}
+    cw_stubber.add_response('get_metric_data', {'MetricDataResults': [
+        {'Id': query_id, 'Label': query_id, 'StatusCode': 'Complete',
+         'Timestamps': [datetime(2025, 1, 1, tzinfo=timezone.utc)], 'Values': values}
+        for query_id, values in queries.items()]}, {'MetricDataQueries': ANY, 'StartTime': ANY, 'EndTime': ANY, 'ScanBy': ANY})
+
+    with asg_stubber, cw_stubber:
+        assert [g['AutoScalingGroupName'] for g in recolector_eks_aws.iter_cluster_asgs('prod', 'us-east-1')] == \
+            ['ng-a', 'ng-b', 'self-managed']
+        asg_stubber.add_response('describe_auto_scaling_groups',
+                                 {'AutoScalingGroups': [_asg('ng-a', managed), _asg('ng-b', managed)]}, por_nombre)
+        asg_stubber.add_response('describe_auto_scaling_groups', {'AutoScalingGroups': [
+            _asg('self-managed', {'kubernetes.io/cluster/prod': 'owned'})]}, por_clave)
+        assert recolector_eks_aws.analyze_asg_stability('prod', 'us-east-1') == {'scaling_observed': True}
+        asg_stubber.assert_no_pending_responses()
+        cw_stubber.assert_no_pending_responses()
+
+def test_inventario_de_node_groups_compartido(monkeypatch):
+    clients = {service: boto3.client(service, region_name='us-east-1',
+                                     aws_access_key_id='test', aws_secret_access_key='test')
+               for service in ('eks', 'ec2', 'autoscaling', 'cloudwatch')}
+    monkeypatch.setattr(recolector_eks_aws, 'create_client', lambda s, r: clients[s])
+    # Un worker: los DescribeNodegroup salen en orden para el Stubber
+    monkeypatch.setattr(recolector_eks_aws, 'NODEGROUP_WORKERS', 1)
+    eks, ec2, autoscaling, cloudwatch = (Stubber(clients[s]) for s in ('eks', 'ec2', 'autoscaling', 'cloudwatch'))
+
+    eks.add_response('list_nodegroups', {'nodegroups': ['ng-general'], 'nextToken': 'p2'}, {'clusterName': 'demo'})
+    eks.add_response('list_nodegroups', {'nodegroups': ['ng-spot']}, {'clusterName': 'demo', 'nextToken': 'p2'})
+    for name, capacity, asg_name in (('ng-general', 'ON_DEMAND', 'eks-ng-general-asg'),
+                                     ('ng-spot', 'SPOT', 'eks-ng-spot-asg')):
+        eks.add_response('describe_nodegroup', {'nodegroup': {
+            'nodegroupName': name, 'status': 'ACTIVE', 'capacityType': capacity, 'instanceTypes': ['m5.large'],
+            'scalingConfig': {'minSize': 1, 'maxSize': 5, 'desiredSize': 2},
+            'resources': {'autoScalingGroups': [{'name': asg_name}]}}},
+            {'clusterName': 'demo', 'nodegroupName': name})
+    self_managed = _instance(1)
+    self_managed['Tags'] = [{'Key': 'aws:autoscaling:groupName', 'Value': 'self-managed-asg'}]
+    ec2.add_response('describe_instances', {'Reservations': [{'Instances': [_instance(0), self_managed]}]},
+                     {'Filters': ANY, 'MaxResults': 1000})
+    # Cluster mixto: un nodo fuera del inventario activa la búsqueda por tags (sin repetir ASGs)
+    managed = {'eks:cluster-name': 'demo', 'kubernetes.io/cluster/demo': 'owned'}
+    autoscaling.add_response('describe_auto_scaling_groups', {'AutoScalingGroups': [
+        _asg('eks-ng-general-asg', managed), _asg('eks-ng-spot-asg', managed)]}, {'Filters': ANY, 'MaxRecords': 100})
+    autoscaling.add_response('describe_auto_scaling_groups', {'AutoScalingGroups': [
+        _asg('self-managed-asg', {'kubernetes.io/cluster/demo': 'owned'})]}, {'Filters': ANY, 'MaxRecords': 100})
+    # Sin una segunda consulta a EKS: el inventario sale del cache
+    for _ in range(2):
+        cloudwatch.add_response('get_metric_data', {'MetricDataResults': []},
+                                {'MetricDataQueries': ANY, 'StartTime': ANY, 'EndTime': ANY, 'ScanBy': ANY})
+
+    batch = recolector_eks_aws.get_metric_data_batch
+    lotes = []
+    monkeypatch.setattr(recolector_eks_aws, 'get_metric_data_batch',
+                        lambda client, queries, *args: lotes.append(queries) or batch(client, queries, *args))
+
+    with eks, ec2, autoscaling, cloudwatch:
+        inventory = recolector_eks_aws.get_nodegroup_inventory('demo', 'us-east-1', refresh=True)
+        nodes = recolector_eks_aws.anotar_nodegroups(recolector_eks_aws.get_cluster_nodes('demo', 'us-east-1'),
+                                                     inventory)
+        recolector_eks_aws.analyze_asg_stability('demo', 'us-east-1', instances=nodes)
+        # Con todos los nodos en managed node groups no hay búsqueda por tags
+        recolector_eks_aws.analyze_asg_stability('demo', 'us-east-1', instances=nodes[:1])
+        for stubber in (eks, ec2, autoscaling, cloudwatch):
+            stubber.assert_no_pending_responses()
+
+    assert [(ng['name'], ng['capacity_type'], ng['asg_names']) for ng in inventory] == [
+        ('ng-general', 'ON_DEMAND', ['eks-ng-general-asg']), ('ng-spot', 'SPOT', ['eks-ng-spot-asg'])]
+    assert inventory[0]['scaling'] == {'minSize': 1, 'maxSize': 5, 'desiredSize': 2}
+    assert nodes[0]['nodegroup'] == 'ng-general' and nodes[0]['capacity_type'] == 'ON_DEMAND'
+    assert nodes[1]['nodegroup'] is None and nodes[1]['capacity_type'] is None
+    assert [[q['MetricStat']['Metric']['Dimensions'][0]['Value'] for q in lote[::2]] for lote in lotes] == [
+        ['eks-ng-general-asg', 'eks-ng-spot-asg', 'self-managed-asg'], ['eks-ng-general-asg', 'eks-ng-spot-asg']]
+    assert recolector_eks_aws.get_nodegroup_inventory('demo', 'us-east-1') is inventory
+    recolector_eks_aws.clear_nodegroup_inventory('demo', 'us-east-1')
+    assert ('demo', 'us-east-1') not in recolector_eks_aws._nodegroup_inventory
+
+def test_cost_explorer_no_espera_a_los_nodos(monkeypatch):
+    ce_empezo = threading.Event()
+    nodos_empezo = threading.Event()
+
+    def nodos(cluster_name, region):
+        nodos_empezo.set()
+        # Si Cost Explorer dependiera de los nodos esto vencería el timeout
+        assert ce_empezo.wait(timeout=2)
+        return [{'instance_type': 'm5.large', 'asg_name': 'eks-ng-a'}]
+
+    def inventario(cluster_name, region, refresh=False):
+        # Ídem si describe_instances esperara al inventario de node groups
+        assert nodos_empezo.wait(timeout=2)
+        return [{'name': 'ng-a', 'capacity_type': 'SPOT', 'asg_names': ['eks-ng-a']}]
+
+    def cost_explorer(cluster_name, region, instances, days=30):
+        ce_empezo.set()
+        return {'data_source': recolector_eks_aws.FALLBACK_SOURCE, 'monthly_cost': 72.0}
+
+    monkeypatch.setattr(recolector_eks_aws, 'get_cluster_nodes', nodos)
+    monkeypatch.setattr(recolector_eks_aws, 'get_real_cost_from_cost_explorer', cost_explorer)
+    monkeypatch.setattr(recolector_eks_aws, 'get_nodegroup_inventory', inventario)
+    stages = [s for s in recolector_eks_aws.build_collector_stages('demo', 'us-east-1', interactive=False)
+              if s.name in ('nodegroups', 'nodes', 'instances', 'cost_ce', 'cost')]
+    results = run_stages(stages)
+    assert results['cost']['monthly_cost'] == 72.0
+    assert results['instances'][0]['nodegroup'] == 'ng-a' and results['instances'][0]['capacity_type'] == 'SPOT'
+    assert 'capacity_type' not in results['nodes'][0]
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Pruebas del recolector de Kubernetes contra un API server falso local
+"""
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from kubernetes import client
+
+from recolector_k8s import CacheK8s, recolectar_requests, requests_pod
+from calculadora_eks import PerfilCluster, PreciosInstancia, calcular_escenario
+
+class ApiServerFalso:
+    """
+    API server mínimo: listas de pods y nodos con limit/continue y watch de
+    los eventos posteriores a un resourceVersion (410 si fue compactado)
+    """
+
+    def __init__(self):
+        self.version = 1
+        self.objetos = {'pods': {}, 'nodes': {}}
+        self.eventos = []  # (version, recurso, tipo, objeto)
+        self.compactado = 0
+        self.requests = []
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                recurso = url.path.rsplit('/', 1)[-1]
+                servidor.requests.append((recurso, query))
+                if query.get('watch') == 'true':
+                    body = servidor._watch(recurso, int(query['resourceVersion']))
+                else:
+                    body = json.dumps(servidor._lista(recurso, query))
+                data = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def api(self):
+        configuration = client.Configuration()
+        configuration.host = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        return client.CoreV1Api(client.ApiClient(configuration))
+
+    def cambiar(self, recurso, tipo, objeto):
+        self.version += 1
+        objeto['metadata']['resourceVersion'] = str(self.version)
+        clave = objeto['metadata']['name']
+        if tipo == 'DELETED':
+            self.objetos[recurso].pop(clave, None)
+        else:
+            self.objetos[recurso][clave] = objeto
+        self.eventos.append((self.version, recurso, tipo, json.loads(json.dumps(objeto))))
+
+    def _lista(self, recurso, query):
+        items = sorted(self.objetos[recurso].values(), key=lambda o: o['metadata']['name'])
+        if 'status.phase!=Succeeded' in query.get('fieldSelector', ''):
+            items = [i for i in items if i['status'].get('phase') not in ('Succeeded', 'Failed')]
+        offset = int(query.get('continue', 0))
+        limit = int(query.get('limit', len(items) or 1))
+        metadata = {'resourceVersion': str(self.version)}
+        if offset + limit < len(items):
+            metadata['continue'] = str(offset + limit)
+        return {'kind': 'List', 'metadata': metadata, 'items': items[offset:offset + limit]}
+
+    def _watch(self, recurso, desde):
+        if desde < self.compactado:
+            return json.dumps({'type': 'ERROR', 'object': {'kind': 'Status', 'code': 410,
+                                                           'reason': 'Expired', 'message': 'too old'}}) + '\n'
+        lineas = [json.dumps({'type': tipo, 'object': objeto})
+                  for version, r, tipo, objeto in self.eventos if r == recurso and version > desde]
+        lineas.append(json.dumps({'type': 'BOOKMARK', 'object': {
+            'kind': 'Pod', 'metadata': {'resourceVersion': str(self.version)}}}))
+        return '\n'.join(lineas) + '\n'
+
+    def cerrar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def _nodo(name, cpu='1930m', memory='7250Mi', instance_type='m5.large'):
+    return {'metadata': {'name': name, 'labels': {'node.kubernetes.io/instance-type': instance_type}},
+            'status': {'allocatable': {'cpu': cpu, 'memory': memory}}}
+
+def _pod(name, node, cpu='50m', memory='256Mi', phase='Running', init=None):
+    spec = {'nodeName': node, 'containers': [{'name': 'app', 'resources': {'requests': {'cpu': cpu, 'memory': memory}}}]}
+    if init:
+        spec['initContainers'] = [{'name': 'init', 'resources': {'requests': init}}]
+    return {'metadata': {'name': name, 'namespace': 'default', 'uid': f'uid-{name}'}, 'spec': spec,
+            'status': {'phase': phase}}
+
+@pytest.fixture
+def servidor():
+    servidor = ApiServerFalso()
+    yield servidor
+    servidor.cerrar()
+
+def test_requests_efectivos_del_pod():
+    pod = _pod('a', 'n1', cpu='250m', init={'cpu': '1', 'memory': '128Mi'})
+    pod['spec']['containers'].append({'name': 'sidecar', 'resources': {'requests': {'cpu': '100m'}}})
+    pod['spec']['overhead'] = {'cpu': '50m', 'memory': '64Mi'}
+    assert requests_pod(pod) == pytest.approx((1.05, 0.3125))
+
+def test_lista_paginada_y_watch_incremental(servidor, tmp_path):
+    for nombre in ('n1', 'n2'):
+        servidor.cambiar('nodes', 'ADDED', _nodo(nombre))
+    for idx in range(25):
+        servidor.cambiar('pods', 'ADDED', _pod(f'p{idx:02d}', 'n1' if idx < 20 else 'n2'))
+    servidor.cambiar('pods', 'ADDED', _pod('job', 'n2', cpu='4', phase='Succeeded'))
+    servidor.cambiar('pods', 'ADDED', _pod('pendiente', None))
+    cache_path = str(tmp_path / 'k8s.json')
+
+    cache = CacheK8s()
+    cache.listar(servidor.api(), 'pods', page_size=10)
+    assert len([q for r, q in servidor.requests if r == 'pods' and 'limit' in q]) == 3
+    assert len(cache.pods) == 26  # el pod terminado no se guarda
+
+    servidor.requests.clear()
+    cache = recolectar_requests(api=servidor.api(), cache_path=cache_path)
+    requests = cache.requests()
+    assert cache.listados == 2 and requests.pendientes == 1
+    assert [(n['node'], n['pods']) for n in requests.nodos] == [('n1', 20), ('n2', 5)]
+    assert requests.nodos[0]['requested_cpu'] == pytest.approx(1.0)
+    assert requests.fraccion_cpu == pytest.approx(1.25 / 3.86)
+    assert requests.fraccion_mem == pytest.approx(6.25 / (2 * 7250 / 1024))
+
+    # Cambios entre ejecuciones: la siguiente solo hace watch desde el resourceVersion guardado
+    servidor.cambiar('pods', 'DELETED', _pod('p00', 'n1'))
+    servidor.cambiar('pods', 'MODIFIED', _pod('pendiente', 'n2'))
+    servidor.cambiar('pods', 'MODIFIED', _pod('p01', 'n1', phase='Succeeded'))
+    servidor.cambiar('pods', 'ADDED', _pod('nuevo', 'n2', cpu='1', memory='1Gi'))
+    servidor.cambiar('nodes', 'ADDED', _nodo('n3', cpu='3920m', memory='15Gi', instance_type='m5.xlarge'))
+    servidor.requests.clear()
+
+    cache = recolectar_requests(api=servidor.api(), cache_path=cache_path)
+    assert cache.listados == 0 and cache.eventos == 5
+    assert all(q.get('watch') == 'true' for _, q in servidor.requests)
+    requests = cache.requests()
+    assert [(n['node'], n['pods']) for n in requests.nodos] == [('n1', 18), ('n2', 7), ('n3', 0)]
+    assert requests.pendientes == 0
+    assert requests.nodos[1]['requested_cpu'] == pytest.approx(1.3)
+    assert cache.versiones['pods'] == str(servidor.version)
+    assert cache.workloads().pods == 25
+
+def test_version_expirada_vuelve_a_listar(servidor, tmp_path):
+    servidor.cambiar('nodes', 'ADDED', _nodo('n1'))
+    servidor.cambiar('pods', 'ADDED', _pod('a', 'n1'))
+    cache_path = str(tmp_path / 'k8s.json')
+    recolectar_requests(api=servidor.api(), cache_path=cache_path)
+
+    servidor.cambiar('pods', 'ADDED', _pod('b', 'n1'))
+    servidor.compactado = servidor.version + 1
+    cache = recolectar_requests(api=servidor.api(), cache_path=cache_path)
+    assert cache.listados == 2
+    assert sorted(cache.pods) == ['uid-a', 'uid-b']
+
+def test_requests_alimentan_el_waste_factor():
+    precios = PreciosInstancia(0.096, 0.0115, True)
+    perfil = PerfilCluster(instance_type='m5.large', node_count=10, utilizacion_cpu=0.2, utilizacion_mem=0.3)
+    assert calcular_escenario(perfil, precios).waste_factor == pytest.approx(0.75)
+
+    perfil = PerfilCluster.desde_entorno({'EKS_PRIMARY_INSTANCE': 'm5.large', 'EKS_NODE_COUNT': '10',
+                                          'EKS_UTIL_CPU': '20', 'EKS_UTIL_MEM': '30',
+                                          'EKS_REQUESTS_CPU': '60', 'EKS_REQUESTS_MEM': '70'})
+    assert (perfil.requests_cpu, perfil.requests_mem) == (0.6, 0.7)
+    assert calcular_escenario(perfil, precios).waste_factor == pytest.approx(0.35)
+
+def test_requests_acotan_la_simulacion_horaria():
+    precios = PreciosInstancia(0.096, 0.0115, True)
+    # Carga real baja con un pico diario; los requests reservan bastante más
+    perfil_horario = [0.15 + 0.25 * (h % 24 >= 18) for h in range(168)]
+    base = dict(instance_type='m5.large', node_count=10, utilizacion_cpu=0.2, utilizacion_mem=0.2,
+                perfil_cpu=perfil_horario, perfil_mem=perfil_horario)
+    sin_requests = calcular_escenario(PerfilCluster(**base), precios, simulacion_horaria=True)
+    con_requests = calcular_escenario(PerfilCluster(**base, requests_cpu=0.6, requests_mem=0.7), precios,
+                                      simulacion_horaria=True)
+
+    assert sin_requests.simulacion is not None and con_requests.simulacion is not None
+    # Los requests superan la carga en todas las horas: flota constante como la estimación estática
+    assert con_requests.simulacion.utilizacion_pico == pytest.approx(0.65)
+    assert con_requests.simulacion.nodos_min == con_requests.simulacion.nodos_max == con_requests.estimated_nodes_auto
+    assert con_requests.simulacion.nodos_promedio > sin_requests.simulacion.nodos_promedio
+    assert con_requests.auto_monthly_cost > sin_requests.auto_monthly_cost
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la grabación y reproducción offline de respuestas de AWS
+"""
+import atexit
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+import aws_utils
+from aws_utils import CallMetrics, RateLimiter
+from replay_aws import (Grabacion, clave_llamada, encadenar, entorno_offline, correr_pipeline, grabar,
+                        grabar_cluster_sintetico, interceptor_desde_entorno, reproducir, respuestas_sinteticas,
+                        responder, main)
+
+def test_grabar_y_reproducir_el_pipeline(tmp_path):
+    path = str(tmp_path / 'cluster.json.gz')
+    grabacion = Grabacion()
+    interceptor = encadenar(responder(respuestas_sinteticas('demo', 25)), grabar(grabacion))
+    with entorno_offline(interceptor, RateLimiter()):
+        datos_grabados, resultado_grabado = correr_pipeline('demo')
+    grabacion.guardar(path)
+
+    llamadas = []
+
+    def sin_red(service, region, operation, params):
+        llamadas.append(operation)
+        raise AssertionError('la reproducción no debe llamar a AWS')
+
+    reproduccion = encadenar(responder(sin_red), reproducir(Grabacion.cargar(path)))
+    with entorno_offline(reproduccion, RateLimiter()):
+        datos, resultado = correr_pipeline('demo')
+
+    assert llamadas == []
+    assert datos.node_count == datos_grabados.node_count == 25
+    assert datos.metric_source == 'Container Insights'
+    assert (datos.cpu_util, datos.mem_util) == (datos_grabados.cpu_util, datos_grabados.mem_util)
+    assert datos.cost_data == datos_grabados.cost_data
+    assert resultado.total_savings == resultado_grabado.total_savings
+
+def test_grabar_desde_el_entorno_sin_caches_locales(tmp_path, monkeypatch):
+    monkeypatch.setattr(atexit, 'register', lambda *args: None)
+    monkeypatch.setenv('EKS_AWS_RECORD', str(tmp_path / 'grabacion.json.gz'))
+    monkeypatch.setenv('EKS_PRICE_INDEX', str(tmp_path / 'price_index.bin'))
+    monkeypatch.delenv('EKS_AWS_REPLAY', raising=False)
+    # Con setenv, monkeypatch restaura los valores que cambia la grabación
+    monkeypatch.setenv('EKS_PRICING_CACHE', '1')
+    monkeypatch.setenv('EKS_COST_LEDGER', '1')
+
+    assert interceptor_desde_entorno() is not None
+    assert (os.environ['EKS_PRICING_CACHE'], os.environ['EKS_COST_LEDGER']) == ('0', '0')
+    assert 'EKS_PRICE_INDEX' not in os.environ
+
+def test_throttling_simulado_pasa_por_los_reintentos(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cluster.json.gz')
+    grabar_cluster_sintetico(path, 10, 'demo')
+    with entorno_offline(reproducir(Grabacion.cargar(path)), RateLimiter()):
+        _, esperado = correr_pipeline('demo')
+
+    metrics = CallMetrics()
+    monkeypatch.setattr(aws_utils, 'call_metrics', metrics)
+    monkeypatch.setattr(aws_utils, 'BACKOFF_BASE', 0.001)
+    with entorno_offline(reproducir(Grabacion.cargar(path), throttle=0.3, seed=3), RateLimiter()):
+        _, resultado = correr_pipeline('demo')
+
+    assert resultado.total_savings == esperado.total_savings
+    assert metrics.totals()['throttles'] > 0 and metrics.totals()['errors'] == 0
+
+def test_fechas_corridas_a_la_ventana_actual():
+    grabada = datetime(2025, 1, 10, tzinfo=timezone.utc)
+    grabacion = Grabacion()
+    grabacion.agregar('cloudwatch', 'us-east-1', 'GetMetricData',
+                      {'EndTime': grabada, 'StartTime': grabada - timedelta(days=1)},
+                      response={'MetricDataResults': [{'Id': 'u', 'Timestamps': [grabada - timedelta(hours=1)]}]})
+    grabacion.agregar('ce', 'us-east-1', 'GetCostAndUsage',
+                      {'TimePeriod': {'Start': '2025-01-01', 'End': '2025-01-10'}},
+                      response={'ResultsByTime': [{'TimePeriod': {'Start': '2025-01-09', 'End': '2025-01-10'}}]})
+
+    class Cliente:
+        pass
+    cliente = reproducir(grabacion)(Cliente(), 'cloudwatch', 'us-east-1')
+    ahora = grabada + timedelta(days=30)
+    respuesta = cliente._make_api_call('GetMetricData', {'EndTime': ahora, 'StartTime': ahora - timedelta(days=1)})
+    assert respuesta['MetricDataResults'][0]['Timestamps'] == [ahora - timedelta(hours=1)]
+
+    cliente = reproducir(grabacion)(Cliente(), 'ce', 'us-east-1')
+    respuesta = cliente._make_api_call('GetCostAndUsage', {'TimePeriod': {'Start': '2025-01-31', 'End': '2025-02-09'}})
+    assert respuesta['ResultsByTime'][0]['TimePeriod'] == {'Start': '2025-02-08', 'End': '2025-02-09'}
+
+    with pytest.raises(ClientError, match='RespuestaNoGrabada'):
+        cliente._make_api_call('GetCostAndUsage', {'TimePeriod': {'Start': '2025-01-31', 'End': '2025-02-09'},
+                                                   'Granularity': 'MONTHLY'})
+
+def test_clave_ignora_fechas_y_orden():
+    a = clave_llamada('ce', 'us-east-1', 'GetCostAndUsage', {'TimePeriod': {'Start': '2025-01-01'}, 'Metrics': ['A']})
+    b = clave_llamada('ce', 'us-east-1', 'GetCostAndUsage', {'Metrics': ['A'], 'TimePeriod': {'Start': '2025-03-01'}})
+    assert a == b
+    assert a != clave_llamada('ce', 'eu-west-1', 'GetCostAndUsage', {'Metrics': ['A'], 'TimePeriod': {}})
+
+def test_cli(tmp_path, capsys):
+    path = str(tmp_path / 's.json.gz')
+    assert main(['sintetico', '--nodes', '5', '--output', path]) == 0
+    assert main(['info', path]) == 0
+    salida = capsys.readouterr().out
+    assert 'ec2.DescribeInstances' in salida and 'pricing.GetProducts' in salida
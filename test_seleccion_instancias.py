@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la selección de tipos de instancia sobre el catálogo
+"""
+import numpy as np
+import pytest
+
+import calculadora_eks
+from calculadora_eks import PerfilCluster, evaluar_cluster, PreciosInstancia
+from seleccion_instancias import Catalogo, parse_familia, seleccionar_flota
+
+def _catalogo():
+    # (tipo, vcpu, GiB, precio EC2/h)
+    tipos = [
+        ('m5.large', 2, 8, 0.096), ('m5.xlarge', 4, 16, 0.192), ('m5.4xlarge', 16, 64, 0.768),
+        ('c5.xlarge', 4, 8, 0.17), ('c5.4xlarge', 16, 32, 0.68),
+        ('r5.xlarge', 4, 32, 0.252), ('r5.4xlarge', 16, 128, 1.008),
+        ('m4.4xlarge', 16, 64, 0.5),         # generación 4: fuera del NodePool por defecto
+        ('m6g.4xlarge', 16, 64, 0.616),      # Graviton: excluido por defecto
+        ('m5n.4xlarge', 16, 64, 0.952),      # dominado por m5.4xlarge
+        ('t3.2xlarge', 8, 32, 0.3328),       # burstable: categoría t
+    ]
+    nombres, vcpu, mem, precio = zip(*tipos)
+    return Catalogo(nombres, vcpu, mem, precio, np.array(precio) * 0.12)
+
+def test_parse_familia():
+    assert parse_familia('c6gn.2xlarge') == ('c6gn', 'c', 6, 'gn')
+    assert parse_familia('m5.large') == ('m5', 'm', 5, '')
+    assert parse_familia('u-6tb1.metal') is None
+
+def test_filtros_y_dominancia():
+    catalogo = _catalogo()
+    elegibles = set(catalogo.tipos[catalogo.filtrar()])
+    assert 'm4.4xlarge' not in elegibles and 'm6g.4xlarge' not in elegibles and 't3.2xlarge' not in elegibles
+    assert 'm6g.4xlarge' in set(catalogo.tipos[catalogo.filtrar(graviton=True)])
+
+    resultado = seleccionar_flota(catalogo, 10, 40)
+    assert resultado.tipos_evaluados == 8
+    assert resultado.tipos_no_dominados < resultado.tipos_evaluados
+
+@pytest.mark.parametrize('cpu,mem', [(60, 60), (40, 600), (100, 400), (7, 300)])
+def test_flota_cubre_la_demanda_y_no_supera_un_solo_tipo(cpu, mem):
+    catalogo = _catalogo()
+    resultado = seleccionar_flota(catalogo, cpu, mem)
+    idx = {t: k for k, t in enumerate(catalogo.tipos)}
+
+    assert sum(n * catalogo.alloc_cpu[idx[t]] for t, n in resultado.flota.items()) >= cpu - 1e-6
+    assert sum(n * catalogo.alloc_mem[idx[t]] for t, n in resultado.flota.items()) >= mem - 1e-6
+    assert resultado.costo_hora == pytest.approx(sum(n * catalogo.precio[idx[t]] for t, n in resultado.flota.items()))
+    assert resultado.costo_hora <= resultado.alternativas[0][2] + 1e-9
+
+def test_mezcla_mas_barata_que_un_solo_tipo():
+    # Demanda con CPU y memoria desbalanceadas: c5 para CPU + r5 para memoria
+    resultado = seleccionar_flota(_catalogo(), 120, 700)
+    assert len(resultado.flota) == 2
+    assert resultado.costo_hora < resultado.alternativas[0][2]
+
+def test_el_pod_mas_grande_debe_entrar():
+    resultado = seleccionar_flota(_catalogo(), 10, 10, min_cpu=6)
+    assert all(t.endswith('4xlarge') for t in resultado.flota)
+
+def test_calculadora_con_seleccion(monkeypatch):
+    monkeypatch.setattr(calculadora_eks, 'get_default_index', lambda: None)
+    perfil = PerfilCluster(instance_type='m5.large', node_count=40, utilizacion_cpu=0.5, utilizacion_mem=0.5)
+    resultado = evaluar_cluster(perfil, {'m5.large': PreciosInstancia(0.096, 0.01152, True)}, rightsizing=True)
+
+    flota = resultado.flota_auto.flota
+    assert set(flota) <= set(resultado.precios_mix)
+    assert resultado.estimated_nodes_auto == sum(flota.values())
+    assert resultado.auto_monthly_cost < resultado.current_monthly_cost
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las series de utilización y de la simulación horaria de la calculadora
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from botocore.stub import ANY
+
+import recolector_eks_aws
+from calculadora_eks import PerfilCluster, PreciosInstancia, calcular_escenario, simular_nodos_horarios
+from series_utilizacion import SerieUtilizacion, parsear_perfil, formatear_perfil
+from test_recolector_eks_aws import _stub_client
+
+LUNES = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+def test_percentiles_y_perfil_semanal():
+    serie = SerieUtilizacion(LUNES, LUNES + timedelta(days=14), 3600)
+    horas = [LUNES + timedelta(hours=h) for h in range(14 * 24)]
+    # 80% de 9 a 18 h en días hábiles, 20% el resto
+    valores = [80.0 if t.weekday() < 5 and 9 <= t.hour < 18 else 20.0 for t in horas]
+    serie.agregar(horas, valores)
+
+    assert len(serie) == 14 * 24
+    assert serie.promedio() == np.mean(valores)
+    assert serie.percentiles() == {50: 20.0, 95: 80.0, 99: 80.0}
+
+    semanal = serie.perfil_semanal()
+    assert len(semanal) == 168
+    assert semanal[10] == 80.0          # lunes 10:00
+    assert semanal[5 * 24 + 10] == 20.0  # sábado 10:00
+    assert list(serie.perfil_horario()[:9]) == [20.0] * 9
+    assert parsear_perfil(formatear_perfil(semanal)) == list(semanal)
+
+def test_memoria_acotada_con_muchos_nodos():
+    inicio = datetime(2025, 1, 1)
+    serie = SerieUtilizacion(inicio, inicio + timedelta(days=30), 60)
+    nbytes = serie.nbytes
+    timestamps = np.arange(30 * 1440) * 60.0 + serie.start
+
+    # 300 nodos × 30 días a 1 minuto se pliegan sin crecer la memoria
+    for nodo in range(300):
+        serie.agregar(timestamps, np.full(len(timestamps), nodo % 100, dtype=float))
+
+    assert serie.nbytes == nbytes < 1024 * 1024
+    assert len(serie) == 30 * 1440
+    assert abs(serie.promedio() - 49.5) < 1e-9
+
+def test_get_utilization_series_pagina_y_pliega(monkeypatch):
+    stubber = _stub_client(monkeypatch, 'cloudwatch')
+    ahora = datetime.utcnow()
+    puntos = [ahora - timedelta(minutes=5 * i) for i in range(1, 5)]
+    expected = {'MetricDataQueries': ANY, 'StartTime': ANY, 'EndTime': ANY,
+                'ScanBy': 'TimestampAscending'}
+    stubber.add_response('get_metric_data', {'MetricDataResults': [
+        {'Id': 'u', 'Timestamps': puntos[:2], 'Values': [10.0, 20.0], 'StatusCode': 'PartialData'}
+    ], 'NextToken': 'p2'}, expected)
+    stubber.add_response('get_metric_data', {'MetricDataResults': [
+        {'Id': 'u', 'Timestamps': puntos[2:], 'Values': [30.0, 40.0], 'StatusCode': 'Complete'}
+    ]}, {**expected, 'NextToken': 'p2'})
+
+    with stubber:
+        serie = recolector_eks_aws.get_utilization_series('prod', 'us-east-1', 'node_cpu_utilization')
+        stubber.assert_no_pending_responses()
+
+    assert len(serie) == 4
+    assert serie.promedio() == 25.0
+
+def _precios():
+    return PreciosInstancia(precio_ec2_hora=0.10, precio_automode_fee_hora=0.01, using_api_pricing=True)
+
+def test_simulacion_con_perfil_constante_coincide_con_estatica():
+    base = dict(instance_type='m5.large', node_count=10, utilizacion_cpu=0.4, utilizacion_mem=0.6)
+    estatico = calcular_escenario(PerfilCluster(**base), _precios())
+    simulado = calcular_escenario(PerfilCluster(**base, perfil_cpu=[0.4] * 168, perfil_mem=[0.6] * 168),
+                                  _precios())
+
+    assert simulado.simulacion.nodos_min == simulado.simulacion.nodos_max == estatico.estimated_nodes_auto
+    assert abs(simulado.auto_monthly_cost - estatico.auto_monthly_cost) < 1e-6
+
+def test_simulacion_consolida_fuera_del_pico():
+    # Pico de 90% en horario laboral, 10% el resto de la semana
+    diurno = [0.9 if (h // 24) < 5 and 9 <= h % 24 < 18 else 0.1 for h in range(168)]
+    perfil = PerfilCluster(instance_type='m5.large', node_count=20,
+                           utilizacion_cpu=float(np.mean(diurno)), utilizacion_mem=float(np.mean(diurno)),
+                           perfil_cpu=diurno, perfil_mem=diurno)
+
+    simulacion = simular_nodos_horarios(perfil)
+    assert simulacion.total.shape == (730,)
+    assert simulacion.nodos_max == 20   # 20 × (1 - 0.1 × 0.2) = 19.6 → 20
+    assert simulacion.nodos_min == 3    # 19.6 × 0.1 / 0.9 = 2.2 → 3
+
+    resultado = calcular_escenario(perfil, _precios())
+    estatico = calcular_escenario(perfil, _precios(), simulacion_horaria=False)
+    assert resultado.auto_monthly_cost < estatico.auto_monthly_cost
+    horas_nodo = simulacion.horas_nodo('m5.large')
+    assert abs(resultado.automode_fee_monthly_cost - horas_nodo * 0.01) < 1e-6